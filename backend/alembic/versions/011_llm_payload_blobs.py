@@ -0,0 +1,50 @@
+"""LLM-LOG-BUF — compressed, content-addressed LLM payloads
+
+Revision ID: 011_llm_payload_blobs
+Revises: 010_pro_tier_marcus_opus
+Create Date: 2026-10-16
+
+Tables / columns
+----------------
+- llm_payload_blobs : sha256 (PK) → codec (zstd / zlib), size, data (bytea).
+  Un system prompt ou un contexte RAG répété n'est stocké qu'une fois.
+- llm_interactions.prompt_sha256 / rag_context_sha256 / response_sha256 :
+  référence vers le blob quand le payload dépasse LLM_LOG_INLINE_MAX_CHARS ;
+  la colonne texte correspondante ne garde alors qu'un aperçu.
+
+Les lignes existantes ne sont pas modifiées (colonnes *_sha256 à NULL = texte
+complet en ligne).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "011_llm_payload_blobs"
+down_revision = "010_pro_tier_marcus_opus"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "llm_payload_blobs",
+        sa.Column("sha256", sa.String(length=64), primary_key=True),
+        sa.Column("codec", sa.String(length=10), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+    )
+    for column in ("prompt_sha256", "rag_context_sha256", "response_sha256"):
+        op.add_column("llm_interactions", sa.Column(column, sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    for column in ("response_sha256", "rag_context_sha256", "prompt_sha256"):
+        op.drop_column("llm_interactions", column)
+    op.drop_table("llm_payload_blobs")
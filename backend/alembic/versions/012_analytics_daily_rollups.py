@@ -0,0 +1,59 @@
+"""ANALYTICS-ROLLUP — per user, per day dashboard counters
+
+Revision ID: 012_analytics_rollups
+Revises: 011_llm_payload_blobs
+Create Date: 2026-10-16
+
+Tables / index
+--------------
+- analytics_daily_rollups : (user_id, day) → lines_of_code,
+  executions_completed, execution_seconds, failed_gates. Tenue à jour par les
+  mapper events de app/models/analytics_rollup.py.
+- idx_executions_project_status : comptes de projets terminés et dernière
+  exécution par projet de /api/analytics.
+
+Après upgrade, remplir la table :
+    python -m app.services.analytics_rollup_service --backfill
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "012_analytics_rollups"
+down_revision = "011_llm_payload_blobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "analytics_daily_rollups",
+        sa.Column(
+            "user_id",
+            sa.Integer(),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("lines_of_code", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("executions_completed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("execution_seconds", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("failed_gates", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            nullable=True,
+            server_default=sa.func.now(),
+        ),
+    )
+    op.create_index(
+        "idx_executions_project_status",
+        "executions",
+        ["project_id", "status", "created_at"],
+    )
+
+
+def downgrade():
+    op.drop_index("idx_executions_project_status", table_name="executions")
+    op.drop_table("analytics_daily_rollups")
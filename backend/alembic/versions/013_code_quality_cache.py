@@ -0,0 +1,66 @@
+"""QUALITY-CACHE — cached code quality analyses and execution summaries
+
+Revision ID: 013_code_quality_cache
+Revises: 012_analytics_rollups
+Create Date: 2026-10-16
+
+Tables created
+--------------
+- code_quality_analyses       : (content_sha256, file_type) → résultat des règles
+  BLD-07 pour un contenu ; partagé entre tâches et exécutions.
+- execution_quality_summaries : 1 ligne / exécution, résumé du dashboard qualité
+  + liste (chemin → hash) de ses fichiers + empreinte des task_executions
+  lues (résumé recalculé si elle change).
+
+Les deux tables se remplissent à la première lecture ou après écriture de
+task_executions.generated_files ; aucun backfill requis.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "013_code_quality_cache"
+down_revision = "012_analytics_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "code_quality_analyses",
+        sa.Column("content_sha256", sa.String(length=64), primary_key=True),
+        sa.Column("file_type", sa.String(length=20), primary_key=True),
+        sa.Column("analyzer_version", sa.Integer(), nullable=False),
+        sa.Column("analysis", sa.JSON(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            nullable=True,
+            server_default=sa.func.now(),
+        ),
+    )
+    op.create_table(
+        "execution_quality_summaries",
+        sa.Column(
+            "execution_id",
+            sa.Integer(),
+            sa.ForeignKey("executions.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("analyzer_version", sa.Integer(), nullable=False),
+        sa.Column("summary", sa.JSON(), nullable=False),
+        sa.Column("files", sa.JSON(), nullable=False),
+        sa.Column("source_fingerprint", sa.String(length=100), nullable=True),
+        sa.Column(
+            "computed_at",
+            sa.DateTime(timezone=True),
+            nullable=True,
+            server_default=sa.func.now(),
+        ),
+    )
+
+
+def downgrade():
+    op.drop_table("execution_quality_summaries")
+    op.drop_table("code_quality_analyses")
@@ -0,0 +1,52 @@
+"""QUALITY-CACHE — write stamp on task_executions.generated_files
+
+Revision ID: 014_generated_files_version
+Revises: 013_code_quality_cache
+Create Date: 2026-10-16
+
+Colonne / trigger
+-----------------
+- task_executions.generated_files_version : incrémentée à chaque écriture de
+  generated_files. L'empreinte des résumés qualité (code_quality_service)
+  somme cette colonne au lieu de la longueur du JSON de chaque tâche.
+- trg_task_executions_generated_files_version : incrémente la colonne pour
+  les UPDATE hors ORM (SQL brut, scripts) ; l'ORM la tient déjà à jour.
+
+Les résumés existants ont une empreinte à l'ancien format : ils sont
+recalculés à la première lecture, aucun backfill requis.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "014_generated_files_version"
+down_revision = "013_code_quality_cache"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "task_executions",
+        sa.Column("generated_files_version", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_generated_files_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.generated_files_version := OLD.generated_files_version + 1;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_task_executions_generated_files_version
+        BEFORE UPDATE OF generated_files ON task_executions
+        FOR EACH ROW EXECUTE FUNCTION bump_generated_files_version()
+    """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS trg_task_executions_generated_files_version ON task_executions")
+    op.execute("DROP FUNCTION IF EXISTS bump_generated_files_version()")
+    op.drop_column("task_executions", "generated_files_version")
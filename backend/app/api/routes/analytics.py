@@ -1,104 +1,75 @@
 from fastapi import APIRouter, Depends
+from sqlalchemy import case, distinct, func
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from typing import Dict, Any
 
 from app.database import get_db
-from app.models import User, Project, Execution, AgentDeliverable, QualityGate, ExecutionStatus, GateStatus
+from app.models import User, Project, Execution, ExecutionStatus
+from app.services.analytics_rollup_service import dashboard_counters
 from app.utils.dependencies import get_current_user
 
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 
-def count_lines_of_code(content: str) -> int:
-    if not content:
-        return 0
-    lines = content.split('\n')
-    code_lines = 0
-    for line in lines:
-        stripped = line.strip()
-        if not stripped:
-            continue
-        if stripped.startswith(('//', '#', '/*', '*', '*/', '<!--', '-->')):
-            continue
-        code_lines += 1
-    return code_lines
-
 @router.get("")
 def get_analytics(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
-    completed_projects = db.query(Project).join(Execution).filter(
-        Execution.status == ExecutionStatus.COMPLETED,
-        Project.user_id == current_user.id
-    ).distinct().count()
-    
+    # ANALYTICS-ROLLUP: LOC, durations, failed gates and velocity come from the
+    # per-day rollups; the remaining reads are two indexed queries.
     week_ago = datetime.utcnow() - timedelta(days=7)
-    recent_completed = db.query(Project).join(Execution).filter(
+    completed_projects, recent_completed = db.query(
+        func.count(distinct(Execution.project_id)),
+        func.count(distinct(case((Execution.completed_at >= week_ago, Execution.project_id)))),
+    ).join(Project).filter(
         Execution.status == ExecutionStatus.COMPLETED,
-        Execution.completed_at >= week_ago,
         Project.user_id == current_user.id
-    ).distinct().count()
+    ).one()
     
-    deliverables = db.query(AgentDeliverable.content).join(Execution).join(Project).filter(
-        Project.user_id == current_user.id
-    ).all()
-    total_lines = sum(count_lines_of_code(d.content) for d in deliverables)
+    counters = dashboard_counters(db, current_user.id)
+    total_lines = counters["lines_of_code"]
     
-    completed_executions = db.query(Execution).join(Project).filter(
-        Execution.status == ExecutionStatus.COMPLETED,
-        Execution.duration_seconds.isnot(None),
-        Project.user_id == current_user.id
-    ).all()
-    
-    ai_time_hours = sum(e.duration_seconds for e in completed_executions) / 3600
+    ai_time_hours = counters["execution_seconds"] / 3600
     manual_time_estimate = ai_time_hours * 20
     time_saved_hours = manual_time_estimate - ai_time_hours
     
-    bugs_caught = db.query(QualityGate).join(Execution).join(Project).filter(
-        QualityGate.status == GateStatus.FAILED,
-        Project.user_id == current_user.id
-    ).count()
+    bugs_caught = counters["failed_gates"]
     
-    recent_projects = db.query(Project).join(Execution).filter(
+    # Latest execution per project, one query
+    ranked = db.query(
+        Execution.project_id,
+        Execution.status,
+        Execution.created_at,
+        func.row_number().over(
+            partition_by=Execution.project_id,
+            order_by=(Execution.created_at.desc(), Execution.id.desc())
+        ).label("rank")
+    ).join(Project).filter(
         Project.user_id == current_user.id
+    ).subquery()
+    recent_projects = db.query(
+        Project.id, Project.name, ranked.c.status, ranked.c.created_at
+    ).join(ranked, ranked.c.project_id == Project.id).filter(
+        ranked.c.rank == 1
     ).order_by(Project.updated_at.desc()).limit(10).all()
     
-    projects_list = []
-    for project in recent_projects:
-        latest_execution = db.query(Execution).filter(
-            Execution.project_id == project.id
-        ).order_by(Execution.created_at.desc()).first()
-        
-        if latest_execution:
-            status_map = {
-                ExecutionStatus.COMPLETED: "Completed",
-                ExecutionStatus.FAILED: "Failed",
-                ExecutionStatus.IN_PROGRESS: "In Progress",
-                ExecutionStatus.PENDING: "Pending"
-            }
-            
-            projects_list.append({
-                "id": f"PROJ-{project.id:03d}",
-                "name": project.name,
-                "date": latest_execution.created_at.strftime("%Y-%m-%d"),
-                "status": status_map.get(latest_execution.status, "Unknown"),
-                "impact": "High" if completed_projects > 5 else "Medium"
-            })
-    
-    velocity_data = []
-    for week_offset in range(6, -1, -1):
-        week_start = datetime.utcnow() - timedelta(weeks=week_offset+1)
-        week_end = datetime.utcnow() - timedelta(weeks=week_offset)
-        
-        week_projects = db.query(Execution).join(Project).filter(
-            Execution.status == ExecutionStatus.COMPLETED,
-            Execution.completed_at >= week_start,
-            Execution.completed_at < week_end,
-            Project.user_id == current_user.id
-        ).count()
-        
-        velocity_data.append(week_projects)
+    status_map = {
+        ExecutionStatus.COMPLETED: "Completed",
+        ExecutionStatus.FAILED: "Failed",
+        ExecutionStatus.RUNNING: "In Progress",
+        ExecutionStatus.PENDING: "Pending"
+    }
+    projects_list = [
+        {
+            "id": f"PROJ-{project_id:03d}",
+            "name": name,
+            "date": created_at.strftime("%Y-%m-%d"),
+            "status": status_map.get(status, "Unknown"),
+            "impact": "High" if completed_projects > 5 else "Medium"
+        }
+        for project_id, name, status, created_at in recent_projects
+    ]
     
     return {
         "stats": {
@@ -109,5 +80,5 @@ def get_analytics(
             "bugs_caught": bugs_caught
         },
         "projects": projects_list,
-        "velocity": velocity_data
+        "velocity": counters["velocity"]
     }
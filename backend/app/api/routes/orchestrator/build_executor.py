@@ -4,14 +4,20 @@ BUILD V2 executor function.
 P4: Extracted from pm_orchestrator.py — Background BUILD execution.
 """
 import logging
+from typing import Optional
 
 from app.database import SessionLocal
 
 logger = logging.getLogger(__name__)
 
 
-async def execute_build_v2(project_id: int, execution_id: int):
-    """Execute BUILD v2 with PhasedBuildExecutor."""
+async def execute_build_v2(project_id: int, execution_id: int, force_deploy: bool = False,
+                           pipelined: Optional[bool] = None):
+    """Execute BUILD v2 with PhasedBuildExecutor.
+
+    force_deploy: full redeploy, no DEPLOY-DIFF. pipelined: PIPE-BUILD mode
+    (None: settings.BUILD_PIPELINED).
+    """
     from app.services.phased_build_executor import PhasedBuildExecutor
     from app.models.task_execution import TaskExecution
 
@@ -38,7 +44,8 @@ async def execute_build_v2(project_id: int, execution_id: int):
 
         logger.info(f"[BUILD v2] Found {len(wbs_tasks)} tasks")
 
-        executor = PhasedBuildExecutor(project_id, execution_id, db)
+        executor = PhasedBuildExecutor(project_id, execution_id, db, pipelined=pipelined,
+                                       force_deploy=force_deploy)
         # Initialize jordan_service (git/sfdx) before execute_build — without
         # this call, executor.jordan_service stays None and Phase 1 crashes on
         # create_phase_branch with NoneType. Symmetric close() in finally.
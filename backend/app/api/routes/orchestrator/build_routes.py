@@ -3,6 +3,8 @@ BUILD phase monitoring routes for PM Orchestrator.
 
 P4: Extracted from pm_orchestrator.py — BUILD task/phase monitoring and execution.
 """
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 import logging
@@ -211,10 +213,15 @@ async def start_build_phase(
     request: Request,
     response: Response,
     project_id: int,
+    pipelined: Optional[bool] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user_from_token_or_header),
 ):
-    """Start the BUILD phase for a project after SDS approval."""
+    """Start the BUILD phase for a project after SDS approval.
+
+    ``pipelined`` overrides settings.BUILD_PIPELINED for this build (deploy of
+    phase N overlapped with generation of phase N+1).
+    """
     from app.services.pm_orchestrator_service_v2 import BuildPhaseService
 
     service = BuildPhaseService(db)
@@ -237,6 +244,7 @@ async def start_build_phase(
         "execute_build_task",
         project_id=project_id,
         execution_id=result["execution_id"],
+        pipelined=pipelined,
         _queue_name="digital-humans",
     )
     logger.info(f"[ARQ] Job {job.job_id} enqueued for BUILD {result['execution_id']}")
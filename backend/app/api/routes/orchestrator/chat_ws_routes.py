@@ -7,6 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query, WebSocket,
 from sqlalchemy.orm import Session
 import asyncio
 import logging
+from contextlib import AsyncExitStack
 
 from app.database import get_db
 from app.models.user import User
@@ -15,11 +16,14 @@ from app.models.execution import Execution, ExecutionStatus
 from app.utils.dependencies import get_current_user
 from app.config import settings
 from app.api.routes.orchestrator._helpers import verify_execution_access
+from app.services.progress_snapshot import progress_snapshot_cache, load_snapshot_from_db
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["PM Orchestrator"])
 
+WS_POLL_INTERVAL = 5  # seconds between snapshot checks when no NOTIFY arrives
+
 
 @router.post("/chat/{execution_id}")
 async def chat_with_pm(
@@ -96,47 +100,88 @@ async def websocket_endpoint(
             "data": {"execution_id": execution_id, "status": execution.status.value},
         })
 
-        last_status = execution.status
+        last_status = execution.status.value
         last_agent = execution.current_agent
+        db.close()  # Release the pooled connection: the loop below only reads snapshots
 
-        while True:
-            try:
-                db.refresh(execution)
-
-                if execution.status != last_status or execution.current_agent != last_agent:
-                    await websocket.send_json({
-                        "type": "progress",
-                        "data": {
-                            "execution_id": execution_id,
-                            "status": execution.status.value,
-                            "progress": execution.progress or 0,
-                            "current_agent": execution.current_agent,
-                            "agent_execution_status": execution.agent_execution_status,
-                            "message": f"Agent {execution.current_agent} is running..." if execution.current_agent else None,
-                        },
-                    })
-                    last_status = execution.status
-                    last_agent = execution.current_agent
-
-                if execution.status in [ExecutionStatus.COMPLETED, ExecutionStatus.FAILED]:
-                    await websocket.send_json({
-                        "type": "completed" if execution.status == ExecutionStatus.COMPLETED else "error",
-                        "data": {
-                            "execution_id": execution_id,
-                            "status": execution.status.value,
-                            "progress": 100 if execution.status == ExecutionStatus.COMPLETED else execution.progress,
-                            "sds_document_path": execution.sds_document_path,
-                        },
-                    })
+        # PROGRESS-SNAP: read the shared per-execution snapshot (pushed with the
+        # orchestrator's NOTIFY) instead of a db.refresh per viewer per tick.
+        notification_service = None
+        try:
+            from app.services.notification_service import get_notification_service
+
+            notification_service = await get_notification_service()
+        except Exception as e:
+            logger.debug(f"Notifications unavailable for WebSocket, using snapshot polling: {e}")
+
+        async with AsyncExitStack() as stack:
+            queue = None
+            if notification_service is not None:
+                try:
+                    queue = await stack.enter_async_context(
+                        notification_service.subscribe(f"execution_{execution_id}")
+                    )
+                except Exception as e:
+                    logger.warning(f"WebSocket subscription failed, falling back to polling: {e}")
+
+            while True:
+                try:
+                    max_age = WS_POLL_INTERVAL
+                    if queue is not None:
+                        try:
+                            message = await asyncio.wait_for(queue.get(), timeout=WS_POLL_INTERVAL)
+                            if isinstance(message.get("snapshot"), dict):
+                                progress_snapshot_cache.update(message["snapshot"])
+                            else:
+                                max_age = 1.0
+                        except asyncio.TimeoutError:
+                            pass
+
+                    snapshot = await progress_snapshot_cache.get_or_load(
+                        execution_id, lambda: load_snapshot_from_db(execution_id), max_age=max_age
+                    )
+                    if snapshot is None:
+                        await websocket.send_json({"type": "error", "data": {"error": "Execution not found"}})
+                        break
+
+                    current_status = snapshot["status"]
+                    current_agent = snapshot["current_agent"]
+                    if current_status != last_status or current_agent != last_agent:
+                        await websocket.send_json({
+                            "type": "progress",
+                            "data": {
+                                "execution_id": execution_id,
+                                "status": current_status,
+                                "progress": snapshot["progress"],
+                                "current_agent": current_agent,
+                                "agent_execution_status": snapshot["agent_execution_status"],
+                                "message": f"Agent {current_agent} is running..." if current_agent else None,
+                            },
+                        })
+                        last_status = current_status
+                        last_agent = current_agent
+
+                    if current_status in (ExecutionStatus.COMPLETED.value, ExecutionStatus.FAILED.value):
+                        completed = current_status == ExecutionStatus.COMPLETED.value
+                        await websocket.send_json({
+                            "type": "completed" if completed else "error",
+                            "data": {
+                                "execution_id": execution_id,
+                                "status": current_status,
+                                "progress": 100 if completed else snapshot["progress"],
+                                "sds_document_path": snapshot["sds_document_path"],
+                            },
+                        })
+                        break
+
+                    if queue is None:
+                        await asyncio.sleep(WS_POLL_INTERVAL)
+
+                except Exception as e:
+                    logger.error(f"Error in WebSocket loop: {str(e)}")
+                    await websocket.send_json({"type": "error", "data": {"error": "Internal server error"}})
                     break
 
-                await asyncio.sleep(5)
-
-            except Exception as e:
-                logger.error(f"Error in WebSocket loop: {str(e)}")
-                await websocket.send_json({"type": "error", "data": {"error": "Internal server error"}})
-                break
-
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for execution {execution_id}")
 
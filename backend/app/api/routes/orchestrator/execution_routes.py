@@ -30,11 +30,16 @@ from app.api.routes.orchestrator._helpers import (
     verify_execution_access,
     build_agent_progress,
 )
+from app.services.progress_snapshot import progress_snapshot_cache, load_snapshot_from_db
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["PM Orchestrator"])
 
+# PROGRESS-SNAP: a NOTIFY without snapshot (payload too large) triggers one shared
+# DB reload; viewers woken by the same NOTIFY within this window reuse it.
+SNAPSHOT_RELOAD_AFTER_BARE_NOTIFY = 1.0
+
 
 @router.post("/execute", response_model=ExecutionStartResponse, status_code=status.HTTP_202_ACCEPTED)
 @limiter.limit(RateLimits.EXECUTE_SDS)
@@ -291,19 +296,30 @@ async def stream_execution_progress(
         start_time = asyncio.get_event_loop().time()
         poll_interval = 3 if use_notifications else 2  # noqa: F823 — pre-initialized at function entry, ruff false positive on closure
 
-        def build_progress_data():
-            db.refresh(execution)
-            agent_prog, overall, phase = build_agent_progress(execution)
-            current_status = (
-                execution.status.value if hasattr(execution.status, "value") else str(execution.status)
+        async def build_progress_data(message=None):
+            # PROGRESS-SNAP: serve the shared per-execution snapshot. A pushed
+            # snapshot updates the cache without touching the DB; otherwise at
+            # most one DB read per poll_interval is shared by every viewer.
+            max_age = poll_interval
+            if message is not None:
+                if isinstance(message.get("snapshot"), dict):
+                    progress_snapshot_cache.update(message["snapshot"])
+                else:
+                    max_age = SNAPSHOT_RELOAD_AFTER_BARE_NOTIFY
+            snapshot = await progress_snapshot_cache.get_or_load(
+                execution_id, lambda: load_snapshot_from_db(execution_id), max_age=max_age
             )
+            if snapshot is None:
+                raise RuntimeError("Execution not found")
+            current_status = snapshot["status"]
+            overall = snapshot["overall_progress"]
             return {
-                "execution_id": execution.id,
+                "execution_id": snapshot["execution_id"],
                 "status": current_status,
-                "execution_state": execution.execution_state or "draft",
+                "execution_state": snapshot["execution_state"],
                 "overall_progress": overall,
-                "current_phase": phase,
-                "agent_progress": agent_prog,
+                "current_phase": snapshot["current_phase"],
+                "agent_progress": snapshot["agent_progress"],
             }, current_status, overall
 
         if use_notifications and notification_service:
@@ -312,11 +328,12 @@ async def stream_execution_progress(
                 async with notification_service.subscribe(channel) as queue:
                     while (asyncio.get_event_loop().time() - start_time) < max_duration:
                         try:
+                            message = None
                             try:
-                                await asyncio.wait_for(queue.get(), timeout=poll_interval)
+                                message = await asyncio.wait_for(queue.get(), timeout=poll_interval)
                             except asyncio.TimeoutError:
                                 pass
-                            data, current_status, overall = build_progress_data()
+                            data, current_status, overall = await build_progress_data(message)
                             if current_status != last_status or overall != last_progress:
                                 yield f"data: {json.dumps(data)}\n\n"
                                 last_status = current_status
@@ -336,7 +353,7 @@ async def stream_execution_progress(
         if not use_notifications:
             while (asyncio.get_event_loop().time() - start_time) < max_duration:
                 try:
-                    data, current_status, overall = build_progress_data()
+                    data, current_status, overall = await build_progress_data()
                     if current_status != last_status or overall != last_progress:
                         yield f"data: {json.dumps(data)}\n\n"
                         last_status = current_status
@@ -4,6 +4,8 @@ Retry and execution control routes for PM Orchestrator.
 P4: Extracted from pm_orchestrator.py — Retry, pause, resume controls.
 P7: Multi-step retry operations wrapped in try/except with rollback.
 """
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 import logging
@@ -171,10 +173,17 @@ def pause_build(
 @router.post("/execute/{execution_id}/resume-build")
 async def resume_build(
     execution_id: int,
+    force_deploy: bool = False,
+    pipelined: Optional[bool] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Resume a paused BUILD phase execution."""
+    """Resume a paused BUILD phase execution.
+
+    ``force_deploy=true`` redeploys each remaining phase in full instead of only
+    the components changed since the last deploy (target org edited by hand).
+    ``pipelined`` overrides settings.BUILD_PIPELINED for the resumed build.
+    """
     from app.services.pm_orchestrator_service_v2 import BuildPhaseService
 
     service = BuildPhaseService(db)
@@ -190,9 +199,12 @@ async def resume_build(
             "execute_build_task",
             project_id=execution.project_id,
             execution_id=execution_id,
+            force_deploy=force_deploy,
+            pipelined=pipelined,
             _queue_name="digital-humans",
         )
-        logger.info(f"[ARQ] Job {job.job_id} enqueued for build resume {execution_id}")
+        logger.info(f"[ARQ] Job {job.job_id} enqueued for build resume {execution_id}"
+                    f"{' (full redeploy)' if force_deploy else ''}")
 
     return {
         "status": result["status"],
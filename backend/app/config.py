@@ -46,6 +46,11 @@ class Settings(BaseSettings):
     # OpenAI
     OPENAI_API_KEY: str = ""
 
+    # BUILD (PIPE-BUILD): generate phase N+1 while phase N deploys. Off by
+    # default (shared sandbox); env BUILD_PIPELINED=true, or per build with
+    # the start-build / resume-build ``pipelined`` query parameter.
+    BUILD_PIPELINED: bool = False
+
     # Centralized paths (P2 / D-1: env-driven with sane defaults).
     #
     # Every path below is derived from PROJECT_ROOT (auto-detected as the
@@ -1,6 +1,8 @@
 """
 Database configuration and session management.
 """
+from contextlib import contextmanager
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -42,3 +44,19 @@ def get_db():
         raise
     finally:
         db.close()
+
+
+@contextmanager
+def get_db_session():
+    """
+    Session context manager for code outside FastAPI dependencies
+    (worker threads, raw SQL routes). Same rollback / close policy as get_db.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -22,6 +22,7 @@ from fastapi.responses import JSONResponse
 from slowapi.errors import RateLimitExceeded
 from app.rate_limiter import limiter, rate_limit_exceeded_handler
 from app.services.notification_service import get_notification_service, shutdown_notification_service
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -194,6 +195,25 @@ async def shutdown_event():
         logger.info("NotificationService shutdown complete")
     except Exception as e:
         logger.error(f"Error shutting down NotificationService: {e}")
+    try:
+        from app.services.audit_service import audit_service
+        await asyncio.to_thread(audit_service.writer.shutdown)
+        logger.info(f"Audit writer flushed: {audit_service.writer.stats}")
+    except Exception as e:
+        logger.error(f"Error flushing audit writer: {e}")
+    try:
+        from app.services.llm_logger import get_llm_log_writer
+        await asyncio.to_thread(get_llm_log_writer().shutdown)
+    except Exception as e:
+        logger.error(f"Error flushing LLM interaction writer: {e}")
+    try:
+        from app.services import llm_router_service
+        router = llm_router_service._router_instance
+        if router is not None:
+            await router.aclose_clients()
+            await asyncio.to_thread(router.shutdown)
+    except Exception as e:
+        logger.error(f"Error closing LLM router clients: {e}")
 
 @app.get("/health")
 async def health_check():
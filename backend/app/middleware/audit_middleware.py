@@ -50,6 +50,14 @@ class AuditMiddleware(BaseHTTPMiddleware):
         ip_address = self._get_client_ip(request)
         user_agent = request.headers.get("user-agent", "")[:500]
         
+        # Request context (contextvar): also carried by audit events logged by the endpoint
+        from app.services.audit_service import audit_service
+        context_token = audit_service.set_request_context(
+            request_id=request_id,
+            ip_address=ip_address,
+            user_agent=user_agent
+        )
+        
         # Record start time
         start_time = time.time()
         
@@ -78,24 +86,13 @@ class AuditMiddleware(BaseHTTPMiddleware):
             )
             
             if should_log:
-                # Log in background to not slow down response
+                # AUDIT-ASYNC: queued, written in batches by the audit writer thread
                 try:
-                    # Import here to avoid circular imports at startup
-                    from app.services.audit_service import audit_service
-                    
                     action = self._method_to_action(request.method)
                     entity_type, entity_id = self._parse_path(request.url.path)
                     project_id = self._extract_id_from_path(request.url.path, "projects")
                     execution_id = self._extract_id_from_path(request.url.path, "executions")
                     
-                    # Set request context
-                    audit_service.set_request_context(
-                        request_id=request_id,
-                        ip_address=ip_address,
-                        user_agent=user_agent
-                    )
-                    
-                    # Log synchronously but in try/except
                     audit_service.log(
                         actor_type=ActorType.API,
                         actor_id=ip_address,
@@ -114,10 +111,10 @@ class AuditMiddleware(BaseHTTPMiddleware):
                             "status_code": status_code,
                         }
                     )
-                    
-                    audit_service.clear_request_context()
                 except Exception as e:
                     logger.error(f"Audit middleware failed: {e}")
+            
+            audit_service.clear_request_context(context_token)
     
     def _get_client_ip(self, request: Request) -> str:
         """Extract real client IP"""
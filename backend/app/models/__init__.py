@@ -40,7 +40,7 @@ from app.models.sds_version import SDSVersion
 
 # ORCH-03a: Incremental Build
 from app.models.task_execution import TaskExecution, TaskStatus
-from app.models.llm_interaction import LLMInteraction
+from app.models.llm_interaction import LLMInteraction, LLMPayloadBlob
 from app.models.uc_requirement_sheet import UCRequirementSheet
 from app.models.change_request import ChangeRequest, CRStatus, CRCategory, CRPriority
 from app.models.project_conversation import ProjectConversation
@@ -48,6 +48,12 @@ from app.models.project_conversation import ProjectConversation
 # CORE-001: Audit Logging
 from app.models.audit import AuditLog, ActorType, ActionCategory
 
+# ANALYTICS-ROLLUP: dashboard counters (registers the mapper events)
+from app.models.analytics_rollup import AnalyticsDailyRollup
+
+# QUALITY-CACHE: code quality analyses / summaries (registers the mapper events)
+from app.models.code_quality import CodeQualityAnalysis, ExecutionQualitySummary
+
 __all__ = [
     # Core models
     "User",
@@ -99,11 +105,16 @@ __all__ = [
     "TaskExecution",
     "TaskStatus",
     "LLMInteraction",
+    "LLMPayloadBlob",
     "UCRequirementSheet",
     # Audit Logging
     "AuditLog",
     "ActorType",
     "ActionCategory",
+    # Analytics
+    "AnalyticsDailyRollup",
+    "CodeQualityAnalysis",
+    "ExecutionQualitySummary",
 ]
 
 # Phase 6: WBS Task Types
@@ -0,0 +1,233 @@
+"""
+Analytics rollups (ANALYTICS-ROLLUP) — per user, per day counters behind /api/analytics.
+
+Before: every dashboard load read the full content of every deliverable the
+user ever produced to count lines of code, every completed execution to sum
+durations, plus one query per recent project and one COUNT per week.
+
+Now ``analytics_daily_rollups`` holds, per (user, day), lines of code,
+completed executions, their duration and failed quality gates. The rows are
+maintained by the mapper events below, in the same transaction as the change,
+whatever code path saves the deliverable / execution / gate. Rows deleted
+outside the ORM (``ON DELETE CASCADE``, raw SQL) are not seen: rebuild with
+``python -m app.services.analytics_rollup_service --backfill``.
+"""
+import logging
+from datetime import date, datetime, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import Column, Integer, BigInteger, Date, DateTime, ForeignKey, event, select, update
+from sqlalchemy.orm.attributes import get_history
+from sqlalchemy.orm.base import PASSIVE_NO_INITIALIZE
+from sqlalchemy.sql import func
+
+from app.database import Base
+from app.models.agent_deliverable import AgentDeliverable
+from app.models.execution import Execution, ExecutionStatus
+from app.models.project import Project
+from app.models.quality_gate import QualityGate, GateStatus
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_ROLLUPS_ENABLED = True     # False stops maintaining the rollups (backfill to catch up)
+
+_COUNTERS = ("lines_of_code", "executions_completed", "execution_seconds", "failed_gates")
+
+
+class AnalyticsDailyRollup(Base):
+    """Dashboard counters for one user and one (UTC) day."""
+
+    __tablename__ = "analytics_daily_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    lines_of_code = Column(BigInteger, nullable=False, default=0, server_default="0")
+    executions_completed = Column(Integer, nullable=False, default=0, server_default="0")
+    execution_seconds = Column(BigInteger, nullable=False, default=0, server_default="0")
+    failed_gates = Column(Integer, nullable=False, default=0, server_default="0")
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<AnalyticsDailyRollup user={self.user_id} day={self.day}>"
+
+
+def count_lines_of_code(content: str) -> int:
+    if not content:
+        return 0
+    lines = content.split('\n')
+    code_lines = 0
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith(('//', '#', '/*', '*', '*/', '<!--', '-->')):
+            continue
+        code_lines += 1
+    return code_lines
+
+
+def rollup_day(moment: Optional[datetime]) -> date:
+    """UTC day a timestamp is counted on (today when unknown)."""
+    if moment is None:
+        return datetime.now(timezone.utc).date()
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.date()
+
+
+def execution_contribution(status, duration_seconds, completed_at) -> Optional[tuple]:
+    """``(day, {counter: delta})`` an execution adds to the rollups, None if not completed."""
+    if status != ExecutionStatus.COMPLETED:
+        return None
+    return rollup_day(completed_at), {"executions_completed": 1, "execution_seconds": duration_seconds or 0}
+
+
+def apply_rollup(connection, user_id: Optional[int], day: date, deltas: Dict[str, int]) -> None:
+    """Add ``deltas`` to the (user_id, day) row, creating it if needed."""
+    deltas = {k: v for k, v in deltas.items() if v}
+    if user_id is None or not deltas:
+        return
+    table = AnalyticsDailyRollup.__table__
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(user_id=user_id, day=day, **{c: deltas.get(c, 0) for c in _COUNTERS})
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.day],
+            set_={**{c: table.c[c] + stmt.excluded[c] for c in deltas}, "updated_at": func.now()},
+        )
+        connection.execute(stmt)
+        return
+    result = connection.execute(
+        update(table).where(table.c.user_id == user_id, table.c.day == day)
+        .values(**{c: table.c[c] + v for c, v in deltas.items()}, updated_at=func.now())
+    )
+    if not result.rowcount:
+        connection.execute(table.insert().values(user_id=user_id, day=day,
+                                                 **{c: deltas.get(c, 0) for c in _COUNTERS}))
+
+
+# ═══════════════════════════════════════════════════════════════
+# Mapper events
+# ═══════════════════════════════════════════════════════════════
+
+def _safe_apply(connection, user_id, changes) -> None:
+    """Apply ``[(day, deltas, sign)]`` in a savepoint: a rollup error never fails the caller's flush."""
+    if user_id is None or not changes:
+        return
+    try:
+        with connection.begin_nested():
+            for day, deltas, sign in changes:
+                apply_rollup(connection, user_id, day, {k: sign * v for k, v in deltas.items()})
+    except Exception as e:
+        logger.warning(f"[AnalyticsRollup] rollup update skipped (run the backfill): {e}")
+
+
+def _owner_of_execution(connection, execution_id) -> Optional[int]:
+    if execution_id is None:
+        return None
+    executions, projects = Execution.__table__, Project.__table__
+    return connection.execute(
+        select(projects.c.user_id).select_from(executions.join(projects, projects.c.id == executions.c.project_id))
+        .where(executions.c.id == execution_id)
+    ).scalar()
+
+
+def _owner_of_project(connection, project_id) -> Optional[int]:
+    if project_id is None:
+        return None
+    projects = Project.__table__
+    return connection.execute(select(projects.c.user_id).where(projects.c.id == project_id)).scalar()
+
+
+def _values(connection, target, columns, previous: bool = False) -> Dict[str, object]:
+    """
+    Column values of ``target`` without triggering a load inside the flush:
+    pending / loaded state first, the row in the database otherwise.
+    ``previous`` returns the values before this flush.
+    """
+    values, missing = {}, []
+    for column in columns:
+        history = get_history(target, column, passive=PASSIVE_NO_INITIALIZE)
+        if previous and history.deleted:
+            values[column] = history.deleted[0]
+        elif previous and history.added:
+            missing.append(column)          # old value never loaded
+        elif column in target.__dict__:
+            values[column] = target.__dict__[column]
+        else:
+            missing.append(column)          # expired / server default
+    if missing:
+        table = target.__table__
+        row = connection.execute(select(*[table.c[c] for c in missing]).where(table.c.id == target.id)).first()
+        values.update(dict(zip(missing, row)) if row is not None else dict.fromkeys(missing))
+    return values
+
+
+def _changed(target, columns) -> bool:
+    return any(get_history(target, c, passive=PASSIVE_NO_INITIALIZE).has_changes() for c in columns)
+
+
+def _deliverable_contribution(v) -> tuple:
+    return rollup_day(v["created_at"]), {"lines_of_code": count_lines_of_code(v["content"])}
+
+
+def _execution_contribution(v) -> Optional[tuple]:
+    return execution_contribution(v["status"], v["duration_seconds"], v["completed_at"])
+
+
+def _gate_contribution(v) -> Optional[tuple]:
+    if v["status"] != GateStatus.FAILED:
+        return None
+    return rollup_day(v["checked_at"]), {"failed_gates": 1}
+
+
+# model → (columns, owner lookup column, owner lookup, contribution)
+_TRACKED = {
+    AgentDeliverable: (("content", "created_at", "execution_id"), "execution_id",
+                       _owner_of_execution, _deliverable_contribution),
+    Execution: (("status", "duration_seconds", "completed_at", "project_id"), "project_id",
+                _owner_of_project, _execution_contribution),
+    QualityGate: (("status", "checked_at", "execution_id"), "execution_id",
+                  _owner_of_execution, _gate_contribution),
+}
+
+
+def _apply_state(connection, target, values, sign) -> None:
+    columns, owner_column, owner_of, contribution = _TRACKED[type(target)]
+    change = contribution(values)
+    if change:
+        _safe_apply(connection, owner_of(connection, values[owner_column]), [(*change, sign)])
+
+
+def _inserted(mapper, connection, target):
+    if ANALYTICS_ROLLUPS_ENABLED:
+        _apply_state(connection, target, _values(connection, target, _TRACKED[type(target)][0]), 1)
+
+
+def _updated(mapper, connection, target):
+    columns = _TRACKED[type(target)][0]
+    if not ANALYTICS_ROLLUPS_ENABLED or not _changed(target, columns):
+        return
+    before = _values(connection, target, columns, previous=True)
+    after = _values(connection, target, columns)
+    if before == after:
+        return
+    _apply_state(connection, target, before, -1)
+    _apply_state(connection, target, after, 1)
+
+
+def _deleted(mapper, connection, target):
+    if ANALYTICS_ROLLUPS_ENABLED:
+        _apply_state(connection, target, _values(connection, target, _TRACKED[type(target)][0], previous=True), -1)
+
+
+for _model in _TRACKED:
+    event.listen(_model, "after_insert", _inserted)
+    event.listen(_model, "before_update", _updated)
+    event.listen(_model, "before_delete", _deleted)
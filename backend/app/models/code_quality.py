@@ -0,0 +1,95 @@
+"""
+Code quality cache (QUALITY-CACHE) — per-file analyses and per-execution summaries.
+
+``code_quality_analyses`` stores the result of the quality rules for one file
+content (sha256) and file type, so identical files shared by several tasks or
+executions are analysed once. ``execution_quality_summaries`` materialises the
+dashboard summary of an execution plus the (path → hash) list of its files.
+
+Writing ``TaskExecution.generated_files`` through the ORM drops the summary of
+that execution and, after commit, recomputes it in the background. Every write
+also bumps ``TaskExecution.generated_files_version`` (ORM: listener below;
+raw SQL: trigger from migration 014). The summary keeps a fingerprint of the
+row ids and versions it was built from and is recomputed on read when it no
+longer matches, which catches writes that bypass the ORM.
+"""
+import logging
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, event, delete
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import get_history
+from sqlalchemy.orm.base import PASSIVE_NO_INITIALIZE
+from sqlalchemy.sql import func
+
+from app.database import Base
+from app.models.task_execution import TaskExecution
+
+logger = logging.getLogger(__name__)
+
+QUALITY_PRECOMPUTE_ON_WRITE = True   # False: summaries are only rebuilt when read
+
+_DIRTY_KEY = "quality_dirty_executions"
+
+
+class CodeQualityAnalysis(Base):
+    """Quality rules result for one file content."""
+    __tablename__ = "code_quality_analyses"
+
+    content_sha256 = Column(String(64), primary_key=True)
+    file_type = Column(String(20), primary_key=True)
+    analyzer_version = Column(Integer, nullable=False)
+    analysis = Column(JSON, nullable=False)   # score, issues, metrics, errors_count, warnings_count
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<CodeQualityAnalysis {self.content_sha256[:12]} {self.file_type}>"
+
+
+class ExecutionQualitySummary(Base):
+    """Materialised quality summary of one execution."""
+    __tablename__ = "execution_quality_summaries"
+
+    execution_id = Column(Integer, ForeignKey("executions.id", ondelete="CASCADE"), primary_key=True)
+    analyzer_version = Column(Integer, nullable=False)
+    summary = Column(JSON, nullable=False)
+    files = Column(JSON, nullable=False)      # [{task_id, file_path, file_type, sha256}]
+    source_fingerprint = Column(String(100))  # rows:sum(id):sum(generated_files_version), see code_quality_service
+
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<ExecutionQualitySummary execution={self.execution_id}>"
+
+
+def _bump_generated_files_version(mapper, connection, target):
+    if get_history(target, "generated_files", passive=PASSIVE_NO_INITIALIZE).has_changes():
+        target.generated_files_version = (target.generated_files_version or 0) + 1
+
+
+def _generated_files_written(mapper, connection, target):
+    if not get_history(target, "generated_files", passive=PASSIVE_NO_INITIALIZE).has_changes():
+        return
+    table = ExecutionQualitySummary.__table__
+    connection.execute(delete(table).where(table.c.execution_id == target.execution_id))
+    session = object_session(target)
+    if session is not None and QUALITY_PRECOMPUTE_ON_WRITE:
+        session.info.setdefault(_DIRTY_KEY, set()).add(target.execution_id)
+
+
+event.listen(TaskExecution, "before_update", _bump_generated_files_version)
+event.listen(TaskExecution, "after_insert", _generated_files_written)
+event.listen(TaskExecution, "after_update", _generated_files_written)
+
+
+@event.listens_for(Session, "after_commit")
+def _precompute_after_commit(session):
+    execution_ids = session.info.pop(_DIRTY_KEY, None)
+    if execution_ids:
+        from app.services.code_quality_service import schedule_precompute
+        schedule_precompute(execution_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session):
+    session.info.pop(_DIRTY_KEY, None)
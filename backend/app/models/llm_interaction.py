@@ -1,7 +1,7 @@
 """
 LLM Interaction Model - Tracks all LLM calls for debugging
 """
-from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, ForeignKey, LargeBinary
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from app.database import Base
@@ -10,7 +10,8 @@ from app.database import Base
 class LLMInteraction(Base):
     """
     Tracks every LLM API call made by agents.
-    Enables debugging by storing full prompt, response, and context.
+    Enables debugging by storing full prompt, response, and context (long
+    payloads in ``LLMPayloadBlob``, see ``load_llm_payload``).
     """
     __tablename__ = "llm_interactions"
     
@@ -20,15 +21,23 @@ class LLMInteraction(Base):
     agent_id = Column(String(50), nullable=False, index=True)
     agent_mode = Column(String(20))  # spec, build, test
     
-    # Input
+    # Input (LLM-LOG-BUF: prompt / rag_context / response longer than
+    # LLM_LOG_INLINE_MAX_CHARS only keep a preview here; the full text lives in
+    # llm_payload_blobs under the matching *_sha256 column. Read the full text
+    # with app.services.llm_logger.load_llm_payload(db, interaction, field).)
     prompt = Column(Text, nullable=False)
     rag_context = Column(Text, nullable=True)
     previous_feedback = Column(Text, nullable=True)
     
-    # Output
+    # Output (preview when response_sha256 is set, see above)
     response = Column(Text, nullable=True)
     parsed_files = Column(JSONB, nullable=True)  # Extracted files from response
     
+    # Full payloads in llm_payload_blobs (NULL = stored inline)
+    prompt_sha256 = Column(String(64), nullable=True)
+    rag_context_sha256 = Column(String(64), nullable=True)
+    response_sha256 = Column(String(64), nullable=True)
+    
     # Metrics
     tokens_input = Column(Integer, nullable=True)
     tokens_output = Column(Integer, nullable=True)
@@ -44,3 +53,21 @@ class LLMInteraction(Base):
     
     def __repr__(self):
         return f"<LLMInteraction {self.id} agent={self.agent_id} task={self.task_id}>"
+
+
+class LLMPayloadBlob(Base):
+    """
+    Compressed LLM payload (prompt / RAG context / response), stored once per
+    content hash: repeated system prompts and RAG contexts share one row.
+    """
+    __tablename__ = "llm_payload_blobs"
+    
+    sha256 = Column(String(64), primary_key=True)
+    codec = Column(String(10), nullable=False)   # zstd, zlib
+    size = Column(Integer, nullable=False)       # uncompressed bytes (utf-8)
+    data = Column(LargeBinary, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<LLMPayloadBlob {self.sha256[:12]} {self.codec} {self.size}B>"
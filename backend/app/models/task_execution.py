@@ -59,6 +59,7 @@ class TaskExecution(Base):
     
     # Results
     generated_files = Column(JSON)        # List of files generated by agent
+    generated_files_version = Column(Integer, default=0, server_default="0", nullable=False)  # Bumped on each generated_files write
     deploy_result = Column(JSON)          # SFDX deploy result
     test_result = Column(JSON)            # Elena's test results
     git_commit_sha = Column(String(64))   # Git commit SHA if committed
@@ -0,0 +1,138 @@
+"""
+Analytics rollup service (ANALYTICS-ROLLUP) — dashboard reads and backfill.
+
+The rollup rows are maintained by the mapper events of
+``app.models.analytics_rollup``; this module reads them for /api/analytics and
+rebuilds them from the source tables (after the migration, or after deletes
+that bypassed the ORM).
+
+Usage::
+
+    python -m app.services.analytics_rollup_service --backfill            # every user
+    python -m app.services.analytics_rollup_service --backfill --user-id 12
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.agent_deliverable import AgentDeliverable
+from app.models.analytics_rollup import AnalyticsDailyRollup, count_lines_of_code, execution_contribution, rollup_day
+from app.models.execution import Execution, ExecutionStatus
+from app.models.project import Project
+from app.models.quality_gate import QualityGate, GateStatus
+
+logger = logging.getLogger(__name__)
+
+VELOCITY_WEEKS = 7
+BACKFILL_CHUNK = 200                 # deliverables streamed per fetch (content can be large)
+
+
+def dashboard_counters(db: Session, user_id: int, today: Optional[date] = None) -> Dict:
+    """
+    Totals and weekly velocity from the rollups (two indexed reads).
+
+    Velocity buckets are whole UTC days: ``velocity[-1]`` is the last 7 days
+    including today, ``velocity[0]`` the oldest week.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    totals = db.query(
+        func.coalesce(func.sum(AnalyticsDailyRollup.lines_of_code), 0),
+        func.coalesce(func.sum(AnalyticsDailyRollup.execution_seconds), 0),
+        func.coalesce(func.sum(AnalyticsDailyRollup.failed_gates), 0),
+    ).filter(AnalyticsDailyRollup.user_id == user_id).one()
+
+    velocity = [0] * VELOCITY_WEEKS
+    since = today - timedelta(days=7 * VELOCITY_WEEKS - 1)
+    recent = db.query(AnalyticsDailyRollup.day, AnalyticsDailyRollup.executions_completed).filter(
+        AnalyticsDailyRollup.user_id == user_id,
+        AnalyticsDailyRollup.day >= since,
+        AnalyticsDailyRollup.day <= today,
+    ).all()
+    for day, completed in recent:
+        velocity[VELOCITY_WEEKS - 1 - (today - day).days // 7] += completed or 0
+
+    return {
+        "lines_of_code": int(totals[0]),
+        "execution_seconds": int(totals[1]),
+        "failed_gates": int(totals[2]),
+        "velocity": velocity,
+    }
+
+
+def backfill_rollups(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Recompute the rollups of one user (or every user) from the source tables.
+    Returns the number of rollup rows written.
+    """
+    counters: Dict[tuple, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    owner = Project.user_id
+
+    def scoped(query):
+        return query.filter(owner == user_id) if user_id is not None else query
+
+    deliverables = scoped(
+        db.query(owner, AgentDeliverable.created_at, AgentDeliverable.content)
+        .join(Execution, Execution.id == AgentDeliverable.execution_id)
+        .join(Project, Project.id == Execution.project_id)
+    ).yield_per(BACKFILL_CHUNK)
+    for uid, created_at, content in deliverables:
+        counters[(uid, rollup_day(created_at))]["lines_of_code"] += count_lines_of_code(content)
+
+    executions = scoped(
+        db.query(owner, Execution.status, Execution.duration_seconds, Execution.completed_at)
+        .join(Project, Project.id == Execution.project_id)
+        .filter(Execution.status == ExecutionStatus.COMPLETED)
+    )
+    for uid, status, duration, completed_at in executions:
+        day, deltas = execution_contribution(status, duration, completed_at)
+        for name, value in deltas.items():
+            counters[(uid, day)][name] += value
+
+    gates = scoped(
+        db.query(owner, QualityGate.checked_at)
+        .join(Execution, Execution.id == QualityGate.execution_id)
+        .join(Project, Project.id == Execution.project_id)
+        .filter(QualityGate.status == GateStatus.FAILED)
+    )
+    for uid, checked_at in gates:
+        counters[(uid, rollup_day(checked_at))]["failed_gates"] += 1
+
+    stale = db.query(AnalyticsDailyRollup)
+    if user_id is not None:
+        stale = stale.filter(AnalyticsDailyRollup.user_id == user_id)
+    stale.delete(synchronize_session=False)
+    rows: List[Dict] = [
+        {"user_id": uid, "day": day, "lines_of_code": 0, "executions_completed": 0,
+         "execution_seconds": 0, "failed_gates": 0, **values}
+        for (uid, day), values in counters.items()
+    ]
+    if rows:
+        db.bulk_insert_mappings(AnalyticsDailyRollup, rows)
+    db.commit()
+    logger.info(f"[AnalyticsRollup] backfill: {len(rows)} rollup rows"
+                + (f" for user {user_id}" if user_id is not None else ""))
+    return len(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Analytics rollups maintenance")
+    parser.add_argument("--backfill", action="store_true", help="Recompute rollups from the source tables")
+    parser.add_argument("--user-id", type=int, help="Only this user")
+    args = parser.parse_args()
+
+    if not args.backfill:
+        parser.error("nothing to do (use --backfill)")
+    session = SessionLocal()
+    try:
+        written = backfill_rollups(session, args.user_id)
+        print(f"Backfill complete: {written} rollup rows")
+    finally:
+        session.close()
@@ -18,21 +18,67 @@ Usage:
     
     # With database session
     audit_service.log(..., db=db)
+
+AUDIT-ASYNC: without ``db``, ``log()`` no longer opens a session and commits
+one row on the caller's thread (the event loop, for AuditMiddleware). The
+row is queued and written by a daemon thread in multi-row INSERTs of
+AUDIT_BATCH_SIZE rows every AUDIT_FLUSH_INTERVAL_SECONDS. The queue is
+bounded (AUDIT_QUEUE_MAX): past it, new entries are dropped and counted in
+``audit_service.writer.stats``. Request context (request_id, ip, user agent)
+lives in a ContextVar, so concurrent requests no longer overwrite each other's.
+With ``db``, the row is still inserted in the caller's transaction.
 """
+import atexit
 import uuid
 import time
-from datetime import datetime
-from typing import Optional, Any, Dict
+from contextvars import ContextVar, Token
+from datetime import datetime, timezone
+from typing import Optional, Any, Callable, Dict, List
 from contextlib import contextmanager
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, insert
 
 from app.database import SessionLocal
 from app.models.audit import AuditLog, ActorType, ActionCategory
+from app.services.batched_writer import BatchedWriter
 import logging
 
 logger = logging.getLogger(__name__)
 
+AUDIT_ASYNC_WRITES = True            # False restores one synchronous INSERT + commit per log()
+AUDIT_FLUSH_INTERVAL_SECONDS = 1.0
+AUDIT_BATCH_SIZE = 500               # rows per multi-row INSERT
+AUDIT_QUEUE_MAX = 20000              # backpressure: beyond this, new entries are dropped (counted)
+AUDIT_MAX_FLUSH_RETRIES = 30         # consecutive failed flushes before the head batch is dropped
+
+_request_context: ContextVar[Dict[str, Any]] = ContextVar("audit_request_context", default={})
+
+_ROW_COLUMNS = (
+    "timestamp", "actor_type", "actor_id", "actor_name", "action", "action_detail",
+    "entity_type", "entity_id", "entity_name", "old_value", "new_value",
+    "project_id", "execution_id", "task_id", "extra_data",
+    "request_id", "ip_address", "user_agent", "success", "error_message", "duration_ms",
+)
+
+
+class AuditWriter(BatchedWriter):
+    """
+    Bounded in-process queue of audit rows + background flusher
+    (``BatchedWriter``): multi-row INSERTs, rows the database rejects are
+    dropped (``rejected``), a batch nobody can write goes back to the queue.
+    """
+
+    thread_name = "audit-writer"
+    max_flush_retries = AUDIT_MAX_FLUSH_RETRIES
+
+    def __init__(self, session_factory: Optional[Callable[[], Any]] = None,
+                 flush_interval: float = AUDIT_FLUSH_INTERVAL_SECONDS,
+                 batch_size: int = AUDIT_BATCH_SIZE, max_queue: int = AUDIT_QUEUE_MAX):
+        super().__init__(session_factory, flush_interval, batch_size, max_queue)
+
+    def _write_rows(self, db, rows: List[Dict[str, Any]]) -> None:
+        db.execute(insert(AuditLog), rows)
+
 
 class AuditService:
     """
@@ -40,8 +86,12 @@ class AuditService:
     Thread-safe design for synchronous operations.
     """
     
-    def __init__(self):
-        self._request_context: Dict[str, Any] = {}
+    def __init__(self, writer: Optional[AuditWriter] = None):
+        self.writer = writer or AuditWriter()
+    
+    @property
+    def _request_context(self) -> Dict[str, Any]:
+        return _request_context.get()
     
     def set_request_context(
         self,
@@ -49,18 +99,25 @@ class AuditService:
         ip_address: Optional[str] = None,
         user_agent: Optional[str] = None,
         user_id: Optional[str] = None
-    ):
-        """Set context for the current request (called by middleware)"""
-        self._request_context = {
+    ) -> Token:
+        """Set context for the current request / task (called by middleware)"""
+        return _request_context.set({
             "request_id": request_id or str(uuid.uuid4()),
             "ip_address": ip_address,
             "user_agent": user_agent,
             "user_id": user_id
-        }
+        })
     
-    def clear_request_context(self):
+    def clear_request_context(self, token: Optional[Token] = None):
         """Clear request context after request completes"""
-        self._request_context = {}
+        if token is not None:
+            _request_context.reset(token)
+        else:
+            _request_context.set({})
+    
+    def flush(self) -> int:
+        """Write queued entries now (tests, shutdown)."""
+        return self.writer.flush()
     
     def log(
         self,
@@ -87,9 +144,39 @@ class AuditService:
         Log an audit entry.
         
         Returns:
-            ID of the created audit log entry, or None if failed
+            ID of the created audit log entry, or None if failed or queued (no ``db``)
         """
         try:
+            if db is None and AUDIT_ASYNC_WRITES:
+                # AUDIT-ASYNC: queued, written by the background flusher
+                context = _request_context.get()
+                row = dict.fromkeys(_ROW_COLUMNS)
+                row.update(
+                    timestamp=datetime.now(timezone.utc),
+                    actor_type=actor_type.value if isinstance(actor_type, ActorType) else actor_type,
+                    actor_id=actor_id,
+                    actor_name=actor_name,
+                    action=action.value if isinstance(action, ActionCategory) else action,
+                    action_detail=action_detail,
+                    entity_type=entity_type,
+                    entity_id=entity_id,
+                    entity_name=entity_name,
+                    old_value=old_value,
+                    new_value=new_value,
+                    project_id=project_id,
+                    execution_id=execution_id,
+                    task_id=task_id,
+                    extra_data=extra_data,
+                    request_id=context.get("request_id"),
+                    ip_address=context.get("ip_address"),
+                    user_agent=context.get("user_agent"),
+                    success=success,
+                    error_message=error_message,
+                    duration_ms=duration_ms,
+                )
+                self.writer.submit(row)
+                return None
+            
             # Use provided session or create new one
             if db:
                 return self._insert_log(
@@ -473,3 +560,4 @@ class AuditService:
 
 # Singleton instance
 audit_service = AuditService()
+atexit.register(audit_service.writer.shutdown)
@@ -0,0 +1,248 @@
+"""
+Background writers (BATCH-WRITER) — daemon thread + bounded queue shared by
+the write-behind paths (CostLedger, AuditWriter, LLMLogWriter).
+
+- ``BackgroundWriter``: one daemon thread per process that calls ``flush()``
+  every ``flush_interval`` seconds or when woken. After a fork the child
+  restarts its own thread (``_after_fork`` drops what the parent had queued),
+  and ``shutdown()`` stops it and flushes what is left.
+- ``BatchedWriter``: bounded queue of rows written ``batch_size`` rows per
+  transaction. Subclasses implement ``_write_rows(db, rows)``, which executes
+  the INSERTs for ``rows`` without committing. When a batch fails, each row is
+  retried in its own savepoint. Rows the database refuses on their own are
+  dropped and counted in ``rejected``. A batch nobody could write (database
+  down) goes back to the head of the queue, up to ``max_flush_retries``
+  consecutive failures, then is dropped and counted in ``dropped``.
+"""
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWriter:
+    """Daemon thread that calls ``flush()`` periodically (one per process)."""
+
+    thread_name = "background-writer"
+
+    def __init__(self, session_factory: Optional[Callable[[], Any]] = None, flush_interval: float = 1.0):
+        self._session_factory = session_factory
+        self.flush_interval = flush_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+
+    def _session(self):
+        if self._session_factory is None:
+            from app.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def _after_fork(self) -> None:
+        """Forked child: drop the parent's queued entries (override)."""
+
+    def _ensure_writer(self) -> None:
+        if self._pid != os.getpid():
+            # Forked child: the parent's queue and thread are not ours.
+            self._pid = os.getpid()
+            self._thread = None
+            self._after_fork()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def _tick(self) -> None:
+        """One writer-loop iteration (override to add periodic work)."""
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(timeout=self.flush_interval)
+            self._wake.clear()
+            try:
+                self._tick()
+            except Exception as exc:  # pragma: no cover — defensive, the loop must survive
+                logger.error("[%s] writer loop error: %s", self.thread_name, exc, exc_info=True)
+
+    def flush(self) -> int:
+        raise NotImplementedError
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop the writer and flush what is left (also registered atexit)."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+        self.flush()
+
+
+class BatchedWriter(BackgroundWriter):
+    """
+    Bounded queue of rows + background flusher. The bound is in ``_row_size``
+    units (1 per row by default).
+    """
+
+    max_flush_retries = 30                 # consecutive failed flushes before the head batch is dropped
+    flush_max_size: Optional[int] = None   # wake the writer early once this much is queued (``_row_size`` units)
+
+    def __init__(self, session_factory: Optional[Callable[[], Any]] = None, flush_interval: float = 1.0,
+                 batch_size: int = 500, max_queue: int = 20000):
+        super().__init__(session_factory, flush_interval)
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self._queue: deque = deque()
+        self._queued_size = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._consecutive_failures = 0
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "rejected": 0,
+                      "flushes": 0, "flush_failures": 0}
+
+    # ------------------------------------------------------------------
+    # Subclass hooks
+    # ------------------------------------------------------------------
+
+    def _write_rows(self, db, rows: List[Dict[str, Any]]) -> Any:
+        """Execute the INSERTs for ``rows`` (no commit). The return value is passed to ``_written``."""
+        raise NotImplementedError
+
+    def _written(self, rows: List[Dict[str, Any]], receipts: List[Any]) -> None:
+        """Called after commit with the rows written and the ``_write_rows`` results (under ``_lock``)."""
+
+    def _row_size(self, row: Dict[str, Any]) -> int:
+        return 1
+
+    # ------------------------------------------------------------------
+    # Queue
+    # ------------------------------------------------------------------
+
+    def _after_fork(self) -> None:
+        self._queue = deque()
+        self._queued_size = 0
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        """Queue one row; False if it was dropped because the queue is full."""
+        self._ensure_writer()
+        size = self._row_size(row)
+        with self._lock:
+            if self._queue and self._queued_size + size > self.max_queue:
+                self.stats["dropped"] += 1
+                dropped = self.stats["dropped"]
+                queued = None
+            else:
+                self._queue.append(row)
+                self._queued_size += size
+                self.stats["enqueued"] += 1
+                queued = (len(self._queue), self._queued_size)
+        if queued is None:
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning("[%s] queue full (%d), %d entries dropped so far", self.thread_name,
+                               self.max_queue, dropped)
+            return False
+        if queued[0] >= self.batch_size or (self.flush_max_size is not None and queued[1] >= self.flush_max_size):
+            self._wake.set()
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._queue)
+
+    # ------------------------------------------------------------------
+    # Flush
+    # ------------------------------------------------------------------
+
+    def flush(self) -> int:
+        """Write everything queued, ``batch_size`` rows per transaction. Returns the number of rows written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                    self._queued_size -= sum(self._row_size(r) for r in batch)
+                if not batch:
+                    return written
+                ok = self._write(batch)
+                if ok is None:
+                    return written
+                written += ok
+
+    def _write(self, batch: List[Dict[str, Any]]) -> Optional[int]:
+        db = None
+        try:
+            db = self._session()
+            receipts = [self._write_rows(db, batch)]
+            db.commit()
+            accepted = batch
+        except Exception as exc:
+            if db is not None:
+                try:
+                    db.rollback()
+                except Exception:
+                    pass
+            accepted, receipts = self._write_each(db, batch) if db is not None else ([], [])
+            if not accepted:
+                return self._requeue(batch, exc)
+            logger.error("[%s] %d row(s) rejected by the database: %s", self.thread_name,
+                         len(batch) - len(accepted), exc)
+        finally:
+            if db is not None:
+                db.close()
+        self._consecutive_failures = 0
+        with self._lock:
+            self.stats["flushes"] += 1
+            self.stats["written"] += len(accepted)
+            self.stats["rejected"] += len(batch) - len(accepted)
+            self._written(accepted, receipts)
+        return len(accepted)
+
+    def _write_each(self, db, batch: List[Dict[str, Any]]):
+        """Row-by-row fallback (one savepoint per row). Returns (rows written, their receipts)."""
+        accepted, receipts = [], []
+        try:
+            for row in batch:
+                try:
+                    with db.begin_nested():
+                        receipt = self._write_rows(db, [row])
+                    accepted.append(row)
+                    receipts.append(receipt)
+                except Exception:
+                    pass        # ligne rejetee ; si aucune ne passe, le lot est remis en file
+            db.commit()
+        except Exception:
+            try:
+                db.rollback()
+            except Exception:
+                pass
+            return [], []
+        return accepted, receipts
+
+    def _requeue(self, batch: List[Dict[str, Any]], exc: Exception) -> None:
+        """Put a batch nobody could write back in front (stats + warning); returns None to stop the flush."""
+        self._consecutive_failures += 1
+        with self._lock:
+            self.stats["flush_failures"] += 1
+            if self._consecutive_failures >= self.max_flush_retries:
+                self.stats["dropped"] += len(batch)
+                self._consecutive_failures = 0
+                logger.error("[%s] %d entries dropped after %d failed flushes: %s", self.thread_name,
+                             len(batch), self.max_flush_retries, exc)
+                return None
+            kept, size = [], 0
+            for row in batch:
+                row_size = self._row_size(row)
+                if self._queued_size + size + row_size > self.max_queue and (kept or self._queue):
+                    break
+                kept.append(row)
+                size += row_size
+            self.stats["dropped"] += len(batch) - len(kept)
+            # At-least-once: the batch goes back in front of newer entries.
+            self._queue.extendleft(reversed(kept))
+            self._queued_size += size
+        logger.error("[%s] flush failed, %d entries re-queued: %s", self.thread_name, len(kept), exc)
+        return None
@@ -0,0 +1,421 @@
+"""
+Code quality service (QUALITY-CACHE) — BLD-07 quality rules, cached.
+
+Before: ``/quality/execution/{id}`` re-ran the rules over every file of
+``task_executions.generated_files`` on each request, and ``/quality/trends``
+did it once per execution, synchronously inside ``async def`` handlers.
+
+Now:
+- each (content sha256, file type) is analysed once and stored in
+  ``code_quality_analyses`` (identical files across tasks / executions share
+  the row); ANALYZER_VERSION invalidates them when the rules change;
+- the summary of an execution is materialised in
+  ``execution_quality_summaries``: trends are one query, an execution view
+  is two (summary + analyses of its hashes);
+- summaries are rebuilt after ``generated_files`` is written through the ORM
+  (background thread, see app.models.code_quality), on first read, and on
+  any read where the fingerprint of the execution's task rows (row count,
+  sum of ids, total length of generated_files, one aggregate query) differs
+  from the one stored: raw SQL / bulk writes and reruns are not served stale.
+  An in-place edit that keeps the exact JSON length is the one change it
+  does not see.
+
+Callers run these functions in a worker thread (``asyncio.to_thread``).
+"""
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import DateTime, JSON, func, text
+from sqlalchemy.orm import Session
+
+from app.models.code_quality import CodeQualityAnalysis, ExecutionQualitySummary
+from app.models.task_execution import TaskExecution
+from app.services.deploy_manifest import content_sha256
+
+logger = logging.getLogger(__name__)
+
+ANALYZER_VERSION = 1                 # bump when the rules below change: cached results are recomputed
+
+_precompute_pool: Optional[ThreadPoolExecutor] = None
+_precompute_lock = threading.Lock()
+
+
+# ========== Cache ==========
+
+def _upsert(session: Session, model, rows: List[Dict[str, Any]], keys: Tuple[str, ...]) -> None:
+    """Insert ``rows``, replacing existing rows with the same ``keys`` (concurrent writers included)."""
+    if not rows:
+        return
+    table = model.__table__
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[k] for k in keys],
+            set_={c: stmt.excluded[c] for c in rows[0] if c not in keys},
+        )
+        session.execute(stmt, rows)
+        return
+    for row in rows:
+        session.merge(model(**row))
+
+
+def analyze_files(session: Session, files: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Analysis of each ``(file_path, content)``, keyed by ``(sha256, file_type)``.
+    Only contents never seen before (at ANALYZER_VERSION) are analysed.
+    """
+    wanted: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    for file_path, content in files:
+        content = content if isinstance(content, str) else str(content or "")
+        wanted.setdefault((content_sha256(content), _detect_file_type(file_path)), (file_path, content))
+    results = _cached_analyses(session, wanted)
+    misses = [key for key in wanted if key not in results]
+    rows = []
+    for key in misses:
+        file_path, content = wanted[key]
+        results[key] = analyze_code_quality(file_path, content)
+        rows.append({"content_sha256": key[0], "file_type": key[1],
+                     "analyzer_version": ANALYZER_VERSION, "analysis": results[key]})
+    _upsert(session, CodeQualityAnalysis, rows, ("content_sha256", "file_type"))
+    if misses:
+        logger.info(f"[Quality] {len(misses)} new file analyses, {len(wanted) - len(misses)} from cache")
+    return results
+
+
+def _cached_analyses(session: Session, keys) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    shas = sorted({sha for sha, _ in keys})
+    found = {}
+    for i in range(0, len(shas), 500):
+        for row in session.query(CodeQualityAnalysis).filter(
+            CodeQualityAnalysis.content_sha256.in_(shas[i:i + 500]),
+            CodeQualityAnalysis.analyzer_version == ANALYZER_VERSION,
+        ):
+            found[(row.content_sha256, row.file_type)] = row.analysis
+    return {key: found[key] for key in keys if key in found}
+
+
+def _summarize(all_files: List[Dict[str, Any]]) -> Dict[str, Any]:
+    total_errors = 0
+    total_warnings = 0
+    apex_scores = []
+    lwc_scores = []
+    for analysis in all_files:
+        total_errors += analysis["errors_count"]
+        total_warnings += analysis["warnings_count"]
+        
+        if analysis["file_type"] == "apex":
+            apex_scores.append(analysis["score"])
+        elif analysis["file_type"] == "lwc":
+            lwc_scores.append(analysis["score"])
+    
+    # Calculate aggregates
+    apex_score = sum(apex_scores) / len(apex_scores) if apex_scores else 0
+    lwc_score = sum(lwc_scores) / len(lwc_scores) if lwc_scores else 0
+    overall_score = (apex_score + lwc_score) / 2 if (apex_scores or lwc_scores) else 0
+    
+    # Estimate test coverage based on test files
+    test_files = [f for f in all_files if "Test" in f["file_path"]]
+    source_files = [f for f in all_files if "Test" not in f["file_path"] and f["file_type"] == "apex"]
+    test_coverage = (len(test_files) / len(source_files) * 75) if source_files else 0
+    
+    return {
+        "overall_score": round(overall_score, 1),
+        "apex_score": round(apex_score, 1),
+        "lwc_score": round(lwc_score, 1),
+        "total_files": len(all_files),
+        "errors_count": total_errors,
+        "warnings_count": total_warnings,
+        "test_coverage_estimate": round(test_coverage, 1),
+        "grade": score_to_grade(overall_score)
+    }
+
+
+def _source_fingerprints(session: Session, execution_ids: Iterable[int]) -> Dict[int, str]:
+    """Fingerprint of the task rows holding files, per execution (aggregated in the database).
+
+    Built from row ids and ``generated_files_version``, bumped on each write, so
+    the check never reads the file contents.
+    """
+    execution_ids = list(execution_ids)
+    if not execution_ids:
+        return {}
+    rows = session.query(
+        TaskExecution.execution_id,
+        func.count(TaskExecution.id),
+        func.sum(TaskExecution.id),
+        func.sum(TaskExecution.generated_files_version),
+    ).filter(
+        TaskExecution.execution_id.in_(execution_ids),
+        TaskExecution.generated_files.isnot(None),
+    ).group_by(TaskExecution.execution_id)
+    found = {execution_id: f"{count}:{id_sum or 0}:{versions or 0}" for execution_id, count, id_sum, versions in rows}
+    return {execution_id: found.get(execution_id, "0:0:0") for execution_id in execution_ids}
+
+
+def compute_execution_quality(session: Session, execution_id: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Analyse the generated files of an execution (cache-aware) and materialise its summary."""
+    # Empreinte lue avant les fichiers : une ecriture concurrente la rend perimee, jamais l'inverse.
+    fingerprint = _source_fingerprints(session, [execution_id])[execution_id]
+    result = session.execute(text("""
+        SELECT task_id, generated_files
+        FROM task_executions 
+        WHERE execution_id = :exec_id 
+        AND generated_files IS NOT NULL
+        ORDER BY id
+    """).columns(generated_files=JSON), {"exec_id": execution_id})
+    entries = []
+    for row in result:
+        if row.generated_files:
+            for file_path, content in row.generated_files.items():
+                content = content if isinstance(content, str) else str(content or "")
+                entries.append((row.task_id, file_path, content_sha256(content), content))
+    analyses = analyze_files(session, ((path, content) for _, path, _, content in entries))
+
+    all_files, refs = [], []
+    for task_id, file_path, sha, _ in entries:
+        file_type = _detect_file_type(file_path)
+        all_files.append({"task_id": task_id, "file_path": file_path, **analyses[(sha, file_type)]})
+        refs.append({"task_id": task_id, "file_path": file_path, "file_type": file_type, "sha256": sha})
+    summary = _summarize(all_files)
+    if refs:
+        # Pas de ligne pour une execution sans fichiers : elle peut encore en recevoir.
+        _upsert(session, ExecutionQualitySummary, [{
+            "execution_id": execution_id, "analyzer_version": ANALYZER_VERSION,
+            "summary": summary, "files": refs, "source_fingerprint": fingerprint,
+        }], ("execution_id",))
+    session.commit()
+    return summary, all_files
+
+
+def get_execution_quality(session: Session, execution_id: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """``(summary, files)`` from the materialised summary, computed if missing or stale."""
+    row = session.get(ExecutionQualitySummary, execution_id)
+    if (row is None or row.analyzer_version != ANALYZER_VERSION
+            or row.source_fingerprint != _source_fingerprints(session, [execution_id])[execution_id]):
+        return compute_execution_quality(session, execution_id)
+    keys = {(ref["sha256"], ref["file_type"]) for ref in row.files}
+    analyses = _cached_analyses(session, keys)
+    if len(analyses) < len(keys):
+        return compute_execution_quality(session, execution_id)
+    files = [{"task_id": ref["task_id"], "file_path": ref["file_path"],
+              **analyses[(ref["sha256"], ref["file_type"])]} for ref in row.files]
+    return row.summary, files
+
+
+def get_quality_trends(session: Session, project_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+    """Score per recent execution: two queries, summaries computed only when missing or stale."""
+    result = session.execute(text("""
+        SELECT e.id, e.created_at, s.summary, s.source_fingerprint
+        FROM executions e
+        LEFT JOIN execution_quality_summaries s
+            ON s.execution_id = e.id AND s.analyzer_version = :version
+        WHERE e.project_id = :project_id
+        ORDER BY e.created_at DESC
+        LIMIT :limit
+    """).columns(created_at=DateTime, summary=JSON), {"project_id": project_id, "limit": limit, "version": ANALYZER_VERSION}).all()
+    
+    fingerprints = _source_fingerprints(session, [row.id for row in result if row.summary is not None])
+    trends = []
+    for row in result:
+        summary = row.summary
+        if summary is None or row.source_fingerprint != fingerprints[row.id]:
+            summary, _ = compute_execution_quality(session, row.id)
+        trends.append({
+            "execution_id": row.id,
+            "date": row.created_at.isoformat() if row.created_at else None,
+            "score": summary.get("overall_score", 0),
+            "grade": summary.get("grade", "N/A")
+        })
+    return trends
+
+
+def precompute_execution_quality(execution_ids: Iterable[int]) -> None:
+    """Rebuild summaries in a fresh session (after a commit that wrote generated_files)."""
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        for execution_id in sorted(execution_ids):
+            try:
+                compute_execution_quality(session, execution_id)
+            except Exception as e:
+                session.rollback()
+                logger.warning(f"[Quality] precompute failed for execution {execution_id}: {e}")
+    finally:
+        session.close()
+
+
+def schedule_precompute(execution_ids: Iterable[int]) -> None:
+    global _precompute_pool
+    with _precompute_lock:
+        if _precompute_pool is None:
+            _precompute_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quality-precompute")
+    _precompute_pool.submit(precompute_execution_quality, set(execution_ids))
+
+
+# ========== Quality rules (BLD-07) ==========
+
+def analyze_code_quality(file_path: str, content: str) -> Dict[str, Any]:
+    """
+    Analyze code quality and return metrics.
+    """
+    file_type = _detect_file_type(file_path)
+    issues = []
+    score = 100.0
+    metrics = {
+        "lines": len(content.split('\n')),
+        "chars": len(content)
+    }
+    
+    if file_type == "apex":
+        issues, score, metrics = _analyze_apex(content, metrics)
+    elif file_type == "lwc":
+        issues, score, metrics = _analyze_lwc(content, metrics)
+    elif file_type == "metadata":
+        issues, score, metrics = _analyze_metadata(content, metrics)
+    
+    errors = [i for i in issues if i["severity"] == "error"]
+    warnings = [i for i in issues if i["severity"] == "warning"]
+    
+    return {
+        "file_type": file_type,
+        "score": max(0, min(100, score)),
+        "issues": issues,
+        "metrics": metrics,
+        "errors_count": len(errors),
+        "warnings_count": len(warnings)
+    }
+
+
+def _detect_file_type(file_path: str) -> str:
+    """Detect file type from path."""
+    if file_path.endswith('.cls') or file_path.endswith('.trigger'):
+        return "apex"
+    elif file_path.endswith('.js') and '/lwc/' in file_path:
+        return "lwc"
+    elif file_path.endswith('.html') and '/lwc/' in file_path:
+        return "lwc_template"
+    elif file_path.endswith('.xml') or file_path.endswith('-meta.xml'):
+        return "metadata"
+    else:
+        return "other"
+
+
+def _analyze_apex(content: str, metrics: Dict) -> tuple:
+    """Analyze Apex code quality."""
+    issues = []
+    score = 100.0
+    
+    # Count methods and complexity
+    methods = re.findall(r'(public|private|global)\s+\w+\s+\w+\s*\(', content)
+    metrics["methods_count"] = len(methods)
+    
+    # APEX001: SOQL/DML in loops
+    loops = re.findall(r'for\s*\([^)]+\)\s*\{', content, re.IGNORECASE)
+    for_content = content
+    for loop in loops:
+        if re.search(r'\[SELECT|INSERT|UPDATE|DELETE|Database\.', for_content, re.IGNORECASE):
+            issues.append({"rule": "APEX001", "severity": "error", "message": "SOQL/DML detected inside loop"})
+            score -= 15
+            break
+    
+    # APEX002: Hardcoded IDs
+    if re.search(r"'[a-zA-Z0-9]{15,18}'", content):
+        issues.append({"rule": "APEX002", "severity": "error", "message": "Hardcoded Salesforce ID detected"})
+        score -= 10
+    
+    # APEX003: Missing null checks before .size() or accessing properties
+    if re.search(r'\w+\.size\(\)', content) and not re.search(r'!=\s*null.*\.size\(\)|\.isEmpty\(\)', content):
+        issues.append({"rule": "APEX003", "severity": "warning", "message": "Potential null pointer - check before .size()"})
+        score -= 5
+    
+    # APEX005: Test class without @isTest or testMethod
+    if 'Test' in content and not re.search(r'@isTest|testMethod', content, re.IGNORECASE):
+        issues.append({"rule": "APEX005", "severity": "warning", "message": "Test class missing @isTest annotation"})
+        score -= 5
+    
+    # APEX007: Hardcoded credentials (from BUG-042)
+    if re.search(r'password\s*=|api[_-]?key\s*=|secret\s*=|token\s*=', content, re.IGNORECASE):
+        issues.append({"rule": "APEX007", "severity": "error", "message": "Potential hardcoded credentials detected"})
+        score -= 20
+    
+    return issues, score, metrics
+
+
+def _analyze_lwc(content: str, metrics: Dict) -> tuple:
+    """Analyze LWC JavaScript quality."""
+    issues = []
+    score = 100.0
+    
+    # Count methods
+    methods = re.findall(r'(async\s+)?\w+\s*\([^)]*\)\s*\{', content)
+    metrics["methods_count"] = len(methods)
+    
+    # LWC001: Missing @api decorator for public properties
+    if re.search(r'export\s+default\s+class', content) and not re.search(r'@api', content):
+        if re.search(r'this\.\w+\s*=', content):
+            issues.append({"rule": "LWC001", "severity": "warning", "message": "Consider using @api for public properties"})
+            score -= 5
+    
+    # LWC002: Missing error handling in async methods
+    if re.search(r'async\s+\w+', content) and not re.search(r'try\s*\{|catch\s*\(|\.catch\s*\(', content):
+        issues.append({"rule": "LWC002", "severity": "warning", "message": "Missing error handling in async method"})
+        score -= 5
+    
+    # LWC004: Direct DOM manipulation
+    if re.search(r'document\.(getElementById|querySelector|createElement)', content):
+        issues.append({"rule": "LWC004", "severity": "error", "message": "Direct DOM manipulation - use template refs instead"})
+        score -= 15
+    
+    return issues, score, metrics
+
+
+def _analyze_metadata(content: str, metrics: Dict) -> tuple:
+    """Analyze metadata XML quality."""
+    issues = []
+    score = 100.0
+    
+    # META001: Invalid API version
+    version_match = re.search(r'<apiVersion>(\d+\.\d+)</apiVersion>', content)
+    if version_match:
+        version = float(version_match.group(1))
+        if version < 50.0:
+            issues.append({"rule": "META001", "severity": "warning", "message": f"Old API version {version} - consider upgrading"})
+            score -= 5
+    
+    # META002: Missing description
+    if '<CustomObject' in content or '<CustomField' in content:
+        if '<description>' not in content:
+            issues.append({"rule": "META002", "severity": "warning", "message": "Missing description in metadata"})
+            score -= 3
+    
+    # META003: Forbidden properties (from BLD-02)
+    forbidden = ['enableChangeDataCapture', 'enableEnhancedLookup', 'enableHistory', 'enableBulkApi']
+    for prop in forbidden:
+        if prop in content:
+            issues.append({"rule": "META003", "severity": "error", "message": f"Forbidden property: {prop}"})
+            score -= 10
+    
+    return issues, score, metrics
+
+
+def score_to_grade(score: float) -> str:
+    """Convert numeric score to letter grade."""
+    if score >= 90:
+        return "A"
+    elif score >= 80:
+        return "B"
+    elif score >= 70:
+        return "C"
+    elif score >= 60:
+        return "D"
+    else:
+        return "F"
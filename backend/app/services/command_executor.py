@@ -0,0 +1,322 @@
+"""
+Command executor (CMD-EXEC) — one execution path for the sf / git CLIs.
+
+Before: ``SFDXService._run_command`` and ``GitService._run_git`` spawned a
+process per call with no limit, ``SFAdminService._deploy_via_sfdx`` and
+``MetadataFetcher.authenticate`` used a blocking ``subprocess.run``, and every
+``sf org display`` paid the Node CLI start-up (several seconds) again.
+
+Now:
+- Every CLI call goes through one executor, from async code (``run``) or from
+  a worker thread (``run_sync``), under a global cap and a cap per key: the
+  target org for sf (``sf:<org>``), the working tree for git (``git:<path>``,
+  git refuses concurrent writers on one index anyway). Both paths share the
+  same limits (``_Limiter``); coroutines wait on an asyncio future, not on a
+  thread of the default executor.
+- ``sf org display`` results are cached per org for ORG_DISPLAY_TTL_SECONDS,
+  single-flight: concurrent callers share one CLI start. When Salesforce
+  rejects the token (401 / INVALID_SESSION_ID, see ``is_session_error``),
+  callers use ``refresh_org`` / ``refresh_org_sync``: the entry is dropped,
+  ``sf org display`` runs again (the CLI refreshes its token) and the call is
+  retried once.
+- Every call returns its timing (queue wait + run time) in ``CommandResult``;
+  callers log it. The audit trail keeps one row per operation (deploy, test,
+  commit...), not one per CLI call.
+
+Usage::
+
+    executor = get_command_executor()
+    result = await executor.run(["sf", "project", "deploy", "start", ...], key=f"sf:{org}", timeout=600)
+    info, error = executor.org_display_sync(org)     # cached `sf org display --json` result
+    info, error = executor.refresh_org_sync(org)     # token rejected: fetch it again
+"""
+
+import asyncio
+import json
+import logging
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLI_MAX_CONCURRENCY = 6              # processus Node/git simultanes, toutes cles confondues
+SF_MAX_CONCURRENCY_PER_ORG = 2       # deploiements d'une org : file serie cote Salesforce
+GIT_MAX_CONCURRENCY_PER_REPO = 1     # .git/index.lock
+ORG_DISPLAY_TTL_SECONDS = 600        # jeton de session valable bien plus longtemps
+
+_LABEL_TOKEN = re.compile(r"[a-z][a-z:-]*")
+_SESSION_ERROR = re.compile(
+    r"INVALID_SESSION_ID|Session expired or invalid|expired access/refresh token|INVALID_AUTH_HEADER",
+    re.IGNORECASE,
+)
+
+
+def is_session_error(text: Optional[str]) -> bool:
+    """True when a CLI / REST error says the org access token is no longer valid."""
+    return bool(text) and _SESSION_ERROR.search(text) is not None
+
+
+def _limit_for(key: str) -> int:
+    if key.startswith("sf:"):
+        return SF_MAX_CONCURRENCY_PER_ORG
+    if key.startswith("git:"):
+        return GIT_MAX_CONCURRENCY_PER_REPO
+    return 1
+
+
+def command_label(cmd: List[str], max_words: int = 3) -> str:
+    """``project deploy start`` / ``commit``: leading sub-command words only (no URL, path or token)."""
+    words = []
+    for arg in cmd[1:]:
+        if not _LABEL_TOKEN.fullmatch(arg) or len(words) == max_words:
+            break
+        words.append(arg)
+    return " ".join(words)
+
+
+@dataclass
+class CommandResult:
+    """Outcome and timing of one CLI call"""
+    returncode: Optional[int]
+    stdout: str = ""
+    stderr: str = ""
+    label: str = ""
+    duration_ms: int = 0
+    queued_ms: int = 0
+    timed_out: bool = False
+    error: Optional[str] = None      # process could not be started
+
+    @property
+    def success(self) -> bool:
+        return self.returncode == 0 and not self.timed_out and self.error is None
+
+    @property
+    def session_expired(self) -> bool:
+        """Failed because Salesforce rejected the org's access token."""
+        return not self.success and self.error is None and is_session_error(f"{self.stdout}\n{self.stderr}")
+
+
+class _Limiter:
+    """
+    Counting semaphore shared by threads and coroutines, first come first
+    served. Threads block on an Event; coroutines await a future of their own
+    loop, so a waiting coroutine holds no executor thread.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._used = 0
+        self._lock = threading.Lock()
+        self._waiters: deque = deque()       # threading.Event | (loop, future)
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self._used < self.limit and not self._waiters:
+                self._used += 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()                         # jeton transmis par release()
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._used < self.limit and not self._waiters:
+                self._used += 1
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove((loop, future))
+                    granted = False
+                except ValueError:
+                    granted = True           # jeton deja en route : _grant le rendra
+            if granted and future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                try:
+                    loop.call_soon_threadsafe(self._grant, future)
+                    return
+                except RuntimeError:         # boucle fermee : waiter suivant
+                    continue
+            self._used -= 1
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.done():                    # annule entre release() et ici
+            self.release()
+        else:
+            future.set_result(None)
+
+
+class CommandExecutor:
+    """Bounded sf / git command runner with a cached ``sf org display``."""
+
+    def __init__(self, max_total: int = CLI_MAX_CONCURRENCY):
+        self._total = _Limiter(max_total)
+        self._key_sems: Dict[str, _Limiter] = {}
+        self._lock = threading.Lock()
+        self._org_cache: Dict[str, Tuple[float, Dict]] = {}
+        self._org_locks: Dict[str, threading.Lock] = {}
+
+    def _semaphores(self, key: Optional[str]) -> List[_Limiter]:
+        if key is None:
+            return [self._total]
+        with self._lock:
+            sem = self._key_sems.get(key)
+            if sem is None:
+                sem = self._key_sems[key] = _Limiter(_limit_for(key))
+        # Cle d'abord : on n'occupe pas une place globale en attendant son org.
+        return [sem, self._total]
+
+    async def run(self, cmd: List[str], *, cwd: str = None, timeout: float = 300,
+                  key: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> CommandResult:
+        """Run ``cmd`` without blocking the event loop (process killed on timeout / cancel)."""
+        label = command_label(cmd)
+        queued = time.perf_counter()
+        acquired = []
+        try:
+            for sem in self._semaphores(key):
+                await sem.acquire_async()
+                acquired.append(sem)
+            started = time.perf_counter()
+            queued_ms = int((started - queued) * 1000)
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, cwd=cwd, env=env,
+                )
+            except Exception as e:
+                return CommandResult(None, label=label, queued_ms=queued_ms, error=str(e))
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                return CommandResult(None, label=label, queued_ms=queued_ms, timed_out=True,
+                                     duration_ms=int((time.perf_counter() - started) * 1000))
+            except asyncio.CancelledError:
+                process.kill()
+                raise
+            return CommandResult(
+                process.returncode,
+                stdout.decode('utf-8', errors='replace'),
+                stderr.decode('utf-8', errors='replace'),
+                label=label,
+                duration_ms=int((time.perf_counter() - started) * 1000),
+                queued_ms=queued_ms,
+            )
+        finally:
+            for sem in reversed(acquired):
+                sem.release()
+
+    def run_sync(self, cmd: List[str], *, cwd: str = None, timeout: float = 300,
+                 key: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> CommandResult:
+        """Blocking variant for code already running in a worker thread."""
+        label = command_label(cmd)
+        queued = time.perf_counter()
+        acquired = []
+        try:
+            for sem in self._semaphores(key):
+                sem.acquire()
+                acquired.append(sem)
+            started = time.perf_counter()
+            queued_ms = int((started - queued) * 1000)
+            try:
+                completed = subprocess.run(cmd, cwd=cwd, env=env, capture_output=True, text=True, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                return CommandResult(None, label=label, queued_ms=queued_ms, timed_out=True,
+                                     duration_ms=int((time.perf_counter() - started) * 1000))
+            except Exception as e:
+                return CommandResult(None, label=label, queued_ms=queued_ms, error=str(e))
+            return CommandResult(
+                completed.returncode, completed.stdout or "", completed.stderr or "",
+                label=label,
+                duration_ms=int((time.perf_counter() - started) * 1000),
+                queued_ms=queued_ms,
+            )
+        finally:
+            for sem in reversed(acquired):
+                sem.release()
+
+    # ═══════════════════════════════════════════════════════════════
+    # sf org display (cache)
+    # ═══════════════════════════════════════════════════════════════
+
+    def org_display_sync(self, org: str, refresh: bool = False) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        ``result`` of ``sf org display --target-org <org> --json`` (accessToken,
+        instanceUrl, id, ...), served from cache for ORG_DISPLAY_TTL_SECONDS.
+        Each caller gets its own copy.
+
+        Returns:
+            (org_info, None) or (None, error message)
+        """
+        with self._lock:
+            org_lock = self._org_locks.setdefault(org, threading.Lock())
+        with org_lock:
+            cached = self._org_cache.get(org)
+            if cached and not refresh and time.monotonic() - cached[0] < ORG_DISPLAY_TTL_SECONDS:
+                return dict(cached[1]), None
+
+            result = self.run_sync(["sf", "org", "display", "--target-org", org, "--json"],
+                                   key=f"sf:{org}", timeout=60)
+            try:
+                payload = json.loads(result.stdout) if result.stdout.strip() else {}
+            except json.JSONDecodeError:
+                payload = {}
+            info = payload.get("result") if isinstance(payload.get("result"), dict) else None
+            if not result.success or not info:
+                error = (result.error or ("Timeout" if result.timed_out else None)
+                         or payload.get("message") or result.stderr.strip() or "sf org display failed")
+                logger.warning(f"[CLI] sf org display {org} failed: {error[:200]}")
+                return None, error
+
+            logger.info(f"[CLI] sf org display {org}: {result.duration_ms} ms (cached {ORG_DISPLAY_TTL_SECONDS}s)")
+            self._org_cache[org] = (time.monotonic(), info)
+            return dict(info), None
+
+    async def org_display(self, org: str, refresh: bool = False) -> Tuple[Optional[Dict], Optional[str]]:
+        return await asyncio.to_thread(self.org_display_sync, org, refresh)
+
+    def invalidate_org(self, org: str) -> None:
+        with self._lock:
+            self._org_cache.pop(org, None)
+
+    def refresh_org_sync(self, org: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """Drop the cached entry of ``org`` (its token was rejected) and run ``sf org display`` again."""
+        logger.warning(f"[CLI] access token of {org} rejected, refreshing sf org display")
+        self.invalidate_org(org)
+        return self.org_display_sync(org, refresh=True)
+
+    async def refresh_org(self, org: str) -> Tuple[Optional[Dict], Optional[str]]:
+        return await asyncio.to_thread(self.refresh_org_sync, org)
+
+
+_executor: Optional[CommandExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_command_executor() -> CommandExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = CommandExecutor()
+    return _executor
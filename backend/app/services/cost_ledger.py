@@ -0,0 +1,564 @@
+"""
+Cost ledger (COST-LEDGER) — one write path for budget and credit accounting.
+
+Before: every successful LLM call opened a SessionLocal for
+``BudgetService.check_budget`` / ``record_cost`` in ``generate_llm_response``
+and two more in the router credit hooks (pre-flight + post-charge), i.e. 3-5
+connection checkouts and commits per call.
+
+Now:
+- Budget checks and credit pre-flights are served from in-memory state.
+  The DB is read once when an execution / user is first seen (cold path),
+  then refreshed in the background.
+- Pre-flight *reserves* the estimated credits, so concurrent calls for the
+  same user cannot all pass on the same balance. The reservation is
+  replaced by the real charge (or released) when the call ends.
+- Budget deltas (per execution) and credit charges are queued, then written
+  by a daemon thread in one session / one commit per flush. A failed flush
+  is retried entry by entry: entries the database refuses on their own are
+  logged and dropped, and a batch nobody could write is re-queued
+  (at-least-once) up to FLUSH_MAX_RETRIES times, never dropped silently.
+
+Across processes (API workers, build workers) each ledger only sees its own
+unflushed costs. What another process spends reaches this one after its
+flush (FLUSH_INTERVAL_SECONDS) plus the next refresh here
+(STATE_REFRESH_SECONDS), so the ``check_budget`` / ``reserve`` hard stops can
+be overshot by what the other processes spend in that window (~16 s).
+
+Usage::
+
+    ledger = get_cost_ledger()
+    ledger.check_budget(execution_id)                 # raises BudgetExceededError
+    res = ledger.reserve(user_id, model, max_tokens)  # raises CreditError subclasses
+    ...
+    ledger.settle(res, model, tokens_in, tokens_out, execution_id, project_id)
+    ledger.record_llm_cost(execution_id, model, tokens_in, tokens_out)
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.services.batched_writer import BackgroundWriter
+from app.services.budget_service import (
+    DEFAULT_EXECUTION_LIMIT_USD,
+    DEFAULT_PROJECT_LIMIT_USD,
+    BudgetExceededError,
+    _resolve_pricing as _resolve_usd_pricing,
+)
+from app.services.credit_service import (
+    CreditService,
+    InsufficientCreditsError,
+    ModelNotAllowedError,
+    UnknownModelError,
+    _credits_for_tokens,
+    _is_daily_cap_quota_tier,
+    resolve_credit_tier,
+)
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 1.0
+FLUSH_MAX_PENDING = 200          # flush early once this many entries are queued
+FLUSH_MAX_RETRIES = 120          # consecutive failed flushes before a batch is dead-lettered (~2 min)
+STATE_REFRESH_SECONDS = 15.0     # background re-read of cached balances / execution costs (cross-process lag)
+STATE_IDLE_SECONDS = 900.0       # cached state unused this long is dropped instead of refreshed
+PRICING_TTL_SECONDS = 300.0
+
+
+@dataclass
+class _CreditPricing:
+    """Detached copy of a ModelPricing row (usable outside its session)."""
+    model_name: str
+    credits_per_1k_input: float
+    credits_per_1k_output: float
+    allowed_tiers: Set[str]
+
+    def tier_allowed(self, tier_name: str) -> bool:
+        return tier_name in self.allowed_tiers
+
+
+@dataclass
+class _CreditAccount:
+    user_id: int
+    tier: str
+    available: int                # balance.available when loaded
+    daily_cap: Optional[int]
+    daily_used: int               # today's charges when loaded
+    daily_quota_tier: bool
+    loaded_at: float
+    last_used: float = 0.0
+    reserved: int = 0             # open pre-flight reservations
+    charged: int = 0              # settled since loaded (flushed or not)
+
+    def spendable(self) -> Optional[int]:
+        """Remaining balance, None when not balance-bound (daily-cap quota tiers)."""
+        if self.daily_quota_tier:
+            return None
+        return self.available - self.charged - self.reserved
+
+    def daily_left(self) -> Optional[int]:
+        if self.daily_cap is None:
+            return None
+        return self.daily_cap - self.daily_used - self.charged - self.reserved
+
+
+@dataclass
+class CreditReservation:
+    user_id: int
+    model: str
+    credits: int
+    released: bool = False
+
+
+@dataclass
+class _BudgetState:
+    execution_id: int
+    project_id: Optional[int]
+    execution_cost: float         # executions.total_cost when loaded
+    project_cost: float           # sum over the project when loaded
+    loaded_at: float
+    last_used: float = 0.0
+    added: float = 0.0            # recorded since loaded (flushed or not)
+
+
+@dataclass
+class _PendingCharge:
+    user_id: int
+    model_name: str
+    tokens_in: int
+    tokens_out: int
+    credits: int
+    execution_id: Optional[int] = None
+    project_id: Optional[int] = None
+
+
+@dataclass
+class _Pending:
+    budget: Dict[int, List[float]] = field(default_factory=lambda: defaultdict(lambda: [0.0, 0]))
+    charges: List[_PendingCharge] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.budget) + len(self.charges)
+
+
+class CostLedger(BackgroundWriter):
+    """Process-wide in-memory accounting state + batched writer."""
+
+    thread_name = "cost-ledger"
+
+    def __init__(self, session_factory: Optional[Callable[[], Any]] = None,
+                 flush_interval: float = FLUSH_INTERVAL_SECONDS):
+        super().__init__(session_factory, flush_interval)
+        self._lock = threading.RLock()
+        self._accounts: Dict[int, _CreditAccount] = {}
+        self._budgets: Dict[int, _BudgetState] = {}
+        self._pricing: Dict[str, tuple] = {}           # model → (loaded_at, _CreditPricing | None)
+        self._pending = _Pending()
+        self._consecutive_failures = 0
+        self.stats = {"flushes": 0, "flush_failures": 0, "rows_written": 0, "rejected": 0, "dropped": 0,
+                      "cold_loads": 0}
+
+    # ------------------------------------------------------------------
+    # Background writer hooks
+    # ------------------------------------------------------------------
+
+    def _after_fork(self) -> None:
+        self._pending = _Pending()
+
+    def _tick(self) -> None:
+        self.flush()
+        self._refresh_stale_state()
+
+    def _enqueued(self) -> None:
+        self._ensure_writer()
+        if len(self._pending) >= FLUSH_MAX_PENDING:
+            self._wake.set()
+
+    # ------------------------------------------------------------------
+    # Budget (USD, per execution / project)
+    # ------------------------------------------------------------------
+
+    def _load_budget(self, execution_id: int) -> Optional[_BudgetState]:
+        from sqlalchemy import func
+        from app.models.execution import Execution
+
+        db = self._session()
+        try:
+            execution = db.query(Execution).get(execution_id)
+            if execution is None:
+                return None
+            project_cost = db.query(func.coalesce(func.sum(Execution.total_cost), 0)).filter(
+                Execution.project_id == execution.project_id
+            ).scalar()
+            return _BudgetState(
+                execution_id=execution_id,
+                project_id=execution.project_id,
+                execution_cost=float(execution.total_cost or 0.0),
+                project_cost=float(project_cost or 0.0),
+                loaded_at=time.monotonic(),
+            )
+        finally:
+            db.close()
+
+    def _budget_state(self, execution_id: int) -> Optional[_BudgetState]:
+        with self._lock:
+            state = self._budgets.get(execution_id)
+            if state is not None:
+                state.last_used = time.monotonic()
+                return state
+        self.stats["cold_loads"] += 1
+        state = self._load_budget(execution_id)
+        if state is not None:
+            state.last_used = state.loaded_at
+            with self._lock:
+                state.added = self._pending.budget[execution_id][0] if execution_id in self._pending.budget else 0.0
+                self._budgets[execution_id] = state
+            # The writer thread also runs the refresh: start it in check-only processes too.
+            self._ensure_writer()
+        return state
+
+    def check_budget(self, execution_id: int, estimated_cost: float = 0.0) -> dict:
+        """Same contract as BudgetService.check_budget, served from memory.
+
+        Costs recorded by other processes are seen after at most
+        FLUSH_INTERVAL_SECONDS + STATE_REFRESH_SECONDS (see module docstring).
+        """
+        state = self._budget_state(execution_id)
+        if state is None:
+            return {"allowed": True, "execution_cost": 0, "project_cost": 0}
+        with self._lock:
+            # The writer may have swapped in a refreshed state since the lookup.
+            state = self._budgets.get(execution_id, state)
+            execution_cost = state.execution_cost + state.added
+            project_cost = state.project_cost + self._project_added(state.project_id)
+        if execution_cost + estimated_cost > DEFAULT_EXECUTION_LIMIT_USD:
+            raise BudgetExceededError("execution", execution_cost, DEFAULT_EXECUTION_LIMIT_USD)
+        if project_cost + estimated_cost > DEFAULT_PROJECT_LIMIT_USD:
+            raise BudgetExceededError("project", project_cost, DEFAULT_PROJECT_LIMIT_USD)
+        return {
+            "allowed": True,
+            "execution_cost": execution_cost,
+            "project_cost": project_cost,
+            "remaining_execution": DEFAULT_EXECUTION_LIMIT_USD - execution_cost,
+            "remaining_project": DEFAULT_PROJECT_LIMIT_USD - project_cost,
+        }
+
+    def _project_added(self, project_id: Optional[int]) -> float:
+        return sum(s.added for s in self._budgets.values() if s.project_id == project_id)
+
+    def record_llm_cost(self, execution_id: int, model: str, input_tokens: int, output_tokens: int) -> float:
+        """Queue a cost for ``execution_id``; returns the USD cost (BudgetService.estimate_cost pricing)."""
+        pricing = _resolve_usd_pricing(model)
+        cost = round((input_tokens * pricing["input"] + output_tokens * pricing["output"]) / 1_000_000, 6)
+        with self._lock:
+            entry = self._pending.budget[execution_id]
+            entry[0] += cost
+            entry[1] += int(input_tokens or 0) + int(output_tokens or 0)
+            state = self._budgets.get(execution_id)
+            if state is not None:
+                state.added += cost
+        self._enqueued()
+        return cost
+
+    # ------------------------------------------------------------------
+    # Credits (per user)
+    # ------------------------------------------------------------------
+
+    def _credit_pricing(self, db, model: str) -> Optional[_CreditPricing]:
+        cached = self._pricing.get(model)
+        if cached is not None and time.monotonic() - cached[0] < PRICING_TTL_SECONDS:
+            return cached[1]
+        try:
+            row = CreditService(db)._resolve_pricing(model)
+            pricing = _CreditPricing(
+                model_name=row.model_name,
+                credits_per_1k_input=float(row.credits_per_1k_input or 0),
+                credits_per_1k_output=float(row.credits_per_1k_output or 0),
+                allowed_tiers={t.strip() for t in (row.allowed_tiers or "").split(",") if t.strip()},
+            )
+        except UnknownModelError:
+            pricing = None
+        self._pricing[model] = (time.monotonic(), pricing)
+        return pricing
+
+    def _load_account(self, db, user_id: int) -> _CreditAccount:
+        from app.models.user import User
+
+        service = CreditService(db)
+        user = db.query(User).get(user_id)
+        if user is None:
+            from app.services.credit_service import CreditError
+            raise CreditError(f"User {user_id} not found")
+        tier_name = resolve_credit_tier(user)
+        balance = service._ensure_balance(user_id)
+        tier_cfg = service._get_tier_config(tier_name)
+        return _CreditAccount(
+            user_id=user_id,
+            tier=tier_name,
+            available=int(balance.available),
+            daily_cap=tier_cfg.daily_credits_cap if tier_cfg else None,
+            daily_used=service._daily_used_credits(user_id),
+            daily_quota_tier=_is_daily_cap_quota_tier(tier_cfg),
+            loaded_at=time.monotonic(),
+        )
+
+    def _account_and_pricing(self, user_id: int, model: str):
+        with self._lock:
+            account = self._accounts.get(user_id)
+            if account is not None:
+                account.last_used = time.monotonic()
+        pricing_cached = self._pricing.get(model)
+        if account is not None:
+            if pricing_cached is not None and time.monotonic() - pricing_cached[0] < PRICING_TTL_SECONDS:
+                return account, pricing_cached[1]
+        # Cold path: first call for this user or model.
+        self.stats["cold_loads"] += 1
+        db = self._session()
+        try:
+            pricing = self._credit_pricing(db, model)
+            if account is None:
+                loaded = self._load_account(db, user_id)
+                loaded.last_used = loaded.loaded_at
+                with self._lock:
+                    loaded.charged = sum(c.credits for c in self._pending.charges if c.user_id == user_id)
+                    account = self._accounts.setdefault(user_id, loaded)
+                self._ensure_writer()
+            return account, pricing
+        finally:
+            db.close()
+
+    def reserve(self, user_id: int, model: str, max_tokens: int) -> CreditReservation:
+        """Pre-flight: same checks as CreditService.preflight, and hold the estimate."""
+        account, pricing = self._account_and_pricing(user_id, model)
+        if pricing is None:
+            raise UnknownModelError(f"No pricing row for model '{model}'")
+        if not pricing.tier_allowed(account.tier):
+            raise ModelNotAllowedError(user_id, pricing.model_name, account.tier)
+        estimate = _credits_for_tokens(pricing, max_tokens, max_tokens)
+        with self._lock:
+            # Hold the estimate on the current account, not one a refresh has replaced.
+            account = self._accounts.get(user_id, account)
+            daily_left = account.daily_left()
+            if daily_left is not None and estimate > 0 and estimate > daily_left:
+                raise InsufficientCreditsError(user_id=user_id, requested=estimate, available=max(0, daily_left))
+            spendable = account.spendable()
+            if spendable is not None and estimate > spendable:
+                raise InsufficientCreditsError(user_id=user_id, requested=estimate, available=max(0, spendable))
+            account.reserved += estimate
+        return CreditReservation(user_id=user_id, model=model, credits=estimate)
+
+    def release(self, reservation: Optional[CreditReservation]) -> None:
+        """Drop a reservation without charging (failed call)."""
+        if reservation is None or reservation.released:
+            return
+        with self._lock:
+            account = self._accounts.get(reservation.user_id)
+            if account is not None:
+                account.reserved = max(0, account.reserved - reservation.credits)
+            reservation.released = True
+
+    def settle(self, reservation: Optional[CreditReservation], model: str, tokens_in: int, tokens_out: int,
+               execution_id: Optional[int] = None, project_id: Optional[int] = None) -> int:
+        """Replace the reservation by the real charge (queued for the writer). Returns credits."""
+        if reservation is None:
+            return 0
+        self.release(reservation)
+        _, pricing = self._account_and_pricing(reservation.user_id, model)
+        if pricing is None:
+            logger.error("[CostLedger] No credit pricing for %s — call not charged", model)
+            return 0
+        credits = _credits_for_tokens(pricing, tokens_in, tokens_out)
+        with self._lock:
+            account = self._accounts.get(reservation.user_id)
+            if account is not None:
+                account.charged += credits
+            self._pending.charges.append(_PendingCharge(
+                user_id=reservation.user_id, model_name=pricing.model_name,
+                tokens_in=int(tokens_in or 0), tokens_out=int(tokens_out or 0), credits=credits,
+                execution_id=execution_id, project_id=project_id,
+            ))
+        self._enqueued()
+        return credits
+
+    # ------------------------------------------------------------------
+    # Flush
+    # ------------------------------------------------------------------
+
+    def _apply_budget(self, db, budget: Dict[int, List[float]]) -> None:
+        from sqlalchemy import func
+        from app.models.execution import Execution
+
+        for execution_id, (cost, tokens) in budget.items():
+            db.query(Execution).filter(Execution.id == execution_id).update({
+                Execution.total_cost: func.coalesce(Execution.total_cost, 0.0) + cost,
+                Execution.total_tokens_used: func.coalesce(Execution.total_tokens_used, 0) + int(tokens),
+            }, synchronize_session=False)
+
+    def _apply_charges(self, db, charges: List[_PendingCharge]) -> None:
+        from app.models.credit import TRANSACTION_TYPE_CHARGE, CreditBalance, CreditTransaction
+
+        by_user: Dict[int, int] = defaultdict(int)
+        for charge in charges:
+            by_user[charge.user_id] += charge.credits
+            db.add(CreditTransaction(
+                user_id=charge.user_id,
+                transaction_type=TRANSACTION_TYPE_CHARGE,
+                model_used=charge.model_name,
+                tokens_input=charge.tokens_in,
+                tokens_output=charge.tokens_out,
+                credits_consumed=charge.credits,
+                execution_id=charge.execution_id,
+                project_id=charge.project_id,
+            ))
+        for user_id, credits in by_user.items():
+            if credits:
+                db.query(CreditBalance).filter(CreditBalance.user_id == user_id).update(
+                    {CreditBalance.used_credits: CreditBalance.used_credits + credits},
+                    synchronize_session=False,
+                )
+
+    def flush(self) -> int:
+        """Write every queued entry in one transaction. Returns the number of entries written."""
+        with self._lock:
+            if not len(self._pending):
+                return 0
+            batch, self._pending = self._pending, _Pending()
+        db = None
+        rejected = _Pending()
+        try:
+            db = self._session()
+            self._apply_budget(db, batch.budget)
+            self._apply_charges(db, batch.charges)
+            db.commit()
+        except Exception as exc:
+            if db is not None:
+                try:
+                    db.rollback()
+                except Exception:
+                    pass
+            rejected = self._write_rows(db, batch) if db is not None else None
+            if rejected is None:
+                return self._requeue(batch, exc)
+            # Dead letter: the entries the database refuses on their own are
+            # logged in full (manual reconciliation) instead of blocking the queue.
+            logger.error("[CostLedger] %d entries rejected by the database, dropped: budget=%s charges=%s (%s)",
+                         len(rejected), dict(rejected.budget), rejected.charges, exc)
+        finally:
+            if db is not None:
+                db.close()
+        written = len(batch) - len(rejected)
+        self._consecutive_failures = 0
+        with self._lock:
+            self.stats["flushes"] += 1
+            self.stats["rows_written"] += written
+            self.stats["rejected"] += len(rejected)
+        logger.debug("[CostLedger] flushed %d entries", written)
+        return written
+
+    def _write_rows(self, db, batch: _Pending) -> Optional[_Pending]:
+        """Entry-by-entry fallback (one savepoint each). Returns the rejected entries, None if none was written."""
+        rejected = _Pending()
+        written = 0
+        try:
+            for execution_id, entry in batch.budget.items():
+                try:
+                    with db.begin_nested():
+                        self._apply_budget(db, {execution_id: entry})
+                    written += 1
+                except Exception:
+                    rejected.budget[execution_id] = entry
+            for charge in batch.charges:
+                try:
+                    with db.begin_nested():
+                        self._apply_charges(db, [charge])
+                    written += 1
+                except Exception:
+                    rejected.charges.append(charge)     # utilisateur / execution supprime...
+            db.commit()
+        except Exception:
+            try:
+                db.rollback()
+            except Exception:
+                pass
+            return None
+        return rejected if written else None
+
+    def _requeue(self, batch: _Pending, exc: Exception) -> int:
+        """Put a batch nobody could write back in front of newer entries (dead-lettered after FLUSH_MAX_RETRIES)."""
+        self._consecutive_failures += 1
+        with self._lock:
+            self.stats["flush_failures"] += 1
+            if self._consecutive_failures >= FLUSH_MAX_RETRIES:
+                self._consecutive_failures = 0
+                self.stats["dropped"] += len(batch)
+                logger.error("[CostLedger] %d entries dropped after %d failed flushes: budget=%s charges=%s (%s)",
+                             len(batch), FLUSH_MAX_RETRIES, dict(batch.budget), batch.charges, exc)
+                return 0
+            # At-least-once: put the batch back in front of newer entries.
+            for execution_id, (cost, tokens) in batch.budget.items():
+                entry = self._pending.budget[execution_id]
+                entry[0] += cost
+                entry[1] += tokens
+            self._pending.charges[:0] = batch.charges
+        logger.error("[CostLedger] flush failed, %d entries re-queued: %s", len(batch), exc)
+        return 0
+
+    def _refresh_stale_state(self) -> None:
+        """Re-read cached balances / execution costs older than STATE_REFRESH_SECONDS (writer thread)."""
+        now = time.monotonic()
+        with self._lock:
+            for cache in (self._accounts, self._budgets):
+                for key in [k for k, v in cache.items() if now - v.last_used > STATE_IDLE_SECONDS and not getattr(v, "reserved", 0)]:
+                    del cache[key]
+            stale_users = [a.user_id for a in self._accounts.values() if now - a.loaded_at > STATE_REFRESH_SECONDS]
+            stale_execs = [s.execution_id for s in self._budgets.values() if now - s.loaded_at > STATE_REFRESH_SECONDS]
+        if not stale_users and not stale_execs:
+            return
+        db = self._session()
+        try:
+            for user_id in stale_users:
+                fresh = self._load_account(db, user_id)
+                with self._lock:
+                    old = self._accounts.get(user_id)
+                    fresh.reserved = old.reserved if old else 0
+                    fresh.last_used = old.last_used if old else now
+                    # Flushed charges are now in the DB numbers; keep only what is still queued.
+                    fresh.charged = sum(c.credits for c in self._pending.charges if c.user_id == user_id)
+                    self._accounts[user_id] = fresh
+        except Exception as exc:
+            logger.warning("[CostLedger] balance refresh failed: %s", exc)
+        finally:
+            db.close()
+        for execution_id in stale_execs:
+            try:
+                fresh = self._load_budget(execution_id)
+            except Exception as exc:
+                logger.warning("[CostLedger] budget refresh failed for %s: %s", execution_id, exc)
+                continue
+            with self._lock:
+                if fresh is None:
+                    self._budgets.pop(execution_id, None)
+                    continue
+                old = self._budgets.get(execution_id)
+                fresh.last_used = old.last_used if old else now
+                fresh.added = self._pending.budget[execution_id][0] if execution_id in self._pending.budget else 0.0
+                self._budgets[execution_id] = fresh
+
+
+_ledger: Optional[CostLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_cost_ledger() -> CostLedger:
+    global _ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                _ledger = CostLedger()
+                atexit.register(_ledger.shutdown)
+    return _ledger
@@ -0,0 +1,133 @@
+"""
+Deployment manifest (DEPLOY-DIFF) — content-addressed delta deployments.
+
+Before: ``JordanDeployService.deploy_source_code`` and
+``SFAdminService.execute_plan`` pushed the whole phase output on every call,
+retries and resumed builds included, although most files were byte-identical
+to what the org already had.
+
+Now a manifest per project and environment (target org) records, for every
+deployed file, the sha256 of the content last deployed successfully:
+
+    <METADATA_DIR>/deploy_manifests/<project_id>/<environment>.json
+    {"files": {"force-app/main/default/classes/X.cls": {"sha256": "...", "deploy_id": "...", "deployed_at": "..."}}}
+
+``changed(files)`` keeps only the components with at least one new or
+modified file (a whole LWC / Aura bundle, or a class with its -meta.xml, is
+redeployed together), ``record(files)`` is called after a successful deploy
+only. A failed deploy therefore leaves the manifest untouched and the next
+attempt retries the same delta.
+
+Changes made directly in the org are invisible to the manifest. A delta
+deploy that fails after skipping files is retried once in full by
+``JordanDeployService.deploy_phase``; otherwise a full redeploy is requested
+with ``force_deploy`` on the build (``PhasedBuildExecutor(force_deploy=True)``,
+or ``POST /execute/{id}/resume-build?force_deploy=true``), with
+DEPLOY_DIFF_ENABLED = False, or by deleting
+``<METADATA_DIR>/deploy_manifests/<project_id>``.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEPLOY_DIFF_ENABLED = True           # False restores full redeploys
+
+_BUNDLE_FOLDERS = ("lwc", "aura", "staticresources")
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.@-]+")
+
+
+def content_sha256(content: Union[str, bytes]) -> str:
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+def normalise_path(path: str) -> str:
+    path = path.replace("\\", "/")
+    while path.startswith("./"):
+        path = path[2:]
+    return path.lstrip("/")
+
+
+def component_key(path: str) -> str:
+    """
+    Deployable unit a file belongs to: ``lwc/<bundle>`` for bundles,
+    ``classes/X`` for ``X.cls`` + ``X.cls-meta.xml``, the file itself otherwise.
+    """
+    parts = normalise_path(path).split("/")
+    for i, part in enumerate(parts[:-1]):
+        if part in _BUNDLE_FOLDERS and i + 1 < len(parts) - 1:
+            return "/".join(parts[:i + 2])
+    stem = parts[-1].split(".", 1)[0]
+    return "/".join(parts[:-1] + [stem])
+
+
+class DeploymentManifest:
+    """Last deployed content hash per file, for one project and one environment."""
+
+    def __init__(self, project_id: Union[int, str], environment: str, root: Optional[Path] = None):
+        self.project_id = project_id
+        self.environment = environment or "default"
+        base = Path(root or settings.METADATA_DIR / "deploy_manifests") / str(project_id)
+        self.path = base / f"{_SAFE_NAME.sub('_', self.environment)}.json"
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, Dict]:
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f).get("files", {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"[DeployManifest] Unreadable manifest {self.path}: {e} — full deploy")
+            return {}
+
+    def changed(self, files: Dict[str, Union[str, bytes]], force: bool = False) -> Dict[str, Union[str, bytes]]:
+        """Subset of ``files`` whose component has at least one new or modified file."""
+        if force or not DEPLOY_DIFF_ENABLED:
+            return dict(files)
+        deployed = self.load()
+        dirty = {
+            component_key(path)
+            for path, content in files.items()
+            if deployed.get(normalise_path(path), {}).get("sha256") != content_sha256(content)
+        }
+        return {path: content for path, content in files.items() if component_key(path) in dirty}
+
+    def record(self, files: Dict[str, Union[str, bytes]], deploy_id: Optional[str] = None) -> None:
+        """Mark ``files`` as deployed (call only after a successful deployment)."""
+        if not files:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            deployed = self.load()
+            for path, content in files.items():
+                deployed[normalise_path(path)] = {"sha256": content_sha256(content),
+                                                  "deploy_id": deploy_id, "deployed_at": now}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "w") as f:
+                json.dump({"project_id": self.project_id, "environment": self.environment,
+                           "files": deployed}, f, indent=2, sort_keys=True)
+            tmp.replace(self.path)
+        logger.info(f"[DeployManifest] {len(files)} file(s) recorded for {self.environment}")
+
+
+def read_tree(root: Union[str, Path], subdir: str = "force-app") -> Dict[str, bytes]:
+    """``{relative path: bytes}`` of every file under ``root/subdir``."""
+    root = Path(root)
+    base = root / subdir
+    if not base.is_dir():
+        return {}
+    return {str(p.relative_to(root)).replace("\\", "/"): p.read_bytes()
+            for p in sorted(base.rglob("*")) if p.is_file()}
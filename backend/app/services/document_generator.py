@@ -9,12 +9,11 @@ Generates high-quality Word documents with:
 FIXED VERSION: Properly extracts data from database
 """
 
+import io
 import os
 import re
 import json
 import logging
-import subprocess
-import tempfile
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
@@ -27,6 +26,7 @@ from docx.oxml.ns import nsdecls
 from docx.oxml import parse_xml
 from sqlalchemy import create_engine, text
 from app.config import settings
+from app.services.mermaid_renderer import extract_mermaid_blocks, get_mermaid_renderer
 
 logger = logging.getLogger(__name__)
 
@@ -187,30 +187,13 @@ class ProfessionalDocumentGenerator:
     def add_mermaid_diagram(self, mermaid_code: str, title: str = None) -> bool:
         """Convert Mermaid diagram to image and add to document"""
         try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.mmd', delete=False) as f:
-                f.write(mermaid_code)
-                mmd_file = f.name
-            
-            png_file = mmd_file.replace('.mmd', '.png')
-            
-            result = subprocess.run(
-                ['mmdc', '-i', mmd_file, '-o', png_file, '-b', 'white', '-w', '800'],
-                capture_output=True,
-                timeout=30
-            )
-            
-            if result.returncode == 0 and os.path.exists(png_file):
+            png = get_mermaid_renderer().render(mermaid_code)
+            if png:
                 if title:
                     self.doc.add_heading(title, 3)
-                self.doc.add_picture(png_file, width=Inches(6))
+                self.doc.add_picture(io.BytesIO(png), width=Inches(6))
                 self.doc.add_paragraph()
-                
-                os.unlink(mmd_file)
-                os.unlink(png_file)
                 return True
-                
-        except (subprocess.TimeoutExpired, FileNotFoundError) as e:
-            logger.warning(f"Mermaid CLI not available: {e}")
         except Exception as e:
             logger.error(f"Error generating mermaid diagram: {e}")
         
@@ -236,6 +219,7 @@ class ProfessionalDocumentGenerator:
             self.doc.add_paragraph("Content pending generation.")
             return
         
+        get_mermaid_renderer().render_many(extract_mermaid_blocks(content))   # MERMAID-POOL: rendus en parallele
         lines = content.split('\n')
         i = 0
         
@@ -10,7 +10,6 @@ Supports:
 Author: Digital Humans Team
 Created: 2025-12-08
 """
-import asyncio
 import logging
 import os
 import shutil
@@ -18,6 +17,8 @@ import tempfile
 from typing import Dict, List, Any, Tuple
 from urllib.parse import urlparse
 from app.services.audit_service import audit_service
+from app.services.command_executor import get_command_executor
+from app.services.deploy_manifest import content_sha256
 import httpx
 
 logger = logging.getLogger(__name__)
@@ -165,35 +166,22 @@ class GitService:
         
         logger.info(f"[Git] Running: git {' '.join(args)} in {work_cwd}")
         
-        try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=work_cwd
-            )
-            
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(),
-                timeout=timeout
-            )
-            
-            stdout_str = stdout.decode('utf-8', errors='replace')
-            stderr_str = stderr.decode('utf-8', errors='replace')
-            
-            success = process.returncode == 0
-            
+        # CMD-EXEC: executeur partage, une commande a la fois par arbre de travail
+        run = await get_command_executor().run(cmd, cwd=work_cwd, timeout=timeout, key=f"git:{work_cwd}")
+        
+        if run.timed_out:
+            logger.error("[Git] Command timed out")
+            success, stdout_str, stderr_str = False, "", "Timeout"
+        elif run.error:
+            logger.error(f"[Git] Exception: {run.error}")
+            success, stdout_str, stderr_str = False, "", run.error
+        else:
+            success, stdout_str, stderr_str = run.success, run.stdout, run.stderr
             if not success:
                 logger.warning(f"[Git] Command failed: {stderr_str}")
-            
-            return success, stdout_str, stderr_str
-            
-        except asyncio.TimeoutError:
-            logger.error("[Git] Command timed out")
-            return False, "", "Timeout"
-        except Exception as e:
-            logger.error(f"[Git] Exception: {str(e)}")
-            return False, "", str(e)
+        
+        logger.info(f"[Git] {run.label}: {run.duration_ms} ms (queued {run.queued_ms} ms)")
+        return success, stdout_str, stderr_str
     
     async def clone(self, shallow: bool = True) -> Dict[str, Any]:
         """
@@ -639,19 +627,28 @@ class GitService:
         if not self.repo_path:
             return {"success": False, "error": "Repository not cloned"}
         
-        # Write files
+        # Write files — DEPLOY-DIFF: a file whose content already matches the
+        # working tree (i.e. HEAD after clone) is neither rewritten nor added.
         written_files = []
         for path, content in files.items():
             full_path = os.path.join(self.repo_path, path)
+            if os.path.isfile(full_path):
+                with open(full_path, 'rb') as f:
+                    if content_sha256(f.read()) == content_sha256(content):
+                        continue
             os.makedirs(os.path.dirname(full_path), exist_ok=True)
             
             with open(full_path, 'w', encoding='utf-8') as f:
                 f.write(content)
             written_files.append(path)
         
-        # Add files
-        for path in written_files:
-            await self._run_git(["add", path])
+        if not written_files:
+            logger.info(f"[Git] {len(files)} file(s) unchanged, nothing to commit")
+            return {"success": True, "message": "Nothing to commit", "files": [], "unchanged": len(files)}
+        
+        # Add files (one git process per 500 paths instead of one per file)
+        for start in range(0, len(written_files), 500):
+            await self._run_git(["add", "--"] + written_files[start:start + 500])
         
         # Commit
         success, stdout, stderr = await self._run_git([
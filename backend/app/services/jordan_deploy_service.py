@@ -2,11 +2,15 @@
 Jordan Deploy Service - BUILD v2
 Service centralisé de déploiement, utilisé par Jordan (Tech Lead).
 """
+import json
 import logging
+import os
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 from enum import Enum
 
+from app.services.deploy_manifest import DeploymentManifest
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,6 +41,19 @@ PHASE_CONFIGS = {
 }
 
 
+def _write_sfdx_project(project_dir: str, files: Dict[str, str], api_version: str) -> None:
+    """sfdx-project.json couvrant les dossiers racine de ``files`` (resolution du --manifest)."""
+    if "sfdx-project.json" in files:
+        return
+    roots = sorted({path.split("/", 1)[0] for path in files if "/" in path})
+    project = {
+        "packageDirectories": [{"path": root, "default": i == 0} for i, root in enumerate(roots)],
+        "sourceApiVersion": api_version,
+    }
+    with open(os.path.join(project_dir, "sfdx-project.json"), "w") as f:
+        json.dump(project, f, indent=2)
+
+
 class JordanDeployService:
     """
     Service de déploiement centralisé pour BUILD v2.
@@ -180,7 +197,8 @@ class JordanDeployService:
         phase: int,
         aggregated_output: Dict[str, Any],
         branch_name: str,
-        pr_url: Optional[str] = None
+        pr_url: Optional[str] = None,
+        force: bool = False
     ) -> Dict[str, Any]:
         """
         Déploie une phase complète.
@@ -197,6 +215,8 @@ class JordanDeployService:
             aggregated_output: Output agrégé de la phase
             branch_name: Nom de la branche
             pr_url: URL de la PR à merger (optionnel)
+            force: redeploie tous les composants (ignore le manifest DEPLOY-DIFF).
+                Sans lui, un deploiement delta en echec est retente une fois en complet.
             
         Returns:
             Résultat du déploiement
@@ -227,17 +247,19 @@ class JordanDeployService:
                 result["merge_sha"] = merge_result.get("sha")
             
             # Step 2: Deploy based on method
-            if config.deploy_method == DeployMethod.TOOLING_API:
-                deploy_result = await self.deploy_admin_config(aggregated_output)
-            elif config.deploy_method == DeployMethod.SFDX_SOURCE:
-                deploy_result = await self.deploy_source_code(aggregated_output)
-            elif config.deploy_method == DeployMethod.DATA_SCRIPTS:
-                deploy_result = await self.execute_data_migration(aggregated_output)
-            else:
-                deploy_result = {"success": False, "error": f"Unknown deploy method: {config.deploy_method}"}
-            
+            deploy_result = await self._deploy_with_method(config, aggregated_output, force)
             result["steps"].append({"step": "deploy", "result": deploy_result})
             
+            # DEPLOY-DIFF : un delta qui echoue alors que des composants ont ete
+            # sautes peut venir d'une org modifiee a la main (composant supprime
+            # ou altere que le manifest croit deploye) : un seul nouvel essai,
+            # complet, avant d'abandonner.
+            if not deploy_result.get("success") and not force and deploy_result.get("skipped_files"):
+                logger.warning(f"[Jordan] Phase {phase} delta deploy failed with "
+                               f"{deploy_result['skipped_files']} skipped file(s), retrying a full deploy")
+                deploy_result = await self._deploy_with_method(config, aggregated_output, True)
+                result["steps"].append({"step": "deploy_full", "result": deploy_result})
+            
             if not deploy_result.get("success"):
                 result["error"] = f"Deploy failed: {deploy_result.get('error')}"
                 # Rollback merge if we merged
@@ -247,7 +269,8 @@ class JordanDeployService:
                 return result
             
             # Step 3: Retrieve metadata if needed (post-Tooling API)
-            if config.requires_retrieve:
+            # (rien a relire si aucun composant n'a change : DEPLOY-DIFF)
+            if config.requires_retrieve and not deploy_result.get("unchanged"):
                 retrieve_result = await self.retrieve_and_commit_metadata(aggregated_output, branch_name)
                 result["steps"].append({"step": "retrieve", "result": retrieve_result})
             
@@ -267,6 +290,15 @@ class JordanDeployService:
             result["error"] = str(e)
             return result
     
+    async def _deploy_with_method(self, config, aggregated_output: Dict[str, Any], force: bool) -> Dict[str, Any]:
+        if config.deploy_method == DeployMethod.TOOLING_API:
+            return await self.deploy_admin_config(aggregated_output, force=force)
+        if config.deploy_method == DeployMethod.SFDX_SOURCE:
+            return await self.deploy_source_code(aggregated_output, force=force)
+        if config.deploy_method == DeployMethod.DATA_SCRIPTS:
+            return await self.execute_data_migration(aggregated_output)
+        return {"success": False, "error": f"Unknown deploy method: {config.deploy_method}"}
+    
     # ═══════════════════════════════════════════════════════════════
     # GIT OPERATIONS
     # ═══════════════════════════════════════════════════════════════
@@ -413,9 +445,10 @@ class JordanDeployService:
     # DEPLOYMENT METHODS
     # ═══════════════════════════════════════════════════════════════
     
-    async def deploy_admin_config(self, aggregated_output: Dict[str, Any]) -> Dict[str, Any]:
+    async def deploy_admin_config(self, aggregated_output: Dict[str, Any], force: bool = False) -> Dict[str, Any]:
         """
         Phase 1/4: Déploie via SFDX CLI (plans JSON de Raj → XML → deploy).
+        Seuls les fichiers XML modifies depuis le dernier deploiement partent (DEPLOY-DIFF).
         """
         if not self.sf_admin_service:
             logger.error(f"[Jordan] ECHEC : " + str("SF Admin service not initialized"))
@@ -443,7 +476,7 @@ class JordanDeployService:
         
         # execute_plan est synchrone, on l'appelle dans un thread
         import asyncio
-        result = await asyncio.to_thread(self.sf_admin_service.execute_plan, plan)
+        result = await asyncio.to_thread(self.sf_admin_service.execute_plan, plan, force)
 
         # FIX-PERSIST-002 (10/08/2026) — versionner ce qui vient d'etre
         # deploye. C'est le maillon qui rend le travail REUTILISABLE : sans
@@ -470,12 +503,25 @@ class JordanDeployService:
             "components_failed": result.components_failed,
             "errors": result.errors,
             "deployed_components": [c["name"] for c in result.created_components],
-            "deploy_id": result.deploy_id
+            "deploy_id": result.deploy_id,
+            "unchanged": result.unchanged,
+            "skipped_files": result.skipped_files,
+            "package_xml": result.package_xml,
         }
     
-    async def deploy_source_code(self, aggregated_output: Dict[str, Any]) -> Dict[str, Any]:
+    def _deploy_manifest(self) -> Optional[DeploymentManifest]:
+        """Manifest DEPLOY-DIFF de l'org cible (None sans org configuree)."""
+        target_org = getattr(self.sfdx_service, "target_org", None)
+        if not target_org:
+            return None
+        return DeploymentManifest(self.project_id, target_org)
+    
+    async def deploy_source_code(self, aggregated_output: Dict[str, Any], force: bool = False) -> Dict[str, Any]:
         """
         Phase 2/3/5: Déploie via SFDX source deploy.
+        
+        Args:
+            force: redeploie tout, sans diff contre le manifest (org modifiee a la main)
         """
         if not self.sfdx_service:
             logger.error(f"[Jordan] ECHEC : " + str("SFDX service not initialized"))
@@ -490,24 +536,54 @@ class JordanDeployService:
             logger.error(f"[Jordan] ECHEC : " + str("No files to deploy"))
             return {"success": False, "error": "No files to deploy"}
         
-        logger.info(f"[Jordan] Deploying {len(files)} files via SFDX")
+        # DEPLOY-DIFF : seuls les composants dont le contenu a change depuis le
+        # dernier deploiement reussi sur cette org partent ; les reprises et
+        # retries ne repoussent plus toute la phase.
+        manifest = self._deploy_manifest()
+        changed = manifest.changed(files, force=force) if manifest else dict(files)
+        if not changed:
+            logger.info(f"[Jordan] {len(files)} file(s) unchanged since last deploy — nothing to deploy")
+            return {"success": True, "unchanged": True, "skipped_files": len(files),
+                    "deployed_components": []}
+        
+        logger.info(f"[Jordan] Deploying {len(changed)}/{len(files)} changed files via SFDX")
         
         # Write files to temp directory
         import tempfile
         import os
         
+        from app.services.sf_admin_service import SFAdminService
+        package_xml = self.sfdx_service._generate_package_xml(
+            self.sfdx_service._categorize_files(changed), SFAdminService._version_api()
+        )
+        delta = len(changed) < len(files)
         with tempfile.TemporaryDirectory() as tmpdir:
-            for path, content in files.items():
-                full_path = os.path.join(tmpdir, path)
+            # Sources dans project/, package.xml a cote : le manifest delimite
+            # le deploiement delta sans faire partie de l'arborescence deployee.
+            project_dir = os.path.join(tmpdir, "project")
+            for path, content in changed.items():
+                full_path = os.path.join(project_dir, path)
                 os.makedirs(os.path.dirname(full_path), exist_ok=True)
                 with open(full_path, 'w') as f:
                     f.write(content)
             
-            # Deploy using SFDX
-            result = await self.sfdx_service.deploy_source(tmpdir)
+            # Deploy using SFDX (--manifest pour un delta, --source-dir sinon)
+            if delta:
+                manifest_path = os.path.join(tmpdir, "package.xml")
+                with open(manifest_path, 'w') as f:
+                    f.write(package_xml)
+                _write_sfdx_project(project_dir, changed, SFAdminService._version_api())
+                result = await self.sfdx_service.deploy_source(project_dir, manifest_path=manifest_path,
+                                                               cwd=project_dir)
+            else:
+                result = await self.sfdx_service.deploy_source(project_dir)
         
+        result["package_xml"] = package_xml
+        result["skipped_files"] = len(files) - len(changed)
         if result.get("success"):
-            result["deployed_components"] = list(files.keys())
+            result["deployed_components"] = list(changed.keys())
+            if manifest:
+                manifest.record(changed, deploy_id=result.get("id"))
         
         return result
     
@@ -1,17 +1,191 @@
 """
 LLM Logger Service - Logs all LLM interactions to database
+
+LLM-LOG-BUF: ``log_llm_interaction()`` used to open a session, insert one row
+(prompts up to 100 KB, responses up to 500 KB) and commit inside every agent
+call. Rows are now queued and written by a daemon thread, LLM_LOG_BATCH_SIZE
+rows per INSERT, every LLM_LOG_FLUSH_INTERVAL_SECONDS, as soon as
+LLM_LOG_FLUSH_MAX_BYTES of payload are pending, and at shutdown.
+
+Prompt / RAG context / response longer than LLM_LOG_INLINE_MAX_CHARS go to
+``llm_payload_blobs``, compressed (zstd if ``zstandard`` is installed, zlib
+otherwise) and keyed by sha256, so a system prompt or RAG context repeated
+across calls is stored once. The row keeps a preview and the hash;
+``load_llm_payload()`` returns the full text.
 """
+import atexit
+import hashlib
+import threading
 import time
-from typing import Optional, Dict
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.batched_writer import BatchedWriter
+
+try:
+    import zstandard
+except ImportError:  # zlib fallback
+    zstandard = None
 
 # Database imports
 try:
+    from sqlalchemy import insert
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
     from app.database import SessionLocal
-    from app.models.llm_interaction import LLMInteraction
+    from app.models.llm_interaction import LLMInteraction, LLMPayloadBlob
     DB_AVAILABLE = True
 except ImportError:
     DB_AVAILABLE = False
 
+LLM_LOG_BUFFERED = True                       # False restores one synchronous INSERT + commit per call
+LLM_LOG_FLUSH_INTERVAL_SECONDS = 2.0
+LLM_LOG_BATCH_SIZE = 50                       # rows per INSERT
+LLM_LOG_FLUSH_MAX_BYTES = 8 * 1024 * 1024     # flush early once this much payload is queued
+LLM_LOG_QUEUE_MAX_BYTES = 128 * 1024 * 1024   # backpressure: beyond this, new rows are dropped (counted)
+LLM_LOG_MAX_FLUSH_RETRIES = 30                # consecutive failed flushes before the head batch is dropped
+LLM_LOG_INLINE_MAX_CHARS = 4000               # longer payloads go to llm_payload_blobs
+LLM_LOG_PREVIEW_CHARS = 1000                  # kept in the text column of an externalised payload
+LLM_LOG_KNOWN_BLOBS = 4096                    # hashes known to be stored, not re-sent
+ZSTD_LEVEL = 6
+
+# Truncation limits (unchanged)
+_LIMITS = {"prompt": 100000, "rag_context": 50000, "previous_feedback": 10000,
+           "response": 500000, "error_message": 5000}
+_BLOB_FIELDS = ("prompt", "rag_context", "response")
+
+
+def compress_payload(data: bytes):
+    """``(codec, compressed bytes)``"""
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def decompress_payload(codec: str, data: bytes) -> str:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd payload but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    return zlib.decompress(data).decode("utf-8")
+
+
+def load_llm_payload(db, interaction, field: str) -> Optional[str]:
+    """Full ``prompt`` / ``rag_context`` / ``response`` of an interaction (blob or inline)."""
+    sha = getattr(interaction, f"{field}_sha256", None)
+    if sha:
+        blob = db.get(LLMPayloadBlob, sha)
+        if blob is not None:
+            return decompress_payload(blob.codec, blob.data)
+    return getattr(interaction, field)
+
+
+def _build_row(agent_id, prompt, response, execution_id, task_id, agent_mode, rag_context,
+               previous_feedback, parsed_files, tokens_input, tokens_output, model, provider,
+               execution_time_seconds, success, error_message) -> Dict[str, Any]:
+    texts = {"prompt": prompt, "rag_context": rag_context, "previous_feedback": previous_feedback,
+             "response": response, "error_message": error_message}
+    row = {field: value[:_LIMITS[field]] if value else None for field, value in texts.items()}
+    row.update(
+        execution_id=int(execution_id) if execution_id else None,
+        task_id=task_id,
+        agent_id=agent_id,
+        agent_mode=agent_mode,
+        parsed_files=parsed_files,
+        tokens_input=tokens_input,
+        tokens_output=tokens_output,
+        model=model,
+        provider=provider,
+        execution_time_seconds=execution_time_seconds,
+        success=success,
+    )
+    return row
+
+
+def _payload_size(row: Dict[str, Any]) -> int:
+    return sum(len(row[field]) for field in _BLOB_FIELDS if row.get(field))
+
+
+class LLMLogWriter(BatchedWriter):
+    """
+    LLMInteraction rows + payload blobs on the shared ``BatchedWriter``. The
+    queue is bounded in payload bytes (``max_bytes``); blobs already stored
+    (last LLM_LOG_KNOWN_BLOBS hashes) are not re-sent.
+    """
+
+    thread_name = "llm-log-writer"
+    max_flush_retries = LLM_LOG_MAX_FLUSH_RETRIES
+    flush_max_size = LLM_LOG_FLUSH_MAX_BYTES
+
+    def __init__(self, session_factory: Optional[Callable[[], Any]] = None,
+                 flush_interval: float = LLM_LOG_FLUSH_INTERVAL_SECONDS,
+                 batch_size: int = LLM_LOG_BATCH_SIZE, max_bytes: int = LLM_LOG_QUEUE_MAX_BYTES):
+        super().__init__(session_factory, flush_interval, batch_size, max_queue=max_bytes)
+        self._known: "OrderedDict[str, None]" = OrderedDict()
+        self.stats.update(blobs_written=0, blobs_deduplicated=0, payload_bytes=0, stored_bytes=0)
+
+    def _row_size(self, row: Dict[str, Any]) -> int:
+        return _payload_size(row)
+
+    def _externalise(self, row: Dict[str, Any], blobs: Dict[str, bytes]) -> Dict[str, Any]:
+        row = dict(row)
+        for field in _BLOB_FIELDS:
+            text = row.get(field)
+            sha = None
+            if text and len(text) > LLM_LOG_INLINE_MAX_CHARS:
+                data = text.encode("utf-8")
+                sha = hashlib.sha256(data).hexdigest()
+                blobs.setdefault(sha, data)
+                row[field] = text[:LLM_LOG_PREVIEW_CHARS]
+            row[f"{field}_sha256"] = sha
+        if row["prompt"] is None:
+            row["prompt"] = ""          # NOT NULL: a single NULL would fail the whole batch
+        return row
+
+    def _write_rows(self, db, rows: List[Dict[str, Any]]):
+        """INSERT the blobs not known to be stored, then the rows. Returns (hashes, new blobs, stored bytes)."""
+        blobs: Dict[str, bytes] = {}
+        prepared = [self._externalise(row, blobs) for row in rows]
+        new_blobs = []
+        for sha, data in blobs.items():
+            if sha in self._known:
+                continue
+            codec, packed = compress_payload(data)
+            new_blobs.append({"sha256": sha, "codec": codec, "size": len(data), "data": packed})
+        if new_blobs:
+            db.execute(pg_insert(LLMPayloadBlob).on_conflict_do_nothing(index_elements=["sha256"]), new_blobs)
+        db.execute(insert(LLMInteraction), prepared)
+        return list(blobs), new_blobs, sum(_payload_size(r) for r in prepared)
+
+    def _written(self, rows: List[Dict[str, Any]], receipts: List[Any]) -> None:
+        shas = {sha for receipt in receipts for sha in receipt[0]}
+        new_blobs = {blob["sha256"]: blob for receipt in receipts for blob in receipt[1]}
+        for sha in new_blobs:
+            self._known[sha] = None
+        for sha in shas:
+            self._known.move_to_end(sha)
+        while len(self._known) > LLM_LOG_KNOWN_BLOBS:
+            self._known.popitem(last=False)
+        self.stats["blobs_written"] += len(new_blobs)
+        self.stats["blobs_deduplicated"] += len(shas) - len(new_blobs)
+        self.stats["payload_bytes"] += sum(_payload_size(r) for r in rows)
+        self.stats["stored_bytes"] += (sum(receipt[2] for receipt in receipts)
+                                       + sum(len(b["data"]) for b in new_blobs.values()))
+
+
+_writer: Optional[LLMLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_llm_log_writer() -> LLMLogWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = LLMLogWriter()
+                atexit.register(_writer.shutdown)
+    return _writer
+
 
 def log_llm_interaction(
     agent_id: str,
@@ -35,12 +209,24 @@ def log_llm_interaction(
     Log an LLM interaction to the database.
     
     Returns:
-        The ID of the created record, or None if logging failed.
+        The ID of the created record, or None if logging failed or the row
+        was queued for the background writer (LLM_LOG_BUFFERED).
     """
     if not DB_AVAILABLE:
         print("⚠️ [LLM Logger] Database not available, skipping log")
         return None
     
+    if LLM_LOG_BUFFERED:
+        try:
+            get_llm_log_writer().submit(_build_row(
+                agent_id, prompt, response, execution_id, task_id, agent_mode, rag_context,
+                previous_feedback, parsed_files, tokens_input, tokens_output, model, provider,
+                execution_time_seconds, success, error_message,
+            ))
+        except Exception as e:
+            print(f"❌ [LLM Logger] Failed to queue: {e}", flush=True)
+        return None
+    
     try:
         db = SessionLocal()
         
@@ -0,0 +1,414 @@
+"""
+LLM rate governor (RATE-GOV) — per-provider RPM/TPM buckets + concurrency cap.
+
+Parallel phases (SDS experts, Phase 2 batches) and ``max_jobs`` concurrent
+ARQ executions used to hit the providers unthrottled; the resulting 429
+storms ended up on the fallback chain. LLMRouterService now takes a slot
+from this governor before every provider call.
+
+Config (``rate_limits`` section of ``llm_routing.yaml``)::
+
+    rate_limits:
+      enabled: true
+      backend: local            # local | redis (RPM/TPM shared across workers)
+      redis_url: "redis://localhost:6379/0"
+      max_queue_wait_seconds: 600
+      providers:                # provider name or "provider/model" (more specific wins)
+        anthropic: {rpm: 50, tpm: 400000, max_concurrency: 8}
+
+- Token buckets refill continuously (capacity = 1 minute of budget).
+- TPM is charged with an estimate (prompt chars / 4 + max_tokens) and
+  reconciled with the real usage once the call returns.
+- Waiters are served by priority (orchestrator tier before worker), FIFO
+  within a priority. Concurrency is always enforced per process; with the
+  redis backend the RPM/TPM buckets are shared and fail soft to local
+  buckets if Redis is unreachable. Redis round-trips run in a worker thread,
+  outside the governor lock, so they never block an event loop.
+- The governor is process-wide and loop-agnostic: waiters may come from the
+  router's sync bridge loop, the API loop or ``asyncio.run`` callers.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_ORCHESTRATOR = 0
+PRIORITY_WORKER = 1
+
+DEFAULT_MAX_QUEUE_WAIT = 600.0
+MAX_WAIT_SLICE = 1.0          # waiters re-check at least this often (lost wake-ups, refills)
+RATE_LIMIT_PENALTY = 0.5      # fraction of the RPM bucket drained when a provider answers 429
+WAIT_SAMPLES = 512            # recent queue waits kept per provider for percentiles
+
+
+class QueueWaitExceeded(Exception):
+    """A call waited longer than ``max_queue_wait_seconds`` for a slot."""
+
+
+def is_rate_limit_error(error: Optional[str]) -> bool:
+    """True for provider throttling errors (429 / 529 overloaded) worth a shared backoff."""
+    error = (error or "").lower()
+    return any(marker in error for marker in ("429", "rate limit", "rate_limit", "overloaded", "529"))
+
+
+def estimate_tokens(prompt: str, system_prompt: Optional[str], max_tokens: int) -> int:
+    """Rough pre-call token estimate (≈4 chars/token) — reconciled after the call."""
+    return (len(prompt or "") + len(system_prompt or "")) // 4 + int(max_tokens or 0)
+
+
+class TokenBucket:
+    """Continuously refilled bucket. Capacity = one minute of budget."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` can be taken (requests larger than capacity need a full bucket)."""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level = min(self.capacity, self.level - amount)
+
+
+# Atomic multi-bucket take for the redis backend. KEYS = buckets, ARGV = capacity/rate/amount triples.
+# Returns "0" when taken, else the wait in seconds (as a string: Lua numbers are truncated to integers).
+_REDIS_TAKE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local wait = 0
+local levels = {}
+for i, key in ipairs(KEYS) do
+  local cap = tonumber(ARGV[3 * i - 2])
+  local rate = tonumber(ARGV[3 * i - 1])
+  local amount = tonumber(ARGV[3 * i])
+  local data = redis.call('HMGET', key, 'level', 'ts')
+  local level = tonumber(data[1]) or cap
+  local ts = tonumber(data[2]) or now
+  level = math.min(cap, level + math.max(0, now - ts) * rate)
+  levels[i] = level
+  local needed = math.min(amount, cap)
+  if amount > 0 and level < needed then
+    wait = math.max(wait, (needed - level) / rate)
+  end
+end
+if wait > 0 then return tostring(wait) end
+for i, key in ipairs(KEYS) do
+  local cap = tonumber(ARGV[3 * i - 2])
+  local rate = tonumber(ARGV[3 * i - 1])
+  local amount = tonumber(ARGV[3 * i])
+  redis.call('HSET', key, 'level', math.min(cap, levels[i] - amount), 'ts', now)
+  redis.call('EXPIRE', key, math.ceil(cap / rate) + 60)
+end
+return "0"
+"""
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: int = field(compare=False)
+    loop: Any = field(compare=False, default=None)
+    event: Any = field(compare=False, default=None)
+
+    def wake(self) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:  # loop closed — the waiter is gone
+            pass
+
+
+class ProviderLimiter:
+    """Buckets, concurrency cap, priority queue and wait metrics for one provider key."""
+
+    def __init__(self, key: str, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 max_concurrency: Optional[int] = None):
+        self.key = key
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.max_concurrency = int(max_concurrency) if max_concurrency else None
+        self.in_flight = 0
+        self.queue: List[_Waiter] = []
+        self.taking: Optional[_Waiter] = None     # waiter whose shared (Redis) take is in flight
+        self.granted = 0
+        self.timeouts = 0
+        self.rate_limited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.waits: deque = deque(maxlen=WAIT_SAMPLES)
+
+    def record_wait(self, seconds: float) -> None:
+        self.granted += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+        self.waits.append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self.waits)
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1000, 1) if waits else 0.0
+
+        return {
+            "queued": len(self.queue),
+            "in_flight": self.in_flight,
+            "granted": self.granted,
+            "timeouts": self.timeouts,
+            "rate_limited_responses": self.rate_limited,
+            "queue_wait_ms_avg": round(self.wait_total / self.granted * 1000, 1) if self.granted else 0.0,
+            "queue_wait_ms_p50": pct(0.5),
+            "queue_wait_ms_p95": pct(0.95),
+            "queue_wait_ms_max": round(self.wait_max * 1000, 1),
+        }
+
+
+class RateGovernor:
+    """Process-wide registry of ProviderLimiter, built from the ``rate_limits`` YAML section."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.limits: Dict[str, Dict[str, Any]] = dict(config.get("providers") or {})
+        self.max_queue_wait = float(config.get("max_queue_wait_seconds") or DEFAULT_MAX_QUEUE_WAIT)
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._redis = None
+        self._redis_script = None
+        if (config.get("backend") or "local") == "redis":
+            self._init_redis(config.get("redis_url") or "redis://localhost:6379/0")
+
+    def _init_redis(self, url: str) -> None:
+        try:
+            import redis
+            self._redis = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            self._redis_script = self._redis.register_script(_REDIS_TAKE_SCRIPT)
+        except Exception as exc:
+            logger.warning("[RateGov] Redis backend unavailable (%s) — using local buckets", exc)
+            self._redis = None
+
+    # ------------------------------------------------------------------
+
+    def limiter_for(self, provider_str: str) -> Optional[ProviderLimiter]:
+        """Limiter for ``provider/model`` (exact key first, then provider name), None if unlimited."""
+        provider_name = provider_str.split("/", 1)[0]
+        key = provider_str if provider_str in self.limits else provider_name
+        cfg = self.limits.get(key)
+        if not cfg:
+            return None
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = ProviderLimiter(key, cfg.get("rpm"), cfg.get("tpm"), cfg.get("max_concurrency"))
+                self._limiters[key] = limiter
+            return limiter
+
+    def _shared(self, limiter: ProviderLimiter) -> bool:
+        return self._redis is not None and (limiter.rpm is not None or limiter.tpm is not None)
+
+    def _redis_take(self, limiter: ProviderLimiter, tokens: int) -> Optional[float]:
+        """Atomic take on the shared buckets; the wait, or None if Redis failed.
+
+        Blocking network I/O: called from a worker thread, never under ``_lock``.
+        """
+        try:
+            keys, args = [], []
+            for suffix, bucket, amount in (("rpm", limiter.rpm, 1), ("tpm", limiter.tpm, tokens)):
+                if bucket is not None:
+                    keys.append(f"dh:llm_rate:{limiter.key}:{suffix}")
+                    args.extend([bucket.capacity, bucket.rate, amount])
+            return float(self._redis_script(keys=keys, args=args))
+        except Exception as exc:
+            logger.warning("[RateGov] Redis bucket failed (%s) — falling back to local buckets", exc)
+            self._redis = None
+            return None
+
+    def _redis_reconcile(self, limiter: ProviderLimiter, delta: int) -> None:
+        try:
+            self._redis_script(
+                keys=[f"dh:llm_rate:{limiter.key}:tpm"],
+                args=[limiter.tpm.capacity, limiter.tpm.rate, delta],
+            )
+        except Exception as exc:
+            logger.debug("[RateGov] TPM reconcile skipped: %s", exc)
+
+    def _bucket_wait_locked(self, limiter: ProviderLimiter, tokens: int, now: float) -> float:
+        """Take 1 request + ``tokens`` from the local buckets if both allow it; otherwise return the wait."""
+        wait = 0.0
+        if limiter.rpm is not None:
+            wait = max(wait, limiter.rpm.wait_time(1, now))
+        if limiter.tpm is not None:
+            wait = max(wait, limiter.tpm.wait_time(tokens, now))
+        if wait > 0:
+            return wait
+        if limiter.rpm is not None:
+            limiter.rpm.take(1, now)
+        if limiter.tpm is not None:
+            limiter.tpm.take(tokens, now)
+        return 0.0
+
+    def _head_ready_locked(self, limiter: ProviderLimiter, waiter: _Waiter) -> bool:
+        """``waiter`` is first in line, a concurrency slot is free and no shared take is in flight."""
+        if not limiter.queue or limiter.queue[0] is not waiter:
+            return False
+        if limiter.max_concurrency is not None and limiter.in_flight >= limiter.max_concurrency:
+            return False
+        return limiter.taking is None
+
+    def _grant_locked(self, limiter: ProviderLimiter, waiter: _Waiter, wait: float) -> Optional[float]:
+        """None when granted (buckets already charged), else how long to sleep before re-checking."""
+        if wait > 0:
+            if limiter.queue and limiter.queue[0] is not waiter:
+                limiter.queue[0].wake()
+            return min(wait, MAX_WAIT_SLICE)
+        limiter.queue.remove(waiter)
+        heapq.heapify(limiter.queue)
+        limiter.in_flight += 1
+        if limiter.queue:
+            limiter.queue[0].wake()
+        return None
+
+    def _remove_locked(self, limiter: ProviderLimiter, waiter: _Waiter) -> None:
+        if limiter.taking is waiter:
+            limiter.taking = None
+        try:
+            limiter.queue.remove(waiter)
+        except ValueError:
+            return
+        heapq.heapify(limiter.queue)
+        if limiter.queue:
+            limiter.queue[0].wake()
+
+    async def acquire(self, limiter: ProviderLimiter, tokens: int, priority: int = PRIORITY_WORKER) -> float:
+        """Wait for a slot; returns the queue wait in seconds. Raises QueueWaitExceeded."""
+        waiter = _Waiter(priority, next(self._seq), tokens, asyncio.get_running_loop(), asyncio.Event())
+        started = time.monotonic()
+        with self._lock:
+            heapq.heappush(limiter.queue, waiter)
+        try:
+            while True:
+                shared = False
+                with self._lock:
+                    waiter.event.clear()
+                    sleep_for = MAX_WAIT_SLICE
+                    if self._head_ready_locked(limiter, waiter):
+                        if self._shared(limiter):
+                            # Le take Redis se fait hors du verrou (I/O reseau) ; les
+                            # autres waiters attendent sa fin (limiter.taking).
+                            limiter.taking = waiter
+                            shared = True
+                        else:
+                            sleep_for = self._grant_locked(
+                                limiter, waiter, self._bucket_wait_locked(limiter, tokens, time.monotonic()))
+                if shared:
+                    wait = await asyncio.to_thread(self._redis_take, limiter, tokens)
+                    with self._lock:
+                        limiter.taking = None
+                        if wait is None:
+                            wait = self._bucket_wait_locked(limiter, tokens, time.monotonic())
+                        sleep_for = self._grant_locked(limiter, waiter, wait)
+                if sleep_for is None:
+                    waited = time.monotonic() - started
+                    with self._lock:
+                        limiter.record_wait(waited)
+                    return waited
+                remaining = self.max_queue_wait - (time.monotonic() - started)
+                if remaining <= 0:
+                    with self._lock:
+                        limiter.timeouts += 1
+                    raise QueueWaitExceeded(
+                        f"rate_limited: waited {self.max_queue_wait:.0f}s for a {limiter.key} slot"
+                    )
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), timeout=min(sleep_for, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._lock:
+                self._remove_locked(limiter, waiter)
+            raise
+
+    def release(self, limiter: ProviderLimiter, estimated_tokens: int, actual_tokens: Optional[int]) -> bool:
+        """Free the concurrency slot and reconcile the local TPM estimate with the real usage.
+
+        Returns True when the shared (Redis) TPM bucket still has to be
+        reconciled with ``_redis_reconcile`` (``slot`` does it off the loop).
+        """
+        with self._lock:
+            limiter.in_flight = max(0, limiter.in_flight - 1)
+            if actual_tokens is not None and limiter.tpm is not None and self._redis is None:
+                limiter.tpm.take(actual_tokens - estimated_tokens, time.monotonic())
+            if limiter.queue:
+                limiter.queue[0].wake()
+        return actual_tokens is not None and limiter.tpm is not None and self._redis is not None
+
+    def report_rate_limited(self, limiter: ProviderLimiter) -> None:
+        """Provider answered 429 anyway: drain part of the RPM bucket so the queue backs off."""
+        with self._lock:
+            limiter.rate_limited += 1
+            if limiter.rpm is not None and self._redis is None:
+                limiter.rpm.take(limiter.rpm.capacity * RATE_LIMIT_PENALTY, time.monotonic())
+
+    @asynccontextmanager
+    async def slot(self, provider_str: str, tokens: int, priority: int = PRIORITY_WORKER):
+        """``async with governor.slot(...) as ticket`` — set ``ticket["actual_tokens"]`` before exit."""
+        limiter = self.limiter_for(provider_str)
+        ticket: Dict[str, Any] = {"queue_wait_s": 0.0, "actual_tokens": None, "limiter": limiter}
+        if limiter is None:
+            yield ticket
+            return
+        ticket["queue_wait_s"] = await self.acquire(limiter, tokens, priority)
+        try:
+            yield ticket
+        finally:
+            if self.release(limiter, tokens, ticket["actual_tokens"]):
+                await asyncio.to_thread(self._redis_reconcile, limiter, ticket["actual_tokens"] - tokens)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "redis" if self._redis is not None else "local",
+                "providers": {key: limiter.stats() for key, limiter in self._limiters.items()},
+            }
+
+
+_governor: Optional[RateGovernor] = None
+_governor_config: Optional[Dict[str, Any]] = None
+_governor_lock = threading.Lock()
+
+
+def get_rate_governor(config: Optional[Dict[str, Any]]) -> Optional[RateGovernor]:
+    """Process-wide governor for ``config`` (rate_limits section); None when disabled.
+
+    Shared by every router instance in the process so the limits hold even
+    when tests or reload_config() build several routers.
+    """
+    global _governor, _governor_config
+    enabled = (config or {}).get("enabled")
+    if isinstance(enabled, str):
+        enabled = enabled.strip().lower() in ("1", "true", "yes", "on")
+    if not enabled:
+        return None
+    with _governor_lock:
+        if _governor is None or _governor_config != config:
+            _governor = RateGovernor(config)
+            _governor_config = config
+        return _governor
@@ -0,0 +1,144 @@
+"""
+LLM response cache (RESP-CACHE) — opt-in replay of byte-identical LLM calls.
+
+Targeted regenerations, resumes and retries resend the exact same
+(model, system prompt, prompt, temperature, max_tokens) tuple. When enabled
+in ``llm_routing.yaml`` (``response_cache`` section), LLMRouterService serves
+those from this SQLite store instead of paying the provider again.
+
+- Keys are a SHA-256 of the canonical request tuple (no raw prompt stored in the key).
+- Values are zlib-compressed JSON of the LLMResponse fields.
+- Size-bounded: once the payload total exceeds ``max_size_mb`` the least
+  recently used entries are evicted down to ``EVICT_TARGET_RATIO``.
+- WAL mode, so the API process and the ARQ worker can share one file.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE_MB = 256
+EVICT_TARGET_RATIO = 0.9     # evict down to 90 % of max size, not just below it
+
+
+def make_cache_key(
+    provider_str: str,
+    model_id: str,
+    system_prompt: Optional[str],
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+) -> str:
+    """Content hash of everything that determines the provider's answer."""
+    canonical = json.dumps(
+        [provider_str, model_id, system_prompt or "", prompt, round(float(temperature), 4), int(max_tokens)],
+        ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """SQLite-backed LRU store of LLM responses, bounded by payload size."""
+
+    def __init__(self, path: str, max_size_mb: float = DEFAULT_MAX_SIZE_MB, ttl_seconds: float = 0):
+        self.path = str(path)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_responses_last_access ON llm_responses(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE llm_responses SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        try:
+            return json.loads(zlib.decompress(row[0]))
+        except (zlib.error, ValueError) as exc:
+            logger.warning("[RespCache] Corrupted entry %s dropped: %s", key[:12], exc)
+            self.delete(key)
+            return None
+
+    def put(self, key: str, payload: Dict[str, Any]) -> None:
+        blob = zlib.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, value, size, created_at, last_access, hits)"
+                " VALUES (?, ?, ?, ?, ?, 0)",
+                (key, blob, len(blob), now, now),
+            )
+            self._evict_locked()
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _evict_locked(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * EVICT_TARGET_RATIO)
+        evicted = 0
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM llm_responses ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= target:
+                break
+            self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.info("[RespCache] Evicted %d entries (size now %.1f MB)", evicted, total / 1024 / 1024)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses"
+            ).fetchone()
+        return {"entries": count, "size_bytes": total, "max_bytes": self.max_bytes, "path": self.path}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -18,15 +18,27 @@ import os
 import time
 import asyncio
 import logging
+import threading
+import weakref
+import concurrent.futures
+import contextvars
 from enum import Enum
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 
 import yaml
 import httpx
 from app.config import settings
+from app.services.llm_rate_governor import (
+    PRIORITY_ORCHESTRATOR,
+    PRIORITY_WORKER,
+    QueueWaitExceeded,
+    estimate_tokens,
+    get_rate_governor,
+    is_rate_limit_error,
+)
 
 try:
     from anthropic import Anthropic, AsyncAnthropic
@@ -107,6 +119,11 @@ class LLMResponse:
 
 _CACHE_ELIGIBLE_AGENTS = frozenset({"marcus", "architect", "solution_architect"})
 
+# LOOP-001 : attente max d'un appelant synchrone. Au-dela du plus long budget
+# d'agent (Emma : 3600 s, experts SDS : 1200 s, continuations comprises) pour
+# ne couper que les appels reellement bloques.
+COMPLETE_SYNC_TIMEOUT_SECONDS = 7200
+
 
 def _should_cache_system(agent_type: Optional[str], subscription_tier: Optional[str]) -> bool:
     """Determine if Anthropic prompt caching should be auto-enabled for this call.
@@ -127,6 +144,152 @@ def _should_cache_system(agent_type: Optional[str], subscription_tier: Optional[
     return tier in ("pro", "team", "enterprise")
 
 
+class LLMCancelScope:
+    """
+    BUILD-OFFLOAD: cancels every ``complete_sync`` call made under it.
+
+    Blocking agent code runs in executor threads; when the asyncio task that
+    owns it is cancelled, ``cancel()`` cancels the in-flight LLM coroutine
+    (closing its stream) and makes later sync calls in the scope fail fast.
+    Bound to the calling thread's context via ``_llm_cancel_scope``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: "set[concurrent.futures.Future]" = set()
+        self.cancelled = False
+
+    def attach(self, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            if not self.cancelled:
+                self._futures.add(future)
+                return
+        future.cancel()
+
+    def detach(self, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            self._futures.discard(future)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            futures, self._futures = list(self._futures), set()
+        for future in futures:
+            future.cancel()
+
+
+_llm_cancel_scope: contextvars.ContextVar[Optional[LLMCancelScope]] = contextvars.ContextVar(
+    "llm_cancel_scope", default=None
+)
+
+
+def run_in_cancel_scope(scope: LLMCancelScope, fn, *args, **kwargs):
+    """Call ``fn`` with ``scope`` as the current LLM cancel scope (executor-thread entry point)."""
+    token = _llm_cancel_scope.set(scope)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _llm_cancel_scope.reset(token)
+
+
+class _BackgroundLoop:
+    """
+    LOOP-001: long-lived event loop running in a daemon thread.
+
+    Sync callers (agents run through ``asyncio.to_thread(agent.run, ...)``)
+    submit coroutines here instead of building a fresh loop with
+    ``asyncio.run()`` per call, so the async SDK clients and their HTTP
+    keep-alive / TLS sessions survive across calls. Re-created transparently
+    after a fork (ARQ workers) since the thread does not survive it.
+    """
+
+    def __init__(self, name: str = "llm-router-loop"):
+        self._name = name
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is not None and self._thread is not None and self._thread.is_alive():
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            thread = threading.Thread(target=_run, name=self._name, daemon=True)
+            thread.start()
+            ready.wait()
+            self._loop, self._thread = loop, thread
+            logger.info("LLM Router background loop started (%s)", self._name)
+            return loop
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        """The running background loop, if started."""
+        return self._loop if self._thread is not None and self._thread.is_alive() else None
+
+    def owns_current_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run ``coro`` on the background loop and block until it completes."""
+        if self.owns_current_thread():
+            coro.close()
+            raise RuntimeError("complete_sync() called from the router loop itself (would deadlock)")
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+        scope = _llm_cancel_scope.get()
+        if scope is not None:
+            scope.attach(future)
+        try:
+            return future.result(timeout=timeout)
+        except BaseException:
+            # Timeout or caller interrupted: cancel the coroutine so the
+            # underlying HTTP stream is closed instead of running on.
+            future.cancel()
+            raise
+        finally:
+            if scope is not None:
+                scope.detach(future)
+
+    def shutdown(self, timeout: float = 5.0):
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=timeout)
+        if not loop.is_running():
+            loop.close()
+
+
+async def _aclose_all(clients) -> None:
+    """Close pooled async clients (httpx ``aclose``, Anthropic / OpenAI SDK ``close``)."""
+    for client in list(clients):
+        close = getattr(client, "aclose", None) or getattr(client, "close", None)
+        if close is None:
+            continue
+        try:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logger.debug("LLM client close failed: %s", e)
+
+
+def _as_bool(value: Any) -> bool:
+    """YAML flag that may come from an env var expansion ("true", "1", …)."""
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
 class LLMRouterService:
     """
     Multi-profile LLM Router.
@@ -154,11 +317,25 @@ class LLMRouterService:
 
         self.providers: Dict[str, Any] = {}
         self.async_providers: Dict[str, Any] = {}
+        # LOOP-001: async clients are bound to the loop that first uses them;
+        # one set per loop (weak keys so dead loops release their clients).
+        self._loop_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._loop_clients_lock = threading.Lock()
+        self._sync_loop = _BackgroundLoop()
 
         self.usage_log: List[Dict[str, Any]] = []
         self.session_cost_usd: float = 0.0
 
+        # RESP-CACHE: opt-in replay of identical calls (response_cache section of the YAML)
+        self._response_cache = None
+        self.response_cache_stats: Dict[str, Any] = {
+            "hits": 0, "misses": 0, "saved_cost_usd": 0.0, "saved_tokens": 0,
+        }
+
         self._init_providers()
+        self._init_response_cache()
+        # RATE-GOV: process-wide RPM/TPM/concurrency governor (rate_limits section), None if disabled
+        self._governor = get_rate_governor(self.config.get("rate_limits"))
 
         logger.info(
             "LLM Router initialized : profile=%s, build_enabled=%s, config=%s",
@@ -229,7 +406,11 @@ class LLMRouterService:
         self._validate_profile()
         self.providers = {}
         self.async_providers = {}
+        with self._loop_clients_lock:
+            self._loop_clients = weakref.WeakKeyDictionary()
         self._init_providers()
+        self._init_response_cache()
+        self._governor = get_rate_governor(self.config.get("rate_limits"))
 
     # ----------------------------------------------------------------------
     # Provider initialization
@@ -312,6 +493,7 @@ class LLMRouterService:
                 self.async_providers["anthropic"] = {
                     "type": ProviderType.ANTHROPIC,
                     "client": AsyncAnthropic(api_key=api_key, timeout=float(timeout), **extra),
+                    "factory": lambda: AsyncAnthropic(api_key=api_key, timeout=float(timeout), **extra),
                     "models": providers_config["anthropic"].get("models", {}),
                 }
                 logger.info("Anthropic provider initialized")
@@ -342,16 +524,136 @@ class LLMRouterService:
                 self.async_providers["openai"] = {
                     "type": ProviderType.OPENAI,
                     "client": AsyncOpenAI(api_key=api_key),
+                    "factory": lambda: AsyncOpenAI(api_key=api_key),
                     "models": providers_config["openai"].get("models", {}),
                 }
                 logger.info("OpenAI provider initialized")
             else:
                 logger.warning("%s not set, OpenAI disabled", api_key_env)
 
+    # ----------------------------------------------------------------------
+    # Per-loop pooled clients (LOOP-001)
+    # ----------------------------------------------------------------------
+
+    def _loop_client(self, key: Any, factory):
+        """Return the client cached for the running loop under ``key``, creating it once."""
+        loop = asyncio.get_running_loop()
+        with self._loop_clients_lock:
+            clients = self._loop_clients.get(loop)
+            if clients is None:
+                clients = self._loop_clients[loop] = {}
+            client = clients.get(key)
+            if client is None:
+                client = clients[key] = factory()
+            return client
+
+    def _get_async_client(self, provider_name: str):
+        """Async SDK client for ``provider_name`` usable on the running loop.
+
+        The client built at init goes to the first loop that asks for it;
+        other loops (e.g. the sync bridge loop) get their own instance so a
+        connection pool is never shared across loops.
+        """
+        entry = self.async_providers.get(provider_name) or {}
+        if not entry.get("client"):
+            return None
+
+        def _factory():
+            if not entry.get("_claimed"):
+                entry["_claimed"] = True
+                return entry["client"]
+            return entry["factory"]() if entry.get("factory") else entry["client"]
+
+        return self._loop_client(provider_name, _factory)
+
+    def _get_http_client(self, timeout: float) -> httpx.AsyncClient:
+        """Keep-alive httpx client for the running loop (Ollama / llama.cpp endpoints)."""
+        return self._loop_client(("httpx", float(timeout)), lambda: httpx.AsyncClient(timeout=timeout))
+
     # ----------------------------------------------------------------------
     # Public accessors
     # ----------------------------------------------------------------------
 
+    # ----------------------------------------------------------------------
+    # Response cache (RESP-CACHE)
+    # ----------------------------------------------------------------------
+
+    def _response_cache_config(self) -> Dict[str, Any]:
+        return self.config.get("response_cache") or {}
+
+    def _init_response_cache(self):
+        """Open the SQLite response cache if ``response_cache.enabled`` is set in the YAML."""
+        if self._response_cache is not None:
+            self._response_cache.close()
+            self._response_cache = None
+        cfg = self._response_cache_config()
+        if not _as_bool(cfg.get("enabled")):
+            return
+        path = Path(cfg.get("path") or "data/llm_response_cache.sqlite")
+        if not path.is_absolute():
+            path = Path(settings.BACKEND_ROOT) / path
+        try:
+            from app.services.llm_response_cache import DEFAULT_MAX_SIZE_MB, LLMResponseCache
+            self._response_cache = LLMResponseCache(
+                str(path),
+                max_size_mb=float(cfg.get("max_size_mb") or DEFAULT_MAX_SIZE_MB),
+                ttl_seconds=float(cfg.get("ttl_seconds") or 0),
+            )
+            logger.info("LLM response cache enabled at %s", path)
+        except Exception as exc:
+            logger.error("LLM response cache unavailable (%s) — calls go to providers", exc)
+
+    def _response_cache_key(self, request: LLMRequest, provider_str: str) -> Optional[str]:
+        """Cache key for ``request`` if caching applies to its profile/agent, else None.
+
+        ``response_cache.agents.<agent>`` overrides ``response_cache.profiles.<profile>``.
+        """
+        if self._response_cache is None:
+            return None
+        cfg = self._response_cache_config()
+        enabled = _as_bool((cfg.get("profiles") or {}).get(self.profile))
+        agent = (request.agent_type or "").lower().replace("-", "_").replace(" ", "_")
+        agent_flags = cfg.get("agents") or {}
+        if agent in agent_flags:
+            enabled = _as_bool(agent_flags[agent])
+        if not enabled:
+            return None
+        from app.services.llm_response_cache import make_cache_key
+        return make_cache_key(
+            provider_str, self._get_model_id(provider_str), request.system_prompt,
+            request.prompt, request.temperature, request.max_tokens,
+        )
+
+    def _response_from_cache(self, payload: Dict[str, Any], started: float) -> LLMResponse:
+        """Rebuild a cached LLMResponse; replays cost nothing (original usage kept in metadata)."""
+        metadata = dict(payload.get("metadata") or {})
+        metadata.update({
+            "response_cache": "hit",
+            "saved_cost_usd": payload.get("cost_usd", 0.0),
+            "cached_tokens_in": payload.get("tokens_in", 0),
+            "cached_tokens_out": payload.get("tokens_out", 0),
+        })
+        return LLMResponse(
+            content=payload["content"], provider=payload["provider"], model_id=payload["model_id"],
+            tokens_in=0, tokens_out=0, cost_usd=0.0,
+            latency_ms=int((time.perf_counter() - started) * 1000),
+            success=True, stop_reason=payload.get("stop_reason"),
+            continuations=payload.get("continuations", 0), metadata=metadata,
+        )
+
+    @staticmethod
+    def _response_to_cache(response: LLMResponse) -> Dict[str, Any]:
+        return {
+            "content": response.content,
+            "provider": response.provider,
+            "model_id": response.model_id,
+            "tokens_in": response.tokens_in,
+            "tokens_out": response.tokens_out,
+            "cost_usd": response.cost_usd,
+            "stop_reason": response.stop_reason,
+            "continuations": response.continuations,
+        }
+
     def get_active_profile(self) -> str:
         return self.profile
 
@@ -373,15 +675,8 @@ class LLMRouterService:
     # Routing
     # ----------------------------------------------------------------------
 
-    def _select_provider(self, request: LLMRequest) -> str:
-        """
-        Select provider/model for a request based on the active profile.
-
-        Returns e.g. "anthropic/claude-opus" or "local/mixtral".
-        """
-        if request.force_provider:
-            return request.force_provider
-
+    def _tier_for_request(self, request: LLMRequest) -> AgentTier:
+        """Tier from agent_type, else from the legacy TaskComplexity; WORKER by default."""
         tier = AgentTier.WORKER
         if request.agent_type:
             tier = self.get_tier_for_agent(request.agent_type)
@@ -393,6 +688,18 @@ class LLMRouterService:
                     tier = AgentTier.ORCHESTRATOR
             except Exception:
                 pass
+        return tier
+
+    def _select_provider(self, request: LLMRequest) -> str:
+        """
+        Select provider/model for a request based on the active profile.
+
+        Returns e.g. "anthropic/claude-opus" or "local/mixtral".
+        """
+        if request.force_provider:
+            return request.force_provider
+
+        tier = self._tier_for_request(request)
 
         profile_cfg = self.config["profiles"][self.profile]
         provider = profile_cfg.get(tier.value)
@@ -475,10 +782,10 @@ class LLMRouterService:
             payload["system"] = request.system_prompt
 
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                resp = await client.post(f"{base_url}/api/generate", json=payload)
-                resp.raise_for_status()
-                data = resp.json()
+            client = self._get_http_client(timeout)
+            resp = await client.post(f"{base_url}/api/generate", json=payload)
+            resp.raise_for_status()
+            data = resp.json()
 
             content = data.get("response", "")
             tokens_out = data.get("eval_count", len(content) // 4)
@@ -568,16 +875,17 @@ class LLMRouterService:
         debut = time.time()
         try:
             # httpx plutot qu'aiohttp : deja utilise par _call_ollama, pas de
-            # dependance nouvelle a installer.
-            async with httpx.AsyncClient(timeout=cfg.get("timeout", 600)) as client:
-                r = await client.post(f"{base}/chat/completions", json=charge)
-                if r.status_code != 200:
-                    return LLMResponse(content="", provider=provider_name, model_id=model,
-                                       tokens_in=0, tokens_out=0, cost_usd=0.0,
-                                       latency_ms=int((time.time()-debut)*1000),
-                                       success=False,
-                                       error=f"HTTP {r.status_code} : {r.text[:200]}")
-                d = r.json()
+            # dependance nouvelle a installer. LOOP-001 : client partage par
+            # boucle, les connexions keep-alive survivent entre les appels.
+            client = self._get_http_client(cfg.get("timeout", 600))
+            r = await client.post(f"{base}/chat/completions", json=charge)
+            if r.status_code != 200:
+                return LLMResponse(content="", provider=provider_name, model_id=model,
+                                   tokens_in=0, tokens_out=0, cost_usd=0.0,
+                                   latency_ms=int((time.time()-debut)*1000),
+                                   success=False,
+                                   error=f"HTTP {r.status_code} : {r.text[:200]}")
+            d = r.json()
 
             msg = (d.get("choices") or [{}])[0].get("message", {})
             contenu = msg.get("content") or ""
@@ -608,7 +916,7 @@ class LLMRouterService:
         """Call Anthropic Claude API with automatic continuation on max_tokens (CRIT-02 port)."""
         start_time = time.time()
 
-        async_client = self.async_providers.get("anthropic", {}).get("client")
+        async_client = self._get_async_client("anthropic")
         if not async_client:
             return LLMResponse(
                 content="", provider=provider_str, model_id=model_id,
@@ -730,7 +1038,7 @@ class LLMRouterService:
 
     async def _call_openai(self, request: LLMRequest, model_id: str, provider_str: str) -> LLMResponse:
         start_time = time.time()
-        async_client = self.async_providers.get("openai", {}).get("client")
+        async_client = self._get_async_client("openai")
         if not async_client:
             return LLMResponse(
                 content="", provider=provider_str, model_id=model_id,
@@ -780,35 +1088,65 @@ class LLMRouterService:
         )
 
         # Phase 3.1 : credit pre-flight (no-op if request.user_id is None).
-        preflight_error = self._credit_preflight(request, provider_str)
+        # Before the cache lookup: a replayed answer must pass the same tier /
+        # credit / suspension checks as a fresh call.
+        reservation, preflight_error = self._credit_preflight(request, provider_str)
         if preflight_error is not None:
             return preflight_error
 
-        response = await self._call_provider(request, provider_str)
+        # RESP-CACHE: identical call already answered → replay, no charge, no provider call.
+        cache_key = self._response_cache_key(request, provider_str)
+        if cache_key is not None:
+            started = time.perf_counter()
+            try:
+                cached = await asyncio.to_thread(self._response_cache.get, cache_key)
+            except BaseException:
+                self._credit_release(reservation)
+                raise
+            if cached is not None:
+                self._credit_release(reservation)
+                response = self._response_from_cache(cached, started)
+                self._track_usage(request, response, cache="hit")
+                return response
 
-        # Fallback chain scoped to profile
-        if not response.success:
-            fallback = self._fallback_for(provider_str)
-            if fallback and fallback != provider_str:
-                logger.warning("Falling back from %s to %s (profile=%s)", provider_str, fallback, self.profile)
-                # Re-check credits for the fallback model in case it changes tier.
-                preflight_error = self._credit_preflight(request, fallback)
-                if preflight_error is not None:
-                    return preflight_error
-                response = await self._call_provider(request, fallback)
-            elif fallback == provider_str:
-                logger.info("No-op fallback for %s in profile %s", provider_str, self.profile)
-            else:
-                logger.warning(
-                    "No fallback configured for %s in profile %s — error surfaced as-is",
-                    provider_str, self.profile,
-                )
+        try:
+            response = await self._governed_call(request, provider_str)
+            # Only the selected model's own answers are cached, never a fallback's.
+            cacheable = cache_key is not None and response.success
+
+            # Fallback chain scoped to profile
+            if not response.success:
+                fallback = self._fallback_for(provider_str)
+                if fallback and fallback != provider_str:
+                    logger.warning("Falling back from %s to %s (profile=%s)", provider_str, fallback, self.profile)
+                    # Re-check credits for the fallback model in case it changes tier.
+                    self._credit_release(reservation)
+                    reservation, preflight_error = self._credit_preflight(request, fallback)
+                    if preflight_error is not None:
+                        return preflight_error
+                    response = await self._governed_call(request, fallback)
+                elif fallback == provider_str:
+                    logger.info("No-op fallback for %s in profile %s", provider_str, self.profile)
+                else:
+                    logger.warning(
+                        "No fallback configured for %s in profile %s — error surfaced as-is",
+                        provider_str, self.profile,
+                    )
+        except BaseException:
+            # Cancelled / crashed call: nothing to charge, give the reservation back.
+            self._credit_release(reservation)
+            raise
 
-        # Phase 3.1 : debit credits ONLY on success (failures cost nothing).
-        if response.success:
-            self._credit_post_charge(request, response)
+        # Phase 3.1 : debit credits ONLY on success (failures cost nothing, reservation released).
+        self._credit_post_charge(request, response, reservation)
 
-        self._track_usage(request, response)
+        if cacheable:
+            try:
+                await asyncio.to_thread(self._response_cache.put, cache_key, self._response_to_cache(response))
+            except Exception as exc:
+                logger.warning("LLM response cache write failed: %s", exc)
+
+        self._track_usage(request, response, cache="miss" if cache_key is not None else None)
         return response
 
     # ------------------------------------------------------------------
@@ -817,41 +1155,43 @@ class LLMRouterService:
 
     def _credit_preflight(
         self, request: LLMRequest, provider_str: str
-    ) -> Optional[LLMResponse]:
+    ) -> Tuple[Optional[Any], Optional[LLMResponse]]:
         """
-        Run credit pre-flight for ``request``. Returns an error LLMResponse
-        if the user cannot afford or is not authorized for the model, ``None``
-        otherwise. No-op when ``request.user_id`` is None.
+        Run credit pre-flight for ``request``. Returns ``(reservation, error)``:
+        an error LLMResponse if the user cannot afford or is not authorized for
+        the model, otherwise the credit reservation to settle after the call.
+        No-op when ``request.user_id`` is None.
+
+        COST-LEDGER: served from the in-memory cost ledger (no DB round trip
+        once the user's balance is cached); the estimate is held until
+        _credit_post_charge / _credit_release.
         """
         if request.user_id is None:
-            return None
+            return None, None
         try:
-            from app.database import SessionLocal
+            from app.services.cost_ledger import get_cost_ledger
             from app.services.credit_service import (
                 CreditError,
-                CreditService,
                 InsufficientCreditsError,
                 ModelNotAllowedError,
             )
         except Exception as exc:
             logger.error("Credit module unavailable, skipping pre-flight: %s", exc)
-            return None
+            return None, None
 
         model_id = self._get_model_id(provider_str)
-        db = SessionLocal()
         try:
-            service = CreditService(db)
-            service.preflight(request.user_id, model_id, request.max_tokens)
+            return get_cost_ledger().reserve(request.user_id, model_id, request.max_tokens), None
         except ModelNotAllowedError as exc:
             logger.warning("Credit pre-flight blocked: %s", exc)
-            return LLMResponse(
+            return None, LLMResponse(
                 content="", provider=provider_str, model_id=model_id,
                 tokens_in=0, tokens_out=0, cost_usd=0.0, latency_ms=0,
                 success=False, error=f"model_not_allowed: {exc}",
             )
         except InsufficientCreditsError as exc:
             logger.warning("Credit pre-flight blocked: %s", exc)
-            return LLMResponse(
+            return None, LLMResponse(
                 content="", provider=provider_str, model_id=model_id,
                 tokens_in=0, tokens_out=0, cost_usd=0.0, latency_ms=0,
                 success=False, error=f"insufficient_credits: {exc}",
@@ -860,29 +1200,21 @@ class LLMRouterService:
             logger.error("Credit pre-flight error (skipping): %s", exc)
         except Exception as exc:  # pragma: no cover — defensive
             logger.error("Unexpected credit pre-flight failure: %s", exc, exc_info=True)
-        finally:
-            db.close()
-        return None
+        return None, None
 
     def _credit_post_charge(
-        self, request: LLMRequest, response: LLMResponse
+        self, request: LLMRequest, response: LLMResponse, reservation: Optional[Any] = None
     ) -> None:
-        """Debit credits after a successful LLM call. Errors are logged, never raised."""
-        if request.user_id is None:
+        """Debit credits after a successful LLM call (queued in the cost ledger). Errors are logged, never raised."""
+        if request.user_id is None or reservation is None:
             return
         if not response.success:
+            self._credit_release(reservation)
             return
         try:
-            from app.database import SessionLocal
-            from app.services.credit_service import CreditService
-        except Exception as exc:
-            logger.error("Credit module unavailable, skipping post-charge: %s", exc)
-            return
-
-        db = SessionLocal()
-        try:
-            CreditService(db).charge(
-                user_id=request.user_id,
+            from app.services.cost_ledger import get_cost_ledger
+            get_cost_ledger().settle(
+                reservation,
                 model=response.model_id or response.provider,
                 tokens_in=response.tokens_in or 0,
                 tokens_out=response.tokens_out or 0,
@@ -895,8 +1227,43 @@ class LLMRouterService:
                 "Credit post-charge failed for user=%s model=%s: %s",
                 request.user_id, response.model_id, exc,
             )
-        finally:
-            db.close()
+
+    def _credit_release(self, reservation: Optional[Any]) -> None:
+        """Give back a pre-flight reservation (failed call, fallback switch)."""
+        if reservation is None:
+            return
+        try:
+            from app.services.cost_ledger import get_cost_ledger
+            get_cost_ledger().release(reservation)
+        except Exception as exc:
+            logger.error("Credit reservation release failed: %s", exc)
+
+    async def _governed_call(self, request: LLMRequest, provider_str: str) -> LLMResponse:
+        """RATE-GOV: take a provider slot (RPM/TPM/concurrency, tier priority) around _call_provider."""
+        if self._governor is None:
+            return await self._call_provider(request, provider_str)
+
+        estimated = estimate_tokens(request.prompt, request.system_prompt, request.max_tokens)
+        priority = (
+            PRIORITY_ORCHESTRATOR if self._tier_for_request(request) == AgentTier.ORCHESTRATOR
+            else PRIORITY_WORKER
+        )
+        try:
+            async with self._governor.slot(provider_str, estimated, priority) as ticket:
+                response = await self._call_provider(request, provider_str)
+                ticket["actual_tokens"] = (response.tokens_in or 0) + (response.tokens_out or 0)
+        except QueueWaitExceeded as exc:
+            logger.error("%s (agent=%s)", exc, request.agent_type)
+            return LLMResponse(
+                content="", provider=provider_str, model_id=self._get_model_id(provider_str),
+                tokens_in=0, tokens_out=0, cost_usd=0.0, latency_ms=0,
+                success=False, error=str(exc),
+            )
+
+        response.metadata["queue_wait_ms"] = int(ticket["queue_wait_s"] * 1000)
+        if not response.success and ticket["limiter"] is not None and is_rate_limit_error(response.error):
+            self._governor.report_rate_limited(ticket["limiter"])
+        return response
 
     async def _call_provider(self, request: LLMRequest, provider_str: str) -> LLMResponse:
         provider_name, model_name = provider_str.split("/", 1)
@@ -919,7 +1286,18 @@ class LLMRouterService:
             success=False, error=f"Unknown provider: {provider_name}",
         )
 
-    def _track_usage(self, request: LLMRequest, response: LLMResponse):
+    def _track_usage(self, request: LLMRequest, response: LLMResponse, cache: Optional[str] = None):
+        """Record a call. ``cache`` is "hit" / "miss" when the response cache applied, else None."""
+        saved_cost = 0.0
+        if cache == "hit":
+            saved_cost = response.metadata.get("saved_cost_usd", 0.0)
+            self.response_cache_stats["hits"] += 1
+            self.response_cache_stats["saved_cost_usd"] += saved_cost
+            self.response_cache_stats["saved_tokens"] += (
+                response.metadata.get("cached_tokens_in", 0) + response.metadata.get("cached_tokens_out", 0)
+            )
+        elif cache == "miss":
+            self.response_cache_stats["misses"] += 1
         self.session_cost_usd += response.cost_usd
         self.usage_log.append({
             "timestamp": datetime.now().isoformat(),
@@ -933,6 +1311,9 @@ class LLMRouterService:
             "success": response.success,
             "project_id": request.project_id,
             "execution_id": request.execution_id,
+            "cache": cache,
+            "saved_cost_usd": saved_cost,
+            "queue_wait_ms": response.metadata.get("queue_wait_ms", 0),
         })
         if response.cost_usd > 0:
             logger.info(
@@ -941,8 +1322,13 @@ class LLMRouterService:
             )
 
     def get_session_stats(self) -> Dict[str, Any]:
+        cache_stats = dict(self.response_cache_stats, saved_cost_usd=round(self.response_cache_stats["saved_cost_usd"], 4))
+        governor_stats = self._governor.get_stats() if self._governor is not None else None
         if not self.usage_log:
-            return {"total_requests": 0, "total_cost_usd": 0.0, "by_provider": {}}
+            return {
+                "total_requests": 0, "total_cost_usd": 0.0, "by_provider": {},
+                "response_cache": cache_stats, "rate_governor": governor_stats,
+            }
         by_provider: Dict[str, Dict] = {}
         for entry in self.usage_log:
             p = entry["provider"]
@@ -955,6 +1341,8 @@ class LLMRouterService:
             "total_requests": len(self.usage_log),
             "total_cost_usd": round(self.session_cost_usd, 4),
             "by_provider": by_provider,
+            "response_cache": cache_stats,
+            "rate_governor": governor_stats,
         }
 
     def get_available_providers(self) -> Dict[str, bool]:
@@ -968,19 +1356,56 @@ class LLMRouterService:
     # Sync + legacy wrappers
     # ----------------------------------------------------------------------
 
-    def complete_sync(self, request: LLMRequest) -> LLMResponse:
-        """Sync wrapper for complete() — handles being inside an async context."""
+    def complete_sync(self, request: LLMRequest,
+                      timeout: Optional[float] = COMPLETE_SYNC_TIMEOUT_SECONDS) -> LLMResponse:
+        """Sync wrapper for complete() — safe from worker threads and from inside an async context.
+
+        LOOP-001: runs on the router's persistent background loop instead of a
+        fresh ``asyncio.run()`` per call, so pooled connections are reused.
+        On ``timeout`` the in-flight call (and its LLM stream) is cancelled,
+        as it is when the caller's ``LLMCancelScope`` is cancelled. The default
+        ``COMPLETE_SYNC_TIMEOUT_SECONDS`` outlasts every agent budget; callers
+        with a tighter one pass ``timeout`` explicitly (``None``: no limit).
+        """
         try:
-            loop = asyncio.get_running_loop()
-        except RuntimeError:
-            loop = None
+            return self._sync_loop.run(self.complete(request), timeout=timeout)
+        except concurrent.futures.CancelledError:
+            # BUILD-OFFLOAD: the owning build task was cancelled (LLMCancelScope).
+            logger.info("complete_sync cancelled (agent=%s)", request.agent_type)
+            return LLMResponse(
+                content="", provider="", model_id="",
+                tokens_in=0, tokens_out=0, cost_usd=0.0, latency_ms=0,
+                success=False, error="Cancelled",
+            )
+        except concurrent.futures.TimeoutError:
+            logger.error("complete_sync timed out after %ss (agent=%s)", timeout, request.agent_type)
+            return LLMResponse(
+                content="", provider="", model_id="",
+                tokens_in=0, tokens_out=0, cost_usd=0.0, latency_ms=int((timeout or 0) * 1000),
+                success=False, error=f"Timeout ({timeout}s)",
+            )
 
-        if loop is not None and loop.is_running():
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
-                future = pool.submit(asyncio.run, self.complete(request))
-                return future.result(timeout=600)
-        return asyncio.run(self.complete(request))
+    async def aclose_clients(self):
+        """Close the pooled clients of the running loop (app shutdown, before the loop stops)."""
+        with self._loop_clients_lock:
+            clients = self._loop_clients.pop(asyncio.get_running_loop(), {})
+        await _aclose_all(clients.values())
+
+    def shutdown(self):
+        """Close the bridge loop's clients, stop it and close the response cache (tests / process shutdown)."""
+        loop = self._sync_loop.loop
+        if loop is not None:
+            with self._loop_clients_lock:
+                clients = self._loop_clients.pop(loop, {})
+            if clients:
+                try:
+                    self._sync_loop.run(_aclose_all(clients.values()), timeout=5)
+                except Exception as e:
+                    logger.warning("LLM client close failed: %s", e)
+        self._sync_loop.shutdown()
+        if self._response_cache is not None:
+            self._response_cache.close()
+            self._response_cache = None
 
     def generate(
         self,
@@ -1066,6 +1491,8 @@ def get_llm_router() -> LLMRouterService:
 def reset_llm_router():
     """Reset the singleton — used by tests to switch profile via env var."""
     global _router_instance
+    if _router_instance is not None:
+        _router_instance.shutdown()
     _router_instance = None
 
 
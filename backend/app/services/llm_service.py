@@ -168,10 +168,12 @@ def _strip_legacy_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
     Remove kwargs that the router doesn't accept but legacy callers still pass.
 
     `model`, `model_override`, `provider` are ignored : the router decides the
-    model/provider based on `agent_type` + active profile (YAML).
+    model/provider based on `agent_type` + active profile (YAML). `db` is
+    dropped too : budget accounting goes through the cost ledger, which uses
+    its own sessions (COST-LEDGER).
     """
     out = dict(kwargs)
-    for k in ("model", "model_override", "provider"):
+    for k in ("model", "model_override", "provider", "db"):
         out.pop(k, None)
     return out
 
@@ -185,25 +187,17 @@ def generate_llm_response(
     """
     Sync LLM call. Delegates to LLMRouterService.generate().
 
-    `execution_id` in kwargs triggers budget tracking via BudgetService.
-    `project_id` is passed through for cost reporting.
+    `execution_id` in kwargs triggers budget tracking via the cost ledger
+    (COST-LEDGER: in-memory check, batched asynchronous write — no DB session
+    per call). `project_id` is passed through for cost reporting.
     """
+    from app.services.cost_ledger import get_cost_ledger
     from app.services.llm_router_service import get_llm_router
 
     router = get_llm_router()
     clean_kwargs = _strip_legacy_kwargs(kwargs)
-
-    # Auto-create DB session for budget tracking if execution_id provided
     execution_id = clean_kwargs.get("execution_id")
-    db_session = clean_kwargs.get("db")
-    auto_created_db = False
-    if execution_id and not db_session:
-        try:
-            from app.database import SessionLocal
-            db_session = SessionLocal()
-            auto_created_db = True
-        except Exception:
-            db_session = None
+    ledger = get_cost_ledger() if execution_id else None
 
     _log_llm_debug("llm_request", {
         "agent_type": agent_type,
@@ -222,61 +216,50 @@ def generate_llm_response(
             clean_kwargs["subscription_tier"] = resolved_tier
             logger.debug("Resolved tier=%s for execution=%s", resolved_tier, execution_id)
 
-    try:
-        # Garde budgetaire AVANT l'appel — arret dur (mod37, P1.1)
-        if execution_id and db_session:
-            from app.services.budget_service import BudgetService
-            BudgetService(db_session).check_budget(execution_id)
-
-        # FEAT-LANG-001 : directive de langue projet
-        system_prompt = _apply_language_directive(system_prompt, execution_id)
-
-        # GATE-0BIS : directive etat plateforme Salesforce (GUIDELINE_RAG_VEILLE_SF §3.2)
-        from app.services.platform_state import apply_platform_state
-        system_prompt = apply_platform_state(system_prompt, agent_type)
-
-        response = router.generate(
-            prompt=prompt,
-            agent_type=agent_type,
-            system_prompt=system_prompt,
-            max_tokens=clean_kwargs.pop("max_tokens", 16000),
-            temperature=clean_kwargs.pop("temperature", 0.7),
-            **{k: v for k, v in clean_kwargs.items() if k in ("project_id", "execution_id", "user_id", "subscription_tier", "cache_system")},
-        )
-
-        # Budget tracking post-call
-        if execution_id and db_session and response.get("success"):
-            try:
-                from app.services.budget_service import BudgetService
-                budget = BudgetService(db_session)
-                cost = budget.record_cost(
-                    execution_id,
-                    response.get("model") or response.get("provider", ""),
-                    response.get("input_tokens", 0),
-                    response.get("output_tokens", 0),
-                )
-                db_session.commit()
-                logger.info("[Budget] +$%.4f (execution %d)", cost, execution_id)
-            except Exception as e:
-                logger.warning("Budget recording failed (non-blocking): %s", e)
-
-        _log_llm_debug("llm_response", {
-            "provider": response.get("provider"),
-            "model": response.get("model"),
-            "input_tokens": response.get("input_tokens"),
-            "output_tokens": response.get("output_tokens"),
-            "response_length": len(response.get("content", "")),
-            "response_preview": (response.get("content", "") or "")[:1000],
-            "stop_reason": response.get("stop_reason"),
-            "continuations": response.get("continuations", 0),
-        })
-        return response
-    finally:
-        if auto_created_db and db_session:
-            try:
-                db_session.close()
-            except Exception:
-                pass
+    # Garde budgetaire AVANT l'appel — arret dur (mod37, P1.1)
+    if ledger is not None:
+        ledger.check_budget(execution_id)
+
+    # FEAT-LANG-001 : directive de langue projet
+    system_prompt = _apply_language_directive(system_prompt, execution_id)
+
+    # GATE-0BIS : directive etat plateforme Salesforce (GUIDELINE_RAG_VEILLE_SF §3.2)
+    from app.services.platform_state import apply_platform_state
+    system_prompt = apply_platform_state(system_prompt, agent_type)
+
+    response = router.generate(
+        prompt=prompt,
+        agent_type=agent_type,
+        system_prompt=system_prompt,
+        max_tokens=clean_kwargs.pop("max_tokens", 16000),
+        temperature=clean_kwargs.pop("temperature", 0.7),
+        **{k: v for k, v in clean_kwargs.items() if k in ("project_id", "execution_id", "user_id", "subscription_tier", "cache_system")},
+    )
+
+    # Budget tracking post-call (queued, flushed by the cost ledger writer)
+    if ledger is not None and response.get("success"):
+        try:
+            cost = ledger.record_llm_cost(
+                execution_id,
+                response.get("model") or response.get("provider", ""),
+                response.get("input_tokens", 0),
+                response.get("output_tokens", 0),
+            )
+            logger.info("[Budget] +$%.4f (execution %d)", cost, execution_id)
+        except Exception as e:
+            logger.warning("Budget recording failed (non-blocking): %s", e)
+
+    _log_llm_debug("llm_response", {
+        "provider": response.get("provider"),
+        "model": response.get("model"),
+        "input_tokens": response.get("input_tokens"),
+        "output_tokens": response.get("output_tokens"),
+        "response_length": len(response.get("content", "")),
+        "response_preview": (response.get("content", "") or "")[:1000],
+        "stop_reason": response.get("stop_reason"),
+        "continuations": response.get("continuations", 0),
+    })
+    return response
 
 
 async def generate_llm_response_async(
@@ -3,9 +3,9 @@ Markdown to DOCX Converter - Enhanced with Mermaid Image Support
 Converts Emma's SDS markdown to professional DOCX format.
 """
 
+import io
 import os
 import re
-import subprocess
 import tempfile
 from datetime import datetime
 from typing import Optional, List
@@ -21,12 +21,8 @@ try:
 except ImportError:
     DOCX_AVAILABLE = False
 
-PUPPETEER_CONFIG = "/tmp/puppeteer-config.json"
-
-def _ensure_puppeteer_config():
-    if not os.path.exists(PUPPETEER_CONFIG):
-        with open(PUPPETEER_CONFIG, 'w') as f:
-            f.write('{"args": ["--no-sandbox", "--disable-setuid-sandbox"]}')
+from app.services.mermaid_renderer import extract_mermaid_blocks, get_mermaid_renderer
+from app.services.mermaid_renderer import PUPPETEER_CONFIG, fix_mermaid_syntax as _fix_mermaid_syntax  # noqa: F401  (anciens noms)
 
 COLORS = {"primary": "003366", "secondary": "006699", "accent": "0099CC", "alt_row": "F5F5F5"}
 FONT_COLORS = {
@@ -37,60 +33,13 @@ FONT_COLORS = {
 
 
 def convert_mermaid_to_image(mermaid_code: str, output_dir: str = "/tmp") -> Optional[str]:
-    """Convert Mermaid diagram to PNG using mmdc."""
-    _ensure_puppeteer_config()
-    try:
-        fixed_code = _fix_mermaid_syntax(mermaid_code)
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.mmd', delete=False) as f:
-            f.write(fixed_code)
-            mmd_path = f.name
-        
-        png_path = os.path.join(output_dir, f"diagram_{os.path.basename(mmd_path).replace('.mmd', '')}.png")
-        result = subprocess.run(
-            ['mmdc', '-i', mmd_path, '-o', png_path, '-b', 'white', '-w', '800', '-p', PUPPETEER_CONFIG],
-            capture_output=True, timeout=60
-        )
-        os.unlink(mmd_path)
-        
-        if result.returncode == 0 and os.path.exists(png_path):
-            return png_path
-        print(f"⚠️ Mermaid conversion failed: {(result.stderr or result.stdout).decode()[:200]}")
+    """Convert Mermaid diagram to a PNG file (rendered once per content, see mermaid_renderer)."""
+    png = get_mermaid_renderer().render(mermaid_code)
+    if not png:
         return None
-    except Exception as e:
-        print(f"⚠️ Mermaid error: {e}")
-        return None
-
-
-def _fix_mermaid_syntax(code: str) -> str:
-    """Fix erDiagram syntax for newer mermaid versions."""
-    lines = code.split('\n')
-    fixed_lines = []
-    in_entity = False
-    
-    for line in lines:
-        stripped = line.strip()
-        if re.match(r'^\w+\s*\{', stripped):
-            in_entity = True
-            fixed_lines.append(line)
-            continue
-        if stripped == '}':
-            in_entity = False
-            fixed_lines.append(line)
-            continue
-        
-        if in_entity and stripped and not stripped.startswith('%%'):
-            # Convert "FieldName Type" to "type FieldName"
-            field_match = re.match(r'^(\w+)\s+(\w+)(?:\s+(.*))?$', stripped)
-            if field_match:
-                field_name, field_type, extra = field_match.groups()
-                type_map = {'PK': 'string', 'FK': 'string', 'string': 'string', 'text': 'string',
-                           'number': 'decimal', 'decimal': 'decimal', 'boolean': 'boolean', 'date': 'date'}
-                if field_type.upper() in ['PK', 'FK'] or field_type.lower() in type_map:
-                    mapped_type = type_map.get(field_type.upper(), type_map.get(field_type.lower(), 'string'))
-                    fixed_lines.append(f"        {mapped_type} {field_name}" + (f" {extra}" if extra else ""))
-                    continue
-        fixed_lines.append(line)
-    return '\n'.join(fixed_lines)
+    with tempfile.NamedTemporaryFile(mode='wb', suffix='.png', prefix='diagram_', dir=output_dir, delete=False) as f:
+        f.write(png)
+        return f.name
 
 
 def set_cell_shading(cell, hex_color: str):
@@ -211,6 +160,8 @@ def _add_title_page(doc: Document, project_name: str, client_name: str, version:
 
 
 def _parse_markdown_enhanced(doc: Document, markdown: str):
+    renderer = get_mermaid_renderer()
+    renderer.render_many(extract_mermaid_blocks(markdown))     # MERMAID-POOL: tous les diagrammes en parallele
     lines = markdown.split('\n')
     i = 0
     
@@ -227,19 +178,15 @@ def _parse_markdown_enhanced(doc: Document, markdown: str):
             
             mermaid_code = '\n'.join(mermaid_lines)
             if mermaid_code.strip():
-                img_path = convert_mermaid_to_image(mermaid_code)
-                if img_path and os.path.exists(img_path):
+                png = renderer.render(mermaid_code)       # cache hit after render_many
+                if png:
                     # Add diagram as image
                     doc.add_paragraph()
                     para = doc.add_paragraph()
                     para.alignment = WD_ALIGN_PARAGRAPH.CENTER
                     run = para.add_run()
-                    run.add_picture(img_path, width=Inches(5.5))
+                    run.add_picture(io.BytesIO(png), width=Inches(5.5))
                     doc.add_paragraph()
-                    try:
-                        os.unlink(img_path)
-                    except:
-                        pass
                 else:
                     # Fallback: format as entity tables
                     _format_mermaid_as_tables(doc, mermaid_code)
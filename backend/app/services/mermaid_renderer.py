@@ -0,0 +1,420 @@
+"""
+Mermaid renderer (MERMAID-POOL) — warm render workers and a content-addressed PNG cache.
+
+Before: ``ProfessionalDocumentGenerator.add_mermaid_diagram`` and
+``markdown_to_docx.convert_mermaid_to_image`` ran one ``mmdc`` per diagram, one
+after the other, each launching a full headless Chromium (30-60 s timeouts):
+an SDS with 25 diagrams spent minutes rendering, and a new SDS version with
+the same diagrams rendered them all again.
+
+Now:
+- PNGs are cached on disk under ``<OUTPUT_DIR>/mermaid_cache``, keyed by the
+  sha256 of the normalised diagram (``fix_mermaid_syntax`` output, newlines
+  and trailing blanks normalised) plus width and background. Unchanged
+  diagrams are never rendered twice, across SDS versions and processes.
+- Cache misses go to up to MERMAID_WORKERS long-lived node workers
+  (``mermaid_worker.mjs``), each holding one Chromium; ``render_many``
+  renders the diagrams of a document concurrently. Identical diagrams
+  rendered at the same time share one render (single-flight).
+- When the workers cannot start (no node / mermaid-cli), misses fall back to
+  the previous ``mmdc`` command, still cached and concurrent; the pool is
+  retried after MERMAID_POOL_RETRY_SECONDS (doubling up to
+  MERMAID_POOL_RETRY_MAX_SECONDS while it keeps failing).
+- Only mermaid syntax errors are remembered as failed (for this process); an
+  mmdc timeout or a missing binary returns None and is retried next time.
+
+Usage::
+
+    renderer = get_mermaid_renderer()
+    renderer.render_many(extract_mermaid_blocks(markdown))   # warm the cache in parallel
+    png = renderer.render(code)                              # bytes, or None if it does not render
+"""
+
+import atexit
+import base64
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MERMAID_POOL_ENABLED = True          # False: un mmdc par diagramme (cache disque conserve)
+MERMAID_WORKERS = 3                  # Chromium simultanes (~150 Mo chacun)
+MERMAID_RENDER_TIMEOUT_SECONDS = 60
+MERMAID_WORKER_MAX_RENDERS = 200     # recycle le Chromium (fuites memoire)
+MERMAID_WORKER_START_TIMEOUT_SECONDS = 30
+MERMAID_POOL_RETRY_SECONDS = 30      # nouvel essai des workers apres un echec de demarrage
+MERMAID_POOL_RETRY_MAX_SECONDS = 600
+RENDER_WIDTH = 800
+RENDER_BACKGROUND = "white"
+RENDERER_VERSION = 1                 # bump to invalidate the PNG cache
+
+PUPPETEER_CONFIG = "/tmp/puppeteer-config.json"
+WORKER_SCRIPT = Path(__file__).with_name("mermaid_worker.mjs")
+
+
+def ensure_puppeteer_config() -> None:
+    if not os.path.exists(PUPPETEER_CONFIG):
+        with open(PUPPETEER_CONFIG, 'w') as f:
+            f.write('{"args": ["--no-sandbox", "--disable-setuid-sandbox"]}')
+
+
+def fix_mermaid_syntax(code: str) -> str:
+    """Fix erDiagram syntax for newer mermaid versions."""
+    lines = code.split('\n')
+    fixed_lines = []
+    in_entity = False
+
+    for line in lines:
+        stripped = line.strip()
+        if re.match(r'^\w+\s*\{', stripped):
+            in_entity = True
+            fixed_lines.append(line)
+            continue
+        if stripped == '}':
+            in_entity = False
+            fixed_lines.append(line)
+            continue
+
+        if in_entity and stripped and not stripped.startswith('%%'):
+            # Convert "FieldName Type" to "type FieldName"
+            field_match = re.match(r'^(\w+)\s+(\w+)(?:\s+(.*))?$', stripped)
+            if field_match:
+                field_name, field_type, extra = field_match.groups()
+                type_map = {'PK': 'string', 'FK': 'string', 'string': 'string', 'text': 'string',
+                           'number': 'decimal', 'decimal': 'decimal', 'boolean': 'boolean', 'date': 'date'}
+                if field_type.upper() in ['PK', 'FK'] or field_type.lower() in type_map:
+                    mapped_type = type_map.get(field_type.upper(), type_map.get(field_type.lower(), 'string'))
+                    fixed_lines.append(f"        {mapped_type} {field_name}" + (f" {extra}" if extra else ""))
+                    continue
+        fixed_lines.append(line)
+    return '\n'.join(fixed_lines)
+
+
+def normalize_mermaid(code: str) -> str:
+    """Diagram source as rendered: syntax fixed, CRLF and trailing blanks removed."""
+    lines = [line.rstrip() for line in (code or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    return fix_mermaid_syntax("\n".join(lines).strip("\n"))
+
+
+def diagram_key(normalized: str, width: int = RENDER_WIDTH, background: str = RENDER_BACKGROUND) -> str:
+    canonical = json.dumps([RENDERER_VERSION, normalized, int(width), background], separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def extract_mermaid_blocks(markdown: str) -> List[str]:
+    """Sources of the ```mermaid blocks of a markdown text, as the document parsers read them."""
+    lines = (markdown or "").split('\n')
+    blocks = []
+    i = 0
+    while i < len(lines):
+        if lines[i].strip().startswith('```mermaid'):
+            block = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith('```'):
+                block.append(lines[i])
+                i += 1
+            code = '\n'.join(block)
+            if code.strip():
+                blocks.append(code)
+        i += 1
+    return blocks
+
+
+class RenderError(Exception):
+    """The diagram itself does not render (syntax error): retrying will not help."""
+
+
+class RenderUnavailable(Exception):
+    """No renderer right now (mmdc missing or too slow): retry on the next call."""
+
+
+class _WorkerUnavailable(Exception):
+    """The node worker could not start or died: use the mmdc fallback."""
+
+    def __init__(self, message: str, startup: bool = False):
+        super().__init__(message)
+        self.startup = startup                        # failed before its first render
+
+
+class _Worker:
+    """One node process holding a Chromium; one request at a time."""
+
+    def __init__(self, cmd: List[str]):
+        ensure_puppeteer_config()
+        env = {**os.environ, "PUPPETEER_CONFIG": PUPPETEER_CONFIG}
+        try:
+            self.process = subprocess.Popen(
+                cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                text=True, bufsize=1, env=env,
+            )
+        except OSError as e:
+            raise _WorkerUnavailable(str(e), startup=True)
+        self.renders = 0
+        self.successes = 0
+        self._next_id = 0
+        self._replies: "queue.Queue[Optional[dict]]" = queue.Queue()
+        threading.Thread(target=self._read, name="mermaid-worker-reader", daemon=True).start()
+
+    def _read(self) -> None:
+        for line in self.process.stdout:
+            try:
+                self._replies.put(json.loads(line))
+            except ValueError:
+                logger.debug(f"[Mermaid] worker output ignored: {line[:200]}")
+        self._replies.put(None)                       # EOF: process gone
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def render(self, code: str, width: int, background: str, timeout: float) -> bytes:
+        self._next_id += 1
+        request_id = self._next_id
+        try:
+            self.process.stdin.write(json.dumps({"id": request_id, "code": code, "width": width,
+                                                 "background": background}) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise _WorkerUnavailable(f"worker stdin closed: {e}", startup=self.renders == 0)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                reply = self._replies.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                self.close()
+                raise _WorkerUnavailable(f"render timed out after {timeout:.0f}s", startup=self.renders == 0)
+            if reply is None:
+                raise _WorkerUnavailable("worker exited", startup=self.renders == 0)
+            if "fatal" in reply:
+                self.close()
+                raise _WorkerUnavailable(reply["fatal"], startup=self.renders == 0)
+            if reply.get("id") != request_id:
+                continue                              # reply to a request that timed out earlier
+            self.renders += 1
+            if "error" in reply:
+                raise RenderError(reply["error"])
+            self.successes += 1
+            return base64.b64decode(reply["png"])
+
+    def close(self) -> None:
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+
+
+class MermaidRenderer:
+    """PNG cache in front of a small pool of warm mermaid workers."""
+
+    def __init__(self, cache_dir: Optional[str] = None, workers: int = MERMAID_WORKERS,
+                 worker_cmd: Optional[List[str]] = None, timeout: float = MERMAID_RENDER_TIMEOUT_SECONDS):
+        self.cache_dir = Path(cache_dir or settings.OUTPUT_DIR / "mermaid_cache")
+        self.workers = max(1, workers)
+        self.worker_cmd = worker_cmd or ["node", str(WORKER_SCRIPT)]
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._idle: "queue.LifoQueue[_Worker]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._failed: set = set()                     # keys that do not render (this process)
+        self._pool_retry_at = 0.0                     # monotonic time before which the pool is skipped
+        self._pool_backoff = MERMAID_POOL_RETRY_SECONDS
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mermaid")
+        self.stats = {"cache_hits": 0, "renders": 0, "fallback_renders": 0, "failures": 0, "unavailable": 0,
+                      "workers_started": 0}
+
+    # ── cache ──
+
+    def _cache_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.png"
+
+    def _read_cache(self, key: str) -> Optional[bytes]:
+        try:
+            return self._cache_path(key).read_bytes()
+        except OSError:
+            return None
+
+    def _write_cache(self, key: str, png: bytes) -> None:
+        path = self._cache_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(png)
+            tmp.replace(path)
+        except OSError as e:
+            logger.warning(f"[Mermaid] PNG cache write failed: {e}")
+
+    # ── rendering ──
+
+    def render(self, code: str, width: int = RENDER_WIDTH, background: str = RENDER_BACKGROUND) -> Optional[bytes]:
+        """PNG of a diagram, from the cache when the normalised source was rendered before."""
+        normalized = normalize_mermaid(code)
+        if not normalized.strip():
+            return None
+        key = diagram_key(normalized, width, background)
+        png = self._read_cache(key)
+        if png is not None:
+            with self._lock:
+                self.stats["cache_hits"] += 1
+            return png
+
+        with self._lock:
+            if key in self._failed:
+                return None
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result()
+
+        png = None
+        try:
+            png = self._render_uncached(key, normalized, width, background)
+            if png:
+                self._write_cache(key, png)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_result(png)
+        return png
+
+    def render_many(self, codes: Iterable[str], width: int = RENDER_WIDTH,
+                    background: str = RENDER_BACKGROUND) -> List[Optional[bytes]]:
+        """Render several diagrams concurrently (one per worker); results in input order."""
+        codes = list(codes)
+        if len(codes) <= 1:
+            return [self.render(code, width, background) for code in codes]
+        return list(self._executor.map(lambda code: self.render(code, width, background), codes))
+
+    def _render_uncached(self, key: str, normalized: str, width: int, background: str) -> Optional[bytes]:
+        started = time.monotonic()
+        try:
+            if self._pool_available():
+                try:
+                    png = self._render_with_worker(normalized, width, background)
+                    self._pool_backoff = MERMAID_POOL_RETRY_SECONDS
+                    self._count("renders", started)
+                    return png
+                except _WorkerUnavailable as e:
+                    if e.startup:
+                        self._pool_failed(e)
+                    else:
+                        logger.warning(f"[Mermaid] worker failed, falling back to mmdc for this diagram: {e}")
+            png = self._render_with_mmdc(normalized, width, background)
+            self._count("fallback_renders", started)
+            return png
+        except RenderError as e:
+            logger.warning(f"[Mermaid] diagram does not render: {str(e)[:200]}")
+            with self._lock:
+                self._failed.add(key)
+                self.stats["failures"] += 1
+            return None
+        except RenderUnavailable as e:
+            logger.warning(f"[Mermaid] diagram not rendered this time: {e}")
+            with self._lock:
+                self.stats["unavailable"] += 1
+            return None
+
+    def _pool_available(self) -> bool:
+        return MERMAID_POOL_ENABLED and time.monotonic() >= self._pool_retry_at
+
+    def _pool_failed(self, error: _WorkerUnavailable) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now < self._pool_retry_at:
+                return                                # concurrent failure already counted
+            self._pool_retry_at = now + self._pool_backoff
+            logger.warning(f"[Mermaid] render workers unavailable, using mmdc for {self._pool_backoff:.0f}s: {error}")
+            self._pool_backoff = min(self._pool_backoff * 2, MERMAID_POOL_RETRY_MAX_SECONDS)
+
+    def _count(self, name: str, started: float) -> None:
+        with self._lock:
+            self.stats[name] += 1
+        logger.debug(f"[Mermaid] {name[:-1]} in {time.monotonic() - started:.1f}s")
+
+    def _render_with_worker(self, code: str, width: int, background: str) -> bytes:
+        with self._slots:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                worker = _Worker(self.worker_cmd)
+                with self._lock:
+                    self.stats["workers_started"] += 1
+            keep = False
+            try:
+                timeout = self.timeout
+                if worker.renders == 0:
+                    timeout += MERMAID_WORKER_START_TIMEOUT_SECONDS    # lancement de Chromium
+                png = worker.render(code, width, background, timeout)
+                keep = worker.alive and worker.renders < MERMAID_WORKER_MAX_RENDERS
+                return png
+            except RenderError as e:
+                # The worker cannot tell a syntax error from a Chromium that
+                # went away under it: mmdc decides. A worker that rendered
+                # before and now fails is suspect and is not reused.
+                keep = worker.alive and worker.successes == 0
+                raise _WorkerUnavailable(f"worker could not render the diagram: {e}") from e
+            finally:
+                if keep:
+                    self._idle.put(worker)
+                else:
+                    worker.close()
+
+    def _render_with_mmdc(self, code: str, width: int, background: str) -> bytes:
+        ensure_puppeteer_config()
+        with tempfile.TemporaryDirectory(prefix="mermaid_") as tmp:
+            mmd_path, png_path = os.path.join(tmp, "diagram.mmd"), os.path.join(tmp, "diagram.png")
+            with open(mmd_path, "w") as f:
+                f.write(code)
+            try:
+                result = subprocess.run(
+                    ['mmdc', '-i', mmd_path, '-o', png_path, '-b', background, '-w', str(width),
+                     '-p', PUPPETEER_CONFIG],
+                    capture_output=True, timeout=self.timeout,
+                )
+            except FileNotFoundError as e:
+                raise RenderUnavailable(f"mmdc not found: {e}")
+            except subprocess.TimeoutExpired:
+                raise RenderUnavailable(f"mmdc timed out after {self.timeout:.0f}s")
+            if result.returncode != 0 or not os.path.exists(png_path):
+                raise RenderError((result.stderr or result.stdout).decode(errors="replace")[:500])
+            with open(png_path, "rb") as f:
+                return f.read()
+
+    def shutdown(self) -> None:
+        """Stop the idle workers (also registered atexit)."""
+        self._executor.shutdown(wait=False)
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_renderer: Optional[MermaidRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_mermaid_renderer() -> MermaidRenderer:
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = MermaidRenderer()
+                atexit.register(_renderer.shutdown)
+    return _renderer
@@ -0,0 +1,82 @@
+// Mermaid render worker (MERMAID-POOL) — one warm headless Chromium, many diagrams.
+//
+// Started and recycled by app/services/mermaid_renderer.py. Protocol, one JSON
+// object per line:
+//   stdin : {"id": 1, "code": "erDiagram ...", "width": 800, "background": "white"}
+//   stdout: {"id": 1, "png": "<base64>"}  or  {"id": 1, "error": "..."}
+// A start-up failure (mermaid-cli / puppeteer not found, Chromium not
+// launchable), or losing the browser later on, is reported as
+// {"fatal": "..."} before exiting, so the pool replaces this worker.
+//
+// mermaid-cli is installed globally (npm install -g @mermaid-js/mermaid-cli):
+// ESM imports ignore NODE_PATH, so the package is loaded by path, from
+// MERMAID_CLI_DIR or `npm root -g`.
+
+import { execSync } from "node:child_process";
+import { readFileSync, existsSync } from "node:fs";
+import { createRequire } from "node:module";
+import { join } from "node:path";
+import { createInterface } from "node:readline";
+import { pathToFileURL } from "node:url";
+
+function reply(message) {
+  process.stdout.write(JSON.stringify(message) + "\n");
+}
+
+function entryOf(pkg) {
+  let entry = pkg.exports?.["."] ?? pkg.exports ?? pkg.main ?? "index.js";
+  while (entry && typeof entry === "object") entry = entry.import ?? entry.default ?? entry.node;
+  return entry;
+}
+
+async function start() {
+  const cliDir = process.env.MERMAID_CLI_DIR
+    || join(execSync("npm root -g").toString().trim(), "@mermaid-js", "mermaid-cli");
+  const pkg = JSON.parse(readFileSync(join(cliDir, "package.json"), "utf8"));
+  const { renderMermaid } = await import(pathToFileURL(join(cliDir, entryOf(pkg))).href);
+  const require = createRequire(join(cliDir, "package.json"));
+  const puppeteer = (await import(pathToFileURL(require.resolve("puppeteer")).href)).default;
+
+  const configPath = process.env.PUPPETEER_CONFIG;
+  const config = configPath && existsSync(configPath) ? JSON.parse(readFileSync(configPath, "utf8")) : {};
+  const browser = await puppeteer.launch({ headless: "new", ...config });
+  return { renderMermaid, browser };
+}
+
+let renderer;
+try {
+  renderer = await start();
+} catch (e) {
+  reply({ fatal: String(e?.message ?? e) });
+  process.exit(1);
+}
+
+// Requetes traitees une par une : le pool Python ouvre un worker par rendu simultane.
+function exitIfBrowserLost() {
+  if (renderer.browser.isConnected()) return;
+  reply({ fatal: "browser disconnected" });
+  process.exit(1);
+}
+
+let chain = Promise.resolve();
+const lines = createInterface({ input: process.stdin });
+lines.on("line", (line) => {
+  chain = chain.then(async () => {
+    let request;
+    exitIfBrowserLost();
+    try {
+      request = JSON.parse(line);
+      const { data } = await renderer.renderMermaid(renderer.browser, request.code, "png", {
+        backgroundColor: request.background ?? "white",
+        viewport: { width: request.width ?? 800, height: 600, deviceScaleFactor: 1 },
+      });
+      reply({ id: request.id, png: Buffer.from(data).toString("base64") });
+    } catch (e) {
+      exitIfBrowserLost();
+      reply({ id: request?.id ?? null, error: String(e?.message ?? e).slice(0, 500) });
+    }
+  });
+});
+lines.on("close", () => {
+  chain.finally(() => renderer.browser.close()).finally(() => process.exit(0));
+});
@@ -13,6 +13,12 @@ from app.config import settings
 logger = logging.getLogger(__name__)
 
 
+# Tunables for the shared LISTEN connection (NOTIF-MUX).
+SUBSCRIBER_QUEUE_SIZE = 256      # bounded per-subscriber queue, oldest dropped when full
+RECONNECT_INITIAL_DELAY = 0.5    # seconds, doubled after each failed attempt
+RECONNECT_MAX_DELAY = 30.0
+
+
 class NotificationService:
     """
     PostgreSQL LISTEN/NOTIFY based notification service.
@@ -21,13 +27,25 @@ class NotificationService:
     - execution_{id}: Updates for a specific execution
     - build_{id}: Updates for a specific build phase
     - global: System-wide notifications
+
+    NOTIF-MUX: a single long-lived LISTEN connection per process fans every
+    notification out to in-memory subscriber queues. LISTEN/UNLISTEN are
+    reference-counted per channel, so the number of SSE viewers is no longer
+    bounded by the pool size (the pool only serves NOTIFY). If the LISTEN
+    connection drops, it is re-established and every active channel is
+    re-subscribed.
     """
     
-    def __init__(self):
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
         self._pool: Optional[asyncpg.Pool] = None
+        self._db_url: Optional[str] = None
         self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        self._listen_conn: Optional[asyncpg.Connection] = None
+        self._listen_lock = asyncio.Lock()
         self._listen_task: Optional[asyncio.Task] = None
         self._running = False
+        self._queue_size = queue_size
+        self._stats = {"delivered": 0, "dropped": 0, "reconnects": 0}
         
     async def initialize(self):
         """Initialize the connection pool and start listening."""
@@ -39,6 +57,7 @@ class NotificationService:
             db_url = settings.DATABASE_URL
             if db_url.startswith("postgresql://"):
                 db_url = db_url.replace("postgresql://", "postgres://", 1)
+            self._db_url = db_url
             
             self._pool = await asyncpg.create_pool(
                 db_url,
@@ -46,13 +65,14 @@ class NotificationService:
                 max_size=5,
                 command_timeout=60
             )
+            self._running = True
             logger.info("NotificationService: Connection pool created")
         except Exception as e:
             logger.error(f"NotificationService: Failed to create pool: {e}")
             raise
     
     async def close(self):
-        """Close the connection pool."""
+        """Close the LISTEN connection and the connection pool."""
         self._running = False
         if self._listen_task:
             self._listen_task.cancel()
@@ -60,6 +80,13 @@ class NotificationService:
                 await self._listen_task
             except asyncio.CancelledError:
                 pass
+            self._listen_task = None
+        if self._listen_conn is not None:
+            conn, self._listen_conn = self._listen_conn, None
+            try:
+                await conn.close()
+            except Exception as e:
+                logger.debug(f"NotificationService: Error closing LISTEN connection: {e}")
         if self._pool:
             await self._pool.close()
             self._pool = None
@@ -103,44 +130,118 @@ class NotificationService:
         if not self._pool:
             await self.initialize()
         
-        queue: asyncio.Queue = asyncio.Queue()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
         
-        # Register listener
-        if channel not in self._listeners:
-            self._listeners[channel] = set()
-        self._listeners[channel].add(queue)
+        async with self._listen_lock:
+            subscribers = self._listeners.get(channel)
+            if subscribers is None:
+                # First subscriber on this channel: issue LISTEN on the shared connection
+                conn = await self._ensure_listen_connection()
+                await conn.add_listener(channel, self._dispatch)
+                subscribers = self._listeners[channel] = set()
+                logger.debug(f"NotificationService: LISTEN {channel}")
+            subscribers.add(queue)
         
-        # Start listening on this channel
-        conn = await self._pool.acquire()
         try:
-            def callback(conn, pid, channel, payload):
-                try:
-                    data = json.loads(payload)
-                    # Put message in all queues for this channel
-                    for q in self._listeners.get(channel, []):
-                        try:
-                            q.put_nowait(data)
-                        except asyncio.QueueFull:
-                            pass
-                except json.JSONDecodeError:
-                    logger.warning(f"Invalid JSON in notification: {payload[:100]}")
-            
-            await conn.add_listener(channel, callback)
-            logger.debug(f"NotificationService: Subscribed to {channel}")
-            
             yield queue
-            
         finally:
-            await conn.remove_listener(channel, callback)
-            await self._pool.release(conn)
-            
-            # Unregister listener
-            if channel in self._listeners:
-                self._listeners[channel].discard(queue)
-                if not self._listeners[channel]:
-                    del self._listeners[channel]
+            async with self._listen_lock:
+                subscribers = self._listeners.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(queue)
+                    if not subscribers:
+                        # Last subscriber gone: UNLISTEN
+                        del self._listeners[channel]
+                        conn = self._listen_conn
+                        if conn is not None and not conn.is_closed():
+                            try:
+                                await conn.remove_listener(channel, self._dispatch)
+                            except Exception as e:
+                                logger.debug(f"NotificationService: UNLISTEN {channel} failed: {e}")
+                        logger.debug(f"NotificationService: UNLISTEN {channel}")
             
             logger.debug(f"NotificationService: Unsubscribed from {channel}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Counters for monitoring the fan-out (channels, subscribers, drops, reconnects)."""
+        return {
+            "channels": len(self._listeners),
+            "subscribers": sum(len(qs) for qs in self._listeners.values()),
+            **self._stats,
+        }
+
+    # ------------------------------------------------------------------
+    # Shared LISTEN connection (NOTIF-MUX)
+    # ------------------------------------------------------------------
+
+    async def _ensure_listen_connection(self) -> asyncpg.Connection:
+        """Return the shared LISTEN connection, opening it if needed. Caller holds _listen_lock."""
+        if self._listen_conn is not None and not self._listen_conn.is_closed():
+            return self._listen_conn
+        conn = await asyncpg.connect(self._db_url)
+        conn.add_termination_listener(self._on_listen_connection_lost)
+        self._listen_conn = conn
+        logger.info("NotificationService: LISTEN connection opened")
+        return conn
+
+    def _dispatch(self, conn, pid, channel, payload):
+        """asyncpg listener callback: fan a notification out to every subscriber queue."""
+        try:
+            data = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.warning(f"Invalid JSON in notification: {payload[:100]}")
+            return
+        for q in list(self._listeners.get(channel, ())):
+            if q.full():
+                # Slow consumer: drop the oldest message so the newest state always gets through
+                try:
+                    q.get_nowait()
+                    self._stats["dropped"] += 1
+                except asyncio.QueueEmpty:
+                    pass
+            try:
+                q.put_nowait(data)
+                self._stats["delivered"] += 1
+            except asyncio.QueueFull:
+                self._stats["dropped"] += 1
+
+    def _on_listen_connection_lost(self, conn):
+        """Termination callback: schedule reconnection unless we are shutting down."""
+        if not self._running or conn is not self._listen_conn:
+            return
+        logger.warning("NotificationService: LISTEN connection lost, reconnecting")
+        self._listen_conn = None
+        if self._listen_task is None or self._listen_task.done():
+            self._listen_task = asyncio.get_event_loop().create_task(self._reconnect())
+
+    async def _reconnect(self):
+        """Re-open the LISTEN connection with exponential backoff and re-LISTEN active channels."""
+        delay = RECONNECT_INITIAL_DELAY
+        while self._running:
+            try:
+                async with self._listen_lock:
+                    if not self._listeners:
+                        # Nobody listening: the connection will be opened lazily on next subscribe
+                        return
+                    conn = await self._ensure_listen_connection()
+                    for channel in list(self._listeners):
+                        await conn.add_listener(channel, self._dispatch)
+                self._stats["reconnects"] += 1
+                logger.info(f"NotificationService: Re-subscribed to {len(self._listeners)} channel(s)")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"NotificationService: Reconnect failed ({e}), retrying in {delay:.1f}s")
+                async with self._listen_lock:
+                    if self._listen_conn is not None:
+                        try:
+                            await self._listen_conn.close()
+                        except Exception:
+                            pass
+                        self._listen_conn = None
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
     
     # Convenience methods for common notifications
     
@@ -150,17 +251,25 @@ class NotificationService:
         status: str, 
         progress: int,
         agent: Optional[str] = None,
-        message: Optional[str] = None
+        message: Optional[str] = None,
+        snapshot: Optional[Dict[str, Any]] = None
     ):
-        """Notify about execution progress update."""
-        await self.notify(f"execution_{execution_id}", {
+        """Notify about execution progress update.
+
+        PROGRESS-SNAP: ``snapshot`` is the full versioned progress snapshot,
+        cached by the stream endpoints so viewers don't hit the DB.
+        """
+        payload = {
             "event": "progress",
             "execution_id": execution_id,
             "status": status,
             "progress": progress,
             "agent": agent,
             "message": message
-        })
+        }
+        if snapshot is not None:
+            payload["snapshot"] = snapshot
+        await self.notify(f"execution_{execution_id}", payload)
     
     async def notify_execution_completed(
         self, 
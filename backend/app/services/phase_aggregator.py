@@ -3,7 +3,8 @@ Phase Aggregator - BUILD v2
 Fusionne les outputs des sous-lots en un output de phase unifié.
 """
 import logging
-from typing import Dict, List, Any
+import re
+from typing import Dict, List, Any, Optional, Set
 
 logger = logging.getLogger(__name__)
 
@@ -302,6 +303,51 @@ class PhaseAggregator:
         logger.info(f"[Aggregator] Data migration aggregated: {aggregated['metadata']}")
         return aggregated
     
+    def build_provenance(self, phase: int, batch_results: List[Optional[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """
+        RETRY-INC : indique quel lot a produit chaque fichier / opération de l'agrégat.
+        
+        Mêmes règles que l'agrégation (chemins normalisés, premier lot gagnant
+        en cas de doublon). ``batch_results`` est indexé par lot ; les entrées
+        None (lot sans résultat) sont ignorées.
+        
+        ``owners`` garde tous les lots qui ont produit ou modifié un nom : un
+        objet créé par un lot et enrichi de champs par deux autres y a trois lots.
+        
+        Returns:
+            {"files": {chemin normalisé: index du lot},
+             "names": {api_name / Objet.api_name / nom de classe ou composant: index du lot},
+             "owners": {même clés que names (plus les objets modifiés): indices des lots}}
+        """
+        files: Dict[str, int] = {}
+        names: Dict[str, int] = {}
+        owners: Dict[str, Set[int]] = {}
+        
+        def add(name: str, index: int) -> None:
+            names.setdefault(name, index)
+            owners.setdefault(name, set()).add(index)
+        
+        for index, batch in enumerate(batch_results):
+            if not batch:
+                continue
+            for op in batch.get("operations", []):
+                api_name = op.get("api_name", "")
+                obj = op.get("object", "")
+                if api_name:
+                    add(f"{obj}.{api_name}" if obj else api_name, index)
+                    add(api_name, index)
+                if obj:
+                    owners.setdefault(obj, set()).add(index)
+            for path in batch.get("files", {}):
+                normalized_path = self._normalize_path(path)
+                files.setdefault(normalized_path, index)
+                # AccountService.cls -> AccountService ; lwc/monComposant/x.js -> monComposant
+                lwc = re.search(r"/lwc/([^/]+)/", normalized_path)
+                stem = lwc.group(1) if lwc else normalized_path.rsplit("/", 1)[-1].split(".", 1)[0]
+                if stem:
+                    add(stem, index)
+        return {"files": files, "names": names, "owners": owners}
+    
     def _normalize_path(self, path: str) -> str:
         """
         Normalise un chemin de fichier.
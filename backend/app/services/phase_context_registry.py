@@ -1,14 +1,43 @@
 """
 Phase Context Registry - BUILD v2
 Maintient le contexte progressif entre les lots et les phases.
+
+CTX-INC : le rendu Markdown de chaque section (modèle de données, classes,
+composants...) est mis en cache et n'est invalidé que lorsque la section
+change ; un bloc d'objet n'est re-rendu que si ses champs changent. Avec
+``tasks``, ``get_context_for_batch`` ne détaille que les objets, classes et
+composants cités par les tâches du lot (index nom → entrée tenu à jour à
+l'enregistrement), les autres sont seulement nommés, le tout borné par
+CONTEXT_TOKEN_BUDGET. Chaque section détaillée dispose d'au moins sa part du
+budget (budget / nombre de sections) : une section rendue tôt ne peut pas
+priver les suivantes de leurs entrées citées.
 """
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass, field
 import re
 
 logger = logging.getLogger(__name__)
 
+CONTEXT_RELEVANCE_SELECTION = True    # False restores the full context for every batch
+CONTEXT_TOKEN_BUDGET = 6000           # ~4 caracteres par token (cf. llm_rate_governor.estimate_tokens)
+
+# Champs de tache ou chercher les noms d'objets / classes / composants cites.
+_TASK_TEXT_KEYS = ("target_object", "object_name", "object", "class_name", "component_name", "api_name",
+                   "name", "title", "description", "formula", "details", "acceptance_criteria", "technical_notes")
+_NAME_TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+_AMBIGUOUS_NAME_HITS = 3
+
+# Section de contexte alimentee par chaque champ du registre (invalidation des caches).
+_FIELD_SECTIONS = {
+    "generated_objects": "objects", "generated_fields": "objects",
+    "generated_record_types": "objects", "generated_validation_rules": "objects",
+    "generated_classes": "classes", "generated_triggers": "classes",
+    "generated_components": "components",
+    "generated_flows": "automation", "generated_complex_vrs": "automation",
+    "generated_permission_sets": "security", "generated_profiles": "security",
+}
+
 
 @dataclass
 class PhaseContextRegistry:
@@ -44,6 +73,38 @@ class PhaseContextRegistry:
     # Deployed components (après validation Jordan)
     deployed_components: Dict[int, List[str]] = field(default_factory=dict)
     
+    # CTX-INC : caches de rendu et index nom → entrées (non serialises)
+    _sections: Dict[str, str] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _blocks: Dict[Tuple[str, str], str] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _index: Optional[Dict[str, Set[Tuple[str, str]]]] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Reaffecter un champ (from_dict, tests...) invalide sa section.
+        super().__setattr__(name, value)
+        if name in _FIELD_SECTIONS and "_sections" in self.__dict__:
+            self._invalidate(_FIELD_SECTIONS[name], reindex=True)
+    
+    def _invalidate(self, section: str, entry: Optional[str] = None, reindex: bool = False) -> None:
+        """Oublie le rendu d'une section (et d'un bloc) ; ``reindex`` reconstruit l'index au prochain usage."""
+        for key in [k for k in self._sections if k.split(".", 1)[0] == section]:
+            del self._sections[key]
+        if entry is not None:
+            self._blocks.pop((section, entry), None)
+        elif reindex:
+            self._blocks = {k: v for k, v in self._blocks.items() if k[0] != section}
+        if reindex:
+            self._index = None
+    
+    def _index_add(self, section: str, entry: str, *names: str) -> None:
+        if self._index is None:
+            return          # reconstruit en entier au prochain usage
+        for name in (entry,) + names:
+            if name:
+                key = name.lower()
+                self._index.setdefault(key, set()).add((section, entry))
+                if key.endswith("__c"):
+                    self._index.setdefault(key[:-3], set()).add((section, entry))
+    
     # ═══════════════════════════════════════════════════════════════
     # REGISTRATION METHODS
     # ═══════════════════════════════════════════════════════════════
@@ -77,6 +138,8 @@ class PhaseContextRegistry:
                 if api_name and api_name not in self.generated_objects:
                     self.generated_objects.append(api_name)
                     self.generated_fields[api_name] = []
+                    self._invalidate("objects", api_name)
+                    self._index_add("objects", api_name)
                     logger.debug(f"[Registry] Object registered: {api_name}")
                     
             elif op_type == "create_field":
@@ -87,6 +150,8 @@ class PhaseContextRegistry:
                         self.generated_fields[obj] = []
                     if field_name not in self.generated_fields[obj]:
                         self.generated_fields[obj].append(field_name)
+                        self._invalidate("objects", obj)
+                        self._index_add("objects", obj, field_name)
                         
             elif op_type == "create_record_type":
                 obj = op.get("object", "")
@@ -96,6 +161,7 @@ class PhaseContextRegistry:
                         self.generated_record_types[obj] = []
                     if rt_name not in self.generated_record_types[obj]:
                         self.generated_record_types[obj].append(rt_name)
+                        self._invalidate("objects", obj)
                         
             elif op_type in ("create_validation_rule", "simple_validation_rule"):
                 obj = op.get("object", "")
@@ -103,6 +169,7 @@ class PhaseContextRegistry:
                 full_name = f"{obj}.{vr_name}" if obj else vr_name
                 if full_name not in self.generated_validation_rules:
                     self.generated_validation_rules.append(full_name)
+                    self._invalidate("objects")
     
     def _register_business_logic(self, output: Dict[str, Any]) -> None:
         """Enregistre les outputs Phase 2 (Diego Apex)."""
@@ -114,12 +181,15 @@ class PhaseContextRegistry:
                 methods = self._extract_public_methods(content)
                 if class_name:
                     self.generated_classes[class_name] = methods
+                    self._invalidate("classes", class_name)
+                    self._index_add("classes", class_name)
                     logger.debug(f"[Registry] Class registered: {class_name}")
                     
             elif path.endswith(".trigger"):
                 trigger_name = self._extract_trigger_name(path)
                 if trigger_name and trigger_name not in self.generated_triggers:
                     self.generated_triggers.append(trigger_name)
+                    self._invalidate("classes")
     
     def _register_ui_components(self, output: Dict[str, Any]) -> None:
         """Enregistre les outputs Phase 3 (Zara LWC)."""
@@ -131,6 +201,8 @@ class PhaseContextRegistry:
                 props = self._extract_public_props(content)
                 if component_name:
                     self.generated_components[component_name] = props
+                    self._invalidate("components", component_name)
+                    self._index_add("components", component_name)
                     logger.debug(f"[Registry] LWC registered: {component_name}")
     
     def _register_automation(self, output: Dict[str, Any]) -> None:
@@ -144,6 +216,7 @@ class PhaseContextRegistry:
                 flow_name = op.get("api_name", "")
                 if flow_name and flow_name not in self.generated_flows:
                     self.generated_flows.append(flow_name)
+                    self._invalidate("automation")
                     
             elif op_type == "complex_validation_rule":
                 obj = op.get("object", "")
@@ -151,6 +224,7 @@ class PhaseContextRegistry:
                 full_name = f"{obj}.{vr_name}" if obj else vr_name
                 if full_name not in self.generated_complex_vrs:
                     self.generated_complex_vrs.append(full_name)
+                    self._invalidate("automation")
     
     def _register_security(self, output: Dict[str, Any]) -> None:
         """Enregistre les outputs Phase 5 (Raj Security)."""
@@ -163,11 +237,13 @@ class PhaseContextRegistry:
                 ps_name = op.get("api_name", "")
                 if ps_name and ps_name not in self.generated_permission_sets:
                     self.generated_permission_sets.append(ps_name)
+                    self._invalidate("security")
                     
             elif op_type in ("profile", "create_profile"):
                 profile_name = op.get("api_name", "")
                 if profile_name and profile_name not in self.generated_profiles:
                     self.generated_profiles.append(profile_name)
+                    self._invalidate("security")
     
     def _register_data_migration(self, output: Dict[str, Any]) -> None:
         """Enregistre les outputs Phase 6 (Aisha Data Migration)."""
@@ -177,6 +253,23 @@ class PhaseContextRegistry:
             if path not in self.generated_migration_scripts:
                 self.generated_migration_scripts.append(path)
     
+    # Champs alimentes par chaque phase (reset_phase).
+    _PHASE_FIELDS = {
+        1: ("generated_objects", "generated_fields", "generated_record_types", "generated_validation_rules"),
+        2: ("generated_classes", "generated_triggers"),
+        3: ("generated_components",),
+        4: ("generated_flows", "generated_complex_vrs"),
+        5: ("generated_permission_sets", "generated_profiles"),
+        6: ("generated_migration_scripts",),
+    }
+    
+    def reset_phase(self, phase: int) -> None:
+        """Oublie ce qu'une phase a enregistré (avant de ré-enregistrer ses lots après un retry)."""
+        for name in self._PHASE_FIELDS.get(phase, ()):
+            getattr(self, name).clear()
+            if name in _FIELD_SECTIONS:
+                self._invalidate(_FIELD_SECTIONS[name], reindex=True)
+    
     def mark_phase_deployed(self, phase: int, components: List[str]) -> None:
         """Marque les composants d'une phase comme déployés."""
         self.deployed_components[phase] = components
@@ -186,123 +279,222 @@ class PhaseContextRegistry:
     # CONTEXT RETRIEVAL METHODS
     # ═══════════════════════════════════════════════════════════════
     
-    def get_context_for_batch(self, phase: int, include_previous_batches: bool = True) -> str:
+    def get_context_for_batch(
+        self,
+        phase: int,
+        include_previous_batches: bool = True,
+        tasks: Optional[List[Dict[str, Any]]] = None,
+        token_budget: Optional[int] = None,
+    ) -> str:
         """
         Retourne le contexte à injecter dans le prompt du lot.
         
         Args:
             phase: Numéro de phase (1-6)
             include_previous_batches: Inclure les lots précédents de la même phase
+            tasks: Tâches du lot ; si fourni, seuls les objets, classes et composants
+                qu'elles citent sont détaillés, les autres sont nommés (CTX-INC)
+            token_budget: Budget du contexte sélectionné (défaut CONTEXT_TOKEN_BUDGET)
             
         Returns:
             Contexte formaté pour injection dans le prompt
         """
-        context_parts = []
+        sections = []
         
         if phase == 1 and include_previous_batches:
             if self.generated_objects:
-                context_parts.append(self._format_phase1_partial())
+                sections.append("objects.partial")
         
         elif phase == 2:
-            context_parts.append(self.get_full_data_model())
+            sections.append("objects")
             if include_previous_batches and self.generated_classes:
-                context_parts.append(self.get_class_signatures())
+                sections.append("classes")
         
         elif phase == 3:
-            context_parts.append(self.get_full_data_model())
-            context_parts.append(self.get_class_signatures())
+            sections += ["objects", "classes"]
             if include_previous_batches and self.generated_components:
-                context_parts.append(self.get_component_signatures())
+                sections.append("components")
         
         elif phase == 4:
-            context_parts.append(self.get_full_data_model())
-            context_parts.append(self.get_class_signatures())
+            sections += ["objects", "classes"]
             if include_previous_batches and self.generated_flows:
-                context_parts.append(self._format_phase4_context())
+                sections.append("automation")
         
         elif phase == 5:
-            context_parts.append(self.get_full_data_model())
-            context_parts.append(self.get_class_signatures())
-            context_parts.append(self.get_component_signatures())
-            context_parts.append(self._format_phase4_context())
+            sections += ["objects", "classes", "components", "automation"]
         
         elif phase == 6:
-            context_parts.append(self.get_full_data_model())
-            context_parts.append(self.get_class_signatures())
-            context_parts.append(self.get_component_signatures())
-            context_parts.append(self._format_phase4_context())
-            context_parts.append(self._format_phase5_context())
-        
-        return "\n\n".join(filter(None, context_parts))
+            sections += ["objects", "classes", "components", "automation", "security"]
+        
+        selected = self.select_entries(tasks) if tasks and CONTEXT_RELEVANCE_SELECTION else None
+        if selected is None:
+            return "\n\n".join(filter(None, (self._render(name) for name in sections)))
+        
+        total = (token_budget or CONTEXT_TOKEN_BUDGET) * 4
+        rendered = {name: self._render(name) for name in sections if name not in self._DETAILED_SECTIONS}
+        detailed = [name for name in sections if name in self._DETAILED_SECTIONS]
+        # Part garantie par section detaillee ; ce qu'une section n'utilise pas passe aux suivantes.
+        floor = total // max(1, len(detailed))
+        remaining = total - sum(len(text) for text in rendered.values())
+        for i, name in enumerate(detailed):
+            share = max(remaining // (len(detailed) - i), floor)
+            rendered[name] = self._render_selected(name, selected, share)
+            remaining -= len(rendered[name])
+        return "\n\n".join(filter(None, (rendered[name] for name in sections)))
     
     def get_full_data_model(self) -> str:
         """Retourne le modèle de données complet (Phase 1)."""
-        if not self.generated_objects:
-            return ""
-        
-        lines = ["## MODÈLE DE DONNÉES DISPONIBLE (Phase 1 déployée)", ""]
-        
-        for obj in self.generated_objects:
-            lines.append(f"### {obj}")
-            
-            fields = self.generated_fields.get(obj, [])
-            if fields:
-                lines.append("**Champs:** " + ", ".join(fields))
-            
-            rts = self.generated_record_types.get(obj, [])
-            if rts:
-                lines.append("**Record Types:** " + ", ".join(rts))
-            
-            lines.append("")
-        
-        if self.generated_validation_rules:
-            lines.append("### Validation Rules")
-            for vr in self.generated_validation_rules:
-                lines.append(f"  - {vr}")
-            lines.append("")
-        
-        lines.append("⚠️ UTILISEZ UNIQUEMENT ces objets et champs dans vos requêtes SOQL/SOSL.")
-        
-        return "\n".join(lines)
+        return self._render("objects")
     
     def get_class_signatures(self) -> str:
         """Retourne les signatures des classes Apex (Phase 2)."""
-        if not self.generated_classes and not self.generated_triggers:
-            return ""
-        
-        lines = ["## CLASSES APEX DISPONIBLES (Phase 2 déployée)", ""]
-        
-        for class_name, methods in self.generated_classes.items():
-            lines.append(f"### {class_name}")
-            if methods:
-                lines.append("**Méthodes:** " + ", ".join(methods))
-            lines.append("")
-        
-        if self.generated_triggers:
-            lines.append("### Triggers: " + ", ".join(self.generated_triggers))
-            lines.append("")
-        
-        lines.append("⚠️ Vous pouvez appeler ces classes. NE LES REDÉFINISSEZ PAS.")
-        
-        return "\n".join(lines)
+        return self._render("classes")
     
     def get_component_signatures(self) -> str:
         """Retourne les signatures des composants LWC (Phase 3)."""
-        if not self.generated_components:
-            return ""
-        
-        lines = ["## COMPOSANTS LWC DISPONIBLES (Phase 3 déployée)", ""]
-        
-        for comp_name, props in self.generated_components.items():
-            lines.append(f"### {comp_name}")
-            if props:
-                lines.append("**Props @api:** " + ", ".join(props))
-            lines.append("")
-        
-        return "\n".join(lines)
+        return self._render("components")
     
     def _format_phase1_partial(self) -> str:
         """Contexte partiel Phase 1 (pour lots suivants de Phase 1)."""
+        return self._render("objects.partial")
+    
+    def _format_phase4_context(self) -> str:
+        """Contexte Phase 4 (Flows et VRs complexes)."""
+        return self._render("automation")
+    
+    def _format_phase5_context(self) -> str:
+        """Contexte Phase 5 (Security)."""
+        return self._render("security")
+    
+    # ═══════════════════════════════════════════════════════════════
+    # RENDERING (CTX-INC)
+    # ═══════════════════════════════════════════════════════════════
+    
+    # Sections detaillees entree par entree : (titre, consigne finale, libelle des entrees non detaillees,
+    # consigne finale quand certaines entrees ne sont que nommees)
+    _DETAILED_SECTIONS = {
+        "objects": ("## MODÈLE DE DONNÉES DISPONIBLE (Phase 1 déployée)",
+                    "⚠️ UTILISEZ UNIQUEMENT ces objets et champs dans vos requêtes SOQL/SOSL.",
+                    "**Autres objets (champs non détaillés):** ",
+                    "⚠️ Utilisez uniquement les objets de cette section dans vos requêtes SOQL/SOSL. "
+                    "Les champs détaillés ci-dessus sont garantis ; les autres objets existent mais leurs "
+                    "champs ne sont pas listés : si le lot en a besoin, signalez-le dans vos notes "
+                    "plutôt que d'inventer des noms de champs."),
+        "classes": ("## CLASSES APEX DISPONIBLES (Phase 2 déployée)",
+                    "⚠️ Vous pouvez appeler ces classes. NE LES REDÉFINISSEZ PAS.",
+                    "**Autres classes:** ",
+                    "⚠️ Vous pouvez appeler ces classes (méthodes détaillées ci-dessus) ; les autres classes "
+                    "existent aussi. NE REDÉFINISSEZ AUCUNE d'entre elles."),
+        "components": ("## COMPOSANTS LWC DISPONIBLES (Phase 3 déployée)", None,
+                       "**Autres composants:** ", None),
+    }
+    
+    def _render(self, name: str) -> str:
+        """Rendu complet d'une section, recalculé seulement après invalidation."""
+        text = self._sections.get(name)
+        if text is None:
+            text = self._sections[name] = self._RENDERERS[name](self)
+        return text
+    
+    def _entries(self, section: str) -> List[str]:
+        if section == "objects":
+            return self.generated_objects
+        if section == "classes":
+            return list(self.generated_classes)
+        return list(self.generated_components)
+    
+    def _block(self, section: str, entry: str) -> str:
+        """Bloc Markdown d'une entrée (objet, classe, composant), en cache jusqu'à sa modification."""
+        key = (section, entry)
+        block = self._blocks.get(key)
+        if block is None:
+            lines = [f"### {entry}"]
+            if section == "objects":
+                fields = self.generated_fields.get(entry, [])
+                if fields:
+                    lines.append("**Champs:** " + ", ".join(fields))
+                rts = self.generated_record_types.get(entry, [])
+                if rts:
+                    lines.append("**Record Types:** " + ", ".join(rts))
+            elif section == "classes":
+                methods = self.generated_classes.get(entry, [])
+                if methods:
+                    lines.append("**Méthodes:** " + ", ".join(methods))
+            else:
+                props = self.generated_components.get(entry, [])
+                if props:
+                    lines.append("**Props @api:** " + ", ".join(props))
+            block = self._blocks[key] = "\n".join(lines)
+        return block
+    
+    def _section_tail(self, section: str, detailed: Optional[Set[str]] = None) -> List[str]:
+        """Lignes après les blocs : validation rules (de ``detailed`` si fourni) ou triggers."""
+        if section == "objects" and self.generated_validation_rules:
+            vrs = [vr for vr in self.generated_validation_rules
+                   if detailed is None or vr.split(".", 1)[0] in detailed]
+            if vrs:
+                return ["### Validation Rules"] + [f"  - {vr}" for vr in vrs] + [""]
+        if section == "classes" and self.generated_triggers:
+            return ["### Triggers: " + ", ".join(self.generated_triggers), ""]
+        return []
+    
+    def _render_detailed(self, section: str) -> str:
+        entries = self._entries(section)
+        tail = self._section_tail(section)
+        if not entries and not tail:
+            return ""
+        title, footer, _, _ = self._DETAILED_SECTIONS[section]
+        lines = [title, ""]
+        for entry in entries:
+            lines += [self._block(section, entry), ""]
+        lines += tail
+        if footer:
+            lines.append(footer)
+        return "\n".join(lines)
+    
+    def _render_selected(self, section: str, selected: Set[Tuple[str, str]], budget: int) -> str:
+        """
+        Section réduite : blocs des entrées citées par le lot tant que le budget
+        (en caractères) le permet, simple liste de noms pour les autres.
+        """
+        entries = self._entries(section)
+        if not entries:
+            return self._render_detailed(section)
+        title, footer, others_label, partial_footer = self._DETAILED_SECTIONS[section]
+        wanted = {entry for kind, entry in selected if kind == section}
+        if not selected:
+            wanted = set(entries)            # lot sans reference connue : tout, dans la limite du budget
+        
+        lines = [title, ""]
+        used = len(title) + len(partial_footer or footer or "") + 4
+        detailed, others = set(), []
+        for entry in entries:
+            if entry in wanted:
+                block = self._block(section, entry)
+                if used + len(block) + 2 <= budget:
+                    lines += [block, ""]
+                    used += len(block) + 2
+                    detailed.add(entry)
+                    continue
+            others.append(entry)
+        tail = self._section_tail(section, detailed)
+        lines += tail
+        used += sum(len(line) + 1 for line in tail)
+        if others:
+            shown, room = [], max(0, budget - used - len(others_label) - 20)
+            for entry in others:
+                if room < len(entry) + 2:
+                    break
+                shown.append(entry)
+                room -= len(entry) + 2
+            rest = len(others) - len(shown)
+            lines += [others_label + ", ".join(shown) + (f" … (+{rest})" if rest else ""), ""]
+            footer = partial_footer or footer
+        if footer:
+            lines.append(footer)
+        return "\n".join(lines)
+    
+    def _render_phase1_partial(self) -> str:
         if not self.generated_objects:
             return ""
         
@@ -313,8 +505,7 @@ class PhaseContextRegistry:
         
         return "\n".join(lines)
     
-    def _format_phase4_context(self) -> str:
-        """Contexte Phase 4 (Flows et VRs complexes)."""
+    def _render_automation(self) -> str:
         if not self.generated_flows and not self.generated_complex_vrs:
             return ""
         
@@ -327,8 +518,7 @@ class PhaseContextRegistry:
         
         return "\n".join(lines)
     
-    def _format_phase5_context(self) -> str:
-        """Contexte Phase 5 (Security)."""
+    def _render_security(self) -> str:
         if not self.generated_permission_sets and not self.generated_profiles:
             return ""
         
@@ -341,6 +531,52 @@ class PhaseContextRegistry:
         
         return "\n".join(lines)
     
+    _RENDERERS = {
+        "objects": lambda self: self._render_detailed("objects"),
+        "objects.partial": _render_phase1_partial,
+        "classes": lambda self: self._render_detailed("classes"),
+        "components": lambda self: self._render_detailed("components"),
+        "automation": _render_automation,
+        "security": _render_security,
+    }
+    
+    # ═══════════════════════════════════════════════════════════════
+    # RELEVANCE SELECTION (CTX-INC)
+    # ═══════════════════════════════════════════════════════════════
+    
+    def _name_index(self) -> Dict[str, Set[Tuple[str, str]]]:
+        """Index nom (minuscules, avec et sans __c) → entrées ; reconstruit seulement après reset / réaffectation."""
+        if self._index is None:
+            self._index = {}
+            for obj in self.generated_objects:
+                self._index_add("objects", obj, *self.generated_fields.get(obj, []))
+            for obj, fields in self.generated_fields.items():
+                if obj not in self.generated_objects:
+                    self._index_add("objects", obj, *fields)
+            for class_name in self.generated_classes:
+                self._index_add("classes", class_name)
+            for component_name in self.generated_components:
+                self._index_add("components", component_name)
+        return self._index
+    
+    def select_entries(self, tasks: List[Dict[str, Any]]) -> Set[Tuple[str, str]]:
+        """Entrées ``(section, nom)`` citées par les tâches d'un lot."""
+        index = self._name_index()
+        selected: Set[Tuple[str, str]] = set()
+        for task in tasks or []:
+            for key in _TASK_TEXT_KEYS:
+                value = task.get(key)
+                if isinstance(value, (list, tuple)):
+                    value = " ".join(str(v) for v in value)
+                if not value:
+                    continue
+                for token in _NAME_TOKEN_RE.findall(str(value)):
+                    hits = index.get(token.lower(), ())
+                    # Un nom porte par beaucoup d'entrees (Status__c, Name...) ne designe rien.
+                    if len(hits) <= _AMBIGUOUS_NAME_HITS:
+                        selected.update(hits)
+        return selected
+    
     # ═══════════════════════════════════════════════════════════════
     # EXTRACTION HELPERS
     # ═══════════════════════════════════════════════════════════════
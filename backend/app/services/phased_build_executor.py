@@ -2,18 +2,66 @@
 Phased Build Executor - BUILD v2
 Orchestrateur principal du BUILD par phases.
 """
+import asyncio
+import copy
+import functools
 import logging
 import json
-from typing import Dict, List, Any, Optional
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Set
 from datetime import datetime
 from enum import Enum
 
+from app.config import settings
 from app.services.phase_context_registry import PhaseContextRegistry
 from app.services.phase_aggregator import PhaseAggregator
 from app.services.jordan_deploy_service import JordanDeployService, PHASE_CONFIGS
+from app.services.llm_router_service import LLMCancelScope, run_in_cancel_scope
 
 logger = logging.getLogger(__name__)
 
+# BATCH-DAG: lots d'une meme phase generes en parallele, dans l'ordre de leurs
+# dependances reelles (lookup entre objets, classe qui en appelle une autre...).
+# BUILD_BATCH_MAX_CONCURRENCY = 1 restaure la boucle sequentielle historique.
+BUILD_BATCH_MAX_CONCURRENCY = 4
+
+# PIPE-BUILD: generer la phase N+1 pendant le deploiement de la phase N.
+# Desactive par defaut (sandbox partagee) ; settings.BUILD_PIPELINED (env) pour
+# toute l'instance, ou par build : PhasedBuildExecutor(..., pipelined=True).
+BUILD_PIPELINED = settings.BUILD_PIPELINED
+
+# DEPLOY-DIFF: redeployer chaque phase en entier, sans diff contre le manifest
+# (org modifiee a la main). Par build : PhasedBuildExecutor(..., force_deploy=True).
+BUILD_FORCE_DEPLOY = False
+
+# Champs de tache qui nomment ce que le lot PRODUIT (objet, classe, composant).
+_BATCH_PROVIDES_KEYS = ("target_object", "object_name", "object", "class_name", "component_name", "api_name", "name")
+# Champs de tache ou chercher des references a ce que produisent les AUTRES lots.
+_BATCH_REFERENCE_KEYS = ("description", "formula", "details", "acceptance_criteria", "technical_notes")
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+
+# BUILD-OFFLOAD: les generateurs d'agents (generate_build / generate_build_v2)
+# sont synchrones et durent plusieurs minutes. Ils tournent dans ce pool,
+# partage par toutes les executions du worker ARQ (max_jobs = 10), pour ne
+# jamais bloquer la boucle asyncio.
+BUILD_AGENT_MAX_THREADS = 8
+
+_agent_pool: Optional[ThreadPoolExecutor] = None
+_agent_pool_lock = threading.Lock()
+
+
+def _get_agent_pool() -> ThreadPoolExecutor:
+    global _agent_pool
+    if _agent_pool is None:
+        with _agent_pool_lock:
+            if _agent_pool is None:
+                _agent_pool = ThreadPoolExecutor(max_workers=BUILD_AGENT_MAX_THREADS,
+                                                 thread_name_prefix="build-agent")
+    return _agent_pool
+
 
 class PhaseStatus(str, Enum):
     PENDING = "pending"
@@ -134,7 +182,8 @@ TASK_TYPE_TO_PHASE = {
 class PhasedBuildExecutor:
     """
     Orchestrateur principal du BUILD v2.
-    Exécute les 6 phases séquentiellement avec sub-batching.
+    Exécute les 6 phases séquentiellement avec sub-batching
+    (ou en pipeline génération / déploiement, voir BUILD_PIPELINED).
     """
     
     BUILD_PHASES = [
@@ -148,10 +197,16 @@ class PhasedBuildExecutor:
     
     MAX_RETRIES = 3
     
-    def __init__(self, project_id: int, execution_id: int, db):
+    def __init__(self, project_id: int, execution_id: int, db,
+                 batch_concurrency: int = BUILD_BATCH_MAX_CONCURRENCY,
+                 pipelined: Optional[bool] = None,
+                 force_deploy: bool = BUILD_FORCE_DEPLOY):
         self.project_id = project_id
         self.execution_id = execution_id
         self.db = db
+        self.batch_concurrency = batch_concurrency
+        self.pipelined = BUILD_PIPELINED if pipelined is None else pipelined
+        self.force_deploy = force_deploy
         
         self.context_registry = PhaseContextRegistry()
         self.aggregator = PhaseAggregator()
@@ -179,13 +234,20 @@ class PhasedBuildExecutor:
         """
         Exécute le BUILD complet.
         
+        Mode séquentiel (défaut) : chaque phase passe par génération →
+        agrégation → review → branche/PR/déploiement avant la suivante.
+        Mode pipeline (``pipelined=True``, PIPE-BUILD) : la génération de la
+        phase N+1 démarre dès que l'agrégat de la phase N est enregistré dans
+        le registre de contexte, pendant que la phase N se déploie.
+        
         Args:
             wbs_tasks: Liste des tâches WBS
             
         Returns:
             Résultat global du BUILD
         """
-        logger.info(f"[PhasedBuild] Starting BUILD with {len(wbs_tasks)} tasks")
+        logger.info(f"[PhasedBuild] Starting BUILD with {len(wbs_tasks)} tasks "
+                    f"({'pipelined' if self.pipelined else 'sequential'})")
         
         result = {
             "success": True,
@@ -198,45 +260,37 @@ class PhasedBuildExecutor:
         }
         
         start_time = datetime.now()
+        wall_start = time.perf_counter()
         
         try:
             # Group tasks by phase
             tasks_by_phase = self.group_tasks_by_phase(wbs_tasks)
             logger.info(f"[PhasedBuild] Tasks grouped: {[(p, len(t)) for p, t in tasks_by_phase.items()]}")
             
-            # Execute each phase sequentially
-            for phase_config in self.BUILD_PHASES:
-                phase_num = phase_config["phase"]
-                phase_name = phase_config["name"]
-                
-                phase_tasks = tasks_by_phase.get(phase_num, [])
-                if not phase_tasks:
-                    logger.info(f"[PhasedBuild] Phase {phase_num} ({phase_name}): no tasks, skipping")
-                    continue
-                
-                self.current_phase = phase_num
-                logger.info(f"[PhasedBuild] Phase {phase_num} ({phase_name}): {len(phase_tasks)} tasks")
-                
-                # Update phase status in DB
-                await self._update_phase_status(phase_num, phase_name, PhaseStatus.GENERATING)
-                
-                # Execute phase
-                phase_result = await self.execute_phase(phase_config, phase_tasks)
-                self.phase_results[phase_num] = phase_result
-                result["phase_results"][phase_num] = phase_result
-                
-                if phase_result.get("success"):
-                    result["phases_completed"] += 1
-                    result["deployed_components"].extend(phase_result.get("deployed_components", []))
-                    await self._update_phase_status(phase_num, phase_name, PhaseStatus.COMPLETED)
-                else:
-                    result["phases_failed"] += 1
-                    result["success"] = False
-                    await self._update_phase_status(phase_num, phase_name, PhaseStatus.FAILED, 
-                                                    error=phase_result.get("error"))
-                    # Stop on failure
-                    logger.error(f"[PhasedBuild] Phase {phase_num} failed, stopping BUILD")
-                    break
+            if self.pipelined:
+                await self._execute_phases_pipelined(tasks_by_phase, result)
+            else:
+                # Execute each phase sequentially
+                for phase_config in self.BUILD_PHASES:
+                    phase_num = phase_config["phase"]
+                    phase_name = phase_config["name"]
+                    
+                    phase_tasks = tasks_by_phase.get(phase_num, [])
+                    if not phase_tasks:
+                        logger.info(f"[PhasedBuild] Phase {phase_num} ({phase_name}): no tasks, skipping")
+                        continue
+                    
+                    self.current_phase = phase_num
+                    logger.info(f"[PhasedBuild] Phase {phase_num} ({phase_name}): {len(phase_tasks)} tasks")
+                    
+                    # Update phase status in DB
+                    await self._update_phase_status(phase_num, phase_name, PhaseStatus.GENERATING)
+                    
+                    # Execute phase
+                    phase_result = await self.execute_phase(phase_config, phase_tasks)
+                    if not await self._record_phase_result(phase_config, phase_result, result):
+                        # Stop on failure
+                        break
             
             # Final packaging if all phases succeeded
             if result["success"] and result["phases_completed"] > 0:
@@ -251,12 +305,108 @@ class PhasedBuildExecutor:
             result["error"] = str(e)
         
         result["total_time_seconds"] = (datetime.now() - start_time).total_seconds()
+        result["timings"] = self._build_timings(result, time.perf_counter() - wall_start)
         
         logger.info(f"[PhasedBuild] BUILD complete: {result['phases_completed']} phases, "
-                   f"success={result['success']}, time={result['total_time_seconds']:.1f}s")
+                   f"success={result['success']}, time={result['total_time_seconds']:.1f}s, "
+                   f"stages={result['timings']['stages']}")
         
         return result
     
+    async def _record_phase_result(self, phase_config: Dict, phase_result: Dict, result: Dict) -> bool:
+        """Reporte le résultat d'une phase dans le résultat global. Retourne False si le BUILD doit s'arrêter."""
+        phase_num = phase_config["phase"]
+        phase_name = phase_config["name"]
+        self.phase_results[phase_num] = phase_result
+        result["phase_results"][phase_num] = phase_result
+        
+        if phase_result.get("success"):
+            result["phases_completed"] += 1
+            result["deployed_components"].extend(phase_result.get("deployed_components", []))
+            await self._update_phase_status(phase_num, phase_name, PhaseStatus.COMPLETED)
+            return True
+        
+        result["phases_failed"] += 1
+        result["success"] = False
+        await self._update_phase_status(phase_num, phase_name, PhaseStatus.FAILED,
+                                        error=phase_result.get("error"))
+        logger.error(f"[PhasedBuild] Phase {phase_num} failed, stopping BUILD")
+        return False
+    
+    async def _execute_phases_pipelined(self, tasks_by_phase: Dict[int, List[Dict]], result: Dict) -> None:
+        """
+        PIPE-BUILD : génère la phase N+1 pendant le déploiement de la phase N.
+        
+        Les déploiements restent strictement séquentiels (une seule branche
+        git / un seul déploiement à la fois). Si le déploiement de la phase N
+        échoue, la génération de N+1 est annulée (ou son résultat écarté),
+        le registre de contexte est restauré à son état d'avant N+1 et la
+        phase N+1 repasse en attente : rien de ce qui s'appuyait sur N n'est
+        déployé.
+        """
+        shipping: Optional[asyncio.Task] = None          # déploiement en cours (phase N)
+        shipping_config: Optional[Dict] = None
+        
+        async def finish_shipping() -> bool:
+            phase_result = await shipping
+            return await self._record_phase_result(shipping_config, phase_result, result)
+        
+        for phase_config in self.BUILD_PHASES:
+            phase_num = phase_config["phase"]
+            phase_name = phase_config["name"]
+            phase_tasks = tasks_by_phase.get(phase_num, [])
+            if not phase_tasks:
+                logger.info(f"[PhasedBuild] Phase {phase_num} ({phase_name}): no tasks, skipping")
+                continue
+            
+            self.current_phase = phase_num
+            logger.info(f"[PhasedBuild] Phase {phase_num} ({phase_name}): {len(phase_tasks)} tasks")
+            await self._update_phase_status(phase_num, phase_name, PhaseStatus.GENERATING)
+            
+            registry_before = copy.deepcopy(self.context_registry)
+            preparing = asyncio.create_task(self._prepare_phase(phase_config, phase_tasks))
+            
+            if shipping is not None:
+                if not await finish_shipping():
+                    # Rollback : la phase N+1 reposait sur un deploiement qui a echoue.
+                    preparing.cancel()
+                    try:
+                        await preparing
+                    except asyncio.CancelledError:
+                        pass
+                    self.context_registry = registry_before
+                    await self._update_phase_status(
+                        phase_num, phase_name, PhaseStatus.PENDING,
+                        error=f"Rolled back: phase {shipping_config['phase']} deploy failed",
+                    )
+                    result["rolled_back_phases"] = [phase_num]
+                    return
+                shipping = None
+            
+            phase_result, aggregated = await preparing
+            if aggregated is None:
+                await self._record_phase_result(phase_config, phase_result, result)
+                return
+            shipping_config = phase_config
+            shipping = asyncio.create_task(self._ship_phase(phase_config, phase_tasks, aggregated, phase_result))
+        
+        if shipping is not None:
+            await finish_shipping()
+    
+    def _build_timings(self, result: Dict, wall_seconds: float) -> Dict[str, Any]:
+        """PIPE-BUILD : temps cumulés par étape (toutes phases) et temps réel du BUILD."""
+        stages: Dict[str, float] = {}
+        for phase_result in result["phase_results"].values():
+            for stage, seconds in (phase_result.get("timings") or {}).items():
+                stages[stage] = round(stages.get(stage, 0.0) + seconds, 3)
+        return {
+            "mode": "pipelined" if self.pipelined else "sequential",
+            "stages": stages,
+            "wall_seconds": round(wall_seconds, 3),
+            # > 0 en mode pipeline : temps de deploiement recouvert par la generation
+            "overlap_seconds": round(max(0.0, sum(stages.values()) - wall_seconds), 3),
+        }
+    
     async def execute_phase(self, phase_config: Dict, tasks: List[Dict]) -> Dict[str, Any]:
         """
         Exécute une phase complète.
@@ -267,6 +417,18 @@ class PhasedBuildExecutor:
         3. Elena review
         4. Jordan deploy
         """
+        result, aggregated = await self._prepare_phase(phase_config, tasks)
+        if aggregated is None:
+            return result
+        return await self._ship_phase(phase_config, tasks, aggregated, result)
+    
+    async def _prepare_phase(self, phase_config: Dict, tasks: List[Dict]):
+        """
+        Étapes 1-3 d'une phase : génération, agrégation, review (avec retries).
+        
+        Returns:
+            (résultat de phase, agrégat validé — None si la phase a échoué)
+        """
         phase_num = phase_config["phase"]
         phase_name = phase_config["name"]
         agent = phase_config["agent"]
@@ -278,27 +440,46 @@ class PhasedBuildExecutor:
             "success": False,
             "batches": [],
             "deployed_components": [],
+            "timings": {"generate": 0.0, "aggregate": 0.0, "review": 0.0},
         }
+        timings = result["timings"]
         
         retry_count = 0
         retry_feedback = ""
+        task_batches = self._create_task_batches(tasks, phase_num)
+        batch_results: Optional[List[Optional[Dict]]] = None
+        retry_batches: Optional[Set[int]] = None      # RETRY-INC : None = toute la phase
+        feedback_by_batch: Dict[int, str] = {}
         
         while retry_count < self.MAX_RETRIES:
             try:
                 # Step 1: Generate batches
                 await self._update_phase_status(phase_num, phase_name, PhaseStatus.GENERATING)
                 
-                batches = await self.generate_phase_batches(agent, tasks, phase_num, retry_feedback)
+                t0 = time.perf_counter()
+                if batch_results is None or retry_batches is None:
+                    batch_results = await self._generate_batches(agent, task_batches, phase_num, retry_feedback)
+                else:
+                    logger.info(f"[PhasedBuild] Phase {phase_num}: regenerating batches "
+                                f"{sorted(i + 1 for i in retry_batches)} of {len(task_batches)}")
+                    batch_results = await self._generate_batches(
+                        agent, task_batches, phase_num, retry_feedback,
+                        only=retry_batches, previous=batch_results, feedback_by_batch=feedback_by_batch,
+                    )
+                timings["generate"] += time.perf_counter() - t0
+                result["regenerated_batches"] = len(task_batches) if retry_batches is None else len(retry_batches)
+                batches = [b for b in batch_results if b]
                 result["batches"] = batches
                 result["total_batches"] = len(batches)
                 
                 if not batches:
                     result["error"] = "No batches generated"
-                    return result
+                    return result, None
                 
                 # Step 2: Aggregate
                 await self._update_phase_status(phase_num, phase_name, PhaseStatus.AGGREGATING)
                 
+                t0 = time.perf_counter()
                 aggregated = self.aggregator.aggregate(phase_num, batches)
                 result["aggregated"] = {
                     "operations_count": len(aggregated.get("operations", [])),
@@ -307,11 +488,14 @@ class PhasedBuildExecutor:
                 
                 # Register in context for subsequent phases
                 self.context_registry.register_batch_output(phase_num, aggregated)
+                timings["aggregate"] += time.perf_counter() - t0
                 
                 # Step 3: Elena review
                 await self._update_phase_status(phase_num, phase_name, PhaseStatus.REVIEWING)
                 
+                t0 = time.perf_counter()
                 review_result = await self._elena_review(phase_num, aggregated)
+                timings["review"] += time.perf_counter() - t0
                 result["review"] = review_result
                 
                 if review_result.get("verdict") == "FAIL":
@@ -319,57 +503,18 @@ class PhasedBuildExecutor:
                     logger.warning(f"[PhasedBuild] Phase {phase_num} review FAIL, retry {retry_count}/{self.MAX_RETRIES}")
                     retry_feedback = review_result.get("feedback_for_developer", "") or ""
                     result["retry_feedback"] = retry_feedback
+                    retry_batches, feedback_by_batch = self._resolve_retry_batches(
+                        phase_num, review_result, batch_results, retry_feedback
+                    )
                     
                     if retry_count >= self.MAX_RETRIES:
                         result["error"] = f"Review failed after {self.MAX_RETRIES} retries"
-                        return result
+                        return result, None
                     
                     # Retry with feedback
                     continue
                 
-                # Step 4: Create PR and deploy via Jordan
-                await self._update_phase_status(phase_num, phase_name, PhaseStatus.DEPLOYING)
-                
-                # Create branch and PR
-                branch_result = await self.jordan_service.create_phase_branch(phase_num, phase_name)
-                branch_name = branch_result.get("branch_name", f"build/phase-{phase_num}")
-                
-                # Write files to branch
-                files_to_commit = aggregated.get("files", {})
-                if files_to_commit:
-                    await self.jordan_service.commit_files(
-                        files_to_commit,
-                        f"feat(phase-{phase_num}): {phase_name} - {len(files_to_commit)} files"
-                    )
-                
-                # Create PR
-                pr_result = await self.jordan_service.create_phase_pr(
-                    branch_name, phase_num, phase_name,
-                    len(files_to_commit)
-                )
-                result["pr"] = pr_result
-                
-                # Deploy
-                deploy_result = await self.jordan_service.deploy_phase(
-                    phase_num,
-                    aggregated,
-                    branch_name,
-                    pr_result.get("url")
-                )
-                result["deploy"] = deploy_result
-                
-                if deploy_result.get("success"):
-                    result["success"] = True
-                    result["deployed_components"] = deploy_result.get("deployed_components", [])
-                    
-                    # Mark tasks as completed
-                    await self._mark_tasks_completed(tasks)
-                    
-                    logger.info(f"[PhasedBuild] Phase {phase_num} completed successfully")
-                    return result
-                else:
-                    result["error"] = deploy_result.get("error", "Deploy failed")
-                    return result
+                return result, aggregated
                 
             except Exception as e:
                 logger.exception(f"[PhasedBuild] Phase {phase_num} error")
@@ -377,7 +522,63 @@ class PhasedBuildExecutor:
                 result["error"] = str(e)
                 
                 if retry_count >= self.MAX_RETRIES:
-                    return result
+                    return result, None
+        
+        return result, None
+    
+    async def _ship_phase(self, phase_config: Dict, tasks: List[Dict], aggregated: Dict, result: Dict) -> Dict[str, Any]:
+        """Étape 4 d'une phase : branche, commit, PR et déploiement via Jordan."""
+        phase_num = phase_config["phase"]
+        phase_name = phase_config["name"]
+        t0 = time.perf_counter()
+        try:
+            await self._update_phase_status(phase_num, phase_name, PhaseStatus.DEPLOYING)
+            
+            # Create branch and PR
+            branch_result = await self.jordan_service.create_phase_branch(phase_num, phase_name)
+            branch_name = branch_result.get("branch_name", f"build/phase-{phase_num}")
+            
+            # Write files to branch
+            files_to_commit = aggregated.get("files", {})
+            if files_to_commit:
+                await self.jordan_service.commit_files(
+                    files_to_commit,
+                    f"feat(phase-{phase_num}): {phase_name} - {len(files_to_commit)} files"
+                )
+            
+            # Create PR
+            pr_result = await self.jordan_service.create_phase_pr(
+                branch_name, phase_num, phase_name,
+                len(files_to_commit)
+            )
+            result["pr"] = pr_result
+            
+            # Deploy
+            deploy_result = await self.jordan_service.deploy_phase(
+                phase_num,
+                aggregated,
+                branch_name,
+                pr_result.get("url"),
+                force=self.force_deploy,
+            )
+            result["deploy"] = deploy_result
+            
+            if deploy_result.get("success"):
+                result["success"] = True
+                result["deployed_components"] = deploy_result.get("deployed_components", [])
+                
+                # Mark tasks as completed
+                await self._mark_tasks_completed(tasks)
+                
+                logger.info(f"[PhasedBuild] Phase {phase_num} completed successfully")
+            else:
+                result["error"] = deploy_result.get("error", "Deploy failed")
+                
+        except Exception as e:
+            logger.exception(f"[PhasedBuild] Phase {phase_num} deploy error")
+            result["error"] = str(e)
+        finally:
+            result.setdefault("timings", {})["deploy"] = time.perf_counter() - t0
         
         return result
     
@@ -414,42 +615,226 @@ class PhasedBuildExecutor:
             phase: Numéro de phase
             
         Returns:
-            Liste des outputs de lots
+            Liste des outputs de lots (dans l'ordre des lots, pas de fin)
         """
-        batches = []
-        
-        # Get context for this phase
-        context = self.context_registry.get_context_for_batch(phase)
-        
         # Group tasks into batches (1 object/class/component per batch)
         task_batches = self._create_task_batches(tasks, phase)
+        results = await self._generate_batches(agent, task_batches, phase, retry_feedback)
+        return [r for r in results if r]
+    
+    async def _generate_batches(
+        self,
+        agent: str,
+        task_batches: List[List[Dict]],
+        phase: int,
+        retry_feedback: str = "",
+        only: Optional[Set[int]] = None,
+        previous: Optional[List[Optional[Dict]]] = None,
+        feedback_by_batch: Optional[Dict[int, str]] = None,
+    ) -> List[Optional[Dict]]:
+        """
+        Génère les lots ``task_batches`` ; résultat indexé comme eux (None = lot en échec).
+        
+        BATCH-DAG : les lots indépendants partent en parallèle (au plus
+        ``self.batch_concurrency`` à la fois) ; un lot qui dépend d'un autre
+        attend seulement ses prérequis, puis lit un contexte qui les contient.
         
-        logger.info(f"[PhasedBuild] Generating {len(task_batches)} batches for phase {phase}")
+        RETRY-INC : avec ``only``, seuls ces lots sont régénérés ; les autres
+        reprennent leur résultat de ``previous`` et comptent comme déjà faits.
+        """
+        total = len(task_batches)
+        dependencies = self._build_batch_dependencies(task_batches)
+        selected = set(range(total)) if only is None else set(only)
+        
+        logger.info(
+            f"[PhasedBuild] Generating {len(selected)}/{total} batches for phase {phase} "
+            f"({sum(len(d) for d in dependencies.values())} dependencies, "
+            f"concurrency={self.batch_concurrency})"
+        )
+        
+        results: List[Optional[Dict]] = [None] * total
+        finished = [asyncio.Event() for _ in range(total)]
+        for i in range(total):
+            if i not in selected:
+                results[i] = previous[i] if previous else None
+                finished[i].set()
+        if only is not None:
+            # Le contexte de la phase ne doit plus contenir les sorties rejetees.
+            self.context_registry.reset_phase(phase)
+            for kept in results:
+                if kept:
+                    self.context_registry.register_batch_output(phase, kept)
+        done = sum(1 for r in results if r)
         # FIX-BATCHPROG-001 (02/08) : publier l'avancement lot par lot. Sans cela
         # l'interface affiche 0/0 pendant toute la phase (20-25 min) et parait figee.
-        self._publish_batch_progress(phase, 0, len(task_batches))
+        self._publish_batch_progress(phase, done, total)
+        semaphore = asyncio.Semaphore(max(1, self.batch_concurrency))
         
-        for i, batch_tasks in enumerate(task_batches):
-            logger.debug(f"[PhasedBuild] Generating batch {i+1}/{len(task_batches)}")
-            
+        async def run_batch(i: int) -> None:
+            nonlocal done
             try:
-                batch_result = await self._generate_single_batch(
-                    agent, batch_tasks, phase, context, retry_feedback
-                )
-                
+                for dep in dependencies[i]:
+                    await finished[dep].wait()
+                async with semaphore:
+                    logger.debug(f"[PhasedBuild] Generating batch {i+1}/{total}")
+                    # Contexte lu au demarrage du lot : il contient deja ses prerequis.
+                    # CTX-INC : seules les entrees citees par ses taches sont detaillees.
+                    context = self.context_registry.get_context_for_batch(phase, tasks=task_batches[i])
+                    batch_result = await self._generate_single_batch(
+                        agent, task_batches[i], phase, context,
+                        (feedback_by_batch or {}).get(i, retry_feedback)
+                    )
                 if batch_result:
-                    batches.append(batch_result)
-                    self._publish_batch_progress(phase, len(batches), len(task_batches))
-                    
+                    results[i] = batch_result
                     # Update context with this batch's output
                     self.context_registry.register_batch_output(phase, batch_result)
-                    context = self.context_registry.get_context_for_batch(phase)
-                    
+                    done += 1
+                    self._publish_batch_progress(phase, done, total)
+                elif any(i in dependencies[j] for j in selected):
+                    logger.warning(f"[PhasedBuild] Batch {i+1} produced nothing; dependent batches run without it")
             except Exception as e:
                 logger.error(f"[PhasedBuild] Batch {i+1} failed: {e}")
                 # Continue with other batches
+            finally:
+                finished[i].set()
+        
+        await asyncio.gather(*(run_batch(i) for i in sorted(selected)))
+        return results
+    
+    # Severites qui font echouer la review ; les autres ne justifient pas un retry de lot.
+    _BLOCKING_SEVERITIES = ("critical", "high", "major", "error")
+    
+    def _resolve_retry_batches(
+        self,
+        phase: int,
+        review: Dict,
+        batch_results: List[Optional[Dict]],
+        retry_feedback: str,
+    ):
+        """
+        RETRY-INC : lots à régénérer après un verdict FAIL.
+        
+        Chaque problème bloquant est rattaché aux lots qui l'ont produit via
+        la provenance de l'agrégat (voir ``_issue_batches``) ; en cas
+        d'égalité, tous les lots candidats sont repris. Les lots sans résultat
+        sont toujours repris. Si un problème bloquant ne se rattache à aucun
+        lot (review en erreur, plan global...), toute la phase est régénérée
+        comme avant.
+        
+        Returns:
+            (indices des lots à régénérer ou None pour toute la phase,
+             feedback propre à chaque lot régénéré)
+        """
+        issues = [i for i in review.get("issues") or [] if isinstance(i, dict)]
+        blocking = [i for i in issues if str(i.get("severity", "")).lower() in self._BLOCKING_SEVERITIES] or issues
+        if review.get("validation_type") == "error" or not blocking:
+            return None, {}
+        
+        provenance = self.aggregator.build_provenance(phase, batch_results)
+        per_batch: Dict[int, List[str]] = {}
+        for issue in blocking:
+            owners = self._issue_batches(issue, provenance)
+            if not owners:
+                logger.info(f"[PhasedBuild] Review issue not attributable to a batch, full retry: {str(issue)[:200]}")
+                return None, {}
+            line = f"- {issue.get('file') or ''} {issue.get('description') or issue.get('issue') or ''}".rstrip()
+            for owner in owners:
+                per_batch.setdefault(owner, []).append(line)
+        
+        failed = {i for i, r in enumerate(batch_results) if not r}
+        feedback = {
+            i: (retry_feedback + "\n\nProblèmes relevés sur ce lot :\n" + "\n".join(lines)).strip()
+            for i, lines in per_batch.items()
+        }
+        return set(per_batch) | failed, feedback
+    
+    def _issue_batches(self, issue: Dict, provenance: Dict[str, Dict[str, Any]]) -> Set[int]:
+        """
+        RETRY-INC : lots à qui imputer un problème de review (vide = aucun).
+        
+        Du plus précis au plus vague : chemin exact du fichier ; nom exact du
+        composant ou du fichier cité (classe, LWC, Objet.champ) ; nom qualifié
+        Objet.champ dans le texte ; enfin les identifiants du texte, le lot qui
+        en a produit le plus l'emportant. Un nom partagé par plusieurs lots
+        (objet enrichi par chacun) ne départage rien : à égalité, tous sont repris.
+        """
+        owners = provenance["owners"]
+        path = str(issue.get("file") or "").strip()
+        if path:
+            owner = provenance["files"].get(self.aggregator._normalize_path(path))
+            if owner is not None:
+                return {owner}
+        
+        for key in ("component", "file"):
+            value = str(issue.get(key) or "").strip()
+            lwc = re.search(r"lwc/([^/]+)/", value)
+            stem = lwc.group(1) if lwc else value.rsplit("/", 1)[-1].split(".", 1)[0]
+            for name in (value, stem):
+                if name in owners:
+                    return set(owners[name])
+        
+        text = " ".join(str(issue.get(k) or "") for k in ("file", "component", "location", "description", "issue"))
+        qualified = [owners[t] for t in set(re.findall(r"\w+\.\w+", text)) if t in owners]
+        if qualified:
+            return set().union(*qualified)
+        scores: Dict[int, int] = {}
+        for token in set(_IDENTIFIER_RE.findall(text)):
+            for owner in owners.get(token, ()):
+                scores[owner] = scores.get(owner, 0) + 1
+        best = max(scores.values(), default=0)
+        return {owner for owner, score in scores.items() if score == best and best}
+    
+    def _build_batch_dependencies(self, task_batches: List[List[Dict]]) -> Dict[int, Set[int]]:
+        """
+        BATCH-DAG : graphe de dépendances entre les lots d'une phase.
+        
+        Le lot i dépend du lot j si une tâche de i cite explicitement une tâche
+        de j (``dependencies`` du WBS) ou mentionne un nom que j produit (objet
+        cible d'un lookup, classe appelée...). Les cycles sont rompus dans
+        l'ordre des lots : le premier lot bloqué part sans ses prérequis restants.
+        """
+        task_owner: Dict[str, int] = {}
+        name_owner: Dict[str, int] = {}
+        for i, batch in enumerate(task_batches):
+            for task in batch:
+                for key in ("id", "task_id"):
+                    if task.get(key):
+                        task_owner.setdefault(str(task[key]), i)
+                for key in _BATCH_PROVIDES_KEYS:
+                    value = task.get(key)
+                    if isinstance(value, str) and _IDENTIFIER_RE.fullmatch(value) \
+                            and value.lower() not in ("default", "unknown"):
+                        name_owner.setdefault(value, i)
+        
+        dependencies: Dict[int, Set[int]] = {i: set() for i in range(len(task_batches))}
+        for i, batch in enumerate(task_batches):
+            for task in batch:
+                for ref in task.get("dependencies") or []:
+                    owner = task_owner.get(str(ref))
+                    if owner is not None:
+                        dependencies[i].add(owner)
+                text = " ".join(str(task.get(k) or "") for k in _BATCH_REFERENCE_KEYS)
+                for token in set(_IDENTIFIER_RE.findall(text)):
+                    owner = name_owner.get(token)
+                    if owner is not None:
+                        dependencies[i].add(owner)
+            dependencies[i].discard(i)
+        
+        # Kahn : tant qu'il reste des lots, liberer ceux sans prerequis en attente.
+        remaining = set(dependencies)
+        while remaining:
+            ready = [i for i in remaining if not (dependencies[i] & remaining)]
+            if not ready:
+                stuck = min(remaining)
+                logger.warning(
+                    f"[PhasedBuild] Dependency cycle between batches {sorted(remaining)}: "
+                    f"batch {stuck + 1} starts without {sorted(d + 1 for d in dependencies[stuck] & remaining)}"
+                )
+                dependencies[stuck] -= remaining
+                ready = [stuck]
+            remaining.difference_update(ready)
         
-        return batches
+        return dependencies
     
     def _create_task_batches(self, tasks: List[Dict], phase: int) -> List[List[Dict]]:
         """
@@ -543,6 +928,23 @@ class PhasedBuildExecutor:
         
         return flows + list(vrs_by_object.values())
     
+    async def _run_agent(self, fn, **kwargs):
+        """
+        BUILD-OFFLOAD : exécute un générateur d'agent bloquant dans le pool
+        borné. Si la tâche asyncio est annulée, l'appel LLM en cours est
+        annulé (flux fermé) et les suivants échouent immédiatement.
+        """
+        scope = LLMCancelScope()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            _get_agent_pool(), functools.partial(run_in_cancel_scope, scope, fn, **kwargs)
+        )
+        try:
+            return await future
+        except asyncio.CancelledError:
+            scope.cancel()
+            raise
+    
     async def _generate_single_batch(
         self,
         agent: str,
@@ -560,7 +962,8 @@ class PhasedBuildExecutor:
                 target = tasks[0].get("target_object") or tasks[0].get("name", "unknown")
                 description = "\n".join([(t.get("description") or "") for t in tasks])
                 
-                result = generate_build_v2(
+                result = await self._run_agent(
+                    generate_build_v2,
                     phase=phase,
                     target=target,
                     task_description=description,
@@ -574,7 +977,8 @@ class PhasedBuildExecutor:
                 from agents.roles.salesforce_developer_apex import generate_build
                 
                 task = tasks[0]  # Primary task
-                result = generate_build(
+                result = await self._run_agent(
+                    generate_build,
                     task=task,
                     architecture_context=context,
                     execution_id=str(self.execution_id)
@@ -585,7 +989,8 @@ class PhasedBuildExecutor:
                 from agents.roles.salesforce_developer_lwc import generate_build
                 
                 task = tasks[0]
-                result = generate_build(
+                result = await self._run_agent(
+                    generate_build,
                     task=task,
                     architecture_context=context,
                     execution_id=str(self.execution_id)
@@ -596,7 +1001,8 @@ class PhasedBuildExecutor:
                 from agents.roles.salesforce_data_migration import generate_build
                 
                 task = tasks[0]
-                result = generate_build(
+                result = await self._run_agent(
+                    generate_build,
                     task=task,
                     architecture_context=context,
                     execution_id=str(self.execution_id)
@@ -652,7 +1058,8 @@ class PhasedBuildExecutor:
             if not code_files and aggregated.get("operations"):
                 code_files = {"plan.json": json.dumps(aggregated.get("operations"), indent=2)}
             
-            result = generate_test(
+            result = await self._run_agent(
+                generate_test,
                 input_data={
                     "task": {"task_id": f"phase-{phase}-review", "name": f"Phase {phase} Review"},
                     "code_files": code_files,
@@ -894,7 +1301,9 @@ class PhasedBuildExecutor:
 async def create_phased_build_executor(
     project_id: int,
     execution_id: int,
-    db
+    db,
+    pipelined: Optional[bool] = None,
+    force_deploy: bool = False
 ) -> PhasedBuildExecutor:
     """
     Crée et initialise un PhasedBuildExecutor.
@@ -903,10 +1312,12 @@ async def create_phased_build_executor(
         project_id: ID du projet
         execution_id: ID de l'exécution
         db: Session SQLAlchemy
+        pipelined: mode pipeline PIPE-BUILD (None : BUILD_PIPELINED)
+        force_deploy: redeploiement complet, sans diff DEPLOY-DIFF
         
     Returns:
         PhasedBuildExecutor initialisé
     """
-    executor = PhasedBuildExecutor(project_id, execution_id, db)
+    executor = PhasedBuildExecutor(project_id, execution_id, db, pipelined=pipelined, force_deploy=force_deploy)
     await executor.initialize()
     return executor
@@ -30,6 +30,7 @@ Features:
 import os
 import json
 import asyncio
+import shlex
 import subprocess
 import tempfile
 from datetime import datetime, timezone, timedelta
@@ -48,6 +49,9 @@ except ImportError:
 
 
 from app.services.audit_service import audit_service, ActorType, ActionCategory
+from app.services.command_executor import get_command_executor
+from app.services.progress_snapshot import build_progress_snapshot, next_snapshot_version, snapshot_fits_notify
+from app.services.llm_rate_governor import is_rate_limit_error as _is_rate_limit_error  # PHASE2-PAR backoff
 from app.models.project import Project
 from app.models.execution import Execution, ExecutionStatus
 from app.models.agent_deliverable import AgentDeliverable
@@ -131,6 +135,13 @@ PARALLEL_MODE = {
     "build_agents": False,  # Phase BUILD: Sequential for now (sandbox 2-user limit)
 }
 
+# PHASE2-PAR: Olivia UC generation. F-081 batches of 2 BRs dispatched concurrently.
+# PHASE2_MAX_CONCURRENCY = 1 restores the legacy sequential loop.
+PHASE2_BR_BATCH_SIZE = 2
+PHASE2_MAX_CONCURRENCY = 4
+PHASE2_BATCH_MAX_ATTEMPTS = 2
+PHASE2_RATE_LIMIT_BACKOFF = 20  # seconds (x attempt); pauses every pending batch, not just the limited one
+
 # BR-FOOTGUN-FIX : le brief DOIT vivre dans `business_requirements`.
 # En-dessous de ce seuil, `description` n'est pas considéré comme un brief.
 BR_BRIEF_MIN_CHARS = 120
@@ -356,6 +367,7 @@ class PMOrchestratorServiceV2:
                 checkpoint_map = {
                     "phase1_pm": "phase2",
                     "phase2_ba": "phase2",       # BUG-010: re-run Phase 2 (UCs in DB, safe to redo)
+                    "phase2_ba_partial": "phase2",  # PHASE2-PAR: re-run only batches without UCs in DB
                     "phase2_5_emma": "phase2",   # BUG-010: re-run Phase 2+2.5
                     "phase3_3_coverage_gate": None,  # Handled by resume_from_architecture_validation
                     "phase3_wbs": "phase4",      # BUG-010: skip to Phase 4 (artifacts in DB)
@@ -516,67 +528,11 @@ class PMOrchestratorServiceV2:
             except Exception as e:
                 logger.warning(f"[StateMachine] transition failed: {e}")
             
-            ba_tokens_total = 0
-            ba_ucs_saved = 0
-            
             # F-081: Process BRs in batches of 2 to reduce API calls
-            BATCH_SIZE = 2
-            total_batches = (len(business_requirements) + BATCH_SIZE - 1) // BATCH_SIZE
-            logger.info(f"[Phase 2] Processing {len(business_requirements)} BRs in {total_batches} batches of {BATCH_SIZE}")
-            
-            batch_idx = 0
-            for i in range(0, len(business_requirements), BATCH_SIZE):
-                batch_brs = business_requirements[i:i + BATCH_SIZE]
-                br_ids = [br.get("id", f"BR-{i+j+1:03d}") for j, br in enumerate(batch_brs)]
-                progress = 18 + ((batch_idx + 1) / total_batches) * 27  # 18-45%
-                
-                self._update_progress(execution, "ba", "running", int(progress), 
-                                      f"Processing {', '.join(br_ids)} (batch {batch_idx+1}/{total_batches})...")
-                
-                # Send batch or single BR based on count
-                if len(batch_brs) > 1:
-                    input_data = {"business_requirements": batch_brs}
-                else:
-                    input_data = {"business_requirement": batch_brs[0]}
-                
-                uc_result = await self._run_agent(
-                    agent_id="ba",
-                    input_data=input_data,
-                    execution_id=execution_id,
-                    project_id=project_id
-                )
-                
-                # For compatibility with existing code, use first BR's id
-                batch_brs[0]
-                br_id = br_ids[0]
-                batch_idx += 1
-                
-                if uc_result.get("success"):
-                    # Extract metadata
-                    metadata = uc_result["output"].get("metadata", {})
-                    tokens_used = metadata.get("tokens_used", 0)
-                    model_used = metadata.get("model", "unknown")
-                    exec_time = metadata.get("execution_time_seconds", 0)
-                    
-                    # F-081: Handle batch results - tokens are for the whole batch
-                    tokens_used // len(batch_brs) if len(batch_brs) > 1 else tokens_used
-                    
-                    # SAVE IMMEDIATELY TO DATABASE (database-first)
-                    saved = self._save_use_cases_from_result(
-                        execution_id=execution_id,
-                        br_id=br_id,
-                        ba_result=uc_result,
-                        tokens_used=tokens_used,
-                        model_used=model_used,
-                        execution_time=exec_time
-                    )
-                    
-                    ba_ucs_saved += saved
-                    ba_tokens_total += tokens_used
-                    self._accumulate_cost(execution, tokens_used, model_used)
-                    logger.info(f"[Phase 2] {br_id}: {saved} UCs saved to DB")
-                else:
-                    logger.warning(f"[Phase 2] {br_id}: Failed - {uc_result.get('error')}")
+            # PHASE2-PAR: batches dispatched concurrently, retried and checkpointed per batch
+            ba_tokens_total, ba_ucs_saved = await self._run_phase2_batches(
+                execution, execution_id, project_id, business_requirements
+            )
             
             # Get final stats from database
             uc_stats = self._get_use_case_count(execution_id)
@@ -1406,11 +1362,18 @@ class PMOrchestratorServiceV2:
         P3 (May 2026) — wraps the (sync, blocking) ``subprocess.run`` call in a
         thread so that other async jobs (other SDS pipelines, SSE progress,
         DB I/O, …) can keep running during the 30-60 s SFDX call.
+
+        CMD-EXEC — routed through the shared command executor (capped per
+        target org); a timeout still raises ``subprocess.TimeoutExpired``.
         """
-        return await asyncio.to_thread(
-            subprocess.run, cmd,
-            shell=True, capture_output=True, text=True, timeout=timeout,
-        )
+        args = shlex.split(cmd)
+        org = args[args.index("--target-org") + 1] if "--target-org" in args[:-1] else "default"
+        run = await get_command_executor().run(args, timeout=timeout, key=f"sf:{org}")
+        if run.timed_out:
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        if run.error:
+            raise OSError(run.error)
+        return subprocess.CompletedProcess(args, run.returncode, run.stdout, run.stderr)
 
     async def _get_salesforce_metadata(self, execution_id: int, project: "Project" = None) -> Dict[str, Any]:
         """
@@ -1453,11 +1416,9 @@ class PMOrchestratorServiceV2:
         
         try:
             # 1. Get org info (edition, version, features)
-            org_cmd = f"sf org display --target-org {sf_cfg.org_alias} --json"
-            org_result = await self._run_sfdx_async(org_cmd, timeout=30)
-            if org_result.returncode == 0:
-                org_data = json.loads(org_result.stdout)
-                metadata["org_info"] = org_data.get("result", {})
+            org_info, _ = await get_command_executor().org_display(sf_cfg.org_alias)
+            if org_info is not None:
+                metadata["org_info"] = org_info
                 logger.info(f"[Metadata] ✅ Org info retrieved: {metadata['org_info'].get('edition', 'Unknown')} edition")
             
             # 2. List available metadata types
@@ -1524,6 +1485,20 @@ class PMOrchestratorServiceV2:
                 except Exception as e:
                     logger.warning(f"[Metadata] ⚠️ Could not describe {obj_name}: {e}")
             
+            # 7. AS-IS-SNAP: red flags / dette technique (Tooling API) depuis le
+            # snapshot incremental de l'org, verrouille par org. Optionnel : un
+            # echec laisse l'inventaire SFDX ci-dessus intact.
+            from app.services.salesforce.marcus_as_is_v2 import fetch_and_preprocess_metadata
+            as_is = await asyncio.to_thread(
+                fetch_and_preprocess_metadata, sf_cfg.org_alias, project.id if project else None
+            )
+            if as_is.get("success"):
+                metadata["as_is_analysis"] = as_is["summary"]
+                logger.info(f"[Metadata] ✅ As-Is analysis: debt {as_is['summary'].get('technical_debt_score', 0)}/100, "
+                            f"{as_is['summary'].get('red_flags', {}).get('total_count', 0)} red flags")
+            else:
+                logger.warning(f"[Metadata] ⚠️ As-Is analysis unavailable: {as_is.get('error')}")
+            
             # Create summary for Marcus
             summary = self._create_metadata_summary(metadata)
             
@@ -1596,6 +1571,19 @@ class PMOrchestratorServiceV2:
             "note": "Standard object fields (Case, Contact, Account, Lead, Opportunity) included above. Use these before creating custom fields."
         }
         
+        # AS-IS-SNAP: condensed red flags (full analysis stays in the deliverable)
+        analysis = metadata.get("as_is_analysis")
+        if analysis:
+            red_flags = analysis.get("red_flags", {})
+            summary["technical_debt_score"] = analysis.get("technical_debt_score", 0)
+            summary["red_flags"] = {
+                "total_count": red_flags.get("total_count", 0),
+                "by_severity": red_flags.get("by_severity", {}),
+                "critical_and_high": [
+                    f for f in red_flags.get("items", []) if f.get("severity") in ("CRITICAL", "HIGH")
+                ][:10],
+            }
+        
         return summary
 
     async def _run_agent(
@@ -1680,6 +1668,124 @@ class PMOrchestratorServiceV2:
             logger.error(f"Agent {agent_id} exception: {e}", exc_info=True)
             return {"success": False, "error": str(e)}
 
+    async def _run_phase2_batches(
+        self,
+        execution: Execution,
+        execution_id: int,
+        project_id: int,
+        business_requirements: List[Dict],
+    ) -> tuple:
+        """PHASE2-PAR: generate UCs for all BR batches with bounded concurrency.
+
+        Batches of PHASE2_BR_BATCH_SIZE BRs (F-081) are dispatched to Olivia up
+        to PHASE2_MAX_CONCURRENCY at a time. A rate-limited batch pauses new
+        dispatches for everyone (shared cooldown) before being retried; other
+        failures are retried up to PHASE2_BATCH_MAX_ATTEMPTS. Results are saved
+        as each batch finishes but folded into totals in BR order, and BRs that
+        already have UCs in deliverable_items (resume) are not re-generated.
+
+        Returns (tokens_total, ucs_saved).
+        """
+        batches = []
+        for i in range(0, len(business_requirements), PHASE2_BR_BATCH_SIZE):
+            batch_brs = business_requirements[i:i + PHASE2_BR_BATCH_SIZE]
+            br_ids = [br.get("id", f"BR-{i+j+1:03d}") for j, br in enumerate(batch_brs)]
+            batches.append((batch_brs, br_ids))
+        total_batches = len(batches)
+
+        done_brs = self._get_brs_with_use_cases(execution_id)
+        pending = [idx for idx, (_, br_ids) in enumerate(batches) if not set(br_ids) <= done_brs]
+        skipped = total_batches - len(pending)
+        if skipped:
+            logger.info(f"[Phase 2] Resume: {skipped}/{total_batches} batches already have UCs in DB, skipping")
+        logger.info(
+            f"[Phase 2] Processing {len(business_requirements)} BRs in {total_batches} batches of "
+            f"{PHASE2_BR_BATCH_SIZE} (concurrency={PHASE2_MAX_CONCURRENCY})"
+        )
+
+        semaphore = asyncio.Semaphore(max(1, PHASE2_MAX_CONCURRENCY))
+        loop = asyncio.get_running_loop()
+        cooldown_until = [0.0]  # shared rate-limit pause (loop time)
+        outcomes: Dict[int, tuple] = {}
+        finished = [skipped]
+
+        async def run_batch(idx: int):
+            batch_brs, br_ids = batches[idx]
+            input_data = (
+                {"business_requirements": batch_brs} if len(batch_brs) > 1
+                else {"business_requirement": batch_brs[0]}
+            )
+            uc_result: Dict[str, Any] = {"success": False, "error": "not run"}
+            async with semaphore:
+                for attempt in range(1, PHASE2_BATCH_MAX_ATTEMPTS + 1):
+                    wait = cooldown_until[0] - loop.time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    uc_result = await self._run_agent(
+                        agent_id="ba",
+                        input_data=input_data,
+                        execution_id=execution_id,
+                        project_id=project_id
+                    )
+                    if uc_result.get("success"):
+                        break
+                    error = str(uc_result.get("error", ""))
+                    if attempt < PHASE2_BATCH_MAX_ATTEMPTS:
+                        if _is_rate_limit_error(error):
+                            backoff = PHASE2_RATE_LIMIT_BACKOFF * attempt
+                            cooldown_until[0] = max(cooldown_until[0], loop.time() + backoff)
+                            logger.warning(f"[Phase 2] {br_ids[0]}: rate limited, pausing dispatch {backoff}s")
+                        else:
+                            logger.warning(f"[Phase 2] {br_ids[0]}: attempt {attempt} failed ({error[:100]}), retrying")
+
+            # Persist as soon as the batch finishes (database-first), on the loop thread
+            saved, tokens_used = 0, 0
+            if uc_result.get("success"):
+                metadata = uc_result["output"].get("metadata", {})
+                tokens_used = metadata.get("tokens_used", 0)
+                model_used = metadata.get("model", "unknown")
+                # For compatibility with existing code, use first BR's id
+                saved = self._save_use_cases_from_result(
+                    execution_id=execution_id,
+                    br_id=br_ids[0],
+                    ba_result=uc_result,
+                    tokens_used=tokens_used,
+                    model_used=model_used,
+                    execution_time=metadata.get("execution_time_seconds", 0)
+                )
+                self._accumulate_cost(execution, tokens_used, model_used)
+                logger.info(f"[Phase 2] {br_ids[0]}: {saved} UCs saved to DB")
+            else:
+                logger.warning(f"[Phase 2] {br_ids[0]}: Failed - {uc_result.get('error')}")
+            outcomes[idx] = (saved, tokens_used)
+
+            finished[0] += 1
+            progress = 18 + (finished[0] / total_batches) * 27  # 18-45%
+            self._update_progress(execution, "ba", "running", int(progress),
+                                  f"Processed {', '.join(br_ids)} (batch {finished[0]}/{total_batches})")
+            if uc_result.get("success"):
+                self._save_checkpoint(execution, "phase2_ba_partial")
+
+        await asyncio.gather(*(run_batch(idx) for idx in pending))
+
+        # Deterministic fold in BR order, independent of completion order
+        ucs_saved = sum(outcomes[idx][0] for idx in sorted(outcomes))
+        tokens_total = sum(outcomes[idx][1] for idx in sorted(outcomes))
+        return tokens_total, ucs_saved
+
+    def _get_brs_with_use_cases(self, execution_id: int) -> set:
+        """PHASE2-PAR: BR ids that already have parsed UCs saved for this execution (resume)."""
+        try:
+            rows = self.db.query(DeliverableItem.parent_ref).filter(
+                DeliverableItem.execution_id == execution_id,
+                DeliverableItem.agent_id == "ba",
+                DeliverableItem.item_type == "use_case",
+            ).distinct().all()
+            return {row[0] for row in rows if row[0]}
+        except Exception as e:
+            logger.warning(f"[Phase 2] Could not read existing UCs, regenerating all batches: {e}")
+            return set()
+
     def _init_agent_status(self, selected_agents: List[str]) -> Dict:
         """Initialize agent execution status - ORCH-01: respects selected_agents"""
         # Core agents always included (mandatory for SDS)
@@ -1758,19 +1864,32 @@ class PMOrchestratorServiceV2:
             self.db.rollback()
 
         # PERF-001: Send real-time notification (fire-and-forget)
-        self._send_progress_notification(execution.id, agent_id, state, progress, message)
+        # PROGRESS-SNAP: with a full versioned snapshot so stream viewers skip the DB
+        snapshot = None
+        if NOTIFICATIONS_ENABLED:
+            try:
+                self._progress_version = next_snapshot_version(getattr(self, "_progress_version", 0))
+                snapshot = build_progress_snapshot(execution, self._progress_version)
+                if not snapshot_fits_notify(snapshot):
+                    snapshot = None  # Too big for NOTIFY: viewers fall back to a (shared) DB read
+            except Exception as e:
+                logger.debug(f"Progress snapshot failed (non-critical): {e}")
+                snapshot = None
+        self._send_progress_notification(execution.id, agent_id, state, progress, message, snapshot)
     
-    def _send_progress_notification(self, execution_id: int, agent_id: str, state: str, progress: int, message: str):
+    def _send_progress_notification(self, execution_id: int, agent_id: str, state: str, progress: int, message: str,
+                                    snapshot: Optional[Dict] = None):
         """Send progress notification via PostgreSQL NOTIFY (non-blocking)"""
         if not NOTIFICATIONS_ENABLED:
             return
         try:
             loop = asyncio.get_running_loop()
-            loop.create_task(self._async_notify_progress(execution_id, agent_id, state, progress, message))
+            loop.create_task(self._async_notify_progress(execution_id, agent_id, state, progress, message, snapshot))
         except RuntimeError:
             pass  # No running loop, skip notification
     
-    async def _async_notify_progress(self, execution_id: int, agent_id: str, state: str, progress: int, message: str):
+    async def _async_notify_progress(self, execution_id: int, agent_id: str, state: str, progress: int, message: str,
+                                     snapshot: Optional[Dict] = None):
         """Async helper to send notification"""
         try:
             service = await get_notification_service()
@@ -1779,7 +1898,8 @@ class PMOrchestratorServiceV2:
                 status=state,
                 progress=progress,
                 agent=agent_id,
-                message=message
+                message=message,
+                snapshot=snapshot
             )
         except Exception as e:
             logger.debug(f"Notification failed (non-critical): {e}")
@@ -0,0 +1,257 @@
+"""
+Execution progress snapshots shared by the SSE and WebSocket streams.
+
+PROGRESS-SNAP: the orchestrator publishes a complete, versioned snapshot of
+an execution's progress alongside its NOTIFY. Stream endpoints keep the
+latest snapshot per execution in an in-process cache shared by every viewer,
+so N viewers of one execution cost O(1) DB queries per update instead of one
+``db.refresh`` per viewer per tick. The DB is only read on a cache miss or
+when the cached snapshot is older than ``max_age`` (e.g. a status change that
+was committed without a NOTIFY), and that read is single-flight per execution.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from app.models.execution import Execution, ExecutionStatus
+
+logger = logging.getLogger(__name__)
+
+
+# Agent display names mapping (used in progress, SSE, WebSocket)
+AGENT_NAMES = {
+    "pm": "Sophie (PM)",
+    "ba": "Olivia (BA)",
+    "research_analyst": "Emma (Research Analyst)",
+    "architect": "Marcus (Architect)",
+    "apex": "Diego (Apex)",
+    "lwc": "Zara (LWC)",
+    "admin": "Raj (Admin)",
+    "qa": "Elena (QA)",
+    "devops": "Jordan (DevOps)",
+    "data": "Aisha (Data)",
+    "trainer": "Lucas (Trainer)",
+}
+
+# State mapping from internal to frontend format
+STATUS_MAP = {
+    "waiting": "pending",
+    "running": "in_progress",
+    "completed": "completed",
+    "failed": "failed",
+}
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more; keep headroom for the envelope.
+MAX_NOTIFY_SNAPSHOT_BYTES = 7000
+# Number of executions whose snapshot is kept in memory per process.
+SNAPSHOT_CACHE_SIZE = 1000
+
+
+def parse_agent_status(execution: Execution) -> dict:
+    """Parse agent_execution_status from execution, handling str or dict."""
+    agent_status = {}
+    if execution.agent_execution_status:
+        if isinstance(execution.agent_execution_status, str):
+            agent_status = json.loads(execution.agent_execution_status)
+        else:
+            agent_status = execution.agent_execution_status
+    return agent_status
+
+
+def parse_selected_agents(execution: Execution) -> list:
+    """Parse selected_agents from execution, handling str or list."""
+    selected_agents = execution.selected_agents or []
+    if isinstance(selected_agents, str):
+        selected_agents = json.loads(selected_agents)
+    return selected_agents
+
+
+def build_agent_progress(execution: Execution) -> tuple:
+    """
+    Build agent progress data for frontend consumption.
+    Returns (agent_progress_list, overall_progress_percent, current_phase_str).
+    """
+    agent_status = parse_agent_status(execution)
+    selected_agents = parse_selected_agents(execution)
+
+    agent_progress = []
+    for agent_id in selected_agents:
+        status_info = agent_status.get(agent_id, {})
+        state = status_info.get("state", "waiting")
+        agent_progress.append({
+            "agent_name": AGENT_NAMES.get(agent_id, agent_id),
+            "status": STATUS_MAP.get(state, state),
+            "progress": status_info.get("progress", 0),
+            "current_task": status_info.get("message", ""),
+            "output_summary": status_info.get("message", ""),
+            "extra_data": status_info.get("extra_data", None),
+        })
+
+    total_agents = len(selected_agents)
+    completed_agents = sum(
+        1 for a in agent_status.values() if a.get("state") == "completed"
+    )
+    overall_progress = (
+        int((completed_agents / total_agents) * 100) if total_agents > 0 else 0
+    )
+
+    current_phase = "Initializing..."
+    if execution.current_agent:
+        current_phase = f"Running {AGENT_NAMES.get(execution.current_agent, execution.current_agent)}"
+    if execution.status == ExecutionStatus.COMPLETED:
+        current_phase = "Completed"
+        overall_progress = 100
+    elif execution.status == ExecutionStatus.FAILED:
+        current_phase = "Failed"
+    elif execution.status == ExecutionStatus.WAITING_BR_VALIDATION:
+        current_phase = "Waiting for BR Validation"
+    elif execution.status == ExecutionStatus.WAITING_ARCHITECTURE_VALIDATION:
+        current_phase = "Waiting for Architecture Validation"
+
+    return agent_progress, overall_progress, current_phase
+
+
+def next_snapshot_version(previous: int = 0) -> int:
+    """Monotonic version: wall-clock milliseconds, bumped past the previous value if needed.
+
+    Wall-clock based so that a resumed execution (new worker process) still
+    publishes versions newer than what the API processes have cached.
+    """
+    return max(previous + 1, int(time.time() * 1000))
+
+
+def build_progress_snapshot(execution: Execution, version: int) -> Dict[str, Any]:
+    """Build the full progress snapshot served by the SSE and WebSocket streams."""
+    agent_progress, overall_progress, current_phase = build_agent_progress(execution)
+    status = execution.status.value if hasattr(execution.status, "value") else str(execution.status)
+    return {
+        "execution_id": execution.id,
+        "version": version,
+        "status": status,
+        "execution_state": execution.execution_state or "draft",
+        "overall_progress": overall_progress,
+        "current_phase": current_phase,
+        "agent_progress": agent_progress,
+        "progress": execution.progress or 0,
+        "current_agent": execution.current_agent,
+        "agent_execution_status": parse_agent_status(execution),
+        "sds_document_path": execution.sds_document_path,
+    }
+
+
+def snapshot_fits_notify(snapshot: Dict[str, Any]) -> bool:
+    """True if the snapshot can travel inside a NOTIFY payload."""
+    return len(json.dumps(snapshot).encode("utf-8")) <= MAX_NOTIFY_SNAPSHOT_BYTES
+
+
+class ProgressSnapshotCache:
+    """
+    Process-wide cache of the latest progress snapshot per execution.
+
+    ``update`` is fed from NOTIFY payloads (no DB access). ``get_or_load``
+    serves viewers and only calls ``loader`` (a blocking DB read, run in a
+    worker thread) on a miss or when the entry is older than ``max_age``;
+    concurrent viewers of the same execution share that single load.
+    """
+
+    def __init__(self, max_entries: int = SNAPSHOT_CACHE_SIZE):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()  # execution_id -> (snapshot, stored_at)
+        self._lock = threading.Lock()
+        self._loads: Dict[int, asyncio.Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "pushes": 0, "db_loads": 0}
+
+    def get(self, execution_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(execution_id)
+            return entry[0] if entry else None
+
+    def update(self, snapshot: Dict[str, Any]) -> bool:
+        """Store a snapshot unless a newer version is already cached. Returns True if stored."""
+        execution_id = snapshot.get("execution_id")
+        if execution_id is None:
+            return False
+        with self._lock:
+            current = self._entries.get(execution_id)
+            if current and current[0].get("version", 0) > snapshot.get("version", 0):
+                return False
+            self._entries[execution_id] = (snapshot, time.monotonic())
+            self._entries.move_to_end(execution_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            self.stats["pushes"] += 1
+            return True
+
+    def invalidate(self, execution_id: int) -> None:
+        with self._lock:
+            self._entries.pop(execution_id, None)
+
+    async def get_or_load(
+        self,
+        execution_id: int,
+        loader: Callable[[], Optional[Dict[str, Any]]],
+        max_age: Optional[float] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Return the cached snapshot, reading it from the DB (once, shared) if missing or stale."""
+        with self._lock:
+            entry = self._entries.get(execution_id)
+        if entry and (max_age is None or time.monotonic() - entry[1] < max_age):
+            self.stats["hits"] += 1
+            return entry[0]
+        self.stats["misses"] += 1
+
+        pending = self._loads.get(execution_id)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The viewer running the shared load went away (client
+                # disconnect): this one is still live, so load it itself.
+                return await self.get_or_load(execution_id, loader, max_age)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loads[execution_id] = future
+        try:
+            self.stats["db_loads"] += 1
+            snapshot = await asyncio.to_thread(loader)
+            if snapshot is not None:
+                self.update(snapshot)
+                snapshot = self.get(execution_id) or snapshot
+            future.set_result(snapshot)
+            return snapshot
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the exception; mark it retrieved so an unobserved future doesn't log.
+            future.exception()
+            raise
+        finally:
+            # Cancelled mid-load (CancelledError is a BaseException): release
+            # the waiters instead of leaving them on a future nobody resolves.
+            if not future.done():
+                future.cancel()
+            self._loads.pop(execution_id, None)
+
+
+# Global singleton (one per API process)
+progress_snapshot_cache = ProgressSnapshotCache()
+
+
+def load_snapshot_from_db(execution_id: int) -> Optional[Dict[str, Any]]:
+    """Blocking DB read of an execution's snapshot, on its own short-lived session."""
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        execution = db.query(Execution).filter(Execution.id == execution_id).first()
+        if execution is None:
+            return None
+        cached = progress_snapshot_cache.get(execution_id)
+        return build_progress_snapshot(execution, next_snapshot_version(cached["version"] if cached else 0))
+    finally:
+        db.close()
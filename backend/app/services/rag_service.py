@@ -7,9 +7,16 @@ Stratégie hybride:
 - nomic-embed-text-v1.5 pour code (apex, lwc) - optimisé code
 - BGE reranker multilingue (FR/EN cross-lingual)
 """
+import hashlib
 import os
+import threading
+import time
 import chromadb
-from typing import List, Dict, Optional
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Generic, Hashable, Iterable, List, Dict, Optional, Tuple, TypeVar
 import logging
 from app.config import settings
 
@@ -44,6 +51,29 @@ def _log_rag_debug(step: str, data: dict):
 
 CHROMA_PATH = str(settings.CHROMA_PATH)
 
+# INGEST-001: batched embedding + streaming upserts for ingest_document
+OPENAI_EMBED_BATCH_SIZE = 256   # inputs per embeddings.create call (API accepts up to 2048)
+NOMIC_ENCODE_BATCH_SIZE = 32    # model.encode batch size (CPU/GPU memory bound)
+EMBED_WORKERS = 4               # concurrent OpenAI embedding requests
+INGEST_UPSERT_SLICE = 512       # chunks embedded + upserted per slice (memory stays flat)
+
+# QEMB-CACHE: query embeddings cached on (model, normalized query)
+QUERY_EMBED_CACHE_SIZE = 2048
+QUERY_EMBED_CACHE_TTL = 3600    # seconds
+QUERY_WORKERS = 5               # concurrent collection queries in query_rag
+
+# RERANK-001: cross-encoder batching + (query, doc hash) score cache
+RERANK_BATCH_SIZE = 16
+RERANK_MAX_LENGTH = 512         # tokens per (query, doc) pair, longer pairs are truncated
+RERANK_CACHE_ENABLED = True
+RERANK_CACHE_SIZE = 8192
+RERANK_CACHE_TTL = 3600         # seconds
+
+EMBEDDING_MODELS = {
+    "openai": "text-embedding-3-large",
+    "nomic": "nomic-ai/nomic-embed-text-v1.5",
+}
+
 # Collections avec leur type d'embedding
 COLLECTIONS = {
     "technical": {"name": "technical_collection", "embedding": "openai"},
@@ -139,7 +169,7 @@ def get_reranker():
     if _reranker is None:
         try:
             from sentence_transformers import CrossEncoder
-            _reranker = CrossEncoder("BAAI/bge-reranker-v2-m3", max_length=512)
+            _reranker = CrossEncoder("BAAI/bge-reranker-v2-m3", max_length=RERANK_MAX_LENGTH)
             logger.info("✅ Reranker BGE multilingue chargé")
         except Exception as e:
             logger.warning(f"⚠️ Reranker non disponible: {e}")
@@ -170,17 +200,219 @@ def get_nomic_embedding(text: str, is_query: bool = True) -> List[float]:
     
     return model.encode(prefixed_text, convert_to_numpy=True).tolist()
 
-def rerank_results(query: str, documents: List[str], top_k: int = 10) -> List[tuple]:
+def get_openai_embeddings(texts: List[str]) -> List[List[float]]:
+    """Embed several texts in one OpenAI request (order preserved)."""
+    client = get_openai_client()
+    if client is None:
+        raise ValueError("OpenAI client non disponible")
+    response = client.embeddings.create(model="text-embedding-3-large", input=texts)
+    return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+def get_nomic_embeddings(texts: List[str], is_query: bool = False,
+                         batch_size: int = NOMIC_ENCODE_BATCH_SIZE) -> List[List[float]]:
+    """Embed several texts with nomic in one batched encode (same prefixes as get_nomic_embedding)."""
+    model = get_nomic_model()
+    if model is None:
+        raise ValueError("Modèle nomic non disponible")
+    prefix = "search_query: " if is_query else "search_document: "
+    return model.encode(
+        [f"{prefix}{text}" for text in texts], batch_size=batch_size, convert_to_numpy=True
+    ).tolist()
+
+def embed_texts(
+    texts: List[str],
+    embedding_type: str,
+    is_query: bool = False,
+    batch_size: Optional[int] = None,
+    workers: int = EMBED_WORKERS,
+) -> List[List[float]]:
+    """INGEST-001: batched embeddings for a list of texts, in input order.
+
+    OpenAI: texts are split into ``batch_size`` requests sent by a pool of
+    ``workers`` threads. nomic: a single ``encode`` with ``batch_size``
+    (the model batches internally, threads would only contend for it).
+    """
+    if not texts:
+        return []
+    if embedding_type == "openai":
+        size = batch_size or OPENAI_EMBED_BATCH_SIZE
+        batches = [texts[i:i + size] for i in range(0, len(texts), size)]
+        if len(batches) == 1 or workers <= 1:
+            results = [get_openai_embeddings(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+                results = list(pool.map(get_openai_embeddings, batches))
+        return [emb for batch in results for emb in batch]
+    return get_nomic_embeddings(texts, is_query=is_query, batch_size=batch_size or NOMIC_ENCODE_BATCH_SIZE)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class _TTLCache(Generic[K, V]):
+    """Thread-safe LRU + TTL store with hit-rate counters (QEMB-CACHE, RERANK-001).
+
+    Subclasses build the key and expose typed ``get`` / ``put``.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.split())
+
+    def _lookup(self, key: K) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def _store(self, key: K, value: V) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class QueryEmbeddingCache(_TTLCache[Tuple[str, str], List[float]]):
+    """QEMB-CACHE: query embeddings keyed on (model, normalized query).
+
+    The same question asked by several agents during a run — or against
+    several collections sharing an embedding model — is embedded once.
+    """
+
+    def __init__(self, max_entries: int = QUERY_EMBED_CACHE_SIZE, ttl: float = QUERY_EMBED_CACHE_TTL):
+        super().__init__(max_entries, ttl)
+
+    def get(self, model: str, query: str) -> Optional[List[float]]:
+        return self._lookup((model, self.normalize(query)))
+
+    def put(self, model: str, query: str, embedding: List[float]) -> None:
+        self._store((model, self.normalize(query)), embedding)
+
+
+class RerankScoreCache(_TTLCache[Tuple[str, str], float]):
+    """RERANK-001: cross-encoder scores keyed on (normalized query, doc sha1)."""
+
+    def __init__(self, max_entries: int = RERANK_CACHE_SIZE, ttl: float = RERANK_CACHE_TTL):
+        super().__init__(max_entries, ttl)
+
+    @classmethod
+    def _key(cls, query: str, document: str) -> Tuple[str, str]:
+        return cls.normalize(query), hashlib.sha1(document.encode("utf-8")).hexdigest()
+
+    def get(self, query: str, document: str) -> Optional[float]:
+        return self._lookup(self._key(query, document))
+
+    def put(self, query: str, document: str, score: float) -> None:
+        self._store(self._key(query, document), score)
+
+
+_query_embedding_cache = QueryEmbeddingCache()
+_rerank_cache = RerankScoreCache()
+
+
+def get_query_embedding(query: str, embedding_type: str) -> List[float]:
+    """Embedding of a search query, served from the query cache when possible."""
+    model = EMBEDDING_MODELS.get(embedding_type, embedding_type)
+    embedding = _query_embedding_cache.get(model, query)
+    if embedding is None:
+        if embedding_type == "openai":
+            embedding = get_openai_embedding(query)
+        else:
+            embedding = get_nomic_embedding(query, is_query=True)
+        _query_embedding_cache.put(model, query, embedding)
+    return embedding
+
+
+def get_query_cache_stats() -> Dict:
+    """Hit-rate counters of the query embedding cache."""
+    return _query_embedding_cache.stats()
+
+
+def get_rerank_cache_stats() -> Dict:
+    """Hit-rate counters of the reranker score cache."""
+    return _rerank_cache.stats()
+
+
+def rerank_indices(
+    query: str,
+    documents: List[str],
+    top_k: int = 10,
+    batch_size: int = RERANK_BATCH_SIZE,
+    use_cache: bool = RERANK_CACHE_ENABLED,
+) -> List[Tuple[int, float]]:
+    """RERANK-001: rerank ``documents`` and return ``(index, score)`` pairs, best first.
+
+    Indices point into ``documents`` so callers can map back to metadata even
+    when two collections return the same text. Only pairs missing from the
+    score cache go through the cross-encoder, in batches of ``batch_size``.
+    """
     reranker = get_reranker()
     if reranker is None or not documents:
-        return [(doc, 1.0) for doc in documents[:top_k]]
-    
-    pairs = [[query, doc] for doc in documents]
-    scores = reranker.predict(pairs)
-    scored_docs = sorted(zip(documents, scores), key=lambda x: x[1], reverse=True)
-    return scored_docs[:top_k]
+        return [(i, 1.0) for i in range(min(top_k, len(documents)))]
+
+    scores = np.empty(len(documents), dtype=np.float32)
+    missing = []
+    for i, doc in enumerate(documents):
+        cached = _rerank_cache.get(query, doc) if use_cache else None
+        if cached is None:
+            missing.append(i)
+        else:
+            scores[i] = cached
+
+    if missing:
+        # Duplicate texts are scored once
+        unique = list(dict.fromkeys(documents[i] for i in missing))
+        predicted = np.asarray(
+            reranker.predict([[query, doc] for doc in unique], batch_size=batch_size, show_progress_bar=False),
+            dtype=np.float32,
+        ).reshape(-1)
+        by_doc = dict(zip(unique, predicted))
+        for i in missing:
+            scores[i] = by_doc[documents[i]]
+        if use_cache:
+            for doc, score in by_doc.items():
+                _rerank_cache.put(query, doc, float(score))
+
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [(int(i), float(scores[i])) for i in order]
 
-def query_collection(coll_key: str, query: str, n_results: int = 15, project_id: int = None) -> tuple:
+def rerank_results(query: str, documents: List[str], top_k: int = 10) -> List[tuple]:
+    """Rerank documents, returning ``(document, score)`` pairs (see rerank_indices)."""
+    return [(documents[i], score) for i, score in rerank_indices(query, documents, top_k=top_k)]
+
+def query_collection(coll_key: str, query: str, n_results: int = 15, project_id: int = None,
+                     query_embedding: Optional[List[float]] = None) -> tuple:
     """Interroger une collection avec le bon embedding.
 
     Args:
@@ -188,15 +420,12 @@ def query_collection(coll_key: str, query: str, n_results: int = 15, project_id:
         query: Search query text
         n_results: Number of results to return
         project_id: If set, filter results to this project only
+        query_embedding: Precomputed query embedding (skips the embedding step)
     """
     try:
         collection = get_collection(coll_key)
-        embedding_type = COLLECTIONS[coll_key]["embedding"]
-
-        if embedding_type == "openai":
-            query_embedding = get_openai_embedding(query)
-        else:
-            query_embedding = get_nomic_embedding(query)
+        if query_embedding is None:
+            query_embedding = get_query_embedding(query, COLLECTIONS[coll_key]["embedding"])
 
         where_filter = {"project_id": str(project_id)} if project_id else None
         results = collection.query(
@@ -237,8 +466,31 @@ def query_rag(
     all_documents = []
     all_metadatas = []
 
-    for coll_key in collection_keys:
-        docs, metas = query_collection(coll_key, query, n_candidates // len(collection_keys), project_id=project_id)
+    # QEMB-CACHE: one embedding per embedding type, then query the collections concurrently
+    embeddings_by_type = {}
+    for embedding_type in dict.fromkeys(COLLECTIONS[k]["embedding"] for k in collection_keys):
+        try:
+            embeddings_by_type[embedding_type] = get_query_embedding(query, embedding_type)
+        except Exception as e:
+            logger.error(f"[RAG] Query embedding ({embedding_type}) failed: {e}", exc_info=True)
+
+    queryable = [k for k in collection_keys if COLLECTIONS[k]["embedding"] in embeddings_by_type]
+    per_collection = n_candidates // len(collection_keys)
+
+    def _query(coll_key):
+        return query_collection(
+            coll_key, query, per_collection, project_id=project_id,
+            query_embedding=embeddings_by_type[COLLECTIONS[coll_key]["embedding"]],
+        )
+
+    if len(queryable) > 1:
+        with ThreadPoolExecutor(max_workers=min(QUERY_WORKERS, len(queryable))) as pool:
+            results = list(pool.map(_query, queryable))
+    else:
+        results = [_query(k) for k in queryable]
+
+    # Results folded in collection order, whatever the completion order
+    for docs, metas in results:
         all_documents.extend(docs)
         all_metadatas.extend(metas if metas else [{}] * len(docs))
     
@@ -248,17 +500,15 @@ def query_rag(
     # Reranking
     final_scores = []
     if use_reranking and len(all_documents) > n_results:
-        reranked = rerank_results(query, all_documents, top_k=n_results)
-        
+        reranked = rerank_indices(query, all_documents, top_k=n_results)
+
         final_docs = []
         final_metas = []
-        for doc, score in reranked:
-            if doc in all_documents:
-                idx = all_documents.index(doc)
-                final_docs.append(doc)
-                final_metas.append(all_metadatas[idx] if idx < len(all_metadatas) else {})
-                final_scores.append(float(score))
-        
+        for idx, score in reranked:
+            final_docs.append(all_documents[idx])
+            final_metas.append(all_metadatas[idx] if idx < len(all_metadatas) else {})
+            final_scores.append(score)
+
         all_documents = final_docs
         all_metadatas = final_metas
     else:
@@ -365,6 +615,8 @@ def get_stats() -> Dict:
         except Exception as e:
             stats["collections"][key] = {"error": str(e)}
 
+    stats["query_embedding_cache"] = get_query_cache_stats()
+    stats["rerank_cache"] = get_rerank_cache_stats()
     return stats
 
 
@@ -374,57 +626,63 @@ def get_stats() -> Dict:
 
 def ingest_document(
     collection_name: str,
-    chunks: List[str],
+    chunks: Iterable[str],
     metadata: Optional[dict] = None,
     project_id: int = None,
     document_id: int = None,
+    batch_size: Optional[int] = None,
+    slice_size: int = INGEST_UPSERT_SLICE,
 ) -> int:
     """Ingest document chunks into a ChromaDB collection with project tagging.
 
+    INGEST-001: chunks are consumed in slices of ``slice_size``; each slice is
+    embedded in batches (see embed_texts) and upserted before the next one is
+    read, so memory stays flat even for very large documents or generators.
+
     Args:
         collection_name: Collection key (e.g. "technical", "business")
-        chunks: List of text chunks to ingest
+        chunks: Text chunks to ingest (list or any iterable)
         metadata: Base metadata to attach to each chunk
         project_id: Project ID for isolation tagging
         document_id: ProjectDocument ID for deletion tracking
+        batch_size: Embedding batch size override (default per embedding type)
+        slice_size: Number of chunks embedded and upserted at a time
 
     Returns:
         Number of chunks ingested
     """
     import uuid
 
-    if not chunks:
-        return 0
-
     collection = get_collection(collection_name)
     embedding_type = COLLECTIONS[collection_name]["embedding"]
 
-    ids = []
-    embeddings = []
-    metadatas = []
-
-    for i, chunk in enumerate(chunks):
-        chunk_meta = dict(metadata) if metadata else {}
-        if project_id:
-            chunk_meta["project_id"] = str(project_id)
-        if document_id:
-            chunk_meta["document_id"] = str(document_id)
-
-        chunk_id = f"proj{project_id}_doc{document_id}_{i}" if project_id else str(uuid.uuid4())
-
-        if embedding_type == "openai":
-            emb = get_openai_embedding(chunk)
-        else:
-            emb = get_nomic_embedding(chunk, is_query=False)
-
-        ids.append(chunk_id)
-        embeddings.append(emb)
-        metadatas.append(chunk_meta)
-
-    # ChromaDB batch upsert (handles duplicates by ID)
-    collection.upsert(ids=ids, embeddings=embeddings, documents=chunks, metadatas=metadatas)
-    logger.info(f"Ingested {len(chunks)} chunks into {collection_name} (project_id={project_id}, document_id={document_id})")
-    return len(chunks)
+    base_meta = dict(metadata) if metadata else {}
+    if project_id:
+        base_meta["project_id"] = str(project_id)
+    if document_id:
+        base_meta["document_id"] = str(document_id)
+
+    iterator = iter(chunks)
+    total = 0
+    while True:
+        batch = list(islice(iterator, slice_size))
+        if not batch:
+            break
+
+        ids = [
+            f"proj{project_id}_doc{document_id}_{total + i}" if project_id else str(uuid.uuid4())
+            for i in range(len(batch))
+        ]
+        embeddings = embed_texts(batch, embedding_type, is_query=False, batch_size=batch_size)
+        metadatas = [dict(base_meta) for _ in batch]
+
+        # ChromaDB batch upsert (handles duplicates by ID)
+        collection.upsert(ids=ids, embeddings=embeddings, documents=batch, metadatas=metadatas)
+        total += len(batch)
+
+    if total:
+        logger.info(f"Ingested {total} chunks into {collection_name} (project_id={project_id}, document_id={document_id})")
+    return total
 
 
 def delete_project_document_chunks(collection_name: str, document_id: int) -> int:
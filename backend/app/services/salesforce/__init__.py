@@ -2,11 +2,13 @@
 Salesforce Services Module
 - MetadataFetcher: Fetch metadata via Tooling API
 - MetadataPreprocessor: Analyze and summarize for LLM
+- MetadataSnapshotStore: Incremental per-org metadata snapshots
 - Marcus AS-IS V2: Optimized As-Is analysis pipeline
 """
 
 from .metadata_fetcher import MetadataFetcher, SalesforceCredentials, FetchResult
 from .metadata_preprocessor import MetadataPreprocessor, RedFlag, Severity, RedFlagType
+from .metadata_snapshot import MetadataSnapshotStore
 from .marcus_as_is_v2 import fetch_and_preprocess_metadata, get_as_is_prompt_v2
 
 __all__ = [
@@ -19,6 +21,8 @@ __all__ = [
     "RedFlag",
     "Severity", 
     "RedFlagType",
+    # Snapshots
+    "MetadataSnapshotStore",
     # Marcus V2
     "fetch_and_preprocess_metadata",
     "get_as_is_prompt_v2"
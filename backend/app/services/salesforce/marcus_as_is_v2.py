@@ -14,6 +14,7 @@ Usage:
 import json
 import logging
 import tempfile
+from contextlib import nullcontext
 from typing import Dict, Any, Optional
 from app.config import settings
 
@@ -22,12 +23,19 @@ logger = logging.getLogger(__name__)
 # Import metadata services
 from .metadata_fetcher import MetadataFetcher
 from .metadata_preprocessor import MetadataPreprocessor
+from .metadata_snapshot import MetadataSnapshotStore
+
+# AS-IS-SNAP: les exécutions successives sur une même org repartent du
+# snapshot précédent (enregistrements modifiés seulement). False restaure
+# le fetch complet à chaque exécution.
+AS_IS_INCREMENTAL = True
 
 
 def fetch_and_preprocess_metadata(
     org_alias: str = "digital-humans-dev",
     project_id: Optional[str] = None,
-    output_dir: Optional[str] = None
+    output_dir: Optional[str] = None,
+    incremental: bool = AS_IS_INCREMENTAL
 ) -> Dict[str, Any]:
     """
     Run the full metadata pipeline:
@@ -39,6 +47,7 @@ def fetch_and_preprocess_metadata(
         org_alias: SFDX org alias
         project_id: Optional project ID for path organization
         output_dir: Optional custom output directory
+        incremental: Refresh the per-org snapshot instead of a full fetch
         
     Returns:
         Dict with success/error and summary data
@@ -55,17 +64,28 @@ def fetch_and_preprocess_metadata(
         # Step 1: Fetch metadata
         logger.info("Fetching metadata from org: %s...", org_alias)
         fetcher = MetadataFetcher(org_alias)
-        fetch_result = fetcher.fetch_all_metadata(out_path)
-        
-        if not fetch_result.get("success"):
-            return {"success": False, "error": fetch_result.get("error", "Fetch failed")}
-        
-        logger.info("Fetched: %s", fetch_result.get('metadata_counts', {}))
+        store = None
+        if incremental:
+            if not fetcher.authenticate():
+                return {"success": False, "error": "Authentication failed"}
+            store = MetadataSnapshotStore(fetcher.credentials.org_id)
         
-        # Step 2: Preprocess and analyze
-        logger.info("Analyzing metadata...")
-        preprocessor = MetadataPreprocessor(fetch_result["raw_data_path"])
-        summary = preprocessor.generate_summary(f"{out_path}/metadata_summary.json")
+        # Le verrou de l'org couvre le refresh ET la lecture de raw/ : une
+        # exécution concurrente sur la même org attend au lieu de réécrire
+        # le snapshot pendant l'analyse.
+        with store.lock() if store else nullcontext():
+            fetch_result = store.refresh(fetcher) if store else fetcher.fetch_all_metadata(out_path)
+            fetcher.close()
+            
+            if not fetch_result.get("success"):
+                return {"success": False, "error": fetch_result.get("error", "Fetch failed")}
+            
+            logger.info("Fetched: %s", fetch_result.get('metadata_counts', {}))
+            
+            # Step 2: Preprocess and analyze
+            logger.info("Analyzing metadata...")
+            preprocessor = MetadataPreprocessor(fetch_result["raw_data_path"])
+            summary = preprocessor.generate_summary(f"{out_path}/metadata_summary.json")
         
         debt_score = summary.get('technical_debt_score', 0)
         flag_count = summary.get('red_flags', {}).get('total_count', 0)
@@ -75,7 +95,8 @@ def fetch_and_preprocess_metadata(
             "success": True,
             "summary": summary,
             "output_dir": out_path,
-            "fetch_stats": fetch_result.get("metadata_counts", {})
+            "fetch_stats": fetch_result.get("metadata_counts", {}),
+            "snapshot": fetch_result.get("snapshot")
         }
         
     except Exception as e:
@@ -244,13 +265,15 @@ if __name__ == "__main__":
     parser.add_argument("--org", default="digital-humans-dev", help="SFDX org alias")
     parser.add_argument("--output", help="Output directory")
     parser.add_argument("--project-id", help="Project ID")
+    parser.add_argument("--full", action="store_true", help="Ignore the org snapshot and fetch everything")
     
     args = parser.parse_args()
     
     result = fetch_and_preprocess_metadata(
         org_alias=args.org,
         project_id=args.project_id,
-        output_dir=args.output
+        output_dir=args.output,
+        incremental=not args.full
     )
     
     if result.get("success"):
@@ -6,14 +6,19 @@ ZERO LLM - Pure Python data fetching
 """
 
 import json
-import subprocess
+import re
+import threading
+import time
 import requests
+import requests.adapters
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 from dataclasses import dataclass
 import logging
 from app.config import settings
+from app.services.command_executor import get_command_executor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -34,47 +39,188 @@ class FetchResult:
     error: Optional[str] = None
     records_count: int = 0
 
+# META-FETCH: limites du moteur de recuperation.
+# Salesforce plafonne les requetes longues simultanees (25 en production,
+# 5 en Developer Edition) : 6 categories en parallele reste sous la limite
+# tout en recouvrant la latence reseau.
+FETCH_MAX_CONCURRENCY = 6
+FETCH_TIMEOUT_SECONDS = 60
+FETCH_MAX_ATTEMPTS = 4           # 429 / 503 (REQUEST_LIMIT_EXCEEDED, serveur occupe)
+FETCH_BACKOFF_SECONDS = 2.0      # x tentative, ou Retry-After si fourni
+BODY_PREVIEW_CHARS = 500
+
+
+def _truncate_bodies(records: List[Dict]) -> List[Dict]:
+    """Truncate Body for large classes/triggers (keep first 500 chars for analysis)"""
+    for record in records:
+        if record.get('Body') and len(record['Body']) > BODY_PREVIEW_CHARS:
+            record['BodyPreview'] = record['Body'][:BODY_PREVIEW_CHARS] + "..."
+            record['BodyLength'] = len(record['Body'])
+            del record['Body']  # Remove full body to save space
+    return records
+
+
+class _RawJsonWriter:
+    """
+    Écrit raw/<categorie>.json au fil des pages (tableau JSON valide à la fin).
+    Écrit dans un .part renommé à la fermeture : un fetch interrompu ne laisse
+    jamais de fichier tronqué.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._tmp = path.with_name(path.name + ".part")
+        self._file = open(self._tmp, "w")
+        self._file.write("[")
+        self._first = True
+
+    def write(self, records: List[Dict]) -> None:
+        for record in records:
+            self._file.write("\n  " if self._first else ",\n  ")
+            json.dump(record, self._file, default=str)
+            self._first = False
+
+    def close(self) -> None:
+        self._file.write("\n]\n" if not self._first else "]\n")
+        self._file.close()
+        self._tmp.replace(self.path)
+
+    def abort(self) -> None:
+        self._file.close()
+        self._tmp.unlink(missing_ok=True)
+
+
 class MetadataFetcher:
     """
     Fetches Salesforce metadata via REST/Tooling APIs
     Uses existing SFDX authentication
+
+    META-FETCH: one pooled ``requests.Session`` per fetcher, full
+    ``nextRecordsUrl`` pagination, categories fetched concurrently
+    (``FETCH_MAX_CONCURRENCY``) and raw files streamed page by page.
     """
     
-    def __init__(self, org_alias: str = "digital-humans-dev"):
+    # Categorie -> (API, SOQL, transformation par page)
+    CATEGORIES = {
+        "custom_objects": ("tooling", """
+            SELECT Id, DeveloperName, NamespacePrefix, Description
+            FROM CustomObject
+            WHERE NamespacePrefix = null
+        """, None),
+        "custom_fields": ("tooling", """
+            SELECT Id, DeveloperName, TableEnumOrId, NamespacePrefix, Description, Length
+            FROM CustomField
+            WHERE ManageableState = 'unmanaged'
+        """, None),
+        "flows": ("tooling", """
+            SELECT Id, DeveloperName, MasterLabel, Description,
+                   ActiveVersionId, LatestVersionId
+            FROM FlowDefinition
+        """, None),
+        "flow_versions": ("tooling", """
+            SELECT Id, DefinitionId, MasterLabel, VersionNumber, Status,
+                   ProcessType, Description
+            FROM Flow
+            WHERE Status = 'Active'
+        """, None),
+        "apex_classes": ("tooling", """
+            SELECT Id, Name, ApiVersion, Status, IsValid, 
+                   LengthWithoutComments, NamespacePrefix, Body
+            FROM ApexClass
+            WHERE NamespacePrefix = null
+        """, _truncate_bodies),
+        "apex_triggers": ("tooling", """
+            SELECT Id, Name, TableEnumOrId, ApiVersion, Status, 
+                   IsValid, LengthWithoutComments, Body, 
+                   UsageBeforeInsert, UsageBeforeUpdate, UsageBeforeDelete,
+                   UsageAfterInsert, UsageAfterUpdate, UsageAfterDelete,
+                   UsageAfterUndelete
+            FROM ApexTrigger
+            WHERE NamespacePrefix = null
+        """, _truncate_bodies),
+        "validation_rules": ("tooling", """
+            SELECT Id, ValidationName, EntityDefinitionId, Active,
+                   Description, ErrorMessage, ErrorDisplayField
+            FROM ValidationRule
+            WHERE ManageableState = 'unmanaged'
+        """, None),
+        "profiles": ("rest", "SELECT Id, Name, UserType FROM Profile", None),
+        "permission_sets": ("rest", """
+            SELECT Id, Name, Label, Description, IsCustom, NamespacePrefix
+            FROM PermissionSet
+            WHERE IsOwnedByProfile = false
+        """, None),
+        "connected_apps": ("tooling", """
+            SELECT Id, Name, ContactEmail, Description
+            FROM ConnectedApplication
+        """, None),
+        "named_credentials": ("tooling", """
+            SELECT Id, DeveloperName, Endpoint, PrincipalType
+            FROM NamedCredential
+        """, None),
+        "lightning_pages": ("tooling", """
+            SELECT Id, DeveloperName, MasterLabel, Type, EntityDefinitionId
+            FROM FlexiPage
+            WHERE NamespacePrefix = null
+        """, None),
+        "lwc_components": ("tooling", """
+            SELECT Id, DeveloperName, MasterLabel, Description
+            FROM LightningComponentBundle
+            WHERE NamespacePrefix = null
+        """, None),
+        "aura_components": ("tooling", """
+            SELECT Id, DeveloperName, MasterLabel, Description
+            FROM AuraDefinitionBundle
+            WHERE NamespacePrefix = null
+        """, None),
+        "custom_metadata_types": ("tooling", """
+            SELECT Id, DeveloperName, MasterLabel, QualifiedApiName
+            FROM EntityDefinition
+            WHERE QualifiedApiName LIKE '%__mdt'
+            LIMIT 100
+        """, None),
+    }
+    
+    # AS-IS-SNAP: champ d'horodatage par categorie pour les snapshots
+    # incrementaux. None = categorie toujours relue en entier (LIMIT, pas
+    # d'horodatage fiable).
+    WATERMARK_FIELDS = {
+        "custom_objects": "LastModifiedDate",
+        "custom_fields": "LastModifiedDate",
+        "flows": "LastModifiedDate",
+        "flow_versions": "LastModifiedDate",
+        "apex_classes": "SystemModstamp",
+        "apex_triggers": "SystemModstamp",
+        "validation_rules": "LastModifiedDate",
+        "profiles": "SystemModstamp",
+        "permission_sets": "SystemModstamp",
+        "connected_apps": "LastModifiedDate",
+        "named_credentials": "LastModifiedDate",
+        "lightning_pages": "LastModifiedDate",
+        "lwc_components": "LastModifiedDate",
+        "aura_components": "LastModifiedDate",
+        "custom_metadata_types": None,
+    }
+    
+    def __init__(self, org_alias: str = "digital-humans-dev", max_concurrency: int = FETCH_MAX_CONCURRENCY):
         self.org_alias = org_alias
+        self.max_concurrency = max_concurrency
         self.credentials: Optional[SalesforceCredentials] = None
         self.base_url: Optional[str] = None
         self.headers: Optional[Dict] = None
+        self.session: Optional[requests.Session] = None
+        self.api_usage: Optional[str] = None      # dernier en-tete Sforce-Limit-Info
+        self._auth_lock = threading.Lock()
         
     def authenticate(self) -> bool:
-        """Get credentials from SFDX CLI"""
+        """Get credentials from SFDX CLI (``sf org display``, cached per org by the command executor)"""
         try:
-            result = subprocess.run(
-                ["sf", "org", "display", "--target-org", self.org_alias, "--json"],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if result.returncode != 0:
-                logger.error(f"SFDX auth failed: {result.stderr}")
+            org_info, error = get_command_executor().org_display_sync(self.org_alias)
+            if org_info is None:
+                logger.error(f"SFDX auth failed: {error}")
                 return False
-                
-            data = json.loads(result.stdout)
-            org_info = data.get("result", {})
-            
-            self.credentials = SalesforceCredentials(
-                access_token=org_info.get("accessToken"),
-                instance_url=org_info.get("instanceUrl"),
-                org_id=org_info.get("id"),
-                api_version="65.0"
-            )
             
-            self.base_url = f"{self.credentials.instance_url}/services/data/v{self.credentials.api_version}"
-            self.headers = {
-                "Authorization": f"Bearer {self.credentials.access_token}",
-                "Content-Type": "application/json"
-            }
+            self.use_credentials(self._credentials_from(org_info))
             
             logger.info(f"✅ Authenticated to org: {self.credentials.org_id}")
             return True
@@ -83,52 +229,123 @@ class MetadataFetcher:
             logger.error(f"Authentication error: {e}")
             return False
     
-    def _query_tooling(self, soql: str) -> FetchResult:
-        """Execute SOQL query via Tooling API"""
-        if not self.credentials:
-            return FetchResult(success=False, error="Not authenticated")
-            
-        try:
-            url = f"{self.base_url}/tooling/query"
-            params = {"q": soql}
-            response = requests.get(url, headers=self.headers, params=params, timeout=60)
-            
-            if response.status_code == 200:
-                data = response.json()
-                records = data.get("records", [])
-                return FetchResult(success=True, data=records, records_count=len(records))
-            else:
-                return FetchResult(
-                    success=False, 
-                    error=f"API Error {response.status_code}: {response.text[:200]}"
-                )
-                
-        except Exception as e:
-            return FetchResult(success=False, error=str(e))
+    @staticmethod
+    def _credentials_from(org_info: Dict) -> SalesforceCredentials:
+        return SalesforceCredentials(
+            access_token=org_info.get("accessToken"),
+            instance_url=org_info.get("instanceUrl"),
+            org_id=org_info.get("id"),
+            api_version="65.0"
+        )
     
-    def _query_rest(self, soql: str) -> FetchResult:
-        """Execute SOQL query via REST API"""
+    def _reauthenticate(self, rejected_token: Optional[str]) -> bool:
+        """
+        Token rejected (401): refresh ``sf org display`` (cache dropped) and swap
+        the Authorization header of the shared session in place. Threads that
+        hit the same 401 refresh once.
+        """
+        with self._auth_lock:
+            if self.credentials and self.credentials.access_token != rejected_token:
+                return True                          # deja rafraichi par un autre thread
+            org_info, error = get_command_executor().refresh_org_sync(self.org_alias)
+            if org_info is None or not org_info.get("accessToken"):
+                logger.error(f"SFDX re-auth failed: {error}")
+                return False
+            credentials = self._credentials_from(org_info)
+            self.credentials = credentials
+            self.headers = {**(self.headers or {}), "Authorization": f"Bearer {credentials.access_token}"}
+            if self.session is not None:
+                self.session.headers.update(self.headers)
+            return True
+    
+    def use_credentials(self, credentials: SalesforceCredentials) -> None:
+        """Configure base URL, headers and the pooled HTTP session for ``credentials``."""
+        self.credentials = credentials
+        self.base_url = f"{credentials.instance_url}/services/data/v{credentials.api_version}"
+        self.headers = {
+            "Authorization": f"Bearer {credentials.access_token}",
+            "Content-Type": "application/json"
+        }
+        if self.session is not None:
+            self.session.close()
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=max(1, self.max_concurrency))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self.headers)
+    
+    def close(self) -> None:
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+    
+    def _get(self, url: str, params: Optional[Dict] = None, timeout: int = FETCH_TIMEOUT_SECONDS):
+        """GET via the pooled session, retrying 429/503 with backoff and a rejected token once."""
+        token = self.credentials.access_token if self.credentials else None
+        response = self._get_with_backoff(url, params, timeout)
+        if response.status_code == 401 and self._reauthenticate(token):
+            response = self._get_with_backoff(url, params, timeout)
+        return response
+    
+    def _get_with_backoff(self, url: str, params: Optional[Dict], timeout: int):
+        for attempt in range(1, FETCH_MAX_ATTEMPTS + 1):
+            response = self.session.get(url, params=params, timeout=timeout)
+            usage = response.headers.get("Sforce-Limit-Info")
+            if usage:
+                self.api_usage = usage
+            if response.status_code not in (429, 503) or attempt == FETCH_MAX_ATTEMPTS:
+                return response
+            retry_after = response.headers.get("Retry-After")
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else FETCH_BACKOFF_SECONDS * attempt
+            logger.warning(f"Salesforce API busy ({response.status_code}), retry {attempt} in {delay:.1f}s")
+            time.sleep(delay)
+        return response
+    
+    def _query_paginated(self, endpoint: str, soql: str,
+                         on_records: Optional[Callable[[List[Dict]], None]] = None,
+                         transform: Optional[Callable[[List[Dict]], List[Dict]]] = None) -> FetchResult:
+        """
+        Run ``soql`` on ``endpoint`` (``/query`` or ``/tooling/query``) and follow
+        ``nextRecordsUrl`` until ``done``. With ``on_records`` each page is handed
+        over as it arrives and not kept in memory (``data`` is then None).
+        """
         if not self.credentials:
             return FetchResult(success=False, error="Not authenticated")
-            
+        
+        collected: Optional[List[Dict]] = [] if on_records is None else None
+        count = 0
+        url, params = f"{self.base_url}{endpoint}", {"q": soql}
         try:
-            url = f"{self.base_url}/query"
-            params = {"q": soql}
-            response = requests.get(url, headers=self.headers, params=params, timeout=60)
-            
-            if response.status_code == 200:
+            while url:
+                response = self._get(url, params=params)
+                if response.status_code != 200:
+                    return FetchResult(
+                        success=False,
+                        error=f"API Error {response.status_code}: {response.text[:200]}"
+                    )
                 data = response.json()
                 records = data.get("records", [])
-                return FetchResult(success=True, data=records, records_count=len(records))
-            else:
-                return FetchResult(
-                    success=False,
-                    error=f"API Error {response.status_code}: {response.text[:200]}"
-                )
-                
+                if transform:
+                    records = transform(records)
+                count += len(records)
+                if on_records is not None:
+                    on_records(records)
+                else:
+                    collected.extend(records)
+                next_url = None if data.get("done", True) else data.get("nextRecordsUrl")
+                url, params = (f"{self.credentials.instance_url}{next_url}", None) if next_url else (None, None)
+            return FetchResult(success=True, data=collected, records_count=count)
         except Exception as e:
             return FetchResult(success=False, error=str(e))
     
+    def _query_tooling(self, soql: str, on_records=None, transform=None) -> FetchResult:
+        """Execute SOQL query via Tooling API (all pages)"""
+        return self._query_paginated("/tooling/query", soql, on_records, transform)
+    
+    def _query_rest(self, soql: str, on_records=None, transform=None) -> FetchResult:
+        """Execute SOQL query via REST API (all pages)"""
+        return self._query_paginated("/query", soql, on_records, transform)
+    
     def _describe_object(self, object_name: str) -> FetchResult:
         """Get object describe metadata"""
         if not self.credentials:
@@ -136,7 +353,7 @@ class MetadataFetcher:
             
         try:
             url = f"{self.base_url}/sobjects/{object_name}/describe"
-            response = requests.get(url, headers=self.headers, timeout=30)
+            response = self._get(url, timeout=30)
             
             if response.status_code == 200:
                 return FetchResult(success=True, data=response.json(), records_count=1)
@@ -153,173 +370,129 @@ class MetadataFetcher:
     # METADATA FETCH METHODS
     # =========================================================================
     
+    def fetch_category(self, name: str, on_records=None, soql: Optional[str] = None) -> FetchResult:
+        """Fetch one metadata category of ``CATEGORIES`` (all pages), optionally with a rewritten ``soql``."""
+        api, default_soql, transform = self.CATEGORIES[name]
+        query = self._query_tooling if api == "tooling" else self._query_rest
+        return query(soql or default_soql, on_records=on_records, transform=transform)
+    
+    def category_soql(self, name: str, since: Optional[str] = None, select: Optional[str] = None) -> str:
+        """
+        SOQL of ``name`` with its watermark field selected, optionally limited
+        to records modified after ``since`` (SOQL datetime literal) or with the
+        field list replaced by ``select`` (``Id``, ``COUNT()``).
+        """
+        soql = " ".join(self.CATEGORIES[name][1].split())
+        field = self.WATERMARK_FIELDS.get(name)
+        if select is not None:
+            soql = re.sub(r"^SELECT .+? FROM ", f"SELECT {select} FROM ", soql)
+        elif field:
+            soql = soql.replace("SELECT ", f"SELECT {field}, ", 1)
+        if since and field:
+            if " WHERE " in soql:
+                soql = soql.replace(" WHERE ", f" WHERE {field} > {since} AND ", 1)
+            elif " LIMIT " in soql:
+                soql = soql.replace(" LIMIT ", f" WHERE {field} > {since} LIMIT ", 1)
+            else:
+                soql = f"{soql} WHERE {field} > {since}"
+        return soql
+    
+    def count_category(self, name: str) -> Optional[int]:
+        """``SELECT COUNT()`` of a category, None when the API refuses it."""
+        api = self.CATEGORIES[name][0]
+        endpoint = "/tooling/query" if api == "tooling" else "/query"
+        try:
+            response = self._get(f"{self.base_url}{endpoint}",
+                                 params={"q": self.category_soql(name, select="COUNT()")})
+            if response.status_code != 200:
+                return None
+            return response.json().get("totalSize")
+        except Exception:
+            return None
+    
     def fetch_custom_objects(self) -> FetchResult:
         """Fetch all custom objects with field counts"""
-        soql = """
-            SELECT Id, DeveloperName, NamespacePrefix, Description
-            FROM CustomObject
-            WHERE NamespacePrefix = null
-        """
-        return self._query_tooling(soql)
+        return self.fetch_category("custom_objects")
     
     def fetch_custom_fields(self) -> FetchResult:
         """Fetch custom fields grouped by object"""
-        soql = """
-            SELECT Id, DeveloperName, TableEnumOrId, NamespacePrefix, Description, Length
-            FROM CustomField
-            WHERE ManageableState = 'unmanaged'
-        """
-        return self._query_tooling(soql)
+        return self.fetch_category("custom_fields")
     
     def fetch_flows(self) -> FetchResult:
         """Fetch all Flow definitions with details"""
-        soql = """
-            SELECT Id, DeveloperName, MasterLabel, Description,
-                   ActiveVersionId, LatestVersionId
-            FROM FlowDefinition
-        """
-        return self._query_tooling(soql)
+        return self.fetch_category("flows")
     
     def fetch_flow_versions(self, flow_ids: List[str] = None) -> FetchResult:
         """Fetch Flow version details (element counts, etc.)"""
-        soql = """
-            SELECT Id, DefinitionId, MasterLabel, VersionNumber, Status,
-                   ProcessType, Description
-            FROM Flow
-            WHERE Status = 'Active'
-        """
-        return self._query_tooling(soql)
+        return self.fetch_category("flow_versions")
     
     def fetch_apex_classes(self) -> FetchResult:
-        """Fetch all Apex classes"""
-        soql = """
-            SELECT Id, Name, ApiVersion, Status, IsValid, 
-                   LengthWithoutComments, NamespacePrefix, Body
-            FROM ApexClass
-            WHERE NamespacePrefix = null
-        """
-        result = self._query_tooling(soql)
-        
-        # Truncate Body for large classes (keep first 500 chars for analysis)
-        if result.success and result.data:
-            for cls in result.data:
-                if cls.get('Body') and len(cls['Body']) > 500:
-                    cls['BodyPreview'] = cls['Body'][:500] + "..."
-                    cls['BodyLength'] = len(cls['Body'])
-                    del cls['Body']  # Remove full body to save space
-                    
-        return result
+        """Fetch all Apex classes (Body truncated to a preview)"""
+        return self.fetch_category("apex_classes")
     
     def fetch_apex_triggers(self) -> FetchResult:
-        """Fetch all Apex triggers"""
-        soql = """
-            SELECT Id, Name, TableEnumOrId, ApiVersion, Status, 
-                   IsValid, LengthWithoutComments, Body, 
-                   UsageBeforeInsert, UsageBeforeUpdate, UsageBeforeDelete,
-                   UsageAfterInsert, UsageAfterUpdate, UsageAfterDelete,
-                   UsageAfterUndelete
-            FROM ApexTrigger
-            WHERE NamespacePrefix = null
-        """
-        result = self._query_tooling(soql)
-        
-        # Truncate Body
-        if result.success and result.data:
-            for trigger in result.data:
-                if trigger.get('Body') and len(trigger['Body']) > 500:
-                    trigger['BodyPreview'] = trigger['Body'][:500] + "..."
-                    trigger['BodyLength'] = len(trigger['Body'])
-                    del trigger['Body']
-                    
-        return result
+        """Fetch all Apex triggers (Body truncated to a preview)"""
+        return self.fetch_category("apex_triggers")
     
     def fetch_validation_rules(self) -> FetchResult:
         """Fetch validation rules"""
-        soql = """
-            SELECT Id, ValidationName, EntityDefinitionId, Active,
-                   Description, ErrorMessage, ErrorDisplayField
-            FROM ValidationRule
-            WHERE ManageableState = 'unmanaged'
-        """
-        return self._query_tooling(soql)
+        return self.fetch_category("validation_rules")
     
     def fetch_profiles(self) -> FetchResult:
         """Fetch profiles"""
-        soql = "SELECT Id, Name, UserType FROM Profile"
-        return self._query_rest(soql)
+        return self.fetch_category("profiles")
     
     def fetch_permission_sets(self) -> FetchResult:
         """Fetch permission sets"""
-        soql = """
-            SELECT Id, Name, Label, Description, IsCustom, NamespacePrefix
-            FROM PermissionSet
-            WHERE IsOwnedByProfile = false
-        """
-        return self._query_rest(soql)
+        return self.fetch_category("permission_sets")
     
     def fetch_connected_apps(self) -> FetchResult:
         """Fetch connected apps (integrations)"""
-        soql = """
-            SELECT Id, Name, ContactEmail, Description
-            FROM ConnectedApplication
-        """
-        return self._query_tooling(soql)
+        return self.fetch_category("connected_apps")
     
     def fetch_named_credentials(self) -> FetchResult:
         """Fetch named credentials"""
-        soql = """
-            SELECT Id, DeveloperName, Endpoint, PrincipalType
-            FROM NamedCredential
-        """
-        return self._query_tooling(soql)
+        return self.fetch_category("named_credentials")
     
     def fetch_lightning_pages(self) -> FetchResult:
         """Fetch Lightning pages"""
-        soql = """
-            SELECT Id, DeveloperName, MasterLabel, Type, EntityDefinitionId
-            FROM FlexiPage
-            WHERE NamespacePrefix = null
-        """
-        return self._query_tooling(soql)
+        return self.fetch_category("lightning_pages")
     
     def fetch_lwc_components(self) -> FetchResult:
         """Fetch LWC components"""
-        soql = """
-            SELECT Id, DeveloperName, MasterLabel, Description
-            FROM LightningComponentBundle
-            WHERE NamespacePrefix = null
-        """
-        return self._query_tooling(soql)
+        return self.fetch_category("lwc_components")
     
     def fetch_aura_components(self) -> FetchResult:
         """Fetch Aura components"""
-        soql = """
-            SELECT Id, DeveloperName, MasterLabel, Description
-            FROM AuraDefinitionBundle
-            WHERE NamespacePrefix = null
-        """
-        return self._query_tooling(soql)
+        return self.fetch_category("aura_components")
     
     def fetch_custom_metadata_types(self) -> FetchResult:
         """Fetch custom metadata types"""
-        soql = """
-            SELECT Id, DeveloperName, MasterLabel, QualifiedApiName
-            FROM EntityDefinition
-            WHERE QualifiedApiName LIKE '%__mdt'
-            LIMIT 100
-        """
-        return self._query_tooling(soql)
+        return self.fetch_category("custom_metadata_types")
 
     # =========================================================================
     # MAIN FETCH ALL METHOD
     # =========================================================================
     
+    def _fetch_to_file(self, name: str, raw_path: Path) -> FetchResult:
+        writer = _RawJsonWriter(raw_path / f"{name}.json")
+        try:
+            result = self.fetch_category(name, on_records=writer.write)
+        except BaseException:
+            writer.abort()
+            raise
+        if result.success:
+            writer.close()
+        else:
+            writer.abort()
+        return result
+    
     def fetch_all_metadata(self, output_dir: str) -> Dict[str, Any]:
         """
         Fetch all metadata and save to files
         Returns summary of what was fetched
         """
-        if not self.authenticate():
+        if self.credentials is None and not self.authenticate():
             return {"success": False, "error": "Authentication failed"}
         
         output_path = Path(output_dir)
@@ -327,25 +500,6 @@ class MetadataFetcher:
         raw_path = output_path / "raw"
         raw_path.mkdir(exist_ok=True)
         
-        results = {}
-        fetch_methods = {
-            "custom_objects": self.fetch_custom_objects,
-            "custom_fields": self.fetch_custom_fields,
-            "flows": self.fetch_flows,
-            "flow_versions": self.fetch_flow_versions,
-            "apex_classes": self.fetch_apex_classes,
-            "apex_triggers": self.fetch_apex_triggers,
-            "validation_rules": self.fetch_validation_rules,
-            "profiles": self.fetch_profiles,
-            "permission_sets": self.fetch_permission_sets,
-            "connected_apps": self.fetch_connected_apps,
-            "named_credentials": self.fetch_named_credentials,
-            "lightning_pages": self.fetch_lightning_pages,
-            "lwc_components": self.fetch_lwc_components,
-            "aura_components": self.fetch_aura_components,
-            "custom_metadata_types": self.fetch_custom_metadata_types,
-        }
-        
         summary = {
             "org_id": self.credentials.org_id,
             "instance_url": self.credentials.instance_url,
@@ -354,25 +508,29 @@ class MetadataFetcher:
             "errors": []
         }
         
-        for name, method in fetch_methods.items():
-            logger.info(f"Fetching {name}...")
-            result = method()
-            
-            if result.success:
-                # Save raw data
-                file_path = raw_path / f"{name}.json"
-                with open(file_path, 'w') as f:
-                    json.dump(result.data, f, indent=2, default=str)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency), thread_name_prefix="sf-fetch") as pool:
+            futures = {name: pool.submit(self._fetch_to_file, name, raw_path) for name in self.CATEGORIES}
+            # Resultats lus dans l'ordre des categories : resume deterministe.
+            for name, future in futures.items():
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = FetchResult(success=False, error=str(e))
                 
-                summary["metadata_counts"][name] = result.records_count
-                results[name] = result.data
-                logger.info(f"  ✅ {name}: {result.records_count} records")
-            else:
-                summary["errors"].append({
-                    "component": name,
-                    "error": result.error
-                })
-                logger.warning(f"  ⚠️ {name}: {result.error}")
+                if result.success:
+                    summary["metadata_counts"][name] = result.records_count
+                    logger.info(f"  ✅ {name}: {result.records_count} records")
+                else:
+                    summary["errors"].append({
+                        "component": name,
+                        "error": result.error
+                    })
+                    logger.warning(f"  ⚠️ {name}: {result.error}")
+        
+        summary["fetch_seconds"] = round(time.perf_counter() - started, 3)
+        if self.api_usage:
+            summary["api_usage"] = self.api_usage
         
         # Save summary
         summary_path = output_path / "extraction_log.json"
@@ -7,6 +7,7 @@ ZERO LLM - Pure Python analysis with RED FLAG detection
 
 import re
 import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any
@@ -76,13 +77,90 @@ class ComponentSummary:
     by_category: Dict[str, int] = field(default_factory=dict)
 
 
+# META-SCAN: moteur d'analyse mono-passe.
+# Un seul finditer par corps relève les ouvertures de boucle `for (` et les
+# IDs en dur ; le segment de chaque boucle (de la première `)` à la `}`
+# suivante) est ensuite testé pour [SELECT et le DML. Verdicts identiques
+# aux trois regex historiques de MetadataPreprocessor.
+_SCAN_TOKENS = re.compile(r"(?P<loop>(?i:for)\s*\()|['\"](?:[a-zA-Z0-9]{15}|[a-zA-Z0-9]{18})['\"]")
+_SOQL_TOKEN = re.compile(r"\[SELECT", re.IGNORECASE)
+_DML_TOKEN = re.compile(r"(?:insert|update|delete|upsert)\s", re.IGNORECASE)
+
+# Scan multi-processus : seulement au-delà de ce nombre de corps à analyser
+# (en dessous, le coût de démarrage du pool domine). workers=1 = mono-processus.
+PREPROCESS_WORKERS = 1
+PARALLEL_MIN_CLASSES = 2000
+RAW_READ_CHUNK = 1 << 16
+
+
+def scan_apex_body(body: str) -> Dict:
+    """Single-pass scan of an Apex body: test annotation, SOQL/DML in loop, hardcoded IDs"""
+    soql = dml = False
+    hardcoded_ids = 0
+    seen_headers = set()
+    for match in _SCAN_TOKENS.finditer(body):
+        if match.lastgroup != "loop":
+            hardcoded_ids += 1
+            continue
+        if soql and dml:
+            continue
+        close = body.find(")", match.end())
+        if close <= match.end() or close in seen_headers:
+            continue
+        seen_headers.add(close)
+        end = body.find("}", close + 1)
+        segment = body[close + 1:] if end == -1 else body[close + 1:end]
+        soql = soql or bool(_SOQL_TOKEN.search(segment))
+        dml = dml or bool(_DML_TOKEN.search(segment))
+    return {
+        "is_test": "@istest" in body.lower(),
+        "soql_in_loop": soql,
+        "dml_in_loop": dml,
+        "hardcoded_ids": hardcoded_ids,
+    }
+
+
+def iter_json_array(path: Path, chunk_size: int = RAW_READ_CHUNK):
+    """Yield the elements of a top-level JSON array without reading the whole file at once"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buf, eof = f.read(chunk_size), False
+        pos = len(buf) - len(buf.lstrip())
+        if buf[pos:pos + 1] != "[":
+            raise ValueError(f"{path} is not a JSON array")
+        pos += 1
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                if pos >= len(buf):
+                    raise ValueError("buffer exhausted")
+                item, end = decoder.raw_decode(buf, pos)
+                if end == len(buf) and not eof:
+                    raise ValueError("value may continue in next chunk")
+            except ValueError:
+                if eof:
+                    raise
+                more = f.read(chunk_size)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield item
+            pos = end
+            if pos > chunk_size:
+                buf, pos = buf[pos:], 0
+
+
 class MetadataPreprocessor:
     """
     Analyzes raw Salesforce metadata and produces an intelligent summary
     with RED FLAGS for Marcus to consume
     """
     
-    # Patterns for code analysis
+    # Patterns for code analysis (reference rules; scan_apex_body applies
+    # them in a single pass)
     SOQL_IN_LOOP_PATTERN = re.compile(r'for\s*\([^)]+\)[^}]*\[SELECT', re.IGNORECASE | re.DOTALL)
     DML_IN_LOOP_PATTERN = re.compile(r'for\s*\([^)]+\)[^}]*(insert|update|delete|upsert)\s+', re.IGNORECASE | re.DOTALL)
     HARDCODED_ID_PATTERN = re.compile(r"['\"]([a-zA-Z0-9]{15}|[a-zA-Z0-9]{18})['\"]")
@@ -92,18 +170,28 @@ class MetadataPreprocessor:
     DEPRECATED_API_THRESHOLD = 50.0
     WARNING_API_THRESHOLD = 58.0
     
-    def __init__(self, raw_data_path: str):
+    def __init__(self, raw_data_path: str, workers: int = PREPROCESS_WORKERS):
         self.raw_path = Path(raw_data_path)
+        self.workers = workers
         self.red_flags: List[RedFlag] = []
         self.raw_data: Dict[str, Any] = {}
         
     def load_raw_data(self) -> bool:
-        """Load all raw JSON files"""
+        """Load all raw JSON files (streamed record by record, API ``attributes`` dropped)"""
         try:
             for json_file in self.raw_path.glob("*.json"):
                 component_name = json_file.stem
-                with open(json_file, 'r') as f:
-                    self.raw_data[component_name] = json.load(f)
+                try:
+                    records = list(iter_json_array(json_file))
+                except ValueError:
+                    # Pas un tableau (ou illisible) : chargement classique
+                    with open(json_file, 'r') as f:
+                        records = json.load(f)
+                if isinstance(records, list):
+                    for record in records:
+                        if isinstance(record, dict):
+                            record.pop("attributes", None)
+                self.raw_data[component_name] = records
             logger.info(f"Loaded {len(self.raw_data)} raw data files")
             return True
         except Exception as e:
@@ -124,6 +212,21 @@ class MetadataPreprocessor:
             details=details
         ))
     
+    def _scan_bodies(self, records: List[Dict]) -> List[Dict]:
+        """
+        scan_apex_body for every record, in a process pool when ``workers`` > 1
+        and there are enough bodies to scan. Order is preserved.
+        """
+        bodies = [record.get("BodyPreview", record.get("Body", "")) or "" for record in records]
+        if self.workers > 1 and len(bodies) >= PARALLEL_MIN_CLASSES:
+            try:
+                with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                    chunksize = max(1, len(bodies) // (self.workers * 4))
+                    return list(pool.map(scan_apex_body, bodies, chunksize=chunksize))
+            except Exception as e:
+                logger.warning(f"Parallel scan unavailable ({e}), scanning in-process")
+        return [scan_apex_body(body) for body in bodies]
+    
     # =========================================================================
     # ANALYSIS METHODS
     # =========================================================================
@@ -143,14 +246,15 @@ class MetadataPreprocessor:
             "issues": []
         }
         
-        for cls in classes:
+        scans = self._scan_bodies(classes)
+        for cls, scan in zip(classes, scans):
             name = cls.get("Name", "Unknown")
             api_version = cls.get("ApiVersion", 0)
             body_preview = cls.get("BodyPreview", cls.get("Body", ""))
             body_length = cls.get("BodyLength", len(body_preview))
             
             # Categorize
-            is_test = name.lower().endswith("test") or "@istest" in body_preview.lower()
+            is_test = name.lower().endswith("test") or scan["is_test"]
             if is_test:
                 summary["test_classes"].append(name)
             else:
@@ -183,7 +287,7 @@ class MetadataPreprocessor:
             # Code pattern analysis
             if body_preview:
                 # SOQL in loop
-                if self.SOQL_IN_LOOP_PATTERN.search(body_preview):
+                if scan["soql_in_loop"]:
                     self._add_flag(
                         RedFlagType.SOQL_IN_LOOP, Severity.CRITICAL,
                         name, "ApexClass",
@@ -192,7 +296,7 @@ class MetadataPreprocessor:
                     )
                 
                 # DML in loop
-                if self.DML_IN_LOOP_PATTERN.search(body_preview):
+                if scan["dml_in_loop"]:
                     self._add_flag(
                         RedFlagType.DML_IN_LOOP, Severity.CRITICAL,
                         name, "ApexClass",
@@ -201,14 +305,14 @@ class MetadataPreprocessor:
                     )
                 
                 # Hardcoded IDs
-                hardcoded_ids = self.HARDCODED_ID_PATTERN.findall(body_preview)
+                hardcoded_ids = scan["hardcoded_ids"]
                 if hardcoded_ids:
                     self._add_flag(
                         RedFlagType.HARDCODED_ID, Severity.HIGH,
                         name, "ApexClass",
-                        f"Found {len(hardcoded_ids)} potential hardcoded IDs",
+                        f"Found {hardcoded_ids} potential hardcoded IDs",
                         "Use Custom Metadata Types or Custom Labels instead",
-                        id_count=len(hardcoded_ids)
+                        id_count=hardcoded_ids
                     )
             
             # Complexity check
@@ -226,14 +330,15 @@ class MetadataPreprocessor:
                     length=body_length
                 )
         
-        # Check for missing test classes
+        # Check for missing test classes (set index: O(classes))
+        test_names = set(summary["test_classes"])
         for regular_class in summary["regular_classes"]:
             class_name = regular_class["name"]
             expected_test = f"{class_name}Test"
-            if expected_test not in summary["test_classes"]:
+            if expected_test not in test_names:
                 # Check variations
                 variations = [f"{class_name}_Test", f"Test{class_name}"]
-                if not any(v in summary["test_classes"] for v in variations):
+                if not any(v in test_names for v in variations):
                     self._add_flag(
                         RedFlagType.NO_TEST_CLASS, Severity.HIGH,
                         class_name, "ApexClass",
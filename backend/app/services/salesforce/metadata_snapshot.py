@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Salesforce Metadata Snapshot Store (AS-IS-SNAP)
+Snapshot brut par org + watermark (LastModifiedDate / SystemModstamp) par catégorie.
+Un refresh ne relit que les enregistrements modifiés depuis le snapshot
+précédent, puis contrôle les suppressions (COUNT(), scan des Id seulement
+si le compte diverge). Un verrou par org sérialise les refresh concurrents
+(exécutions parallèles, workers ARQ distincts).
+ZERO LLM - Pure Python data fetching
+"""
+
+import fcntl
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from .metadata_fetcher import MetadataFetcher
+
+logger = logging.getLogger(__name__)
+
+# Recouvrement appliqué au watermark : un enregistrement commité avec un
+# horodatage juste antérieur à la lecture précédente est relu (upsert par Id,
+# donc idempotent).
+WATERMARK_OVERLAP_SECONDS = 300
+
+
+def _parse_sf_datetime(value: str) -> datetime:
+    """Parse ``2024-05-01T10:00:00.000+0000`` (format API) ou ISO 8601."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f%z")
+    except ValueError:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _soql_datetime(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class MetadataSnapshotStore:
+    """
+    Per-org snapshot of the raw metadata categories of ``MetadataFetcher``.
+
+    Layout under ``<METADATA_DIR>/snapshots/<org_id>/``:
+    ``raw/<category>.json`` (records sorted by Id, same format as a full
+    fetch), ``state.json`` (watermarks), ``.lock`` (see ``lock``).
+    """
+
+    def __init__(self, org_id: str, root: Optional[Path] = None):
+        self.org_id = org_id
+        self.path = Path(root or settings.METADATA_DIR / "snapshots") / org_id
+        self.raw_path = self.path / "raw"
+
+    # =========================================================================
+    # PERSISTENCE
+    # =========================================================================
+
+    def _read_json(self, path: Path, default):
+        if not path.exists():
+            return default
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable snapshot file {path}: {e}")
+            return default
+
+    def _write_json(self, path: Path, data, indent: Optional[int] = None) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=indent, default=str)
+        tmp.replace(path)
+
+    def load_state(self) -> Dict[str, Any]:
+        return self._read_json(self.path / "state.json", {"categories": {}})
+
+    def load_records(self, name: str) -> Optional[List[Dict]]:
+        return self._read_json(self.raw_path / f"{name}.json", None)
+
+    @contextmanager
+    def lock(self):
+        """
+        Exclusive per-org lock (flock on ``.lock``), across threads and
+        processes. Hold it over ``refresh`` and the reads of ``raw_path`` that
+        follow, so a concurrent refresh never mixes two states of the org.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.path / ".lock", "w") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield self
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    # =========================================================================
+    # REFRESH
+    # =========================================================================
+
+    def _refresh_category(self, fetcher: MetadataFetcher, name: str,
+                          previous: Optional[Dict]) -> Tuple[Optional[str], Optional[Dict], Optional[Dict]]:
+        """Returns (error, state entry, change stats) for one category."""
+        field = fetcher.WATERMARK_FIELDS.get(name)
+        old = None
+        if field and previous and previous.get("watermark"):
+            old = self.load_records(name)
+
+        if old is None:
+            result = fetcher.fetch_category(name, soql=fetcher.category_soql(name))
+            if not result.success:
+                return result.error, None, None
+            records = result.data
+            change = {"mode": "full", "changed": len(records), "deleted": 0}
+        else:
+            since = _parse_sf_datetime(previous["watermark"]) - timedelta(seconds=WATERMARK_OVERLAP_SECONDS)
+            result = fetcher.fetch_category(name, soql=fetcher.category_soql(name, since=_soql_datetime(since)))
+            if not result.success:
+                return result.error, None, None
+            merged = {r["Id"]: r for r in old}
+            changed = sum(1 for r in result.data if merged.get(r["Id"]) != r)
+            merged.update((r["Id"], r) for r in result.data)
+
+            # Contrôle de suppression : un COUNT() suffit tant qu'il concorde ;
+            # sinon (suppression, sortie du filtre WHERE) scan des seuls Id.
+            deleted = 0
+            if fetcher.count_category(name) != len(merged):
+                ids = fetcher.fetch_category(name, soql=fetcher.category_soql(name, select="Id"))
+                if not ids.success:
+                    return ids.error, None, None
+                live = {r["Id"] for r in ids.data}
+                deleted = sum(1 for record_id in merged if record_id not in live)
+                merged = {i: r for i, r in merged.items() if i in live}
+            records = list(merged.values())
+            change = {"mode": "incremental", "changed": changed, "deleted": deleted}
+
+        records.sort(key=lambda r: r.get("Id") or "")
+        if old is None or change["changed"] or change["deleted"]:
+            self._write_json(self.raw_path / f"{name}.json", records, indent=2)
+
+        stamps = [r[field] for r in records if field and r.get(field)]
+        watermark = max(stamps, key=_parse_sf_datetime) if stamps else None
+        return None, {"watermark": watermark, "count": len(records)}, change
+
+    def refresh(self, fetcher: MetadataFetcher) -> Dict[str, Any]:
+        """
+        Bring the snapshot up to date with the org behind ``fetcher``
+        (already authenticated), under ``lock`` when other refreshes may run. Returns a summary shaped like
+        ``MetadataFetcher.fetch_all_metadata`` plus per-category ``snapshot`` stats.
+        A category that fails keeps its previous snapshot.
+        """
+        previous = self.load_state().get("categories", {})
+        self.raw_path.mkdir(parents=True, exist_ok=True)
+
+        summary = {
+            "org_id": fetcher.credentials.org_id,
+            "instance_url": fetcher.credentials.instance_url,
+            "fetch_timestamp": datetime.now().isoformat(),
+            "metadata_counts": {},
+            "errors": [],
+            "snapshot": {},
+        }
+        categories = {}
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, fetcher.max_concurrency), thread_name_prefix="sf-snap") as pool:
+            futures = {
+                name: pool.submit(self._refresh_category, fetcher, name, previous.get(name))
+                for name in fetcher.CATEGORIES
+            }
+            for name, future in futures.items():
+                try:
+                    error, entry, change = future.result()
+                except Exception as e:
+                    error, entry, change = str(e), None, None
+
+                if error is None:
+                    categories[name] = entry
+                    summary["metadata_counts"][name] = entry["count"]
+                    summary["snapshot"][name] = change
+                else:
+                    if name in previous:
+                        categories[name] = previous[name]
+                    summary["errors"].append({"component": name, "error": error})
+                    logger.warning(f"  ⚠️ {name}: {error}")
+
+        summary["fetch_seconds"] = round(time.perf_counter() - started, 3)
+        changed = sum(c["changed"] + c["deleted"] for c in summary["snapshot"].values())
+        logger.info(f"Snapshot {self.org_id} refreshed: {changed} changed component(s) in {summary['fetch_seconds']}s")
+
+        self._write_json(self.path / "state.json", {
+            "org_id": self.org_id,
+            "refreshed_at": summary["fetch_timestamp"],
+            "categories": categories,
+        }, indent=2)
+        self._write_json(self.path / "extraction_log.json", summary, indent=2)
+
+        summary["success"] = True
+        summary["raw_data_path"] = str(self.raw_path)
+        return summary
@@ -11,6 +11,10 @@ from typing import Dict, List, Any, Optional
 from dataclasses import dataclass, field
 from pathlib import Path
 
+from app.services.command_executor import get_command_executor
+from app.services.deploy_manifest import DeploymentManifest, read_tree
+from app.services.sfdx_service import SFDXService
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,6 +30,10 @@ class DeployResult:
     output_dir: Optional[str] = None
     created_components: List[Dict[str, str]] = field(default_factory=list)
     deploy_id: Optional[str] = None
+    # DEPLOY-DIFF : aucun fichier modifie depuis le dernier deploiement
+    unchanged: bool = False
+    skipped_files: int = 0
+    package_xml: Optional[str] = None
 
 
 # ── FIX-SUFFIXE-002 (08/08/2026) ──────────────────────────────────────────
@@ -171,10 +179,12 @@ class SFAdminService:
         "AutoNumber": "AutoNumber",
     }
     
-    def __init__(self, target_org: str, execution_id=None, persist_dir: str = None):
+    def __init__(self, target_org: str, execution_id=None, persist_dir: str = None,
+                 manifest: Optional[DeploymentManifest] = None):
         """
         Args:
             target_org: Username ou alias de l'org cible SFDX
+            manifest: manifest DEPLOY-DIFF de l'org ; None = tout redeployer
         """
         self.target_org = target_org
         self.created_components: List[Dict[str, str]] = []
@@ -183,14 +193,16 @@ class SFAdminService:
         # deploiement et rien n'atteint jamais le depot git.
         self.execution_id = execution_id
         self.persist_dir = persist_dir or "/var/lib/digital-humans/livrables"
+        self.manifest = manifest
         logger.info(f"[SFAdmin] Initialized for org: {target_org}")
     
-    def execute_plan(self, plan: Dict[str, Any]) -> DeployResult:
+    def execute_plan(self, plan: Dict[str, Any], force: bool = False) -> DeployResult:
         """
         Exécute un plan JSON complet.
         
         Args:
             plan: Plan JSON avec liste d'operations
+            force: redeploie tous les fichiers generes, sans diff DEPLOY-DIFF
             
         Returns:
             DeployResult avec succès/échec
@@ -212,8 +224,8 @@ class SFAdminService:
                 # 2. Créer sfdx-project.json
                 self._create_sfdx_project(temp_dir)
                 
-                # 3. Déployer via SFDX
-                result = self._deploy_via_sfdx(temp_dir)
+                # 3. Déployer via SFDX — seulement le delta (DEPLOY-DIFF)
+                result = self._deploy_changed(temp_dir, force)
 
                 # FIX-PERSIST-001 (10/08/2026) — CONSERVER LES FICHIERS.
                 # tempfile.TemporaryDirectory() efface tout en sortant du
@@ -247,6 +259,45 @@ class SFAdminService:
                 logger.error(f"[SFAdmin] Plan execution failed: {e}")
                 return DeployResult(success=False, errors=[str(e)])
     
+    def _deploy_changed(self, temp_dir: str, force: bool = False) -> DeployResult:
+        """
+        DEPLOY-DIFF : compare l'arborescence generee au manifest de l'org et ne
+        deploie que les fichiers dont le contenu a change (projet delta a part,
+        deploye avec son package.xml en --manifest). L'arborescence complete reste dans ``temp_dir``
+        pour la conservation FIX-PERSIST-001.
+        """
+        generated = read_tree(temp_dir)
+        changed = self.manifest.changed(generated, force=force) if self.manifest else generated
+        skipped = len(generated) - len(changed)
+        if generated and not changed:
+            logger.info(f"[SFAdmin] {len(generated)} fichier(s) identiques au dernier deploiement — rien a deployer")
+            return DeployResult(success=True, unchanged=True, skipped_files=skipped)
+
+        package_xml = SFDXService._generate_package_xml(
+            SFDXService._categorize_files(changed), self._version_api()
+        )
+        if not skipped:
+            result = self._deploy_via_sfdx(temp_dir)
+        else:
+            logger.info(f"[SFAdmin] Delta : {len(changed)}/{len(generated)} fichier(s) a deployer")
+            with tempfile.TemporaryDirectory(prefix="sfadmin_delta_") as delta_root:
+                # Projet delta dans project/, package.xml a cote : il delimite
+                # le deploiement (--manifest) sans faire partie des sources.
+                delta_dir = Path(delta_root) / "project"
+                for rel, content in changed.items():
+                    target = delta_dir / rel
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    target.write_bytes(content)
+                self._create_sfdx_project(str(delta_dir))
+                manifest_path = Path(delta_root) / "package.xml"
+                manifest_path.write_text(package_xml, encoding="utf-8")
+                result = self._deploy_via_sfdx(str(delta_dir), manifest_path=str(manifest_path))
+        result.skipped_files = skipped
+        result.package_xml = package_xml
+        if result.success and self.manifest:
+            self.manifest.record(changed, deploy_id=result.deploy_id)
+        return result
+    
     def _generate_metadata_files(self, operations: List[Dict], temp_dir: str) -> None:
         """Génère les fichiers XML pour chaque opération."""
         
@@ -558,19 +609,36 @@ class SFAdminService:
         develop, scratch...). Sans elle, toute cible serait refusee.
         """
         try:
-            r = subprocess.run(
-                ["sf", "org", "display", "--target-org", self.target_org, "--json"],
-                capture_output=True, text=True, timeout=60,
-            )
-            if r.returncode == 0 and r.stdout:
-                return (json.loads(r.stdout).get("result", {})
-                        .get("instanceUrl", "") or "")
+            # CMD-EXEC : resultat partage (cache par org) avec les autres services
+            info, error = get_command_executor().org_display_sync(self.target_org)
+            if info:
+                return info.get("instanceUrl", "") or ""
+            logger.warning(f"[SFAdmin] Instance de l'org indeterminable : {error}")
         except Exception as e:
             logger.warning(f"[SFAdmin] Instance de l'org indeterminable : {e}")
         return ""
 
-    def _deploy_via_sfdx(self, temp_dir: str) -> DeployResult:
-        """Déploie les métadonnées via SFDX CLI."""
+    def _run_sf(self, cmd: List[str], temp_dir: str, timeout: int):
+        """Lance ``cmd`` via l'executeur partage (CMD-EXEC) ; leve TimeoutExpired comme subprocess.run.
+
+        Jeton de session refuse (INVALID_SESSION_ID) : l'org est rafraichie et
+        la commande relancee une fois.
+        """
+        executor = get_command_executor()
+        run = executor.run_sync(cmd, cwd=temp_dir, timeout=timeout, key=f"sf:{self.target_org}")
+        if run.session_expired:
+            executor.refresh_org_sync(self.target_org)
+            run = executor.run_sync(cmd, cwd=temp_dir, timeout=timeout, key=f"sf:{self.target_org}")
+        logger.info(f"[SFAdmin] sf {run.label}: {run.duration_ms} ms (attente {run.queued_ms} ms)")
+        if run.timed_out:
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        if run.error:
+            raise OSError(run.error)
+        return run
+
+    def _deploy_via_sfdx(self, temp_dir: str, manifest_path: Optional[str] = None) -> DeployResult:
+        """Déploie les métadonnées via SFDX CLI (limitées au package.xml ``manifest_path`` s'il est fourni)."""
+        scope = ["--manifest", manifest_path] if manifest_path else ["--source-dir", "force-app"]
 
         # ── GARDE-PROD-001 : refus absolu de déployer en production ──
         instance = getattr(self, "instance_url", "") or self._instance_de_l_org()
@@ -605,16 +673,13 @@ class SFAdminService:
         # l'erreur telle quelle sans avoir touche a l'org.
         cmd_validation = [
             "sf", "project", "deploy", "start",
-            "--source-dir", "force-app",
+            *scope,
             "--target-org", self.target_org,
             "--dry-run",
             "--json",
         ]
         try:
-            v = subprocess.run(
-                cmd_validation, cwd=temp_dir, capture_output=True,
-                text=True, timeout=600,
-            )
+            v = self._run_sf(cmd_validation, temp_dir, timeout=600)
             if v.returncode != 0:
                 detail = json.loads(v.stdout or "{}") if v.stdout else {}
                 erreurs = []
@@ -640,7 +705,7 @@ class SFAdminService:
 
         cmd = [
             "sf", "project", "deploy", "start",
-            "--source-dir", "force-app",
+            *scope,
             "--target-org", self.target_org,
             "--json"
         ]
@@ -649,13 +714,7 @@ class SFAdminService:
         logger.info(f"[SFAdmin] Command: {' '.join(cmd)}")
         
         try:
-            result = subprocess.run(
-                cmd,
-                cwd=temp_dir,
-                capture_output=True,
-                text=True,
-                timeout=120
-            )
+            result = self._run_sf(cmd, temp_dir, timeout=120)
             
             # Parse JSON response
             try:
@@ -955,4 +1014,5 @@ async def create_sf_admin_service(project_id: int, db,
         logger.warning(f"[SFAdmin] No Salesforce config for project {project_id}")
         return None
     
-    return SFAdminService(target_org=result.sf_username, execution_id=execution_id)
+    return SFAdminService(target_org=result.sf_username, execution_id=execution_id,
+                          manifest=DeploymentManifest(project_id, result.sf_username))
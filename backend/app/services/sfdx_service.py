@@ -11,7 +11,6 @@ Capabilities:
 Author: Digital Humans Team
 Created: 2025-12-08
 """
-import asyncio
 import json
 import logging
 import os
@@ -21,6 +20,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple
 from app.services.audit_service import audit_service
+from app.services.command_executor import get_command_executor
 
 logger = logging.getLogger(__name__)
 
@@ -90,49 +90,49 @@ class SFDXService:
         Returns:
             Tuple of (success, result_dict)
         """
-        cmd = [self.sfdx_path] + args + ["--json"]
-        
-        if self.target_org:
+        # Certains appelants passent la commande complete (binaire,
+        # --target-org) : on ne double ni le binaire ni les options.
+        if args and args[0] == self.sfdx_path:
+            args = args[1:]
+        cmd = [self.sfdx_path] + list(args)
+        if "--json" not in cmd:
+            cmd.append("--json")
+        
+        if self.target_org and "--target-org" not in cmd:
             cmd.extend(["--target-org", self.target_org])
         
         logger.info(f"[SFDX] Running: {' '.join(cmd)}")
         
-        try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=cwd
-            )
-            
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(), 
-                timeout=timeout
-            )
-            
-            stdout_str = stdout.decode('utf-8', errors='replace')
-            stderr_str = stderr.decode('utf-8', errors='replace')
-            
+        # CMD-EXEC: executeur partage, plafonne par org ; timing dans les logs (pas de ligne d'audit par commande).
+        executor = get_command_executor()
+        key = f"sf:{self.target_org or 'default'}"
+        run = await executor.run(cmd, cwd=cwd, timeout=timeout, key=key)
+        if run.session_expired and self.target_org:
+            # Jeton refuse : cache `org display` purge, auth rafraichie, une seule relance.
+            await executor.refresh_org(self.target_org)
+            run = await executor.run(cmd, cwd=cwd, timeout=timeout, key=key)
+        
+        if run.timed_out:
+            logger.error(f"[SFDX] Command timed out after {timeout}s")
+            result, success = {"error": f"Timeout after {timeout}s"}, False
+        elif run.error:
+            logger.error(f"[SFDX] Command exception: {run.error}")
+            result, success = {"error": run.error}, False
+        else:
             # Parse JSON output
             try:
-                result = json.loads(stdout_str) if stdout_str.strip() else {}
+                result = json.loads(run.stdout) if run.stdout.strip() else {}
             except json.JSONDecodeError:
-                result = {"raw_output": stdout_str}
+                result = {"raw_output": run.stdout}
             
-            success = process.returncode == 0 and result.get("status", 1) == 0
+            success = run.returncode == 0 and result.get("status", 1) == 0
             
             if not success:
-                logger.warning(f"[SFDX] Command failed: {stderr_str or result.get('message', 'Unknown error')}")
-                result["stderr"] = stderr_str
-            
-            return success, result
-            
-        except asyncio.TimeoutError:
-            logger.error(f"[SFDX] Command timed out after {timeout}s")
-            return False, {"error": f"Timeout after {timeout}s"}
-        except Exception as e:
-            logger.error(f"[SFDX] Command exception: {str(e)}")
-            return False, {"error": str(e)}
+                logger.warning(f"[SFDX] Command failed: {run.stderr or result.get('message', 'Unknown error')}")
+                result["stderr"] = run.stderr
+        
+        logger.info(f"[SFDX] {run.label}: {run.duration_ms} ms (queued {run.queued_ms} ms)")
+        return success, result
     
     async def check_connection(self) -> Dict[str, Any]:
         """
@@ -141,7 +141,12 @@ class SFDXService:
         Returns:
             Dict with org info or error
         """
-        success, result = await self._run_command(["org", "display"])
+        if self.target_org:
+            # CMD-EXEC: `sf org display` servi par le cache de l'executeur
+            org_info, error = await get_command_executor().org_display(self.target_org)
+            success, result = org_info is not None, {"result": org_info or {}, "message": error}
+        else:
+            success, result = await self._run_command(["org", "display"])
         
         if success:
             org_info = result.get("result", {})
@@ -163,7 +168,8 @@ class SFDXService:
         source_path: str,
         test_level: str = "NoTestRun",
         check_only: bool = False,
-        cwd: str = None
+        cwd: str = None,
+        manifest_path: str = None
     ) -> Dict[str, Any]:
         """
         Deploy source to target org.
@@ -173,11 +179,16 @@ class SFDXService:
             test_level: NoTestRun, RunSpecifiedTests, RunLocalTests, RunAllTestsInOrg
             check_only: If True, validate only without deploying
             cwd: Working directory (must contain sfdx-project.json)
+            manifest_path: package.xml scoping the deploy (DEPLOY-DIFF delta);
+                components are then resolved from the project in ``cwd``
             
         Returns:
             Dict with deployment result
         """
-        args = ["project", "deploy", "start", "--source-dir", source_path]
+        if manifest_path:
+            args = ["project", "deploy", "start", "--manifest", manifest_path]
+        else:
+            args = ["project", "deploy", "start", "--source-dir", source_path]
         
         if test_level:
             args.extend(["--test-level", test_level])
@@ -528,12 +539,6 @@ class SFDXService:
             force_app = package_dir / "force-app" / "main" / "default"
             force_app.mkdir(parents=True, exist_ok=True)
             
-            # Categorize components
-            components_created = {
-                "classes": [], "triggers": [], "lwc": [], "objects": [],
-                "flows": [], "permissionsets": [], "profiles": [], "other": []
-            }
-            
             for file_path, file_content in files.items():
                 if not file_path.startswith("force-app"):
                     file_path = f"force-app/main/default/{file_path}"
@@ -543,24 +548,11 @@ class SFDXService:
                 
                 with open(full_path, 'w', encoding='utf-8') as f:
                     f.write(file_content)
-                
-                # Categorize
-                if "/classes/" in file_path:
-                    components_created["classes"].append(file_path)
-                elif "/triggers/" in file_path:
-                    components_created["triggers"].append(file_path)
-                elif "/lwc/" in file_path:
-                    components_created["lwc"].append(file_path)
-                elif "/objects/" in file_path:
-                    components_created["objects"].append(file_path)
-                elif "/flows/" in file_path:
-                    components_created["flows"].append(file_path)
-                elif "/permissionsets/" in file_path:
-                    components_created["permissionsets"].append(file_path)
-                elif "/profiles/" in file_path:
-                    components_created["profiles"].append(file_path)
-                else:
-                    components_created["other"].append(file_path)
+            
+            # Categorize components
+            components_created = self._categorize_files(
+                p if p.startswith("force-app") else f"force-app/main/default/{p}" for p in files
+            )
             
             # Generate package.xml
             manifest = self._generate_package_xml(components_created, api_version)
@@ -586,13 +578,41 @@ class SFDXService:
             logger.error(f"Failed to generate SFDX package: {e}")
             return {"success": False, "error": str(e)}
     
-    def _generate_package_xml(self, components: Dict[str, List[str]], api_version: str) -> str:
+    # Sous-dossiers d'objet testes avant "objects" : un champ est un CustomField, pas un CustomObject.
+    _PACKAGE_CATEGORIES = (
+        ("fields", "/fields/"), ("validationRules", "/validationRules/"), ("listViews", "/listViews/"),
+        ("recordTypes", "/recordTypes/"), ("classes", "/classes/"), ("triggers", "/triggers/"),
+        ("lwc", "/lwc/"), ("objects", "/objects/"), ("flows", "/flows/"),
+        ("permissionsets", "/permissionsets/"), ("profiles", "/profiles/"), ("layouts", "/layouts/"),
+    )
+    
+    @classmethod
+    def _categorize_files(cls, file_paths) -> Dict[str, List[str]]:
+        """Group force-app file paths by metadata folder (input of ``_generate_package_xml``)"""
+        components = {
+            "classes": [], "triggers": [], "lwc": [], "objects": [],
+            "flows": [], "permissionsets": [], "profiles": [], "other": []
+        }
+        for file_path in file_paths:
+            for comp_type, marker in cls._PACKAGE_CATEGORIES:
+                if marker in file_path:
+                    components.setdefault(comp_type, []).append(file_path)
+                    break
+            else:
+                components["other"].append(file_path)
+        return components
+    
+    @staticmethod
+    def _generate_package_xml(components: Dict[str, List[str]], api_version: str) -> str:
         """Generate package.xml manifest"""
         type_mapping = {
             "classes": "ApexClass", "triggers": "ApexTrigger",
             "lwc": "LightningComponentBundle", "objects": "CustomObject",
-            "flows": "Flow", "permissionsets": "PermissionSet", "profiles": "Profile"
+            "flows": "Flow", "permissionsets": "PermissionSet", "profiles": "Profile",
+            "fields": "CustomField", "validationRules": "ValidationRule", "listViews": "ListView",
+            "recordTypes": "RecordType", "layouts": "Layout",
         }
+        object_children = {"fields", "validationRules", "listViews", "recordTypes"}
         
         xml = ['<?xml version="1.0" encoding="UTF-8"?>',
                '<Package xmlns="http://soap.sforce.com/2006/04/metadata">']
@@ -602,9 +622,12 @@ class SFDXService:
                 xml.append("    <types>")
                 seen = set()
                 for fp in files:
-                    name = Path(fp).stem.replace('.cls-meta', '').replace('.trigger-meta', '')
+                    # DEPLOY-DIFF: "X.cls", "X.cls-meta.xml", "X__c.object-meta.xml" -> X
+                    name = Path(fp).name.split(".", 1)[0]
                     if comp_type == "lwc":
                         name = Path(fp).parent.name
+                    elif comp_type in object_children:
+                        name = f"{Path(fp).parent.parent.name}.{name}"
                     if name not in seen:
                         xml.append(f"        <members>{name}</members>")
                         seen.add(name)
@@ -1,5 +1,7 @@
 """ARQ task definitions for long-running executions."""
 import logging
+from typing import Optional
+
 from app.database import SessionLocal
 from app.services.pm_orchestrator_service_v2 import PMOrchestratorServiceV2
 
@@ -88,8 +90,15 @@ async def resume_architecture_task(ctx, execution_id: int, project_id: int, acti
         db.close()
 
 
-async def execute_build_task(ctx, project_id: int, execution_id: int):
-    """ARQ task: Execute BUILD v2 with PhasedBuildExecutor."""
+async def execute_build_task(ctx, project_id: int, execution_id: int, force_deploy: bool = False,
+                             pipelined: Optional[bool] = None):
+    """ARQ task: Execute BUILD v2 with PhasedBuildExecutor.
+
+    force_deploy: redeploy every phase in full, ignoring the DEPLOY-DIFF manifest
+    (target org edited by hand).
+    pipelined: overlap deploy of phase N with generation of phase N+1
+    (PIPE-BUILD; None: settings.BUILD_PIPELINED).
+    """
     from app.services.phased_build_executor import PhasedBuildExecutor
     from app.services.execution_state import ExecutionStateMachine, InvalidTransitionError
     from app.models.task_execution import TaskExecution
@@ -125,7 +134,8 @@ async def execute_build_task(ctx, project_id: int, execution_id: int):
 
         logger.info(f"[ARQ] BUILD v2 found {len(wbs_tasks)} tasks")
 
-        executor = PhasedBuildExecutor(project_id, execution_id, db)
+        executor = PhasedBuildExecutor(project_id, execution_id, db, pipelined=pipelined,
+                                       force_deploy=force_deploy)
         # Initialize jordan_service (git/sfdx) before execute_build — without
         # this call, executor.jordan_service stays None and Phase 1 crashes on
         # create_phase_branch with NoneType. Symmetric close() in finally.
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark for log_llm_interaction agent-call overhead (LLM-LOG-BUF).
+
+Replays N agent calls with realistic payloads (one ~20 KB system prompt per
+agent, a handful of ~30 KB RAG contexts reused across calls, ~40 KB
+responses) against a simulated database whose every statement costs one
+round-trip (--rtt-ms) plus transfer time (--mb-per-s), COMMIT one more
+round-trip, and compares:
+
+  legacy   : SessionLocal + INSERT + COMMIT inside each call (pre LLM-LOG-BUF)
+  buffered : queued row, background writer, compressed and deduplicated blobs
+
+Reports per-call overhead seen by the agent (p50 / p99 / mean), total time
+until everything is durable, and bytes sent to the database.
+
+Usage (from backend/):
+    python benchmarks/bench_llm_logger.py --calls 300 --rtt-ms 2
+"""
+import argparse
+import builtins
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services import llm_logger  # noqa: E402
+from app.services.llm_logger import LLMLogWriter  # noqa: E402
+
+
+class _SimulatedDB:
+    """Round-trip + transfer cost per statement, counts bytes sent."""
+
+    def __init__(self, rtt, bandwidth, counters):
+        self.rtt, self.bandwidth, self.counters = rtt, bandwidth, counters
+
+    def _send(self, payload_bytes):
+        self.counters["bytes"] += payload_bytes
+        self.counters["statements"] += 1
+        time.sleep(self.rtt + payload_bytes / self.bandwidth)
+
+    # legacy ORM path: INSERT on flush, then COMMIT
+    def add(self, obj):
+        self.obj = obj
+
+    def commit(self):
+        obj = getattr(self, "obj", None)
+        if obj is not None:
+            self._send(sum(len(getattr(obj, f) or "") for f in ("prompt", "rag_context", "response")))
+            obj.id = self.counters["statements"]
+        time.sleep(self.rtt)
+
+    # bulk path
+    def execute(self, stmt, rows):
+        self._send(sum(len(v) for r in rows for v in r.values() if isinstance(v, (str, bytes))))
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _calls(n, seed=11):
+    rnd = random.Random(seed)
+    words = "account opportunity trigger handler batch soql selector service test assert".split()
+    text = lambda size: " ".join(rnd.choice(words) for _ in range(size // 7))
+    systems = {a: text(20000) for a in ("diego", "zara", "raj", "elena")}
+    rags = [text(30000) for _ in range(5)]
+    for i in range(n):
+        agent = rnd.choice(sorted(systems))
+        yield dict(agent_id=agent, prompt=systems[agent] + f"\n\n## Tache {i}\n" + text(3000),
+                   rag_context=rnd.choice(rags), response=text(40000), execution_id=1,
+                   tokens_input=9000, tokens_output=10000, model="claude-sonnet", provider="anthropic")
+
+
+def _run(label, calls, rtt, bandwidth, buffered):
+    counters = {"bytes": 0, "statements": 0}
+    factory = lambda: _SimulatedDB(rtt, bandwidth, counters)
+    llm_logger.LLM_LOG_BUFFERED = buffered
+    llm_logger.SessionLocal = factory
+    writer = llm_logger._writer = LLMLogWriter(session_factory=factory)
+    per_call = []
+    started = time.perf_counter()
+    for call in calls:
+        t0 = time.perf_counter()
+        llm_logger.log_llm_interaction(**call)
+        per_call.append((time.perf_counter() - t0) * 1000)
+    caller_done = time.perf_counter() - started
+    writer.shutdown()
+    per_call.sort()
+    return {"mode": label, "calls": len(per_call),
+            "overhead_ms_p50": round(statistics.median(per_call), 3),
+            "overhead_ms_p99": round(per_call[int(len(per_call) * 0.99) - 1], 3),
+            "overhead_ms_mean": round(statistics.mean(per_call), 3),
+            "agent_side_seconds": round(caller_done, 3),
+            "durable_seconds": round(time.perf_counter() - started, 3),
+            "db_statements": counters["statements"], "db_bytes": counters["bytes"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--rtt-ms", type=float, default=2.0)
+    parser.add_argument("--mb-per-s", type=float, default=100.0)
+    args = parser.parse_args()
+
+    calls = list(_calls(args.calls))
+    rtt, bandwidth = args.rtt_ms / 1000, args.mb_per_s * 1024 * 1024
+    # Silence the legacy per-call print
+    real_print, builtins.print = builtins.print, lambda *a, **k: None
+    try:
+        results = [_run("legacy", calls, rtt, bandwidth, buffered=False),
+                   _run("buffered", calls, rtt, bandwidth, buffered=True)]
+    finally:
+        builtins.print = real_print
+    print(json.dumps({"calls": args.calls, "rtt_ms": args.rtt_ms, "codec": llm_logger.compress_payload(b"x")[0],
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
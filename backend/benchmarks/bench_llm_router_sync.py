@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for LLMRouterService.complete_sync call overhead (LOOP-001).
+
+Starts a local stub OpenAI-compatible HTTP server (keep-alive, instant
+response) and routes every tier to it through the gpu_local provider, then
+compares, from a worker thread like agents do:
+
+  legacy : asyncio.run(router.complete(...)) per call (new loop, new pool)
+  bridge : router.complete_sync(...) on the persistent background loop
+
+Reports p50 / p99 / mean per-call latency and new TCP connections accepted.
+
+Usage (from backend/):
+    python benchmarks/bench_llm_router_sync.py --calls 500
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.llm_router_service import LLMRequest, LLMRouterService  # noqa: E402
+
+_RESPONSE = json.dumps({
+    "choices": [{"message": {"content": "ok"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1},
+}).encode()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # otherwise delayed-ACK adds ~40 ms per keep-alive round trip
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(_RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+def _router_for(port: int) -> LLMRouterService:
+    config = {
+        "active_profile": "bench",
+        "default_profile": "bench",
+        "agent_tier_map": {},
+        "profiles": {"bench": {"orchestrator": "gpu_stub/stub", "worker": "gpu_stub/stub"}},
+        "providers": {"gpu_local": {
+            "enabled": True,
+            "base_url": f"http://127.0.0.1:{port}/v1",
+            "timeout_seconds": 30,
+            "models": {"stub": {"model_id": "stub"}},
+        }},
+        "pricing": {},
+    }
+    path = Path(tempfile.mkstemp(suffix=".yaml")[1])
+    path.write_text(yaml.safe_dump(config))
+    return LLMRouterService(config_path=str(path))
+
+
+def _measure(label: str, call, calls: int) -> dict:
+    _StubHandler.connections = 0
+    timings = []
+
+    def worker():
+        for _ in range(calls):
+            t0 = time.perf_counter()
+            response = call()
+            timings.append(time.perf_counter() - t0)
+            assert response.success, response.error
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    timings.sort()
+    return {
+        "mode": label,
+        "calls": calls,
+        "p50_ms": round(statistics.median(timings) * 1000, 3),
+        "p99_ms": round(timings[int(len(timings) * 0.99) - 1] * 1000, 3),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 3),
+        "tcp_connections": _StubHandler.connections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    router = _router_for(server.server_address[1])
+    request = LLMRequest(prompt="ping", agent_type="worker", max_tokens=16)
+
+    try:
+        results = [
+            _measure("legacy asyncio.run per call", lambda: asyncio.run(router.complete(request)), args.calls),
+            _measure("persistent loop (complete_sync)", lambda: router.complete_sync(request), args.calls),
+        ]
+    finally:
+        router.shutdown()
+        server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark for MetadataFetcher.fetch_all_metadata (META-FETCH).
+
+Starts a local mock Tooling/REST API server serving a large org (50k
+CustomField by default, pages of 2000 records with nextRecordsUrl, fixed
+per-request latency) and compares:
+
+  legacy     : categories one after another, one requests.get per query,
+               first page only (what the fetcher did before META-FETCH)
+  sequential : MetadataFetcher with max_concurrency=1 (complete data,
+               no overlap between categories)
+  concurrent : MetadataFetcher with pooled session, full pagination,
+               concurrent categories and raw files streamed to disk
+
+Reports wall time, records retrieved, HTTP requests and TCP connections.
+
+Usage (from backend/):
+    python benchmarks/bench_metadata_fetch.py --fields 50000 --latency-ms 40
+"""
+import argparse
+import json
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.salesforce.metadata_fetcher import (  # noqa: E402
+    MetadataFetcher, SalesforceCredentials,
+)
+
+PAGE_SIZE = 2000
+_FROM_RE = re.compile(r"\bFROM\s+(\w+)", re.IGNORECASE)
+
+
+class _MockOrgHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    sizes = {}
+    latency = 0.0
+    connections = 0
+    requests_served = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with type(self).lock:
+            type(self).connections += 1
+
+    def do_GET(self):
+        with type(self).lock:
+            type(self).requests_served += 1
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        if "/query/cursor-" in url.path:
+            sobject, offset = url.path.rsplit("cursor-", 1)[1].split("-")
+            offset = int(offset)
+        else:
+            soql = parse_qs(url.query)["q"][0]
+            sobject, offset = _FROM_RE.search(soql).group(1), 0
+        total = self.sizes.get(sobject, 10)
+        end = min(offset + PAGE_SIZE, total)
+        records = [{"Id": f"{sobject[:3]}{i:012d}", "DeveloperName": f"{sobject}_{i}",
+                    "Body": "x" * 800 if sobject in ("ApexClass", "ApexTrigger") else None}
+                   for i in range(offset, end)]
+        payload = {"totalSize": total, "done": end >= total, "records": records}
+        if end < total:
+            base = url.path.split("/query")[0]
+            payload["nextRecordsUrl"] = f"{base}/query/cursor-{sobject}-{end}"
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Sforce-Limit-Info", f"api-usage={type(self).requests_served}/15000")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _legacy(fetcher: MetadataFetcher) -> int:
+    """Sequential, unpooled, first page only."""
+    total = 0
+    for api, soql, _ in fetcher.CATEGORIES.values():
+        endpoint = "/tooling/query" if api == "tooling" else "/query"
+        response = requests.get(f"{fetcher.base_url}{endpoint}", headers=fetcher.headers,
+                                params={"q": soql}, timeout=60)
+        total += len(response.json().get("records", []))
+    return total
+
+
+def _run(label, fn):
+    _MockOrgHandler.connections = _MockOrgHandler.requests_served = 0
+    started = time.perf_counter()
+    records = fn()
+    return {
+        "mode": label,
+        "wall_seconds": round(time.perf_counter() - started, 3),
+        "records": records,
+        "http_requests": _MockOrgHandler.requests_served,
+        "tcp_connections": _MockOrgHandler.connections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fields", type=int, default=50000)
+    parser.add_argument("--classes", type=int, default=3000)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--concurrency", type=int, default=None)
+    args = parser.parse_args()
+
+    _MockOrgHandler.sizes = {"CustomField": args.fields, "ApexClass": args.classes,
+                             "ApexTrigger": args.classes // 10, "FlowDefinition": 800, "Flow": 800,
+                             "ValidationRule": 1200, "Profile": 60, "PermissionSet": 300}
+    _MockOrgHandler.latency = args.latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MockOrgHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    credentials = SalesforceCredentials(access_token="bench", org_id="00Dbench",
+                                        instance_url=f"http://127.0.0.1:{server.server_address[1]}")
+    kwargs = {"max_concurrency": args.concurrency} if args.concurrency else {}
+    fetchers = {"sequential": MetadataFetcher(org_alias="bench", max_concurrency=1),
+                "concurrent": MetadataFetcher(org_alias="bench", **kwargs)}
+    for fetcher in fetchers.values():
+        fetcher.use_credentials(credentials)
+
+    results = [_run("legacy", lambda: _legacy(fetchers["sequential"]))]
+    for label, fetcher in fetchers.items():
+        with tempfile.TemporaryDirectory() as out:
+            def fetch_all():
+                summary = fetcher.fetch_all_metadata(out)
+                assert not summary["errors"], summary["errors"]
+                return sum(summary["metadata_counts"].values())
+            results.append(_run(label, fetch_all))
+            results[-1]["raw_bytes"] = sum(p.stat().st_size for p in Path(out, "raw").glob("*.json"))
+        fetcher.close()
+
+    server.shutdown()
+    print(json.dumps({"fields": args.fields, "latency_ms": args.latency_ms, "page_size": PAGE_SIZE,
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
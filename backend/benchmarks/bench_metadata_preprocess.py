@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Benchmark for MetadataPreprocessor.generate_summary (META-SCAN).
+
+Writes a synthetic raw metadata directory (20k Apex classes, 5k flows by
+default, plus fields, triggers and objects) and compares:
+
+  legacy  : json.load per file, three regex scans per body and the list-based
+            missing-test lookup (O(classes x tests)), as before META-SCAN
+  engine  : streamed loading, single-pass scanner and set index (workers=1)
+  engineN : same with the body scan spread over N processes
+
+Checks that every mode yields the same summary (generated_at excluded).
+
+Usage (from backend/):
+    python benchmarks/bench_metadata_preprocess.py --classes 20000 --flows 5000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.salesforce.metadata_preprocessor import (  # noqa: E402
+    MetadataPreprocessor, RedFlagType, Severity,
+)
+
+_SNIPPETS = [
+    "public with sharing class {name} {{\n    public void run(List<Account> accounts) {{\n",
+    "        for (Account a : accounts) {{ List<Contact> c = [SELECT Id FROM Contact WHERE AccountId = :a.Id]; }}\n",
+    "        for (Integer i = 0; i < 10; i++) {{ update accounts[i]; }}\n",
+    "        Id owner = '005000000000001';\n",
+    "        Map<Id, Account> byId = new Map<Id, Account>(accounts);\n",
+    "        if (accounts.isEmpty()) {{ return; }}\n",
+    "        System.debug(LoggingLevel.INFO, 'processing ' + accounts.size());\n",
+]
+
+
+def _write_org(raw: Path, classes: int, flows: int, seed: int = 7) -> None:
+    rnd = random.Random(seed)
+    apex = []
+    for i in range(classes):
+        name = f"Service{i}"
+        body = _SNIPPETS[0].format(name=name) + "".join(
+            rnd.choice(_SNIPPETS[1:]).format() for _ in range(rnd.randint(2, 6))) + "    }\n}"
+        api = rnd.choice([42.0, 55.0, 61.0, 65.0])
+        apex.append({"attributes": {"type": "ApexClass"}, "Id": f"01p{i:012d}", "Name": name,
+                     "ApiVersion": api, "BodyPreview": body[:500] + "...", "BodyLength": len(body) * 12})
+        if rnd.random() < 0.6:
+            test = rnd.choice([f"{name}Test", f"{name}_Test", f"Test{name}"])
+            apex.append({"attributes": {"type": "ApexClass"}, "Id": f"01q{i:012d}", "Name": test,
+                         "ApiVersion": 65.0, "BodyPreview": "@isTest private class " + test + " {}"})
+    flow_types = ["AutoLaunchedFlow", "Flow", "Workflow", "InvocableProcess", "RecordTriggeredFlow"]
+    data = {
+        "apex_classes": apex,
+        "flows": [{"Id": f"300{i:012d}", "ApiName": f"Flow_{i}", "ProcessType": rnd.choice(flow_types),
+                   "Status": "Active", "Description": "Auto" * rnd.randint(0, 40)} for i in range(flows)],
+        "apex_triggers": [{"Id": f"01q{i:012d}", "Name": f"Trg{i}", "TableEnumOrId": f"Obj{i % 150}__c",
+                           "BodyPreview": "trigger T on X (before insert) { Handler.run(); }" if i % 3 else "trigger T {}",
+                           "UsageBeforeInsert": True} for i in range(classes // 40)],
+        "custom_objects": [{"Id": f"01I{i:012d}", "DeveloperName": f"Obj{i}", "Description": None if i % 4 else "x"}
+                           for i in range(classes // 60)],
+        "custom_fields": [{"Id": f"00N{i:012d}", "DeveloperName": f"F{i}", "TableEnumOrId": f"01I{i % 300:012d}"}
+                          for i in range(classes * 2)],
+    }
+    raw.mkdir(parents=True, exist_ok=True)
+    for name, records in data.items():
+        with open(raw / f"{name}.json", "w") as f:
+            json.dump(records, f, indent=2)
+
+
+class _LegacyPreprocessor(MetadataPreprocessor):
+    """Loading and Apex analysis as they were before META-SCAN."""
+
+    def load_raw_data(self) -> bool:
+        for json_file in self.raw_path.glob("*.json"):
+            with open(json_file) as f:
+                self.raw_data[json_file.stem] = json.load(f)
+        return True
+
+    def analyze_apex_classes(self):
+        classes = self.raw_data.get("apex_classes", [])
+        summary = {"count": len(classes), "test_classes": [], "regular_classes": [],
+                   "by_api_version": defaultdict(int), "complex_classes": [], "issues": []}
+        for cls in classes:
+            name, api_version = cls.get("Name", "Unknown"), cls.get("ApiVersion", 0)
+            body = cls.get("BodyPreview", cls.get("Body", ""))
+            body_length = cls.get("BodyLength", len(body))
+            if name.lower().endswith("test") or "@istest" in body.lower():
+                summary["test_classes"].append(name)
+            else:
+                summary["regular_classes"].append({"name": name, "api_version": api_version,
+                                                   "lines": body_length // 50})
+            summary["by_api_version"][str(int(api_version))] += 1
+            if api_version and api_version < self.DEPRECATED_API_THRESHOLD:
+                self._add_flag(RedFlagType.LOW_API_VERSION, Severity.HIGH, name, "ApexClass",
+                               f"Class uses deprecated API version {api_version}",
+                               f"Update to API version {self.CURRENT_API_VERSION}", current_version=api_version)
+            elif api_version and api_version < self.WARNING_API_THRESHOLD:
+                self._add_flag(RedFlagType.LOW_API_VERSION, Severity.MEDIUM, name, "ApexClass",
+                               f"Class uses old API version {api_version}",
+                               f"Consider updating to API version {self.CURRENT_API_VERSION}",
+                               current_version=api_version)
+            if body:
+                if self.SOQL_IN_LOOP_PATTERN.search(body):
+                    self._add_flag(RedFlagType.SOQL_IN_LOOP, Severity.CRITICAL, name, "ApexClass",
+                                   "Potential SOQL query inside loop detected",
+                                   "Move SOQL outside loop or use collections")
+                if self.DML_IN_LOOP_PATTERN.search(body):
+                    self._add_flag(RedFlagType.DML_IN_LOOP, Severity.CRITICAL, name, "ApexClass",
+                                   "Potential DML operation inside loop detected",
+                                   "Collect records and perform single DML outside loop")
+                ids = self.HARDCODED_ID_PATTERN.findall(body)
+                if ids:
+                    self._add_flag(RedFlagType.HARDCODED_ID, Severity.HIGH, name, "ApexClass",
+                                   f"Found {len(ids)} potential hardcoded IDs",
+                                   "Use Custom Metadata Types or Custom Labels instead", id_count=len(ids))
+            if body_length > 5000:
+                summary["complex_classes"].append({"name": name, "length": body_length,
+                                                   "reason": "Large class > 5000 chars"})
+                self._add_flag(RedFlagType.HIGH_COMPLEXITY_CLASS, Severity.MEDIUM, name, "ApexClass",
+                               f"Large class with {body_length} characters",
+                               "Consider refactoring into smaller classes", length=body_length)
+        for regular_class in summary["regular_classes"]:
+            class_name = regular_class["name"]
+            expected_test = f"{class_name}Test"
+            if expected_test not in summary["test_classes"]:
+                variations = [f"{class_name}_Test", f"Test{class_name}"]
+                if not any(v in summary["test_classes"] for v in variations):
+                    self._add_flag(RedFlagType.NO_TEST_CLASS, Severity.HIGH, class_name, "ApexClass",
+                                   f"No test class found for {class_name}", f"Create test class {expected_test}")
+        return summary
+
+
+def _run(label, preprocessor):
+    started = time.perf_counter()
+    summary = preprocessor.generate_summary()
+    elapsed = time.perf_counter() - started
+    summary["metadata_analysis"].pop("generated_at")
+    return {"mode": label, "seconds": round(elapsed, 3),
+            "red_flags": summary["red_flags"]["total_count"]}, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--classes", type=int, default=20000)
+    parser.add_argument("--flows", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--skip-legacy", action="store_true", help="legacy is quadratic in classes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = Path(tmp) / "raw"
+        _write_org(raw, args.classes, args.flows)
+        runs = []
+        if not args.skip_legacy:
+            runs.append(_run("legacy", _LegacyPreprocessor(str(raw))))
+        runs.append(_run("engine", MetadataPreprocessor(str(raw), workers=1)))
+        if args.workers > 1:
+            runs.append(_run(f"engine{args.workers}", MetadataPreprocessor(str(raw), workers=args.workers)))
+        reference = runs[0][1]
+        for result, summary in runs:
+            result["identical"] = summary == reference
+        print(json.dumps({"classes": args.classes, "flows": args.flows,
+                          "raw_mb": round(sum(p.stat().st_size for p in raw.glob("*.json")) / 1e6, 1),
+                          "results": [r for r, _ in runs]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for NotificationService fan-out (NOTIF-MUX).
+
+Opens N simulated SSE subscribers spread over C execution channels on a local
+Postgres, publishes M notifications per channel and reports delivery latency,
+drops and the number of backend connections the service held.
+
+Usage (from backend/):
+    DATABASE_URL=postgresql://user:pw@localhost:5432/digital_humans \
+        python benchmarks/bench_notification_fanout.py --subscribers 1000 --channels 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import asyncpg  # noqa: E402
+
+from app.services.notification_service import NotificationService  # noqa: E402
+
+
+async def _subscriber(service, channel, expected, latencies, ready):
+    async with service.subscribe(channel) as queue:
+        ready.release()
+        received = 0
+        while received < expected:
+            message = await asyncio.wait_for(queue.get(), timeout=60)
+            latencies.append(time.perf_counter() - message["sent_at"])
+            received += 1
+
+
+async def _backend_connections(dsn: str) -> int:
+    conn = await asyncpg.connect(dsn)
+    try:
+        return await conn.fetchval(
+            "SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() AND pid <> pg_backend_pid()"
+        )
+    finally:
+        await conn.close()
+
+
+async def run(subscribers: int, channels: int, messages: int) -> dict:
+    service = NotificationService()
+    await service.initialize()
+    dsn = service._db_url
+
+    baseline_conns = await _backend_connections(dsn)
+    latencies: list = []
+    ready = asyncio.Semaphore(0)
+    tasks = [
+        asyncio.create_task(_subscriber(service, f"execution_{i % channels}", messages, latencies, ready))
+        for i in range(subscribers)
+    ]
+    t0 = time.perf_counter()
+    for _ in range(subscribers):
+        await ready.acquire()
+    subscribe_s = time.perf_counter() - t0
+    held_conns = await _backend_connections(dsn) - baseline_conns
+
+    t0 = time.perf_counter()
+    for seq in range(messages):
+        await asyncio.gather(*(
+            service.notify(f"execution_{c}", {"event": "progress", "seq": seq, "sent_at": time.perf_counter()})
+            for c in range(channels)
+        ))
+    await asyncio.gather(*tasks)
+    publish_s = time.perf_counter() - t0
+
+    stats = service.get_stats()
+    await service.close()
+
+    latencies.sort()
+    return {
+        "subscribers": subscribers,
+        "channels": channels,
+        "messages_per_channel": messages,
+        "subscribe_all_s": round(subscribe_s, 3),
+        "deliveries": len(latencies),
+        "deliveries_per_s": round(len(latencies) / publish_s, 1),
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "latency_p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "backend_connections_held": held_conns,
+        "dropped": stats["dropped"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=20, help="notifications per channel")
+    args = parser.parse_args()
+
+    if not os.environ.get("DATABASE_URL"):
+        print("DATABASE_URL not set, using app.config default", file=sys.stderr)
+    result = asyncio.run(run(args.subscribers, args.channels, args.messages))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
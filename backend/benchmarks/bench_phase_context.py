@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark for PhaseContextRegistry.get_context_for_batch (CTX-INC).
+
+Simulates a BUILD on a synthetic project (200 objects with 12 fields by
+default, one Apex class and one LWC per 2 objects) where every batch of
+phases 1-3 reads its context then registers its output, as
+PhasedBuildExecutor._generate_phase_batches does, and compares:
+
+  legacy    : full Markdown rebuilt from scratch for every batch (pre CTX-INC)
+  cached    : same full context, served from the per-section render caches
+  selected  : relevance selection (tasks of the batch) under CONTEXT_TOKEN_BUDGET
+
+Reports render time and prompt size (characters / ~tokens) per mode.
+
+Usage (from backend/):
+    python benchmarks/bench_phase_context.py --objects 200
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.phase_context_registry import PhaseContextRegistry  # noqa: E402
+
+
+class _LegacyRegistry(PhaseContextRegistry):
+    """Rendering as before CTX-INC: no cache, full context for every batch."""
+
+    def _render(self, name):
+        return self._RENDERERS[name](self)
+
+    def _block(self, section, entry):
+        self._blocks.pop((section, entry), None)
+        return super()._block(section, entry)
+
+    def get_context_for_batch(self, phase, include_previous_batches=True, tasks=None, token_budget=None):
+        return super().get_context_for_batch(phase, include_previous_batches)
+
+
+def _project(objects: int, fields: int, seed: int = 3):
+    rnd = random.Random(seed)
+    names = [f"Obj{i:03d}__c" for i in range(objects)]
+    phase1 = [[{"name": f"Create {n}", "target_object": n, "description": f"Objet {n} et ses champs"}]
+              for n in names]
+    outputs1 = [{"operations": [{"type": "create_object", "api_name": n}] + [
+        {"type": "create_field", "object": n, "api_name": f"Field{j:02d}__c"} for j in range(fields)]}
+        for n in names]
+    phase2, outputs2, phase3, outputs3 = [], [], [], []
+    for k in range(objects // 2):
+        refs = rnd.sample(names, 2)
+        cls = f"{refs[0][:-3]}Service"
+        phase2.append([{"name": cls, "class_name": cls,
+                        "description": f"Service metier sur {refs[0]} et {refs[1]}, lookup {refs[1]}.Field01__c"}])
+        outputs2.append({"files": {f"force-app/main/default/classes/{cls}.cls":
+                                   f"public with sharing class {cls} {{ public static List<{refs[0]}> load(Id id) {{ return null; }} "
+                                   f"public void save({refs[0]} r) {{}} }}"}})
+        cmp = f"obj{k:03d}Card"
+        phase3.append([{"name": cmp, "component_name": cmp,
+                        "description": f"Carte pour {refs[0]}, appelle {cls}.load"}])
+        outputs3.append({"files": {f"force-app/main/default/lwc/{cmp}/{cmp}.js": "@api recordId; @api mode;"}})
+    return [(1, phase1, outputs1), (2, phase2, outputs2), (3, phase3, outputs3)]
+
+
+def _run(label, registry, project, use_tasks):
+    chars, started = [], time.perf_counter()
+    for phase, batches, outputs in project:
+        for tasks, output in zip(batches, outputs):
+            context = registry.get_context_for_batch(phase, tasks=tasks if use_tasks else None)
+            chars.append(len(context))
+            registry.register_batch_output(phase, output)
+    elapsed = time.perf_counter() - started
+    return {"mode": label, "seconds": round(elapsed, 3), "batches": len(chars),
+            "total_context_chars": sum(chars), "max_context_chars": max(chars),
+            "avg_context_tokens": round(sum(chars) / len(chars) / 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=200)
+    parser.add_argument("--fields", type=int, default=12)
+    args = parser.parse_args()
+
+    project = _project(args.objects, args.fields)
+    results = [
+        _run("legacy", _LegacyRegistry(), project, use_tasks=False),
+        _run("cached", PhaseContextRegistry(), project, use_tasks=False),
+        _run("selected", PhaseContextRegistry(), project, use_tasks=True),
+    ]
+    legacy = results[0]["total_context_chars"]
+    for r in results:
+        r["prompt_reduction"] = f"{100 * (1 - r['total_context_chars'] / legacy):.1f}%"
+    print(json.dumps({"objects": args.objects, "fields": args.fields, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
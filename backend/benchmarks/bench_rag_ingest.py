@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark for rag_service.ingest_document throughput (INGEST-001).
+
+Replaces the OpenAI client with a fake embedder that sleeps a fixed
+per-request latency plus a small per-input cost (no network), and the target
+collection with an in-memory ChromaDB collection, then compares:
+
+  legacy  : one embeddings.create call per chunk, single upsert at the end
+  batched : rag_service.ingest_document (batched embeddings, sliced upserts)
+
+Reports wall time, chunks/s and embedding requests issued.
+
+Usage (from backend/):
+    python benchmarks/bench_rag_ingest.py --chunks 5000 --latency-ms 40
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import types
+import uuid
+from pathlib import Path
+
+import chromadb
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services import rag_service  # noqa: E402
+
+DIM = 256
+
+
+class _FakeEmbeddings:
+    def __init__(self, latency_s: float, per_input_s: float):
+        self.latency_s = latency_s
+        self.per_input_s = per_input_s
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def create(self, model, input):
+        texts = [input] if isinstance(input, str) else list(input)
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency_s + self.per_input_s * len(texts))
+        data = [
+            types.SimpleNamespace(index=i, embedding=[(hash(t) % 997) / 997.0] * DIM)
+            for i, t in enumerate(texts)
+        ]
+        return types.SimpleNamespace(data=data)
+
+
+def _legacy_ingest(collection, chunks, embeddings):
+    """Per-chunk embedding loop as ingest_document did before INGEST-001."""
+    ids, vectors, documents, metadatas = [], [], [], []
+    for i, chunk in enumerate(chunks):
+        vectors.append(embeddings.create(model="text-embedding-3-large", input=chunk).data[0].embedding)
+        ids.append(f"proj1_doc1_{i}")
+        documents.append(chunk)
+        metadatas.append({"project_id": "1", "document_id": "1"})
+    collection.upsert(ids=ids, embeddings=vectors, documents=documents, metadatas=metadatas)
+    return len(ids)
+
+
+def _run(label, fn, chunks, embeddings):
+    embeddings.requests = 0
+    t0 = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - t0
+    assert count == len(chunks)
+    return {
+        "mode": label,
+        "chunks": count,
+        "seconds": round(elapsed, 3),
+        "chunks_per_s": round(count / elapsed, 1),
+        "embedding_requests": embeddings.requests,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="fixed latency per embeddings request")
+    parser.add_argument("--per-input-ms", type=float, default=0.2, help="extra latency per input text")
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    embeddings = _FakeEmbeddings(args.latency_ms / 1000, args.per_input_ms / 1000)
+    client = chromadb.EphemeralClient()
+    rag_service.get_openai_client = lambda: types.SimpleNamespace(embeddings=embeddings)
+
+    chunks = [f"chunk {i} " + "lorem ipsum " * 40 for i in range(args.chunks)]
+    results = []
+
+    if not args.skip_legacy:
+        legacy = client.create_collection(f"bench_legacy_{uuid.uuid4().hex[:8]}")
+        results.append(_run("legacy per-chunk", lambda: _legacy_ingest(legacy, chunks, embeddings),
+                            chunks, embeddings))
+
+    batched = client.create_collection(f"bench_batched_{uuid.uuid4().hex[:8]}")
+    rag_service.get_collection = lambda name: batched
+    results.append(_run(
+        "batched ingest_document",
+        lambda: rag_service.ingest_document("technical", iter(chunks), project_id=1, document_id=1),
+        chunks, embeddings,
+    ))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Tests ANALYTICS-ROLLUP — rollups /api/analytics tenus par les mapper events, backfill et lectures du dashboard (SQLite en mémoire)."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes.analytics import get_analytics
+from app.database import Base
+from app.models import (Agent, AgentDeliverable, AnalyticsDailyRollup, Execution, ExecutionStatus, GateStatus,
+                        Project, QualityGate, User)
+from app.services.analytics_rollup_service import backfill_rollups, dashboard_counters
+
+_TABLES = ("users", "projects", "agents", "executions", "execution_agents", "outputs",
+           "agent_deliverables", "quality_gates", "agent_iterations", "analytics_daily_rollups")
+
+APEX = "public class A {\n    // commentaire\n\n    void run() {}\n}\n"       # 3 lignes de code
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    for name in _TABLES:
+        Base.metadata.tables[name].create(bind=engine)
+    session = sessionmaker(bind=engine)()
+    owner = User(email="o@example.com", name="o", hashed_password="x")
+    other = User(email="x@example.com", name="x", hashed_password="x")
+    session.add_all([owner, other, Agent(name="diego", description="dev")])
+    session.flush()
+    session.add_all([Project(user_id=owner.id, name="Formation"), Project(user_id=other.id, name="Autre")])
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _execution(db, project_name, **kwargs):
+    project = db.query(Project).filter_by(name=project_name).one()
+    execution = Execution(project_id=project.id, user_id=project.user_id, **kwargs)
+    db.add(execution)
+    db.flush()
+    return execution
+
+
+def _rollups(db):
+    return sorted((r.user_id, r.lines_of_code, r.executions_completed, r.execution_seconds, r.failed_gates)
+                  for r in db.query(AnalyticsDailyRollup).filter(
+                      (AnalyticsDailyRollup.lines_of_code != 0) | (AnalyticsDailyRollup.executions_completed != 0)
+                      | (AnalyticsDailyRollup.failed_gates != 0)))
+
+
+def test_events_keep_rollups_equal_to_backfill(db):
+    agent_id = db.query(Agent).one().id
+    run = _execution(db, "Formation")
+    first = AgentDeliverable(execution_id=run.id, agent_id=agent_id, deliverable_type="apex_code", content=APEX)
+    db.add_all([first, AgentDeliverable(execution_id=run.id, agent_id=agent_id, deliverable_type="apex_code",
+                                        content=APEX * 2)])
+    db.add(QualityGate(execution_id=run.id, agent_id=agent_id, gate_type="coverage", status=GateStatus.FAILED))
+    db.commit()
+
+    run.status = ExecutionStatus.COMPLETED
+    run.duration_seconds = 3600
+    run.completed_at = datetime.now(timezone.utc)
+    db.commit()
+    db.expire_all()                                       # anciennes valeurs relues en base
+    first.content = APEX * 4
+    db.commit()
+
+    other = _execution(db, "Autre", status=ExecutionStatus.COMPLETED, duration_seconds=60,
+                       completed_at=datetime.now(timezone.utc) - timedelta(days=9))
+    db.add(AgentDeliverable(execution_id=other.id, agent_id=agent_id, deliverable_type="lwc", content="x\ny"))
+    db.commit()
+    db.delete(db.query(QualityGate).one())
+    db.commit()
+
+    owner_id, other_id = db.query(User.id).order_by(User.id).all()
+    incremental = _rollups(db)
+    assert incremental == [(owner_id[0], 18, 1, 3600, 0),                  # (4 + 2) * 3 lignes, gate supprimee
+                           (other_id[0], 0, 1, 60, 0), (other_id[0], 2, 0, 0, 0)]
+    assert backfill_rollups(db) == 3
+    assert _rollups(db) == incremental
+
+
+def test_dashboard_reads_rollups_and_latest_execution(db):
+    owner = db.query(User).filter_by(email="o@example.com").one()
+    now = datetime.now(timezone.utc)
+    for days, seconds in ((0, 1800), (3, 1800), (10, 3600)):
+        _execution(db, "Formation", status=ExecutionStatus.COMPLETED, duration_seconds=seconds,
+                   completed_at=now - timedelta(days=days))
+    _execution(db, "Formation", status=ExecutionStatus.RUNNING)
+    db.commit()
+
+    counters = dashboard_counters(db, owner.id)
+    assert counters["velocity"] == [0, 0, 0, 0, 0, 1, 2]
+    assert counters["execution_seconds"] == 7200
+
+    result = get_analytics(current_user=owner, db=db)
+    assert result["stats"]["total_projects"] == 1
+    assert result["stats"]["projects_change"] == "+1 this week"
+    assert result["stats"]["time_saved_hours"] == 38.0          # 2 h IA * 20 - 2 h
+    assert result["velocity"] == counters["velocity"]
+    assert [(p["name"], p["status"]) for p in result["projects"]] == [("Formation", "In Progress")]
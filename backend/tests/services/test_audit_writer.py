@@ -0,0 +1,124 @@
+"""Tests AUDIT-ASYNC — file d'audit bornée, écritures groupées et contexte de requête par contextvar (session SQLAlchemy simulée, aucune base)."""
+import asyncio
+
+from app.services import audit_service as audit_mod
+from app.services.audit_service import AuditService, AuditWriter
+from app.models.audit import ActionCategory, ActorType
+
+
+class _FakeDB:
+    """Session minimale : enregistre les INSERT groupés, peut échouer sur demande."""
+
+    def __init__(self, sink, fail=lambda rows: False):
+        self.sink, self.fail, self.pending = sink, fail, []
+
+    def execute(self, stmt, rows):
+        if self.fail(rows):
+            raise RuntimeError("db down")
+        self.pending.append([dict(r) for r in rows])
+
+    def begin_nested(self):
+        db = self
+
+        class _Savepoint:
+            def __enter__(self):
+                self.mark = len(db.pending)
+
+            def __exit__(self, exc_type, *a):
+                if exc_type:
+                    del db.pending[self.mark:]
+                return False
+        return _Savepoint()
+
+    def commit(self):
+        self.sink.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+    def close(self):
+        pass
+
+
+def _service(batches, fail=lambda rows: False, **kwargs):
+    writer = AuditWriter(session_factory=lambda: _FakeDB(batches, fail), flush_interval=60, **kwargs)
+    return AuditService(writer=writer)
+
+
+def test_log_is_queued_and_written_in_multi_row_batches():
+    batches = []
+    service = _service(batches, batch_size=4)
+    for i in range(10):
+        assert service.log(ActorType.API, f"ip{i}", ActionCategory.DATA_CREATE, entity_type="project") is None
+    service.flush()
+    assert [len(b) for b in batches] == [4, 4, 2]
+    row = batches[0][0]
+    assert row["action"] == "data.create" and row["actor_type"] == "api" and row["timestamp"] is not None
+    assert set(row) == set(audit_mod._ROW_COLUMNS)
+    assert service.writer.stats["written"] == 10 and service.writer.pending() == 0
+    service.writer.shutdown()
+
+
+def test_request_context_is_isolated_between_concurrent_requests():
+    batches = []
+    service = _service(batches)
+
+    async def request(n):
+        token = service.set_request_context(request_id=f"req-{n}", ip_address=f"10.0.0.{n}")
+        try:
+            await asyncio.sleep(0.01 * (5 - n))        # entrelacement des requetes
+            service.log(ActorType.API, None, ActionCategory.OTHER, action_detail=f"call {n}")
+        finally:
+            service.clear_request_context(token)
+
+    async def main():
+        await asyncio.gather(*(request(n) for n in range(5)))
+
+    asyncio.run(main())
+    service.flush()
+    rows = [r for b in batches for r in b]
+    assert sorted((r["action_detail"], r["request_id"], r["ip_address"]) for r in rows) == [
+        (f"call {n}", f"req-{n}", f"10.0.0.{n}") for n in range(5)]
+    assert service._request_context == {}
+    service.writer.shutdown()
+
+
+def test_full_queue_drops_and_counts():
+    batches = []
+    service = _service(batches, batch_size=1000, max_queue=3)
+    for _ in range(5):
+        service.log_agent_start("marcus", "Marcus", execution_id=1, project_id=1)
+    assert service.writer.stats["dropped"] == 2 and service.writer.pending() == 3
+    service.flush()
+    assert sum(len(b) for b in batches) == 3
+    service.writer.shutdown()
+
+
+def test_failed_flush_requeues_then_rejects_only_bad_rows():
+    batches, state = [], {"down": True}
+    service = _service(batches, fail=lambda rows: state["down"] or any(r["actor_id"] == "bad" for r in rows))
+    for actor in ("a", "bad", "c"):
+        service.log(ActorType.SYSTEM, actor, ActionCategory.OTHER)
+
+    assert service.flush() == 0
+    assert service.writer.pending() == 3 and service.writer.stats["flush_failures"] == 1
+
+    state["down"] = False
+    assert service.flush() == 2
+    assert [r["actor_id"] for b in batches for r in b] == ["a", "c"]
+    assert service.writer.stats["rejected"] == 1 and service.writer.pending() == 0
+    service.writer.shutdown()
+
+
+def test_sync_mode_and_explicit_session_bypass_the_queue(monkeypatch):
+    service = _service([])
+    inserted = []
+    monkeypatch.setattr(service, "_insert_log", lambda db, **kw: inserted.append(kw) or 1)
+    db = type("DB", (), {"flush": lambda self: None})()
+    assert service.log(ActorType.USER, "u1", ActionCategory.AUTH_LOGIN, db=db) == 1
+    monkeypatch.setattr(audit_mod, "AUDIT_ASYNC_WRITES", False)
+    monkeypatch.setattr(audit_mod, "SessionLocal", lambda: type("S", (), {
+        "commit": lambda s: None, "rollback": lambda s: None, "close": lambda s: None})())
+    assert service.log(ActorType.USER, "u1", ActionCategory.AUTH_LOGIN) == 1
+    assert len(inserted) == 2 and service.writer.stats["enqueued"] == 0
@@ -0,0 +1,61 @@
+"""Tests BATCH-WRITER — file bornée, remise en file et abandon après échecs répétés (session simulée, aucune base)."""
+import os
+
+from app.services.batched_writer import BatchedWriter
+
+
+class _DownDB:
+    def execute(self, *a):
+        raise RuntimeError("db down")
+
+    def begin_nested(self):
+        raise RuntimeError("db down")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Writer(BatchedWriter):
+    thread_name = "test-writer"
+    max_flush_retries = 3
+
+    def _write_rows(self, db, rows):
+        db.execute(rows)
+
+
+def _writer(**kwargs):
+    writer = _Writer(session_factory=_DownDB, flush_interval=60, **kwargs)
+    writer._ensure_writer = lambda: None
+    return writer
+
+
+def test_requeue_keeps_the_bound_and_drops_after_max_retries():
+    writer = _writer(batch_size=4, max_queue=4)
+    for i in range(4):
+        assert writer.submit({"i": i})
+    assert not writer.submit({"i": 4})
+
+    assert writer.flush() == 0 and writer.pending() == 4
+    writer._queue.append({"i": 5})                  # file deja pleine : le lot remis en tete est tronque
+    writer._queued_size += 1
+    writer.flush()
+    assert [r["i"] for r in writer._queue] == [0, 1, 2, 5] and writer.stats["dropped"] == 2
+
+    writer.flush()                                  # 3e echec consecutif : lot abandonne
+    assert writer.pending() == 0 and writer.stats["dropped"] == 6
+    assert writer.stats["flush_failures"] == 3
+
+
+def test_forked_child_starts_with_an_empty_queue():
+    writer = _Writer(session_factory=_DownDB, flush_interval=60)
+    writer._queue.append({"i": 0})
+    writer._queued_size = 1
+    writer._pid = os.getpid() + 1                   # comme apres un fork
+    writer._ensure_writer()
+    assert writer.pending() == 0 and writer._queued_size == 0
+    writer._stop.set()
+    writer._wake.set()
+    writer._thread.join(1)
@@ -0,0 +1,163 @@
+"""Tests QUALITY-CACHE — analyses qualité par hash de contenu, résumés d'exécution matérialisés et routes hors event loop (SQLite en mémoire)."""
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.database
+from app.api.routes import quality_dashboard
+from app.database import Base
+from app.models import CodeQualityAnalysis, Execution, ExecutionQualitySummary, Project, TaskExecution, User
+from app.services import code_quality_service as cqs
+
+_TABLES = ("users", "projects", "executions", "task_executions",
+           "code_quality_analyses", "execution_quality_summaries")
+
+FILES = {
+    "force-app/main/default/classes/AccountService.cls":
+        "public class AccountService { public void run(List<Account> a) { String token = 'x'; a.size(); } }",
+    "force-app/main/default/classes/AccountServiceTest.cls": "@isTest class AccountServiceTest {}",
+    "force-app/main/default/lwc/card/card.js": "export default class Card { async load() { await x(); } }",
+}
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    for name in _TABLES:
+        Base.metadata.tables[name].create(bind=engine)
+    with engine.begin() as conn:                            # equivalent du trigger PostgreSQL de la migration 014
+        conn.execute(text("CREATE TRIGGER bump_version AFTER UPDATE OF generated_files ON task_executions "
+                          "BEGIN UPDATE task_executions SET generated_files_version = OLD.generated_files_version + 1 "
+                          "WHERE id = NEW.id; END"))
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    user = User(email="o@example.com", name="o", hashed_password="x")
+    session.add(user)
+    session.flush()
+    session.add(Project(user_id=user.id, name="Formation"))
+    session.commit()
+
+    @contextmanager
+    def fake_session():
+        s = Session()
+        try:
+            yield s
+        finally:
+            s.close()
+
+    monkeypatch.setattr(app.database, "get_db_session", fake_session)
+    monkeypatch.setattr(cqs, "schedule_precompute", lambda ids: None)
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _execution(db, files, tasks=1):
+    project = db.query(Project).one()
+    execution = Execution(project_id=project.id, user_id=project.user_id)
+    db.add(execution)
+    db.flush()
+    for i in range(tasks):
+        db.add(TaskExecution(execution_id=execution.id, task_id=f"TASK-{i:03d}", task_name="t",
+                             generated_files=files))
+    db.commit()
+    return execution.id
+
+
+def _counting(monkeypatch):
+    calls = []
+    real = cqs.analyze_code_quality
+    monkeypatch.setattr(cqs, "analyze_code_quality", lambda path, content: calls.append(path) or real(path, content))
+    return calls
+
+
+def test_identical_files_are_analysed_once_and_summary_matches(db, monkeypatch):
+    analyze = cqs.analyze_code_quality
+    calls = _counting(monkeypatch)
+    first = _execution(db, FILES, tasks=2)
+    second = _execution(db, FILES)
+
+    summary, files = cqs.get_execution_quality(db, first)
+    assert len(files) == 6 and len(calls) == 3
+    assert db.query(CodeQualityAnalysis).count() == 3
+
+    expected = [dict(task_id=f"TASK-{i:03d}", file_path=p, **analyze(p, c))
+                for i in range(2) for p, c in FILES.items()]
+    assert files == expected
+    assert summary == cqs._summarize(expected)
+    assert summary["test_coverage_estimate"] == 75.0 and summary["errors_count"] == 2
+
+    cqs.get_execution_quality(db, second)
+    assert len(calls) == 3                                  # cache partage entre executions
+
+    monkeypatch.setattr(cqs, "compute_execution_quality", lambda *a: pytest.fail("summary not reused"))
+    assert cqs.get_execution_quality(db, first) == (summary, files)
+    trends = cqs.get_quality_trends(db, db.query(Project).one().id)
+    assert [t["score"] for t in trends] == [summary["overall_score"]] * 2
+
+
+def test_writing_generated_files_invalidates_and_schedules_precompute(db, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(cqs, "schedule_precompute", lambda ids: scheduled.append(set(ids)))
+    execution_id = _execution(db, FILES)
+    assert scheduled == [{execution_id}]
+    cqs.get_execution_quality(db, execution_id)
+    assert db.get(ExecutionQualitySummary, execution_id) is not None
+
+    task = db.query(TaskExecution).one()
+    version = task.generated_files_version
+    task.generated_files = {"force-app/main/default/classes/A.cls": "public class A {}"}
+    db.commit()
+    assert task.generated_files_version > version
+    db.expire_all()
+    assert db.get(ExecutionQualitySummary, execution_id) is None
+    assert scheduled[-1] == {execution_id}
+    summary, files = cqs.get_execution_quality(db, execution_id)
+    assert summary["total_files"] == 1 and summary["apex_score"] == 100.0
+
+
+def test_raw_sql_write_makes_materialised_summary_stale(db):
+    execution_id = _execution(db, FILES)
+    summary, _ = cqs.get_execution_quality(db, execution_id)
+    assert summary["total_files"] == 3
+
+    # Ecriture hors ORM (rerun, script) : pas d'event, le trigger incremente la version.
+    db.execute(text("UPDATE task_executions SET generated_files = :files WHERE execution_id = :id"),
+               {"files": '{"force-app/main/default/classes/A.cls": "public class A {}"}', "id": execution_id})
+    db.commit()
+    summary, files = cqs.get_execution_quality(db, execution_id)
+    assert summary["total_files"] == 1 and [f["file_path"] for f in files] == ["force-app/main/default/classes/A.cls"]
+
+    db.execute(text("INSERT INTO task_executions (execution_id, task_id, task_name, status, generated_files) "
+                    "VALUES (:id, 'TASK-009', 't', 'PENDING', :files)"),
+               {"id": execution_id, "files": '{"force-app/main/default/classes/B.cls": "public class B {}"}'})
+    db.commit()
+    trends = cqs.get_quality_trends(db, db.query(Project).one().id)
+    assert trends[0]["execution_id"] == execution_id
+    assert db.get(ExecutionQualitySummary, execution_id).summary["total_files"] == 2
+
+
+def test_routes_return_legacy_payload_shape(db):
+    execution_id = _execution(db, FILES)
+    project_id = db.query(Project).one().id
+    result = asyncio.run(quality_dashboard.get_execution_quality(execution_id))
+    assert result["success"] and result["summary"]["total_files"] == 3
+    assert {f["file_path"] for f in result["files"]} == set(FILES)
+
+    trends = asyncio.run(quality_dashboard.get_quality_trends(project_id))
+    assert trends["trends"][0]["execution_id"] == execution_id
+    assert trends["trends"][0]["grade"] == result["summary"]["grade"]
+
+    single = asyncio.run(quality_dashboard.analyze_file("lwc/x/x.js", "document.querySelector('a')"))
+    assert single["errors_count"] == 0 and single["file_type"] == "other"
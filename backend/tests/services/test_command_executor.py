@@ -0,0 +1,158 @@
+"""Tests CMD-EXEC — exécuteur sf / git plafonné, cache `sf org display` et audit par opération (processus Python locaux, CLI mockée)."""
+import asyncio
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services import command_executor as ce
+from app.services.command_executor import CommandExecutor, CommandResult, command_label
+from app.services.sfdx_service import SFDXService
+
+SLEEP = [sys.executable, "-c", "import time; time.sleep(0.3)"]
+
+
+def test_per_key_cap_serialises_same_repo_only():
+    executor = CommandExecutor(max_total=4)
+
+    async def timed(keys):
+        started = time.perf_counter()
+        results = await asyncio.gather(*(executor.run(SLEEP, key=k, timeout=10) for k in keys))
+        assert all(r.success for r in results)
+        return time.perf_counter() - started, results
+
+    same, results = asyncio.run(timed(["git:/repo", "git:/repo"]))
+    other, _ = asyncio.run(timed(["git:/a", "git:/b"]))
+    assert same >= 0.55                       # GIT_MAX_CONCURRENCY_PER_REPO = 1
+    assert other < same
+    assert max(r.queued_ms for r in results) >= 250
+
+
+def test_timeout_kills_process_and_reports_timing():
+    executor = CommandExecutor()
+    run = asyncio.run(executor.run([sys.executable, "-c", "import time; time.sleep(30)"], timeout=0.2, key="sf:x"))
+    assert run.timed_out and not run.success
+    assert run.duration_ms < 5000
+    missing = executor.run_sync(["/nonexistent/sf", "org"], key="sf:x")
+    assert missing.error and not missing.success
+    assert command_label(["sf", "project", "deploy", "start", "--source-dir", "/tmp/x"]) == "project deploy start"
+
+
+def test_async_waiters_hold_no_executor_thread_and_share_limits_with_threads():
+    executor = CommandExecutor(max_total=4)
+
+    async def main():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=1))
+        holder = asyncio.create_task(asyncio.to_thread(executor.run_sync, SLEEP, key="git:/repo", timeout=10))
+        await asyncio.sleep(0.05)
+        waiting = [asyncio.create_task(executor.run(SLEEP, key="git:/repo", timeout=10)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        waiting[0].cancel()                                  # annule en file : jeton non perdu
+        started = time.perf_counter()
+        await asyncio.to_thread(lambda: None)                # seul thread libre malgre 3 attentes
+        free_after = time.perf_counter() - started
+        await holder
+        results = await asyncio.gather(*waiting[1:])
+        return free_after, results
+
+    free_after, results = asyncio.run(main())
+    assert free_after < 0.5                                  # le thread du holder, pas ceux des attentes
+    assert all(r.success for r in results)
+    assert min(r.queued_ms for r in results) >= 200          # limite git partagee avec run_sync
+    assert executor.run_sync(SLEEP, key="git:/repo", timeout=10).queued_ms < 100
+
+
+def test_rejected_token_refreshes_org_and_retries_once(monkeypatch):
+    executor = ce.get_command_executor()
+    monkeypatch.setitem(executor._org_cache, "dev", (time.monotonic(), {"accessToken": "old"}))
+    displays = []
+
+    def fake_run_sync(cmd, **kwargs):
+        displays.append(cmd)
+        return CommandResult(0, json.dumps({"status": 0, "result": {"accessToken": "new"}}), label="org display")
+
+    runs = []
+
+    async def fake_run(cmd, **kwargs):
+        runs.append(cmd)
+        if len(runs) == 1:
+            return CommandResult(1, json.dumps({"status": 1, "name": "INVALID_SESSION_ID",
+                                                "message": "Session expired or invalid"}), label="org list")
+        return CommandResult(0, json.dumps({"status": 0, "result": []}), label="org list")
+
+    monkeypatch.setattr(executor, "run_sync", fake_run_sync)
+    monkeypatch.setattr(executor, "run", fake_run)
+    service = SFDXService(target_org="dev")
+    service.sfdx_path = "sf"
+    success, _ = asyncio.run(service._run_command(["org", "list"]))
+    assert success and len(runs) == 2 and len(displays) == 1
+    assert executor.org_display_sync("dev")[0]["accessToken"] == "new"
+
+    assert CommandResult(1, "", "ERROR: INVALID_SESSION_ID").session_expired
+    assert not CommandResult(1, "", "Component failure").session_expired
+    assert not CommandResult(None, error="INVALID_SESSION_ID").session_expired
+
+
+def test_org_display_is_cached_and_single_flight(monkeypatch):
+    executor = CommandExecutor()
+    calls = []
+
+    def fake_run_sync(cmd, **kwargs):
+        calls.append(cmd)
+        time.sleep(0.1)
+        payload = {"status": 0, "result": {"instanceUrl": "https://acme.sandbox.my.salesforce.com", "accessToken": "t"}}
+        return CommandResult(0, json.dumps(payload), label="org display")
+
+    monkeypatch.setattr(executor, "run_sync", fake_run_sync)
+    threads = [threading.Thread(target=executor.org_display_sync, args=("dev",)) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    info, error = executor.org_display_sync("dev")
+    assert error is None and info["accessToken"] == "t"
+    assert len(calls) == 1
+
+    info["accessToken"] = "mutated"                     # copie par appelant
+    assert executor.org_display_sync("dev")[0]["accessToken"] == "t"
+
+    monkeypatch.setattr(ce, "ORG_DISPLAY_TTL_SECONDS", 0)
+    executor.org_display_sync("dev")
+    executor.invalidate_org("dev")
+    executor.org_display_sync("dev", refresh=True)
+    assert len(calls) == 3
+
+
+def _sfdx(monkeypatch, calls):
+    service = SFDXService(target_org="dev", execution_id=1)
+    service.sfdx_path = "sf"
+    logged = []
+    monkeypatch.setattr(service, "_log_operation", lambda *a, **kw: logged.append(a))
+
+    async def fake_run(cmd, **kwargs):
+        calls.append((cmd, kwargs))
+        return CommandResult(0, json.dumps({"status": 0, "result": {"success": True}}), label=command_label(cmd),
+                             duration_ms=12, queued_ms=3)
+
+    monkeypatch.setattr(ce.get_command_executor(), "run", fake_run)
+    return service, logged
+
+
+def test_run_command_does_not_duplicate_binary_or_target_org(monkeypatch):
+    calls = []
+    service, logged = _sfdx(monkeypatch, calls)
+    asyncio.run(service._run_command(["sf", "org", "list", "--target-org", "prod", "--json"]))
+    cmd, kwargs = calls[0]
+    assert cmd == ["sf", "org", "list", "--target-org", "prod", "--json"]
+    assert kwargs["key"] == "sf:dev"
+    assert logged == []                                 # pas de ligne d'audit par commande CLI
+
+
+def test_operations_keep_one_audit_row(monkeypatch):
+    calls = []
+    service, logged = _sfdx(monkeypatch, calls)
+    result = asyncio.run(service.deploy_source("force-app", cwd="/tmp"))
+    assert result["success"]
+    assert len(calls) == 1
+    assert logged == [("deploy",)]
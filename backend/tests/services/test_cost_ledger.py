@@ -0,0 +1,236 @@
+"""Tests COST-LEDGER — état budget/crédits en mémoire + écriture groupée (SQLite en mémoire, aucun appel réseau)."""
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.credit import CreditBalance, CreditTransaction, ModelPricing, TierConfig
+from app.models.user import User
+from app.services import cost_ledger as cl
+from app.services.budget_service import DEFAULT_EXECUTION_LIMIT_USD, BudgetExceededError, _resolve_pricing
+from app.services.credit_service import InsufficientCreditsError, ModelNotAllowedError
+
+
+class _CountingFactory:
+    def __init__(self, Session):
+        self.Session = Session
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.Session()
+
+
+@pytest.fixture
+def credit_db():
+    # Mêmes tables que tests/test_credit_service.py (les JSONB d'autres modèles ne compilent pas sur SQLite).
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    for cls in (User, TierConfig, ModelPricing, CreditBalance, CreditTransaction):
+        cls.__table__.create(bind=engine, checkfirst=True)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    db.add_all([
+        TierConfig(tier_name="pro", monthly_credits=100, daily_credits_cap=None,
+                   price_eur_monthly=49, description="pro"),
+        ModelPricing(model_name="claude-sonnet-4-6", credits_per_1k_input=1.0, credits_per_1k_output=5.0,
+                     allowed_tiers="pro,team", requires_opt_in=False, is_active=True),
+        ModelPricing(model_name="claude-opus-4-7", credits_per_1k_input=5.0, credits_per_1k_output=25.0,
+                     allowed_tiers="team", requires_opt_in=True, is_active=True),
+    ])
+    user = User(email="pro@example.com", name="pro", hashed_password="x", is_active=True,
+                subscription_tier="pro")
+    db.add(user)
+    db.commit()
+    yield Session, user.id
+    db.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def ledger(credit_db):
+    Session, _ = credit_db
+    led = cl.CostLedger(session_factory=_CountingFactory(Session), flush_interval=60)
+    yield led
+    led.shutdown(timeout=1)
+
+
+def test_reserve_settle_flush_writes_one_transaction(credit_db, ledger):
+    Session, user_id = credit_db
+    res = ledger.reserve(user_id, "claude-sonnet-4-6", max_tokens=1000)   # 1 + 5 = 6 credits held
+    assert res.credits == 6
+    assert ledger._accounts[user_id].reserved == 6
+
+    charged = ledger.settle(res, "claude-sonnet-4-6", tokens_in=2000, tokens_out=1000)
+    assert charged == 7
+    assert ledger._accounts[user_id].reserved == 0
+    assert ledger.flush() == 1
+
+    db = Session()
+    try:
+        assert db.query(CreditBalance).filter_by(user_id=user_id).one().used_credits == 7
+        tx = db.query(CreditTransaction).filter_by(user_id=user_id).one()
+        assert tx.credits_consumed == 7
+        assert tx.model_used == "claude-sonnet-4-6"
+    finally:
+        db.close()
+
+
+def test_reservations_block_concurrent_overspend(credit_db, ledger):
+    _, user_id = credit_db
+    # 100 crédits dispo, 60 réservés par appel : un seul des deux appels concurrents passe.
+    outcomes = []
+    barrier = threading.Barrier(2)
+
+    def call():
+        barrier.wait()
+        try:
+            outcomes.append(ledger.reserve(user_id, "claude-sonnet-4-6", max_tokens=10000))
+        except InsufficientCreditsError as exc:
+            outcomes.append(exc)
+
+    ledger._account_and_pricing(user_id, "claude-sonnet-4-6")    # cold load hors course
+    threads = [threading.Thread(target=call) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(isinstance(o, cl.CreditReservation) for o in outcomes) == 1
+    assert sum(isinstance(o, InsufficientCreditsError) for o in outcomes) == 1
+
+    ledger.release(next(o for o in outcomes if isinstance(o, cl.CreditReservation)))
+    assert ledger.reserve(user_id, "claude-sonnet-4-6", max_tokens=10000).credits == 60
+
+
+def test_model_not_allowed_for_tier(credit_db, ledger):
+    _, user_id = credit_db
+    with pytest.raises(ModelNotAllowedError):
+        ledger.reserve(user_id, "claude-opus-4-7", max_tokens=100)
+
+
+def test_hot_path_opens_no_session(credit_db, ledger):
+    _, user_id = credit_db
+    ledger.settle(ledger.reserve(user_id, "claude-sonnet-4-6", 100), "claude-sonnet-4-6", 100, 100)
+    cold = ledger._session_factory.calls
+    for _ in range(20):
+        res = ledger.reserve(user_id, "claude-sonnet-4-6", 100)
+        ledger.settle(res, "claude-sonnet-4-6", 100, 100)
+    assert ledger._session_factory.calls == cold
+    ledger.flush()
+    assert ledger._session_factory.calls == cold + 1
+
+
+def _budget_ledger(monkeypatch, execution_cost=0.0):
+    led = cl.CostLedger(session_factory=lambda: pytest.fail("no session expected"), flush_interval=60)
+    loads = []
+
+    def fake_load(execution_id):
+        loads.append(execution_id)
+        return cl._BudgetState(execution_id=execution_id, project_id=1, execution_cost=execution_cost,
+                               project_cost=execution_cost, loaded_at=cl.time.monotonic())
+
+    monkeypatch.setattr(led, "_load_budget", fake_load)
+    return led, loads
+
+
+def test_budget_check_sees_unflushed_costs(monkeypatch):
+    out_price = _resolve_pricing("claude-opus-4-6")["output"]
+    two_dollars_out = int(2_000_000 / out_price)
+    led, loads = _budget_ledger(monkeypatch, execution_cost=DEFAULT_EXECUTION_LIMIT_USD - 1.0)
+    led._ensure_writer = lambda: None
+    assert led.check_budget(42)["allowed"]
+    # ~$2 de sortie, pas encore écrit en base : le check suivant doit déjà le voir.
+    assert led.record_llm_cost(42, "claude-opus-4-6", 0, two_dollars_out) == pytest.approx(2.0, rel=1e-3)
+    with pytest.raises(BudgetExceededError):
+        led.check_budget(42)
+    assert loads == [42]
+
+
+def test_state_is_read_under_lock_and_refreshed_entries_win(monkeypatch, credit_db, ledger):
+    led, _ = _budget_ledger(monkeypatch)
+    led._ensure_writer = lambda: None
+
+    class Guarded(dict):
+        def get(self, *args):
+            assert led._lock._is_owned(), "etat lu sans le verrou du ledger"
+            return super().get(*args)
+
+    led._budgets = Guarded()
+    led.check_budget(3)
+    led.check_budget(3)
+
+    # Un refresh remplace le compte entre la lecture et la reservation : l'estimation va au nouveau.
+    _, user_id = credit_db
+    ledger.release(ledger.reserve(user_id, "claude-sonnet-4-6", 100))
+    stale = ledger._accounts[user_id]
+    fresh = cl._CreditAccount(**{**stale.__dict__, "reserved": 0})
+    monkeypatch.setattr(ledger, "_account_and_pricing",
+                        lambda uid, model: (stale, ledger._pricing[model][1]))
+    ledger._accounts[user_id] = fresh
+    res = ledger.reserve(user_id, "claude-sonnet-4-6", 1000)
+    assert fresh.reserved == res.credits == 6 and stale.reserved == 0
+
+
+def test_failed_flush_requeues_entries(monkeypatch):
+    led, _ = _budget_ledger(monkeypatch)
+    led._ensure_writer = lambda: None
+    led._session_factory = lambda: type("S", (), {"rollback": lambda s: None, "close": lambda s: None})()
+    applied = []
+    fail = {"on": True}
+
+    def apply_budget(db, budget):
+        if fail["on"]:
+            raise RuntimeError("db down")
+        applied.append(dict(budget))
+
+    monkeypatch.setattr(led, "_apply_budget", apply_budget)
+    led.record_llm_cost(7, "claude-opus-4-6", 1000, 0)
+    assert led.flush() == 0
+    assert led.stats["flush_failures"] == 1
+    led.record_llm_cost(7, "claude-opus-4-6", 1000, 0)
+
+    fail["on"] = False
+    led._session_factory = lambda: type("S", (), {"commit": lambda s: None, "close": lambda s: None})()
+    monkeypatch.setattr(led, "_apply_charges", lambda db, charges: None)
+    assert led.flush() == 1
+    cost, tokens = applied[0][7]
+    assert cost == pytest.approx(2 * 1000 * _resolve_pricing("claude-opus-4-6")["input"] / 1_000_000)
+    assert tokens == 2000
+
+
+def test_rejected_entry_is_dropped_without_blocking_the_queue(monkeypatch, credit_db, ledger):
+    Session, user_id = credit_db
+    real_apply = ledger._apply_charges
+
+    def apply_charges(db, charges):
+        if any(c.user_id == 999 for c in charges):
+            raise RuntimeError("FOREIGN KEY constraint failed")     # utilisateur supprime entre-temps
+        real_apply(db, charges)
+
+    monkeypatch.setattr(ledger, "_apply_charges", apply_charges)
+    ledger.settle(ledger.reserve(user_id, "claude-sonnet-4-6", 1000), "claude-sonnet-4-6", 2000, 1000)
+    ledger._pending.charges.append(cl._PendingCharge(user_id=999, model_name="claude-sonnet-4-6",
+                                                     tokens_in=1, tokens_out=1, credits=1))
+    assert ledger.flush() == 1
+    assert ledger.stats["rejected"] == 1 and ledger.stats["flush_failures"] == 0
+    assert not len(ledger._pending)
+
+    db = Session()
+    try:
+        assert db.query(CreditTransaction).count() == 1
+        assert db.query(CreditBalance).filter_by(user_id=user_id).one().used_credits == 7
+    finally:
+        db.close()
+
+
+def test_batch_nobody_can_write_is_dead_lettered(monkeypatch):
+    led, _ = _budget_ledger(monkeypatch)
+    led._ensure_writer = lambda: None
+    led._session_factory = lambda: type("S", (), {"rollback": lambda s: None, "close": lambda s: None})()
+    monkeypatch.setattr(cl, "FLUSH_MAX_RETRIES", 3)
+    monkeypatch.setattr(led, "_apply_budget", lambda db, budget: (_ for _ in ()).throw(RuntimeError("db down")))
+    led.record_llm_cost(7, "claude-opus-4-6", 1000, 0)
+    for _ in range(2):
+        assert led.flush() == 0 and len(led._pending) == 1
+    assert led.flush() == 0
+    assert not len(led._pending) and led.stats["dropped"] == 1
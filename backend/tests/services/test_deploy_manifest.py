@@ -0,0 +1,164 @@
+"""Tests DEPLOY-DIFF — manifest de contenu par org, déploiements delta et package.xml delta (SFDX et git mockés ou locaux, aucun appel réseau)."""
+import asyncio
+import subprocess
+from pathlib import Path
+
+from app.services import jordan_deploy_service as jds
+from app.services.deploy_manifest import DeploymentManifest, component_key
+from app.services.git_service import GitService
+from app.services.sf_admin_service import DeployResult, SFAdminService
+from app.services.sfdx_service import SFDXService
+
+LWC = "force-app/main/default/lwc/card/"
+CLS = "force-app/main/default/classes/"
+
+
+def _files(**overrides):
+    files = {LWC + "card.js": "export default 1;", LWC + "card.html": "<template></template>",
+             CLS + "A.cls": "public class A {}", CLS + "A.cls-meta.xml": "<ApexClass/>",
+             CLS + "B.cls": "public class B {}", CLS + "B.cls-meta.xml": "<ApexClass/>"}
+    files.update(overrides)
+    return files
+
+
+def test_changed_keeps_whole_components_and_survives_failures(tmp_path):
+    assert component_key(LWC + "card.js") == component_key(LWC + "card.html") == "force-app/main/default/lwc/card"
+    assert component_key(CLS + "A.cls-meta.xml") == component_key(CLS + "A.cls")
+
+    manifest = DeploymentManifest(7, "dev@acme.com.sandbox", root=tmp_path)
+    assert manifest.changed(_files()) == _files()
+    manifest.record(_files(), deploy_id="0Af1")
+
+    again = DeploymentManifest(7, "dev@acme.com.sandbox", root=tmp_path)
+    assert again.changed(_files()) == {}
+    assert set(again.changed(_files(**{LWC + "card.js": "export default 2;"}))) == {LWC + "card.js", LWC + "card.html"}
+    assert set(again.changed(_files(**{CLS + "C.cls": "class C {}"}))) == {CLS + "C.cls"}
+    assert again.changed(_files(), force=True) == _files()
+    assert DeploymentManifest(7, "other-org", root=tmp_path).changed(_files()) == _files()
+
+
+def test_delta_package_xml_members():
+    xml = SFDXService._generate_package_xml(SFDXService._categorize_files([
+        CLS + "A.cls", CLS + "A.cls-meta.xml", LWC + "card.js",
+        "force-app/main/default/objects/Formation__c/Formation__c.object-meta.xml",
+        "force-app/main/default/objects/Formation__c/fields/Duree__c.field-meta.xml",
+    ]), "67.0")
+    assert "<members>A</members>" in xml and xml.count("<members>A</members>") == 1
+    assert "<members>card</members>" in xml
+    assert "<members>Formation__c</members>\n        <name>CustomObject</name>" in xml
+    assert "<members>Formation__c.Duree__c</members>\n        <name>CustomField</name>" in xml
+
+
+def test_jordan_redeploys_only_changed_components(tmp_path, monkeypatch):
+    monkeypatch.setattr(jds, "DeploymentManifest", lambda p, e: DeploymentManifest(p, e, root=tmp_path))
+    monkeypatch.setattr(SFAdminService, "_version_api", staticmethod(lambda: "67.0"))
+    service = jds.JordanDeployService(project_id=7, db=None)
+    service.sfdx_service = SFDXService(target_org="dev@acme.com.sandbox")
+    deployed, outcome = [], {"success": True}
+
+    manifests = []
+
+    async def fake_deploy_source(source_path, manifest_path=None, **kwargs):
+        root = Path(source_path)
+        deployed.append(sorted(str(p.relative_to(root)) for p in root.rglob("*") if p.is_file()))
+        manifests.append(manifest_path and Path(manifest_path).read_text())
+        assert manifest_path is None or root not in Path(manifest_path).parents   # hors des sources
+        return dict(outcome, id="0Af1")
+
+    monkeypatch.setattr(service.sfdx_service, "deploy_source", fake_deploy_source)
+    deploy = lambda files: asyncio.run(service.deploy_source_code({"files": files}))
+
+    assert deploy(_files())["success"]
+    assert len(deployed[0]) == 6 and manifests[0] is None  # deploiement complet : --source-dir
+    assert deploy(_files())["unchanged"] and len(deployed) == 1
+
+    outcome["success"] = False
+    assert not deploy(_files(**{CLS + "B.cls": "public class B { }"}))["success"]
+    outcome["success"] = True
+    result = deploy(_files(**{CLS + "B.cls": "public class B { }"}))
+    assert deployed[-1] == [CLS + "B.cls", CLS + "B.cls-meta.xml", "sfdx-project.json"]
+    assert manifests[-1] == result["package_xml"]         # delta : --manifest
+    assert result["skipped_files"] == 4
+    assert "<members>B</members>" in result["package_xml"] and "<members>A</members>" not in result["package_xml"]
+
+
+def test_failed_delta_deploy_is_retried_in_full(tmp_path, monkeypatch):
+    monkeypatch.setattr(jds, "DeploymentManifest", lambda p, e: DeploymentManifest(p, e, root=tmp_path))
+    monkeypatch.setattr(SFAdminService, "_version_api", staticmethod(lambda: "67.0"))
+    service = jds.JordanDeployService(project_id=7, db=None)
+    service.sfdx_service = SFDXService(target_org="dev@acme.com.sandbox")
+    deployed = []
+
+    async def fake_deploy_source(source_path, **kwargs):
+        files = sorted(str(p.relative_to(source_path)) for p in Path(source_path).rglob("*") if p.is_file())
+        deployed.append(files)
+        # A a ete supprimee de l'org a la main : B ne compile que si A repart avec
+        return {"success": CLS + "A.cls" in files, "id": "0Af2"}
+
+    monkeypatch.setattr(service.sfdx_service, "deploy_source", fake_deploy_source)
+    DeploymentManifest(7, "dev@acme.com.sandbox", root=tmp_path).record(_files())
+
+    result = asyncio.run(service.deploy_phase(2, {"files": _files(**{CLS + "B.cls": "public class B { }"})}, "b"))
+    assert result["success"]
+    assert [s["step"] for s in result["steps"]][:2] == ["deploy", "deploy_full"]
+    assert len(deployed) == 2 and len(deployed[0]) == 3 and len(deployed[1]) == 6
+
+    result = asyncio.run(service.deploy_phase(2, {"files": _files(**{CLS + "B.cls": "public class B {}"})}, "b",
+                                              force=True))
+    assert result["success"] and len(deployed) == 3 and len(deployed[2]) == 6
+
+
+def test_sf_admin_plan_deploys_only_modified_xml(tmp_path, monkeypatch):
+    manifest = DeploymentManifest(7, "dev", root=tmp_path / "manifests")
+    service = SFAdminService("dev", persist_dir=str(tmp_path / "livrables"), manifest=manifest)
+    deployed = []
+
+    manifests = []
+
+    def fake_deploy(temp_dir, manifest_path=None):
+        root = Path(temp_dir)
+        deployed.append(sorted(str(p.relative_to(root)) for p in root.rglob("*-meta.xml")))
+        manifests.append(manifest_path)
+        assert manifest_path is None or root not in Path(manifest_path).parents
+        return DeployResult(success=True, deploy_id="0Af2")
+
+    monkeypatch.setattr(service, "_deploy_via_sfdx", fake_deploy)
+    plan = lambda label: {"operations": [
+        {"type": "create_object", "api_name": "Formation", "label": "Formation", "plural_label": "Formations"},
+        {"type": "create_field", "object": "Formation", "api_name": "Duree__c", "field_type": "Number", "label": label},
+        {"type": "create_field", "object": "Formation", "api_name": "Lieu__c", "field_type": "Text", "label": "Lieu"},
+    ]}
+
+    assert service.execute_plan(plan("Duree")).success
+    assert len(deployed[0]) == 3
+    assert service.execute_plan(plan("Duree")).unchanged and len(deployed) == 1
+
+    result = service.execute_plan(plan("Duree (jours)"))
+    assert deployed[-1] == ["force-app/main/default/objects/Formation__c/fields/Duree__c.field-meta.xml"]
+    assert "<members>Formation__c.Duree__c</members>" in result.package_xml
+    assert manifests[0] is None and manifests[-1] is not None
+    assert result.output_dir and len(list(Path(result.output_dir).rglob("*-meta.xml"))) == 3
+
+
+def test_git_commit_skips_files_identical_to_working_tree(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    for cmd in (["init", "-q"], ["config", "user.email", "t@t"], ["config", "user.name", "t"]):
+        subprocess.run(["git", *cmd], cwd=repo, check=True)
+    service = GitService(repo_url="https://github.com/acme/repo", work_dir=str(tmp_path))
+    service.repo_path = str(repo)
+
+    async def fake_push(*args, **kwargs):
+        return {"success": True}
+
+    monkeypatch.setattr(service, "push", fake_push)
+    first = asyncio.run(service.commit_files(_files(), "first"))
+    assert first["success"] and len(first["files"]) == 6
+
+    again = asyncio.run(service.commit_files(_files(), "again"))
+    assert again == {"success": True, "message": "Nothing to commit", "files": [], "unchanged": 6}
+
+    third = asyncio.run(service.commit_files(_files(**{CLS + "A.cls": "public class A { }"}), "third"))
+    assert third["files"] == [CLS + "A.cls"]
+    log = subprocess.run(["git", "log", "--oneline"], cwd=repo, capture_output=True, text=True).stdout
+    assert len(log.splitlines()) == 2
@@ -0,0 +1,123 @@
+"""Tests LLM-LOG-BUF — journal LLM bufferisé, payloads compressés et dédupliqués par hash (session SQLAlchemy simulée, aucune base)."""
+from types import SimpleNamespace
+
+from app.services import llm_logger
+from app.services.llm_logger import LLMInteractionContext, LLMLogWriter, load_llm_payload
+
+SYSTEM = "Tu es Diego, developpeur Apex senior. " * 400          # ~15 KB, identique a chaque appel
+
+
+class _FakeDB:
+    def __init__(self, tables, fail):
+        self.tables, self.fail, self.pending = tables, fail, []
+
+    def execute(self, stmt, rows):
+        if self.fail(rows):
+            raise RuntimeError("db down")
+        self.pending.append((stmt.table.name, [dict(r) for r in rows]))
+
+    def begin_nested(self):
+        db = self
+
+        class _Savepoint:
+            def __enter__(self):
+                self.mark = len(db.pending)
+
+            def __exit__(self, exc_type, *a):
+                if exc_type:
+                    del db.pending[self.mark:]
+                return False
+        return _Savepoint()
+
+    def commit(self):
+        for table, rows in self.pending:
+            self.tables.setdefault(table, []).extend(rows)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+    def close(self):
+        pass
+
+
+def _writer(tables, fail=lambda rows: False, **kwargs):
+    return LLMLogWriter(session_factory=lambda: _FakeDB(tables, fail), flush_interval=60, **kwargs)
+
+
+def _log(monkeypatch, writer, n, **kwargs):
+    monkeypatch.setattr(llm_logger, "_writer", writer)
+    for i in range(n):
+        assert llm_logger.log_llm_interaction(
+            "diego", SYSTEM + f"Tache {i}", response=f"public class C{i} {{}}", execution_id="7", **kwargs) is None
+
+
+def test_rows_are_batched_and_repeated_prompts_stored_once(monkeypatch):
+    tables = {}
+    writer = _writer(tables, batch_size=4)
+    _log(monkeypatch, writer, 6, rag_context="Contexte RAG " * 500)
+    writer.flush()
+    rows = tables["llm_interactions"]
+    assert len(rows) == 6 and writer.stats["flushes"] == 2
+    assert rows[0]["execution_id"] == 7 and len(rows[0]["prompt"]) == llm_logger.LLM_LOG_PREVIEW_CHARS
+    assert rows[0]["response_sha256"] is None and rows[0]["response"] == "public class C0 {}"
+    # 6 prompts distincts (suffixe) + 1 seul contexte RAG, non renvoye au 2e lot
+    assert len(tables["llm_payload_blobs"]) == 7
+    assert len({r["rag_context_sha256"] for r in rows}) == 1
+    assert writer.stats["blobs_deduplicated"] == 1
+    assert writer.stats["stored_bytes"] < writer.stats["payload_bytes"] / 10
+
+    blobs = {b["sha256"]: SimpleNamespace(**b) for b in tables["llm_payload_blobs"]}
+    db = SimpleNamespace(get=lambda model, sha: blobs.get(sha))
+    interaction = SimpleNamespace(**rows[3])
+    assert load_llm_payload(db, interaction, "prompt") == SYSTEM + "Tache 3"
+    assert load_llm_payload(db, interaction, "response") == "public class C3 {}"
+    writer.shutdown()
+
+
+def test_failed_flush_requeues_and_full_queue_drops(monkeypatch):
+    tables, state = {}, {"down": True}
+    writer = _writer(tables, fail=lambda rows: state["down"], max_bytes=len(SYSTEM) * 3 + 200)
+    _log(monkeypatch, writer, 4)
+    assert writer.stats["dropped"] == 1 and writer.pending() == 3
+
+    assert writer.flush() == 0
+    assert writer.pending() == 3 and writer.stats["flush_failures"] == 1
+    state["down"] = False
+    assert writer.flush() == 3
+    assert [r["response"] for r in tables["llm_interactions"]] == [f"public class C{i} {{}}" for i in range(3)]
+    writer.shutdown()
+
+
+def test_rejected_rows_are_dropped_without_blocking_the_queue(monkeypatch):
+    tables = {}
+    # execution supprimee entre l'appel LLM et le flush : la FK rejette la ligne
+    writer = _writer(tables, fail=lambda rows: any(r.get("execution_id") == 8 for r in rows))
+    monkeypatch.setattr(llm_logger, "_writer", writer)
+    for i, execution_id in enumerate(("7", "8", "7")):
+        llm_logger.log_llm_interaction("diego", SYSTEM + f"Tache {i}", response=f"public class C{i} {{}}",
+                                       execution_id=execution_id)
+
+    assert writer.flush() == 2
+    assert [r["response"] for r in tables["llm_interactions"]] == ["public class C0 {}", "public class C2 {}"]
+    assert len(tables["llm_payload_blobs"]) == 2      # le blob de la ligne rejetee part avec son savepoint
+    assert writer.stats["rejected"] == 1 and writer.stats["flush_failures"] == 0
+    assert writer.pending() == 0
+    writer.shutdown()
+
+
+def test_context_manager_goes_through_the_writer(monkeypatch):
+    tables = {}
+    writer = _writer(tables)
+    monkeypatch.setattr(llm_logger, "_writer", writer)
+    try:
+        with LLMInteractionContext("elena", "short prompt", agent_mode="build") as ctx:
+            ctx.set_response("ok", tokens_input=3, tokens_output=1)
+            raise ValueError("parse error")
+    except ValueError:
+        pass
+    writer.shutdown()
+    row = tables["llm_interactions"][0]
+    assert row["prompt"] == "short prompt" and row["prompt_sha256"] is None
+    assert row["success"] is False and row["error_message"] == "parse error"
+    assert "llm_payload_blobs" not in tables
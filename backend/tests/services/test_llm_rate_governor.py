@@ -0,0 +1,168 @@
+"""Tests RATE-GOV — gouverneur RPM/TPM/concurrence du router LLM (provider mocké, aucun appel réseau)."""
+import asyncio
+import time
+
+import pytest
+import yaml
+
+from app.services import llm_rate_governor as gov
+from app.services.llm_router_service import LLMRequest, LLMResponse, LLMRouterService
+
+
+def test_token_bucket_refill():
+    bucket = gov.TokenBucket(per_minute=60)  # 1 / s
+    now = time.monotonic()
+    bucket.take(60, now)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1.0) == 0.0
+    # Requête plus grosse que la capacité : attend un bucket plein, pas l'infini
+    assert bucket.wait_time(500, now + 1.0) == pytest.approx(59.0)
+
+
+def test_concurrency_cap_and_priority_order():
+    governor = gov.RateGovernor({"providers": {"p": {"max_concurrency": 1}}})
+    limiter = governor.limiter_for("p/model")
+    order = []
+
+    async def call(name, priority, hold):
+        async with governor.slot("p/model", 10, priority):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def scenario():
+        first = asyncio.create_task(call("first", gov.PRIORITY_WORKER, 0.05))
+        await asyncio.sleep(0.01)
+        waiters = [
+            asyncio.create_task(call("worker", gov.PRIORITY_WORKER, 0)),
+            asyncio.create_task(call("orchestrator", gov.PRIORITY_ORCHESTRATOR, 0)),
+        ]
+        await asyncio.gather(first, *waiters)
+
+    asyncio.run(scenario())
+    assert order == ["first", "orchestrator", "worker"]
+    stats = governor.get_stats()["providers"]["p"]
+    assert stats["granted"] == 3 and stats["in_flight"] == 0 and stats["queued"] == 0
+    assert stats["queue_wait_ms_max"] >= 30
+    assert limiter.max_concurrency == 1
+
+
+def test_rpm_bucket_spaces_requests():
+    governor = gov.RateGovernor({"providers": {"p": {"rpm": 600}}})  # capacité 600, 10 / s
+    limiter = governor.limiter_for("p")
+    limiter.rpm.take(600, time.monotonic())
+
+    async def scenario():
+        t0 = time.monotonic()
+        for _ in range(3):
+            async with governor.slot("p", 0):
+                pass
+        return time.monotonic() - t0
+
+    assert 0.2 < asyncio.run(scenario()) < 1.0
+
+
+def test_tpm_estimate_is_reconciled():
+    governor = gov.RateGovernor({"providers": {"p": {"tpm": 6000}}})
+    limiter = governor.limiter_for("p")
+
+    async def scenario():
+        async with governor.slot("p", 5000) as ticket:
+            ticket["actual_tokens"] = 1000
+
+    asyncio.run(scenario())
+    assert limiter.tpm.level == pytest.approx(5000, abs=10)
+
+
+def test_queue_wait_exceeded():
+    governor = gov.RateGovernor({"providers": {"p": {"max_concurrency": 1}}, "max_queue_wait_seconds": 0.05})
+
+    async def scenario():
+        async with governor.slot("p", 0):
+            with pytest.raises(gov.QueueWaitExceeded):
+                async with governor.slot("p", 0):
+                    pass
+
+    asyncio.run(scenario())
+    limiter = governor.limiter_for("p")
+    assert limiter.timeouts == 1 and limiter.queue == []
+
+
+def test_redis_take_runs_off_the_loop_and_outside_the_lock():
+    governor = gov.RateGovernor({"providers": {"p": {"rpm": 600, "tpm": 60000, "max_concurrency": 2}}})
+    calls = []
+
+    def fake_script(keys, args):
+        calls.append((keys, governor._lock.locked()))
+        time.sleep(0.05)                          # aller-retour Redis lent
+        return "0"
+
+    governor._redis, governor._redis_script = object(), fake_script
+
+    async def scenario():
+        ticks = []
+
+        async def ticker():
+            for _ in range(10):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def call():
+            async with governor.slot("p", 100) as ticket:
+                ticket["actual_tokens"] = 40
+
+        await asyncio.gather(ticker(), call(), call())
+        return ticks
+
+    ticks = asyncio.run(scenario())
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.04   # la boucle n'est jamais bloquee
+    takes = [c for c in calls if len(c[0]) == 2]
+    assert len(takes) == 2 and len(calls) == 4                 # 2 takes + 2 reconciliations TPM
+    assert not any(locked for _, locked in calls)
+    stats = governor.get_stats()["providers"]["p"]
+    assert stats["granted"] == 2 and stats["in_flight"] == 0 and governor.limiter_for("p").taking is None
+
+
+def test_unlisted_provider_is_not_governed():
+    governor = gov.RateGovernor({"providers": {"anthropic": {"rpm": 1}}})
+    assert governor.limiter_for("gpu_nemotron/nemotron") is None
+    assert governor.limiter_for("anthropic/claude-opus").key == "anthropic"
+
+
+def test_router_caps_concurrent_provider_calls(tmp_path):
+    config = {
+        "default_profile": "test",
+        "agent_tier_map": {"marcus": "orchestrator"},
+        "profiles": {"test": {"orchestrator": "stub/m", "worker": "stub/m"}},
+        "providers": {},
+        "pricing": {},
+        "rate_limits": {"enabled": True, "providers": {"stub": {"max_concurrency": 2}}},
+    }
+    path = tmp_path / "routing.yaml"
+    path.write_text(yaml.safe_dump(config))
+    router = LLMRouterService(config_path=str(path))
+    in_flight = {"now": 0, "max": 0}
+
+    async def fake_call_provider(request, provider_str):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.02)
+        in_flight["now"] -= 1
+        return LLMResponse(content="ok", provider=provider_str, model_id="m", tokens_in=1, tokens_out=1,
+                           cost_usd=0.0, latency_ms=20, success=True)
+
+    router._call_provider = fake_call_provider
+
+    async def burst():
+        return await asyncio.gather(*[
+            router.complete(LLMRequest(prompt="x", agent_type="marcus" if i % 2 else "apex")) for i in range(8)
+        ])
+
+    try:
+        responses = asyncio.run(burst())
+    finally:
+        router.shutdown()
+    assert in_flight["max"] == 2
+    assert all("queue_wait_ms" in r.metadata for r in responses)
+    stats = router.get_session_stats()["rate_governor"]["providers"]["stub"]
+    assert stats["granted"] == 8
+    assert all("queue_wait_ms" in entry for entry in router.usage_log)
@@ -0,0 +1,135 @@
+"""Tests RESP-CACHE — cache disque des réponses LLM (provider mocké, aucun appel réseau)."""
+import asyncio
+import os
+
+import pytest
+import yaml
+
+from app.services.llm_response_cache import LLMResponseCache, make_cache_key
+from app.services.llm_router_service import LLMRequest, LLMResponse, LLMRouterService
+
+
+def _router(tmp_path, profiles=None, agents=None, enabled=True):
+    config = {
+        "default_profile": "test",
+        "agent_tier_map": {},
+        "profiles": {
+            "test": {"orchestrator": "stub/m", "worker": "stub/m"},
+            "prod": {"orchestrator": "stub/m", "worker": "stub/m"},
+        },
+        "providers": {},
+        "pricing": {},
+        "response_cache": {
+            "enabled": enabled,
+            "path": str(tmp_path / "cache.sqlite"),
+            "max_size_mb": 1,
+            "profiles": profiles if profiles is not None else {"test": True},
+            "agents": agents or {},
+        },
+    }
+    path = tmp_path / "routing.yaml"
+    path.write_text(yaml.safe_dump(config))
+    router = LLMRouterService(config_path=str(path))
+    router.provider_calls = 0
+
+    async def fake_call_provider(request, provider_str):
+        router.provider_calls += 1
+        return LLMResponse(content=f"answer to {request.prompt}", provider=provider_str, model_id="m",
+                           tokens_in=100, tokens_out=50, cost_usd=0.25, latency_ms=900, success=True)
+
+    router._call_provider = fake_call_provider
+    return router
+
+
+@pytest.fixture
+def router(tmp_path):
+    r = _router(tmp_path)
+    yield r
+    r.shutdown()
+
+
+def test_identical_request_is_replayed(router):
+    request = LLMRequest(prompt="p", system_prompt="s", agent_type="marcus", temperature=0.0)
+    first = asyncio.run(router.complete(request))
+    second = asyncio.run(router.complete(request))
+    assert router.provider_calls == 1
+    assert second.content == first.content
+    assert second.cost_usd == 0.0 and second.tokens_in == 0
+    assert second.metadata["response_cache"] == "hit"
+    stats = router.get_session_stats()["response_cache"]
+    assert stats == {"hits": 1, "misses": 1, "saved_cost_usd": 0.25, "saved_tokens": 150}
+    assert [e["cache"] for e in router.usage_log] == ["miss", "hit"]
+
+
+def test_hit_still_runs_tier_and_credit_preflight(router, monkeypatch):
+    released = []
+
+    def preflight(request, provider_str):
+        if request.user_id == 2:                      # tier sans acces a ce modele
+            return None, LLMResponse(content="", provider=provider_str, model_id="m", tokens_in=0, tokens_out=0,
+                                     cost_usd=0.0, latency_ms=0, success=False, error="model_not_allowed: tier")
+        return f"reservation-{request.user_id}", None
+
+    monkeypatch.setattr(router, "_credit_preflight", preflight)
+    monkeypatch.setattr(router, "_credit_release", released.append)
+    monkeypatch.setattr(router, "_credit_post_charge", lambda request, response, reservation: None)
+    request = dict(prompt="p", system_prompt="s", agent_type="marcus", temperature=0.0)
+    assert asyncio.run(router.complete(LLMRequest(user_id=1, **request))).success
+
+    blocked = asyncio.run(router.complete(LLMRequest(user_id=2, **request)))
+    assert not blocked.success and blocked.error.startswith("model_not_allowed")
+    hit = asyncio.run(router.complete(LLMRequest(user_id=3, **request)))
+    assert hit.metadata["response_cache"] == "hit"
+    assert released == ["reservation-3"]              # replay gratuit : reservation rendue
+    assert router.provider_calls == 1
+
+
+def test_key_covers_prompt_system_and_temperature(router):
+    for kwargs in ({}, {"system_prompt": "other"}, {"temperature": 0.7}, {"prompt": "q"}):
+        asyncio.run(router.complete(LLMRequest(**{"prompt": "p", **kwargs})))
+    assert router.provider_calls == 4
+
+
+def test_failures_are_not_cached(router):
+    async def failing(request, provider_str):
+        router.provider_calls += 1
+        return LLMResponse(content="", provider=provider_str, model_id="m", tokens_in=0, tokens_out=0,
+                           cost_usd=0.0, latency_ms=0, success=False, error="boom")
+
+    router._call_provider = failing
+    asyncio.run(router.complete(LLMRequest(prompt="p")))
+    asyncio.run(router.complete(LLMRequest(prompt="p")))
+    assert router.provider_calls == 2
+
+
+def test_profile_and_agent_flags(tmp_path):
+    r = _router(tmp_path, profiles={"test": False}, agents={"marcus": True})
+    try:
+        assert r._response_cache_key(LLMRequest(prompt="p", agent_type="sophie"), "stub/m") is None
+        assert r._response_cache_key(LLMRequest(prompt="p", agent_type="Marcus"), "stub/m") is not None
+    finally:
+        r.shutdown()
+    r = _router(tmp_path, enabled="")
+    try:
+        assert r._response_cache is None
+    finally:
+        r.shutdown()
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "c.sqlite"), max_size_mb=0.01)  # ~10 Ko
+    big = {"content": os.urandom(3000).hex()}  # ~3,4 Ko compressés (hexa aléatoire)
+    for i in range(4):
+        cache.put(f"k{i}", big)
+        cache.get("k0")  # k0 reste le plus récemment utilisé
+    cache.put("small", {"content": "x" * 4000})
+    assert cache.get("k0") is not None
+    assert cache.get("k1") is None
+    assert cache.stats()["size_bytes"] <= cache.max_bytes
+    cache.close()
+
+
+def test_cache_key_is_stable():
+    a = make_cache_key("anthropic/claude-opus", "claude-opus-5", None, "p", 0.3, 4096)
+    assert a == make_cache_key("anthropic/claude-opus", "claude-opus-5", "", "p", 0.30000001, 4096)
+    assert a != make_cache_key("anthropic/claude-opus", "claude-opus-5", None, "p", 0.3, 8192)
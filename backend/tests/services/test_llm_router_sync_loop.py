@@ -0,0 +1,135 @@
+"""Tests LOOP-001 — complete_sync via la boucle persistante du router (aucun appel réseau)."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.llm_router_service import (
+    COMPLETE_SYNC_TIMEOUT_SECONDS, LLMRequest, LLMResponse, LLMRouterService,
+)
+
+
+@pytest.fixture
+def router():
+    r = LLMRouterService()
+    yield r
+    r.shutdown()
+
+
+def _ok(loop_ids):
+    async def fake_complete(request):
+        loop_ids.append(id(asyncio.get_running_loop()))
+        return LLMResponse(content="ok", provider="stub/m", model_id="m",
+                           tokens_in=1, tokens_out=1, cost_usd=0.0, latency_ms=0, success=True)
+    return fake_complete
+
+
+def test_sync_calls_share_one_loop_across_threads(router):
+    loop_ids = []
+    router.complete = _ok(loop_ids)
+    threads = [threading.Thread(target=router.complete_sync, args=(LLMRequest(prompt="x"),)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    router.complete_sync(LLMRequest(prompt="x"))
+    assert len(loop_ids) == 9
+    assert len(set(loop_ids)) == 1
+
+
+def test_sync_call_from_inside_running_loop(router):
+    loop_ids = []
+    router.complete = _ok(loop_ids)
+
+    async def caller():
+        return router.complete_sync(LLMRequest(prompt="x")), id(asyncio.get_running_loop())
+
+    response, caller_loop = asyncio.run(caller())
+    assert response.content == "ok"
+    assert loop_ids[0] != caller_loop
+
+
+def test_timeout_cancels_inflight_call(router):
+    cancelled = threading.Event()
+
+    async def slow_complete(request):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    router.complete = slow_complete
+    t0 = time.monotonic()
+    response = router.complete_sync(LLMRequest(prompt="x"), timeout=0.1)
+    assert not response.success
+    assert "Timeout" in response.error
+    assert time.monotonic() - t0 < 2
+    assert cancelled.wait(timeout=2)
+
+
+def test_default_wait_outlasts_agent_budgets(router, monkeypatch):
+    waits = []
+
+    def fake_run(coro, timeout=None):
+        coro.close()
+        waits.append(timeout)
+        return LLMResponse(content="ok", provider="stub/m", model_id="m",
+                           tokens_in=1, tokens_out=1, cost_usd=0.0, latency_ms=0, success=True)
+
+    monkeypatch.setattr(router._sync_loop, "run", fake_run)
+    router.complete_sync(LLMRequest(prompt="x"))
+    router.generate("x", agent_type="emma")
+    assert waits == [COMPLETE_SYNC_TIMEOUT_SECONDS] * 2
+    assert COMPLETE_SYNC_TIMEOUT_SECONDS > 3600          # budget d'Emma
+
+
+def test_long_call_completes_from_worker_thread(router, monkeypatch):
+    # Simulate a call that outlives any wait a caller did not ask for:
+    # the future only resolves after a timed-out wait would have fired.
+    import concurrent.futures
+
+    waited = []
+    real_result = concurrent.futures.Future.result
+
+    def watching_result(self, timeout=None):
+        waited.append(timeout)
+        return real_result(self, timeout=timeout)
+
+    monkeypatch.setattr(concurrent.futures.Future, "result", watching_result)
+
+    async def slow_complete(request):
+        await asyncio.sleep(0.5)
+        return LLMResponse(content="done", provider="stub/m", model_id="m",
+                           tokens_in=1, tokens_out=1, cost_usd=0.0, latency_ms=500, success=True)
+
+    router.complete = slow_complete
+    results = []
+    worker = threading.Thread(target=lambda: results.append(router.generate("x", agent_type="emma")))
+    worker.start()
+    worker.join(timeout=5)
+    assert results and results[0]["content"] == "done"
+    assert results[0]["success"] is True
+    assert waited and all(w == COMPLETE_SYNC_TIMEOUT_SECONDS for w in waited)
+
+
+def test_shutdown_closes_bridge_loop_clients():
+    r = LLMRouterService()
+
+    async def grab():
+        return r._get_http_client(30)
+
+    client = r._sync_loop.run(grab())
+    r.shutdown()
+    assert client.is_closed
+
+
+def test_http_client_pooled_per_loop(router):
+    async def grab():
+        return router._get_http_client(30), router._get_http_client(30)
+
+    a1, a2 = router._sync_loop.run(grab())
+    b1, _ = asyncio.run(grab())
+    assert a1 is a2
+    assert a1 is not b1
@@ -0,0 +1,146 @@
+"""Tests MERMAID-POOL — workers de rendu persistants, cache PNG par hash du diagramme normalisé et export DOCX (worker Python local à la place de node)."""
+import base64
+import sys
+import time
+
+import pytest
+
+from app.services import mermaid_renderer as mr
+from app.services.mermaid_renderer import MermaidRenderer, diagram_key, normalize_mermaid
+
+PNG = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4nGP4//8/AAX+Av4N70a4AAAAAElFTkSuQmCC")
+
+# Meme protocole que mermaid_worker.mjs ; chaque demarrage et chaque rendu sont journalises.
+FAKE_WORKER = f"""
+import base64, json, os, sys, time
+log = sys.argv[1]
+open(log, "a").write(f"start {{os.getpid()}}\\n")
+for line in sys.stdin:
+    request = json.loads(line)
+    time.sleep(0.3)
+    open(log, "a").write("render " + request["code"].splitlines()[0] + "\\n")
+    if "BROKEN" in request["code"]:
+        print(json.dumps({{"id": request["id"], "error": "Parse error on line 2"}}), flush=True)
+    else:
+        print(json.dumps({{"id": request["id"], "png": "{base64.b64encode(PNG).decode()}"}}), flush=True)
+"""
+
+ERD = "erDiagram\n    Account {\n        Id PK\n        Name string\n    }\n"
+
+
+@pytest.fixture
+def worker(tmp_path):
+    script, log = tmp_path / "worker.py", tmp_path / "worker.log"
+    script.write_text(FAKE_WORKER)
+    log.touch()
+
+    def lines(prefix):
+        return [line for line in log.read_text().splitlines() if line.startswith(prefix)]
+
+    return [sys.executable, str(script), str(log)], lines
+
+
+def test_diagrams_render_concurrently_and_unchanged_ones_are_never_rerendered(tmp_path, worker):
+    cmd, lines = worker
+    renderer = MermaidRenderer(cache_dir=tmp_path / "cache", workers=3, worker_cmd=cmd)
+    codes = [f"graph TD\n    A{i} --> B" for i in range(6)]
+    codes += [ERD, ERD.replace("\n", "\r\n") + "\n\n", codes[0]]     # meme diagramme une fois normalise
+
+    started = time.perf_counter()
+    pngs = renderer.render_many(codes)
+    elapsed = time.perf_counter() - started
+    assert pngs == [PNG] * 9
+    assert len(lines("render")) == 7 and len(lines("start")) == 3   # workers reutilises, doublons partages
+    assert elapsed < 7 * 0.3
+    assert normalize_mermaid(ERD).splitlines()[2] == "        string Id"
+    assert (tmp_path / "cache" / diagram_key(normalize_mermaid(ERD))[:2]).is_dir()
+    renderer.shutdown()
+
+    again = MermaidRenderer(cache_dir=tmp_path / "cache", workers=3, worker_cmd=["/nonexistent/node"])
+    assert again.render_many(reversed(codes)) == [PNG] * 9             # nouvelle version du SDS : zero rendu
+    assert again.stats["cache_hits"] == 9 and again.stats["workers_started"] == 0
+    assert len(lines("render")) == 7
+
+
+def test_broken_diagram_is_not_cached_and_missing_node_falls_back_to_mmdc(tmp_path, worker, monkeypatch):
+    cmd, lines = worker
+
+    def mmdc(self, code, width, background):
+        raise mr.RenderError("Parse error on line 2")
+
+    monkeypatch.setattr(MermaidRenderer, "_render_with_mmdc", mmdc)   # mmdc confirme l'erreur de syntaxe
+    renderer = MermaidRenderer(cache_dir=tmp_path / "cache", workers=2, worker_cmd=cmd)
+    broken = "graph TD\n    BROKEN -->"
+    assert renderer.render(broken) is None
+    assert renderer.render(broken) is None                              # echec memorise, pas de nouveau rendu
+    assert len(lines("render")) == 1 and renderer.stats["failures"] == 1
+    assert renderer.render("graph TD\n    ok --> done") == PNG           # le worker reste utilisable
+    assert len(lines("start")) == 1
+    renderer.shutdown()
+
+    mmdc = []
+    monkeypatch.setattr(MermaidRenderer, "_render_with_mmdc", lambda self, code, w, bg: mmdc.append(code) or PNG)
+    fallback = MermaidRenderer(cache_dir=tmp_path / "other", worker_cmd=["/nonexistent/node"])
+    assert fallback.render_many([ERD, "graph LR\n    x --> y"]) == [PNG, PNG]
+    assert normalize_mermaid(ERD) in mmdc and fallback.stats["fallback_renders"] == 2
+
+
+def test_worker_that_lost_its_browser_is_replaced_and_diagrams_fall_back(tmp_path, worker, monkeypatch):
+    cmd, lines = worker
+    # Chromium tombe apres le premier rendu : node reste vivant mais tout echoue ensuite.
+    crashing = tmp_path / "crashing.py"
+    crashing.write_text(FAKE_WORKER.replace(
+        'if "BROKEN" in request["code"]:', 'if "BROKEN" in request["code"] or request["id"] > 1:'))
+    mmdc = []
+    monkeypatch.setattr(MermaidRenderer, "_render_with_mmdc", lambda self, code, w, bg: mmdc.append(code) or PNG)
+    renderer = MermaidRenderer(cache_dir=tmp_path / "cache", workers=1,
+                               worker_cmd=[sys.executable, str(crashing), cmd[2]])
+    assert renderer.render("graph TD\n    a --> b") == PNG
+    assert renderer.render("graph TD\n    c --> d") == PNG                # rendu par mmdc, pas memorise en echec
+    assert renderer.render("graph TD\n    e --> f") == PNG                # nouveau worker
+    assert len(mmdc) == 1 and renderer.stats["failures"] == 0 and not renderer._failed
+    assert len(lines("start")) == 2 and renderer.stats["workers_started"] == 2
+    renderer.shutdown()
+
+
+def test_mmdc_timeout_is_retried_and_pool_is_retried_after_backoff(tmp_path, worker, monkeypatch):
+    cmd, lines = worker
+    monkeypatch.setattr(mr, "MERMAID_POOL_RETRY_SECONDS", 0.2)
+    outcomes = [mr.RenderUnavailable("mmdc timed out after 60s"), PNG]
+
+    def mmdc(self, code, width, background):
+        outcome = outcomes.pop(0) if outcomes else mr.RenderUnavailable("mmdc not found")
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(MermaidRenderer, "_render_with_mmdc", mmdc)
+    renderer = MermaidRenderer(cache_dir=tmp_path / "cache", worker_cmd=["/nonexistent/node"])
+    assert renderer.render(ERD) is None and renderer.stats["unavailable"] == 1
+    assert renderer.render(ERD) == PNG                                  # pas memorise comme echec
+    assert renderer.stats["failures"] == 0 and renderer.stats["fallback_renders"] == 1
+
+    renderer.worker_cmd = cmd                                           # node installe entre-temps
+    assert renderer.render("graph TD\n    a --> b") is None               # pool en attente, mmdc epuise
+    time.sleep(0.25)
+    assert renderer.render("graph TD\n    a --> b") == PNG
+    assert len(lines("start")) == 1 and renderer.stats["renders"] == 1
+    renderer.shutdown()
+
+
+def test_sds_markdown_renders_each_diagram_once(tmp_path, worker, monkeypatch):
+    docx = pytest.importorskip("docx")
+    from app.services import markdown_to_docx
+
+    cmd, lines = worker
+    renderer = MermaidRenderer(cache_dir=tmp_path / "cache", workers=3, worker_cmd=cmd)
+    monkeypatch.setattr(markdown_to_docx, "get_mermaid_renderer", lambda: renderer)
+    markdown = "\n\n".join(f"## Diagramme {i}\n\n```mermaid\ngraph TD\n    N{i} --> M\n```" for i in range(4))
+
+    for version in ("1.0", "1.1"):
+        output = markdown_to_docx.convert_markdown_to_docx(markdown, str(tmp_path / f"SDS_{version}.docx"),
+                                                           version=version)
+        assert len(docx.Document(output).inline_shapes) == 4
+    assert len(lines("render")) == 4 and renderer.stats["cache_hits"] == 4 + 8
+    renderer.shutdown()
+    assert mr.extract_mermaid_blocks(markdown)[3] == "graph TD\n    N3 --> M"
@@ -0,0 +1,147 @@
+"""Tests META-FETCH — pagination, catégories concurrentes et fichiers raw en flux (session HTTP mockée, aucun appel réseau)."""
+import json
+import threading
+import time
+import types
+
+from app.services.salesforce import metadata_fetcher as mf
+from app.services.salesforce.metadata_fetcher import MetadataFetcher, SalesforceCredentials
+
+INSTANCE = "https://acme.my.salesforce.com"
+
+
+def _response(payload, status=200, headers=None):
+    return types.SimpleNamespace(
+        status_code=status, json=lambda: payload, text=json.dumps(payload), headers=headers or {},
+    )
+
+
+class _FakeSession:
+    """Sert chaque SOQL en pages de ``page`` enregistrements via nextRecordsUrl."""
+
+    def __init__(self, sizes, page=3, delay=0.0, fail=()):
+        self.sizes, self.page, self.delay, self.fail = sizes, page, delay, fail
+        self.calls, self.active, self.peak = [], 0, 0
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        with self.lock:
+            self.calls.append(url)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if params:
+                sobject, offset = params["q"].split("FROM")[1].split()[0], 0
+            else:
+                sobject, offset = url.rsplit("/", 1)[1].split("-")
+                offset = int(offset)
+            if sobject in self.fail:
+                return _response([{"errorCode": "INVALID_TYPE"}], status=400)
+            total = self.sizes.get(sobject, 0)
+            end = min(offset + self.page, total)
+            records = [{"Id": f"{sobject}{i}", "Body": "b" * 600} for i in range(offset, end)]
+            payload = {"done": end >= total, "records": records}
+            if end < total:
+                payload["nextRecordsUrl"] = f"/services/data/v65.0/tooling/query/{sobject}-{end}"
+            return _response(payload, headers={"Sforce-Limit-Info": "api-usage=42/15000"})
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def close(self):
+        pass
+
+
+def _fetcher(session, **kwargs):
+    fetcher = MetadataFetcher(org_alias="test", **kwargs)
+    fetcher.use_credentials(SalesforceCredentials(access_token="t", instance_url=INSTANCE, org_id="00D1"))
+    fetcher.session = session
+    return fetcher
+
+
+def test_query_follows_next_records_url_until_done():
+    session = _FakeSession({"CustomField": 8})
+    result = _fetcher(session).fetch_custom_fields()
+
+    assert result.success and result.records_count == 8
+    assert [r["Id"] for r in result.data] == [f"CustomField{i}" for i in range(8)]
+    assert len(session.calls) == 3
+    assert session.calls[1] == f"{INSTANCE}/services/data/v65.0/tooling/query/CustomField-3"
+
+
+def test_bodies_truncated_on_every_page():
+    result = _fetcher(_FakeSession({"ApexClass": 5})).fetch_apex_classes()
+    assert all("Body" not in r and r["BodyLength"] == 600 for r in result.data)
+    assert len(result.data[4]["BodyPreview"]) == mf.BODY_PREVIEW_CHARS + 3
+
+
+def test_fetch_all_streams_raw_files_with_bounded_concurrency(tmp_path):
+    sizes = {"CustomField": 10, "ApexClass": 4, "Profile": 2}
+    session = _FakeSession(sizes, delay=0.02, fail=("ConnectedApplication",))
+    summary = _fetcher(session, max_concurrency=3).fetch_all_metadata(str(tmp_path))
+
+    assert summary["success"]
+    assert list(summary["metadata_counts"]) == [n for n in MetadataFetcher.CATEGORIES if n != "connected_apps"]
+    assert summary["metadata_counts"]["custom_fields"] == 10
+    assert summary["errors"] == [{"component": "connected_apps", "error": summary["errors"][0]["error"]}]
+    assert summary["api_usage"] == "api-usage=42/15000"
+    assert 1 < session.peak <= 3
+
+    raw = tmp_path / "raw"
+    fields = json.loads((raw / "custom_fields.json").read_text())
+    assert [r["Id"] for r in fields] == [f"CustomField{i}" for i in range(10)]
+    assert json.loads((raw / "flows.json").read_text()) == []
+    # Categorie en erreur : ni fichier ni .part residuel.
+    assert not (raw / "connected_apps.json").exists()
+    assert not list(raw.glob("*.part"))
+    assert json.loads((tmp_path / "extraction_log.json").read_text())["org_id"] == "00D1"
+
+
+def test_rate_limited_request_is_retried(monkeypatch):
+    monkeypatch.setattr(mf.time, "sleep", lambda s: None)
+    session = _FakeSession({"Profile": 2})
+    real_get, attempts = session.get, []
+
+    def flaky_get(url, params=None, timeout=None):
+        attempts.append(url)
+        if len(attempts) == 1:
+            return _response([{"errorCode": "REQUEST_LIMIT_EXCEEDED"}], status=429, headers={"Retry-After": "1"})
+        return real_get(url, params=params, timeout=timeout)
+
+    session.get = flaky_get
+    result = _fetcher(session).fetch_profiles()
+    assert result.success and result.records_count == 2
+    assert len(attempts) == 2
+
+
+def test_rejected_token_is_refreshed_once_for_all_threads(monkeypatch):
+    session = _FakeSession({"Profile": 2}, delay=0.05)
+    session.headers = {"Authorization": "Bearer t"}
+    real_get, refreshes = session.get, []
+
+    def guarded_get(url, params=None, timeout=None):
+        if session.headers["Authorization"] != "Bearer fresh":
+            return _response([{"errorCode": "INVALID_SESSION_ID"}], status=401)
+        return real_get(url, params=params, timeout=timeout)
+
+    def refresh_org_sync(org):
+        refreshes.append(org)
+        return {"accessToken": "fresh", "instanceUrl": INSTANCE, "id": "00D1"}, None
+
+    session.get = guarded_get
+    monkeypatch.setattr(mf.get_command_executor(), "refresh_org_sync", refresh_org_sync)
+    fetcher = _fetcher(session)
+    threads = [threading.Thread(target=fetcher.fetch_profiles) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert refreshes == ["test"] and fetcher.credentials.access_token == "fresh"
+    assert fetcher.fetch_profiles().records_count == 2
+
+    monkeypatch.setattr(mf.get_command_executor(), "refresh_org_sync", lambda org: (None, "No authorization"))
+    session.headers["Authorization"] = "Bearer revoked"
+    fetcher.credentials.access_token = "revoked"
+    result = fetcher.fetch_profiles()
+    assert not result.success and "401" in result.error
@@ -0,0 +1,68 @@
+"""Tests META-SCAN — scanner mono-passe, index des classes de test et chargement JSON en flux (fichiers temporaires, aucun appel réseau)."""
+import json
+import random
+
+from app.services.salesforce import metadata_preprocessor as mp
+from app.services.salesforce.metadata_preprocessor import MetadataPreprocessor, iter_json_array, scan_apex_body
+
+_PARTS = ["for", "FOR", " ", "(", ")", "{", "}", "[SELECT", "[select", "insert ", "UPDATE\n", "delete",
+          "'", '"', "a", "0" * 15, "A" * 18, "\n", "@IsTest", "ſelect"]
+
+
+def _write(raw, name, records):
+    raw.mkdir(exist_ok=True)
+    (raw / f"{name}.json").write_text(json.dumps(records, indent=2))
+
+
+def test_single_pass_scan_matches_reference_patterns():
+    rnd = random.Random(42)
+    for _ in range(3000):
+        body = "".join(rnd.choice(_PARTS) for _ in range(rnd.randint(0, 30)))
+        assert scan_apex_body(body) == {
+            "is_test": "@istest" in body.lower(),
+            "soql_in_loop": bool(MetadataPreprocessor.SOQL_IN_LOOP_PATTERN.search(body)),
+            "dml_in_loop": bool(MetadataPreprocessor.DML_IN_LOOP_PATTERN.search(body)),
+            "hardcoded_ids": len(MetadataPreprocessor.HARDCODED_ID_PATTERN.findall(body)),
+        }, body
+
+
+def test_missing_test_lookup_accepts_naming_variations(tmp_path):
+    raw = tmp_path / "raw"
+    _write(raw, "apex_classes", [
+        {"Name": name, "ApiVersion": 65.0, "BodyPreview": "@isTest class X {}" if "Test" in name else "class X {}"}
+        for name in ["A", "ATest", "B", "B_Test", "C", "TestC", "D"]
+    ])
+    summary = MetadataPreprocessor(str(raw)).generate_summary()
+    missing = [f["component"] for f in summary["red_flags"]["items"] if f["type"] == "NO_TEST_CLASS"]
+    assert missing == ["D"]
+
+
+def test_streamed_loading_handles_chunk_boundaries(tmp_path):
+    records = [{"attributes": {"type": "Flow"}, "Id": f"300{i}", "ApiName": f"F{i}",
+                "Description": "] , { \" \\u00e9 " * (i % 5)} for i in range(200)]
+    path = tmp_path / "flows.json"
+    path.write_text(json.dumps(records, indent=2))
+    assert list(iter_json_array(path, chunk_size=7)) == records
+    (tmp_path / "empty.json").write_text("[]\n")
+    assert list(iter_json_array(tmp_path / "empty.json", chunk_size=1)) == []
+
+    preprocessor = MetadataPreprocessor(str(tmp_path))
+    (tmp_path / "notes.json").write_text('{"k": 1}')
+    assert preprocessor.load_raw_data()
+    assert "attributes" not in preprocessor.raw_data["flows"][0]
+    assert preprocessor.raw_data["notes"] == {"k": 1}
+
+
+def test_process_pool_scan_gives_identical_summary(tmp_path, monkeypatch):
+    raw = tmp_path / "raw"
+    body = "for (Account a : accts) { update a; } String s = '001000000000001';"
+    _write(raw, "apex_classes", [{"Name": f"S{i}", "ApiVersion": 40.0 + i, "BodyPreview": body * (i % 3)}
+                                 for i in range(30)])
+    monkeypatch.setattr(mp, "PARALLEL_MIN_CLASSES", 1)
+
+    single = MetadataPreprocessor(str(raw), workers=1).generate_summary()
+    pooled = MetadataPreprocessor(str(raw), workers=2).generate_summary()
+    for summary in (single, pooled):
+        summary["metadata_analysis"].pop("generated_at")
+    assert pooled == single
+    assert single["red_flags"]["by_severity"]["CRITICAL"] == 20
@@ -0,0 +1,162 @@
+"""Tests AS-IS-SNAP — snapshots incrémentaux de métadonnées, verrou par org et résumé Marcus (org Salesforce mockée, aucun appel réseau)."""
+import json
+import re
+import threading
+import time
+import types
+
+from app.services import pm_orchestrator_service_v2 as orch
+from app.services.salesforce import marcus_as_is_v2
+from app.services.salesforce.metadata_fetcher import MetadataFetcher, SalesforceCredentials
+from app.services.salesforce.metadata_preprocessor import MetadataPreprocessor
+from app.services.salesforce.metadata_snapshot import MetadataSnapshotStore, _parse_sf_datetime
+
+OLD, NEW = "2026-10-01T10:00:00.000+0000", "2026-10-15T09:30:00.000+0000"
+SOQL_LOOP = "for (Account a : accounts) { List<Contact> c = [SELECT Id FROM Contact]; }"
+
+
+class _FakeOrg:
+    """Interprète le strict nécessaire du SOQL : FROM, filtre de watermark, COUNT(), SELECT Id."""
+
+    def __init__(self, records):
+        self.records = records
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        soql = params["q"]
+        with self.lock:
+            self.queries.append(soql)
+        sobject = re.search(r"FROM (\w+)", soql).group(1)
+        rows = self.records.get(sobject, [])
+        since = re.search(r"(?:LastModifiedDate|SystemModstamp) > (\S+)", soql)
+        if since:
+            limit = _parse_sf_datetime(since.group(1))
+            rows = [r for r in rows if _parse_sf_datetime(r.get("SystemModstamp") or r["LastModifiedDate"]) > limit]
+        if "COUNT()" in soql:
+            payload = {"totalSize": len(rows), "done": True, "records": []}
+        elif soql.startswith("SELECT Id FROM"):
+            payload = {"done": True, "records": [{"Id": r["Id"]} for r in rows]}
+        else:
+            payload = {"done": True, "records": [dict(r) for r in rows]}
+        return types.SimpleNamespace(status_code=200, json=lambda: payload, text="", headers={})
+
+    def close(self):
+        pass
+
+
+def _org():
+    return _FakeOrg({
+        "CustomObject": [{"Id": "01I1", "DeveloperName": "Formation", "LastModifiedDate": OLD},
+                         {"Id": "01I2", "DeveloperName": "Session", "Description": "x", "LastModifiedDate": OLD}],
+        "CustomField": [{"Id": f"00N{i}", "DeveloperName": f"F{i}", "TableEnumOrId": "01I1", "LastModifiedDate": OLD}
+                        for i in range(3)],
+        "ApexClass": [{"Id": "01p1", "Name": "AccountService", "ApiVersion": 45.0, "Body": SOQL_LOOP, "SystemModstamp": OLD},
+                      {"Id": "01p2", "Name": "AccountServiceTest", "ApiVersion": 62.0, "Body": "@isTest class", "SystemModstamp": OLD},
+                      {"Id": "01p3", "Name": "Utils", "ApiVersion": 62.0, "Body": "'001000000000001'", "SystemModstamp": OLD}],
+        "ApexTrigger": [{"Id": "01q1", "Name": "AccountTrigger", "TableEnumOrId": "Account",
+                         "Body": "trigger AccountTrigger on Account (before insert) {}", "SystemModstamp": OLD}],
+        "Profile": [{"Id": "00e1", "Name": "Admin", "UserType": "Standard", "SystemModstamp": OLD}],
+    })
+
+
+def _fetcher(org):
+    fetcher = MetadataFetcher(org_alias="test", max_concurrency=3)
+    fetcher.use_credentials(SalesforceCredentials(access_token="t", instance_url="https://acme", org_id="00D1"))
+    fetcher.session = org
+    return fetcher
+
+
+def _analyze(store):
+    summary = MetadataPreprocessor(str(store.raw_path)).generate_summary()
+    summary["metadata_analysis"].pop("generated_at")
+    return summary
+
+
+def test_incremental_refresh_matches_full_run(tmp_path):
+    org = _org()
+    store = MetadataSnapshotStore("00D1", root=tmp_path / "a")
+    store.refresh(_fetcher(org))
+    _analyze(store)
+
+    org.records["ApexClass"][2].update(Body="public class Utils {}", SystemModstamp=NEW)
+    org.records["ApexClass"].append({"Id": "01p4", "Name": "Billing", "ApiVersion": 62.0,
+                                     "Body": SOQL_LOOP, "SystemModstamp": NEW})
+    del org.records["CustomField"][1]
+
+    result = store.refresh(_fetcher(org))
+    assert result["snapshot"]["apex_classes"] == {"mode": "incremental", "changed": 2, "deleted": 0}
+    assert result["snapshot"]["custom_fields"] == {"mode": "incremental", "changed": 0, "deleted": 1}
+    assert result["metadata_counts"]["custom_fields"] == 2
+    incremental = _analyze(store)
+
+    full_store = MetadataSnapshotStore("00D1", root=tmp_path / "b")
+    full_store.refresh(_fetcher(org))
+    for raw in full_store.raw_path.glob("*.json"):
+        assert json.loads((store.raw_path / raw.name).read_text()) == json.loads(raw.read_text())
+    assert incremental == _analyze(full_store)
+    assert not any(f["component"] == "Utils" and f["type"] == "HARDCODED_ID" for f in incremental["red_flags"]["items"])
+
+
+def test_unchanged_org_skips_id_scan_and_analysis(tmp_path):
+    org = _org()
+    store = MetadataSnapshotStore("00D1", root=tmp_path)
+    store.refresh(_fetcher(org))
+    first = _analyze(store)
+    state = json.loads((store.path / "state.json").read_text())
+    assert state["categories"]["apex_classes"]["watermark"] == OLD
+
+    org.queries.clear()
+    result = store.refresh(_fetcher(org))
+    again = _analyze(store)
+
+    assert not any(q.startswith("SELECT Id FROM") for q in org.queries)
+    apex_query = next(q for q in org.queries if "FROM ApexClass" in q and "COUNT()" not in q)
+    assert "SystemModstamp > 2026-10-01T09:55:00Z" in apex_query     # watermark - recouvrement
+    assert result["snapshot"]["apex_classes"] == {"mode": "incremental", "changed": 0, "deleted": 0}
+    assert again == first
+
+
+def test_concurrent_runs_on_one_org_refresh_one_at_a_time(tmp_path, monkeypatch):
+    org, active, overlaps = _org(), [], []
+    refresh = MetadataSnapshotStore.refresh
+
+    def slow_refresh(store, fetcher):
+        active.append(store.org_id)
+        overlaps.append(len(active))
+        time.sleep(0.05)
+        try:
+            return refresh(store, fetcher)
+        finally:
+            active.remove(store.org_id)
+
+    def fetcher(alias):
+        f = _fetcher(org)
+        f.authenticate = lambda: True
+        return f
+
+    monkeypatch.setattr(marcus_as_is_v2, "MetadataFetcher", fetcher)
+    monkeypatch.setattr(marcus_as_is_v2, "MetadataSnapshotStore",
+                        lambda org_id: MetadataSnapshotStore(org_id, root=tmp_path / "snapshots"))
+    monkeypatch.setattr(MetadataSnapshotStore, "refresh", slow_refresh)
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(marcus_as_is_v2.fetch_and_preprocess_metadata(
+        "test", output_dir=str(tmp_path / f"out{i}")))) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert overlaps == [1, 1, 1]
+    assert all(r["success"] for r in results)
+    assert sorted(r["snapshot"]["apex_classes"]["mode"] for r in results) == ["full", "incremental", "incremental"]
+
+
+def test_marcus_summary_carries_condensed_red_flags(tmp_path):
+    store = MetadataSnapshotStore("00D1", root=tmp_path)
+    store.refresh(_fetcher(_org()))
+    summary = orch.PMOrchestratorServiceV2._create_metadata_summary(None, {"as_is_analysis": _analyze(store)})
+    assert summary["red_flags"]["total_count"] >= 2
+    assert {f["type"] for f in summary["red_flags"]["critical_and_high"]} >= {"SOQL_IN_LOOP", "HARDCODED_ID"}
+    assert "technical_debt_score" in summary
+    assert "red_flags" not in orch.PMOrchestratorServiceV2._create_metadata_summary(None, {})
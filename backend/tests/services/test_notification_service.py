@@ -0,0 +1,140 @@
+"""Tests NOTIF-MUX — NotificationService (connexion LISTEN partagée, asyncpg mocké)."""
+import asyncio
+import json
+
+from app.services import notification_service as ns
+
+
+# --- Fakes -----------------------------------------------------------------
+class _FakeConn:
+    def __init__(self):
+        self.listening = {}
+        self.closed = False
+        self.termination_listeners = []
+        self.listen_calls = 0
+        self.unlisten_calls = 0
+
+    async def add_listener(self, channel, callback):
+        self.listen_calls += 1
+        self.listening[channel] = callback
+
+    async def remove_listener(self, channel, callback):
+        self.unlisten_calls += 1
+        self.listening.pop(channel, None)
+
+    def add_termination_listener(self, callback):
+        self.termination_listeners.append(callback)
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+    def fire(self, channel, payload):
+        self.listening[channel](self, 1, channel, json.dumps(payload))
+
+    def drop(self):
+        self.closed = True
+        for cb in self.termination_listeners:
+            cb(self)
+
+
+def _service(monkeypatch, queue_size=ns.SUBSCRIBER_QUEUE_SIZE):
+    conns = []
+
+    async def fake_connect(dsn):
+        conn = _FakeConn()
+        conns.append(conn)
+        return conn
+
+    monkeypatch.setattr(ns.asyncpg, "connect", fake_connect)
+    service = ns.NotificationService(queue_size=queue_size)
+    service._pool = object()  # NOTIFY pool non utilisé ici
+    service._running = True
+    return service, conns
+
+
+# --- Fan-out ---------------------------------------------------------------
+def test_many_subscribers_share_one_connection(monkeypatch):
+    async def scenario():
+        service, conns = _service(monkeypatch)
+        async with service.subscribe("execution_1") as q1, \
+                service.subscribe("execution_1") as q2, \
+                service.subscribe("execution_2") as q3:
+            assert len(conns) == 1
+            assert set(conns[0].listening) == {"execution_1", "execution_2"}
+            conns[0].fire("execution_1", {"event": "progress", "progress": 10})
+            assert q1.get_nowait()["progress"] == 10
+            assert q2.get_nowait()["progress"] == 10
+            assert q3.empty()
+            assert service.get_stats()["subscribers"] == 3
+
+    asyncio.run(scenario())
+
+
+def test_listen_unlisten_are_reference_counted(monkeypatch):
+    async def scenario():
+        service, conns = _service(monkeypatch)
+        async with service.subscribe("execution_1"):
+            async with service.subscribe("execution_1"):
+                pass
+            # un abonné reste → pas d'UNLISTEN
+            assert "execution_1" in conns[0].listening
+            assert conns[0].unlisten_calls == 0
+        assert conns[0].listening == {}
+        assert conns[0].listen_calls == 1
+        assert conns[0].unlisten_calls == 1
+        assert service.get_stats()["channels"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_bounded_queue_drops_oldest(monkeypatch):
+    async def scenario():
+        service, conns = _service(monkeypatch, queue_size=2)
+        async with service.subscribe("execution_1") as q:
+            for i in range(5):
+                conns[0].fire("execution_1", {"progress": i})
+            assert [q.get_nowait()["progress"], q.get_nowait()["progress"]] == [3, 4]
+            assert service.get_stats()["dropped"] == 3
+
+    asyncio.run(scenario())
+
+
+def test_invalid_json_is_ignored(monkeypatch):
+    async def scenario():
+        service, conns = _service(monkeypatch)
+        async with service.subscribe("execution_1") as q:
+            conns[0].listening["execution_1"](conns[0], 1, "execution_1", "not-json")
+            assert q.empty()
+
+    asyncio.run(scenario())
+
+
+# --- Reconnexion -----------------------------------------------------------
+def test_reconnect_resubscribes_active_channels(monkeypatch):
+    async def scenario():
+        service, conns = _service(monkeypatch)
+        async with service.subscribe("execution_1") as q1, service.subscribe("build_7"):
+            conns[0].drop()
+            await service._listen_task
+            assert len(conns) == 2
+            assert set(conns[1].listening) == {"execution_1", "build_7"}
+            conns[1].fire("execution_1", {"event": "completed"})
+            assert q1.get_nowait()["event"] == "completed"
+            assert service.get_stats()["reconnects"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_no_reconnect_after_close(monkeypatch):
+    async def scenario():
+        service, conns = _service(monkeypatch)
+        async with service.subscribe("execution_1"):
+            service._running = False
+            conns[0].drop()
+            assert service._listen_task is None
+        assert len(conns) == 1
+
+    asyncio.run(scenario())
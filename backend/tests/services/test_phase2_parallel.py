@@ -0,0 +1,106 @@
+"""Tests PHASE2-PAR — génération des UCs Olivia par batches concurrents (agent mocké)."""
+import asyncio
+
+import pytest
+
+from app.services import pm_orchestrator_service_v2 as orch
+
+
+class _FakeOrchestrator:
+    """Stubs for the DB-touching helpers used by _run_phase2_batches."""
+
+    def __init__(self, fail_first=(), rate_limited=(), done_brs=()):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+        self.saved = []
+        self.checkpoints = []
+        self.progress = []
+        self._fail_first = set(fail_first)
+        self._rate_limited = set(rate_limited)
+        self._done_brs = set(done_brs)
+
+    async def _run_agent(self, agent_id, input_data, execution_id, project_id, mode=None):
+        brs = input_data.get("business_requirements") or [input_data["business_requirement"]]
+        first = brs[0]["id"]
+        self.calls.append(first)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        # Les batches impairs finissent plus tard → ordre de complétion ≠ ordre des BRs
+        await asyncio.sleep(0.02 if int(first[3:]) % 4 == 1 else 0.005)
+        self.in_flight -= 1
+        if first in self._rate_limited:
+            self._rate_limited.discard(first)
+            return {"success": False, "error": "Error code: 429 rate limit"}
+        if first in self._fail_first:
+            self._fail_first.discard(first)
+            return {"success": False, "error": "Timeout (10 min)"}
+        return {"success": True, "output": {"metadata": {"tokens_used": 100, "model": "m"}, "content": {}}}
+
+    def _save_use_cases_from_result(self, execution_id, br_id, ba_result, **kwargs):
+        self.saved.append(br_id)
+        return 3
+
+    def _accumulate_cost(self, execution, tokens, model):
+        pass
+
+    def _update_progress(self, execution, agent_id, state, progress, message):
+        self.progress.append(progress)
+
+    def _save_checkpoint(self, execution, phase):
+        self.checkpoints.append(phase)
+
+    def _get_brs_with_use_cases(self, execution_id):
+        return set(self._done_brs)
+
+    _run_phase2_batches = orch.PMOrchestratorServiceV2._run_phase2_batches
+
+
+def _brs(n):
+    return [{"id": f"BR-{i:03d}", "title": f"BR {i}"} for i in range(1, n + 1)]
+
+
+@pytest.fixture(autouse=True)
+def _fast_backoff(monkeypatch):
+    monkeypatch.setattr(orch, "PHASE2_RATE_LIMIT_BACKOFF", 0.01)
+
+
+def test_batches_run_concurrently_within_limit(monkeypatch):
+    monkeypatch.setattr(orch, "PHASE2_MAX_CONCURRENCY", 3)
+    fake = _FakeOrchestrator()
+    tokens, saved = asyncio.run(fake._run_phase2_batches(None, 1, 1, _brs(20)))
+    assert fake.max_in_flight == 3
+    assert len(fake.calls) == 10
+    assert (tokens, saved) == (1000, 30)
+    assert fake.progress == sorted(fake.progress)
+    assert fake.progress[-1] == 45
+    assert fake.checkpoints.count("phase2_ba_partial") == 10
+
+
+def test_concurrency_one_is_sequential(monkeypatch):
+    monkeypatch.setattr(orch, "PHASE2_MAX_CONCURRENCY", 1)
+    fake = _FakeOrchestrator()
+    asyncio.run(fake._run_phase2_batches(None, 1, 1, _brs(6)))
+    assert fake.max_in_flight == 1
+    assert fake.calls == ["BR-001", "BR-003", "BR-005"]
+
+
+def test_failed_and_rate_limited_batches_are_retried():
+    fake = _FakeOrchestrator(fail_first={"BR-003"}, rate_limited={"BR-005"})
+    tokens, saved = asyncio.run(fake._run_phase2_batches(None, 1, 1, _brs(6)))
+    assert fake.calls.count("BR-003") == 2
+    assert fake.calls.count("BR-005") == 2
+    assert saved == 9
+
+
+def test_resume_skips_batches_with_saved_ucs():
+    fake = _FakeOrchestrator(done_brs={"BR-001", "BR-002", "BR-003"})
+    asyncio.run(fake._run_phase2_batches(None, 1, 1, _brs(6)))
+    # BR-003/BR-004 : batch incomplet (BR-004 sans UC) → régénéré
+    assert sorted(fake.calls) == ["BR-003", "BR-005"]
+
+
+def test_rate_limit_error_detection():
+    assert orch._is_rate_limit_error("Error code: 429 - rate_limit_error")
+    assert orch._is_rate_limit_error("Overloaded")
+    assert not orch._is_rate_limit_error("Timeout (10 min)")
@@ -186,6 +186,26 @@ class TestPhaseAggregator:
             validation = self.aggregator.validate_aggregated_output(1, aggregated)
             assert not validation.get("valid", True) or validation.get("warnings")
 
+    # ═══════════════════════════════════════════════════════════════
+    # Tests provenance (RETRY-INC)
+    # ═══════════════════════════════════════════════════════════════
+
+    def test_build_provenance_maps_files_and_names_to_batches(self):
+        """Chaque fichier / nom de l'agrégat est rattaché au premier lot qui l'a produit"""
+        batch_results = [
+            {"files": {"classes/AccountService.cls": "public class AccountService {}"}},
+            None,
+            {"files": {"force-app/main/default/classes/AccountService.cls": "dup",
+                       "lwc/accountCard/accountCard.js": "export default class AccountCard {}"}},
+        ]
+
+        provenance = self.aggregator.build_provenance(2, batch_results)
+
+        assert provenance["files"]["force-app/main/default/classes/AccountService.cls"] == 0
+        assert provenance["files"]["force-app/main/default/lwc/accountCard/accountCard.js"] == 2
+        assert provenance["names"]["AccountService"] == 0
+        assert provenance["names"]["accountCard"] == 2
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -297,6 +297,72 @@ public class FormationService {
         assert restored.generated_objects == self.registry.generated_objects
         assert restored.generated_classes.keys() == self.registry.generated_classes.keys()
 
+    
+    # ═══════════════════════════════════════════════════════════════
+    # Tests CTX-INC (caches de rendu, sélection par pertinence)
+    # ═══════════════════════════════════════════════════════════════
+    
+    def _data_model(self, count=40):
+        for i in range(count):
+            self.registry.register_batch_output(1, {"operations": [
+                {"type": "create_object", "api_name": f"Obj{i}__c"},
+                {"type": "create_field", "object": f"Obj{i}__c", "api_name": f"Code{i}__c"},
+                {"type": "create_field", "object": f"Obj{i}__c", "api_name": "Status__c"},
+            ]})
+    
+    def test_render_cache_invalidated_only_by_its_section(self):
+        self._data_model(3)
+        model = self.registry.get_full_data_model()
+        assert self.registry.get_full_data_model() is model
+        
+        self.registry.register_batch_output(2, {"files": {"classes/Svc.cls": "public class Svc {}"}})
+        assert self.registry.get_full_data_model() is model
+        
+        self.registry.register_batch_output(1, {"operations": [
+            {"type": "create_field", "object": "Obj1__c", "api_name": "Extra__c"}]})
+        assert "Extra__c" in self.registry.get_full_data_model()
+        
+        self.registry.generated_fields = {"Obj0__c": ["Only__c"]}      # reaffectation directe
+        assert "Only__c" in self.registry.get_full_data_model()
+        assert "Code0__c" not in self.registry.get_full_data_model()
+    
+    def test_batch_context_details_only_referenced_entries(self):
+        self._data_model(40)
+        self.registry.register_batch_output(2, {"files": {
+            f"classes/Svc{i}.cls": f"public class Svc{i} {{ public void run{i}() {{}} }}" for i in range(5)}})
+        tasks = [{"name": "Svc7Card", "description": "Affiche Obj7 (Status__c) via Svc3.run3"}]
+        
+        full = self.registry.get_context_for_batch(3)
+        selected = self.registry.get_context_for_batch(3, tasks=tasks)
+        
+        assert "**Champs:** Code7__c, Status__c" in selected
+        assert "### Svc3" in selected and "run3()" in selected
+        assert "### Obj8__c" not in selected and "Obj8__c" in selected      # nomme, non detaille
+        assert "### Svc4" not in selected
+        assert len(selected) < len(full) / 2
+        
+        tight = self.registry.get_context_for_batch(3, tasks=tasks, token_budget=30)
+        assert "### Obj7__c" not in tight and "(+" in tight
+        
+        self.registry.reset_phase(2)
+        assert "Svc3" not in self.registry.get_context_for_batch(3, tasks=tasks)
+        # Lot sans reference connue : tout le contexte, dans la limite du budget
+        assert self.registry.get_context_for_batch(2, tasks=[{"name": "Misc"}]) == self.registry.get_context_for_batch(2)
+
+    
+    def test_each_detailed_section_keeps_its_share_of_the_budget(self):
+        self._data_model(40)
+        self.registry.register_batch_output(2, {"files": {
+            f"classes/Svc{i}.cls": f"public class Svc{i} {{ public void run{i}() {{}} }}" for i in range(5)}})
+        tasks = [{"name": "Bulk", "description": " ".join(f"Obj{i}__c" for i in range(40)) + " via Svc3.run3"}]
+        
+        context = self.registry.get_context_for_batch(3, tasks=tasks, token_budget=300)
+        assert "### Obj0__c" in context and "### Obj39__c" not in context     # objets bornes a leur part
+        assert "### Svc3" in context and "run3()" in context                  # la classe citee reste detaillee
+        assert "UTILISEZ UNIQUEMENT ces objets et champs" not in context
+        assert "leurs champs ne sont pas listés" in context
+        assert "UTILISEZ UNIQUEMENT ces objets et champs" in self.registry.get_context_for_batch(3)
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,103 @@
+"""Tests BATCH-DAG — génération des lots d'une phase par graphe de dépendances (agents mockés, aucun appel LLM)."""
+import asyncio
+import types
+
+from app.services.phased_build_executor import PhasedBuildExecutor
+
+
+def _executor(concurrency=4):
+    progress = []
+    db = types.SimpleNamespace(
+        execute=lambda query, params: progress.append((params["done"], params["total"])),
+        commit=lambda: None,
+    )
+    return PhasedBuildExecutor(project_id=1, execution_id=99, db=db, batch_concurrency=concurrency), progress
+
+
+def _object_task(obj, description="", **extra):
+    return {"task_type": "create_object", "target_object": obj, "description": description, **extra}
+
+
+def test_dependencies_from_lookups_and_wbs_ids():
+    executor, _ = _executor()
+    batches = [
+        [_object_task("Formation__c")],
+        [_object_task("Session__c", "Lookup vers Formation__c")],
+        [_object_task("Inscription__c", id="TASK-3", dependencies=["TASK-1"])],
+        [_object_task("Salle__c", id="TASK-1")],
+    ]
+    deps = executor._build_batch_dependencies(batches)
+    assert deps == {0: set(), 1: {0}, 2: {3}, 3: set()}
+
+
+def test_dependency_cycle_is_broken_in_batch_order():
+    executor, _ = _executor()
+    batches = [
+        [_object_task("A__c", "Lookup vers B__c")],
+        [_object_task("B__c", "Master-detail vers A__c")],
+    ]
+    deps = executor._build_batch_dependencies(batches)
+    assert deps == {0: set(), 1: {0}}
+
+
+def test_independent_batches_run_concurrently_and_dependents_wait():
+    executor, progress = _executor(concurrency=2)
+    tasks = [
+        _object_task("Formation__c"),
+        _object_task("Salle__c"),
+        _object_task("Session__c", "Lookup vers Formation__c et Salle__c"),
+        _object_task("Badge__c"),
+    ]
+    running, peak, order, contexts = set(), [0], [], {}
+
+    async def fake_generate(agent, batch_tasks, phase, context, retry_feedback=""):
+        obj = batch_tasks[0]["target_object"]
+        contexts[obj] = context
+        running.add(obj)
+        peak[0] = max(peak[0], len(running))
+        await asyncio.sleep(0.02)
+        running.discard(obj)
+        order.append(obj)
+        return {"operations": [{"type": "create_object", "api_name": obj}]}
+
+    executor._generate_single_batch = fake_generate
+    batches = asyncio.run(executor.generate_phase_batches("raj", tasks, phase=1))
+
+    assert [b["operations"][0]["api_name"] for b in batches] == ["Formation__c", "Salle__c", "Session__c", "Badge__c"]
+    assert peak[0] == 2
+    assert order.index("Session__c") > max(order.index("Formation__c"), order.index("Salle__c"))
+    assert "Formation__c" in contexts["Session__c"] and "Salle__c" in contexts["Session__c"]
+    assert progress[0] == (0, 4)
+    assert [done for done, _ in progress[1:]] == [1, 2, 3, 4]
+
+
+def test_failed_batch_does_not_block_dependents():
+    executor, progress = _executor()
+    tasks = [_object_task("Formation__c"), _object_task("Session__c", "Lookup vers Formation__c")]
+
+    async def fake_generate(agent, batch_tasks, phase, context, retry_feedback=""):
+        obj = batch_tasks[0]["target_object"]
+        if obj == "Formation__c":
+            raise RuntimeError("LLM down")
+        return {"operations": [{"type": "create_object", "api_name": obj}]}
+
+    executor._generate_single_batch = fake_generate
+    batches = asyncio.run(executor.generate_phase_batches("raj", tasks, phase=1))
+    assert len(batches) == 1
+    assert progress[-1] == (1, 2)
+
+
+def test_concurrency_one_is_sequential():
+    executor, _ = _executor(concurrency=1)
+    running, peak = [0], [0]
+
+    async def fake_generate(agent, batch_tasks, phase, context, retry_feedback=""):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.005)
+        running[0] -= 1
+        return {"files": {}}
+
+    executor._generate_single_batch = fake_generate
+    asyncio.run(executor.generate_phase_batches("zara", [{"name": f"cmp{i}"} for i in range(5)], phase=3))
+    assert peak[0] == 1
@@ -0,0 +1,100 @@
+"""Tests BUILD-OFFLOAD — générateurs d'agents bloquants hors de la boucle asyncio (agents et LLM mockés, aucun appel réseau)."""
+import asyncio
+import threading
+import time
+import types
+
+import pytest
+
+import agents.roles.salesforce_developer_lwc as lwc_agent
+from app.services.llm_router_service import LLMRequest, LLMRouterService
+from app.services.phased_build_executor import PhasedBuildExecutor
+
+
+def _executor(execution_id):
+    db = types.SimpleNamespace(execute=lambda *a, **k: None, commit=lambda: None)
+    return PhasedBuildExecutor(project_id=1, execution_id=execution_id, db=db)
+
+
+def test_two_builds_progress_concurrently_in_one_loop(monkeypatch):
+    events = []
+    lock = threading.Lock()
+
+    def blocking_generate_build(task, architecture_context, execution_id, **kwargs):
+        with lock:
+            events.append(("start", execution_id))
+        time.sleep(0.3)   # appel LLM synchrone de plusieurs minutes, en miniature
+        with lock:
+            events.append(("end", execution_id))
+        return {"success": True, "content": {"files": {f"lwc/{task['name']}/x.js": ""}}}
+
+    monkeypatch.setattr(lwc_agent, "generate_build", blocking_generate_build)
+
+    async def worker():
+        ticks = 0
+        stop = asyncio.Event()
+
+        async def heartbeat():
+            nonlocal ticks
+            while not stop.is_set():
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        hb = asyncio.create_task(heartbeat())
+        t0 = time.monotonic()
+        builds = await asyncio.gather(
+            _executor(1).generate_phase_batches("zara", [{"name": "cmpA"}], phase=3),
+            _executor(2).generate_phase_batches("zara", [{"name": "cmpB"}], phase=3),
+        )
+        elapsed = time.monotonic() - t0
+        stop.set()
+        await hb
+        return builds, elapsed, ticks
+
+    builds, elapsed, ticks = asyncio.run(worker())
+    assert all(len(b) == 1 for b in builds)
+    # Les deux builds demarrent avant que l'un ou l'autre ne finisse.
+    assert [e[0] for e in events[:2]] == ["start", "start"]
+    assert elapsed < 0.55
+    # La boucle n'a pas ete gelee pendant les appels bloquants.
+    assert ticks >= 15
+
+
+def test_cancelling_build_cancels_inflight_llm_call():
+    router = LLMRouterService()
+    started, cancelled = threading.Event(), threading.Event()
+    after_cancel = []
+
+    async def slow_complete(request):
+        started.set()
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    router.complete = slow_complete
+
+    def agent_generate(**kwargs):
+        first = router.complete_sync(LLMRequest(prompt="x"))
+        after_cancel.append(router.complete_sync(LLMRequest(prompt="y")))   # doit echouer immediatement
+        return first
+
+    async def run():
+        executor = _executor(3)
+        task = asyncio.create_task(executor._run_agent(agent_generate))
+        await asyncio.to_thread(started.wait, 2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    try:
+        asyncio.run(run())
+        assert cancelled.wait(timeout=2)
+        deadline = time.monotonic() + 2
+        while not after_cancel and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert after_cancel and not after_cancel[0].success
+        assert after_cancel[0].error == "Cancelled"
+    finally:
+        router.shutdown()
@@ -0,0 +1,100 @@
+"""Tests PIPE-BUILD — génération de la phase N+1 pendant le déploiement de la phase N (agents, Elena et Jordan mockés)."""
+import asyncio
+import time
+import types
+
+from app.services.phased_build_executor import PhasedBuildExecutor
+
+WBS = [
+    {"task_type": "create_object", "target_object": "Formation__c", "id": "T1"},
+    {"task_type": "apex_class", "class_name": "FormationService", "id": "T2"},
+]
+
+
+def _executor(pipelined, deploy_ok=(1, 2)):
+    db = types.SimpleNamespace(execute=lambda *a, **k: types.SimpleNamespace(rowcount=0), commit=lambda: None)
+    executor = PhasedBuildExecutor(project_id=1, execution_id=5, db=db, pipelined=pipelined)
+    events = []
+
+    async def generate(agent, batch_tasks, phase, context, retry_feedback=""):
+        events.append(("gen_start", phase, time.perf_counter()))
+        await asyncio.sleep(0.05)
+        events.append(("gen_end", phase, time.perf_counter()))
+        if phase == 1:
+            return {"operations": [{"type": "create_object", "api_name": "Formation__c"}]}
+        return {"files": {"classes/FormationService.cls": "public class FormationService {}"}}
+
+    async def review(phase, aggregated):
+        return {"verdict": "PASS", "issues": []}
+
+    async def ok(*args, **kwargs):
+        return {"success": True, "branch_name": "b", "url": None}
+
+    async def deploy_phase(phase, aggregated, branch_name, pr_url=None, force=False):
+        events.append(("deploy_start", phase, time.perf_counter()))
+        await asyncio.sleep(0.1)
+        events.append(("deploy_end", phase, time.perf_counter()))
+        if phase in deploy_ok:
+            return {"success": True, "deployed_components": [f"phase{phase}"]}
+        return {"success": False, "error": "sfdx error"}
+
+    executor._generate_single_batch = generate
+    executor._elena_review = review
+    executor.jordan_service = types.SimpleNamespace(
+        create_phase_branch=ok, commit_files=ok, create_phase_pr=ok, deploy_phase=deploy_phase,
+        generate_final_package_xml=ok,
+    )
+    return executor, events
+
+
+def _at(events, kind, phase):
+    return next(t for k, p, t in events if k == kind and p == phase)
+
+
+def test_pipelined_overlaps_next_generation_with_deploy():
+    executor, events = _executor(pipelined=True)
+    result = asyncio.run(executor.execute_build([dict(t) for t in WBS]))
+
+    assert result["success"] and result["phases_completed"] == 2
+    assert _at(events, "gen_start", 2) < _at(events, "deploy_end", 1)
+    assert _at(events, "deploy_start", 2) >= _at(events, "deploy_end", 1)     # deploiements en serie
+    timings = result["timings"]
+    assert timings["mode"] == "pipelined"
+    assert set(timings["stages"]) == {"generate", "aggregate", "review", "deploy"}
+    assert timings["overlap_seconds"] > 0.03
+
+
+def test_sequential_mode_reports_stage_timings():
+    executor, events = _executor(pipelined=False)
+    result = asyncio.run(executor.execute_build([dict(t) for t in WBS]))
+
+    assert result["success"]
+    assert _at(events, "gen_start", 2) > _at(events, "deploy_end", 1)
+    assert result["timings"]["mode"] == "sequential"
+    assert result["timings"]["stages"]["deploy"] >= 0.2
+    assert result["phase_results"][1]["timings"]["generate"] >= 0.05
+
+
+def test_failed_deploy_rolls_back_next_phase():
+    executor, events = _executor(pipelined=True, deploy_ok=())
+    result = asyncio.run(executor.execute_build([dict(t) for t in WBS]))
+
+    assert not result["success"]
+    assert result["phases_failed"] == 1 and result["phases_completed"] == 0
+    assert result["rolled_back_phases"] == [2]
+    assert 2 not in result["phase_results"]
+    assert not any(k == "deploy_start" and p == 2 for k, p, _ in events)
+    # Le registre ne garde rien de la phase 2 generee sur une phase 1 non deployee.
+    assert executor.context_registry.generated_classes == {}
+    assert executor.context_registry.generated_objects == ["Formation__c"]
+
+
+def test_pipelined_mode_defaults_to_settings(monkeypatch):
+    from app.services import phased_build_executor as pbe
+
+    db = types.SimpleNamespace()
+    monkeypatch.setattr(pbe, "BUILD_PIPELINED", True)
+    assert PhasedBuildExecutor(1, 5, db).pipelined is True
+    assert PhasedBuildExecutor(1, 5, db, pipelined=False).pipelined is False
+    monkeypatch.setattr(pbe, "BUILD_PIPELINED", False)
+    assert PhasedBuildExecutor(1, 5, db).pipelined is False
@@ -0,0 +1,123 @@
+"""Tests RETRY-INC — retry de phase limité aux lots rejetés par la review (agents, Elena et Jordan mockés)."""
+import asyncio
+import types
+from collections import Counter
+
+from app.services.phased_build_executor import PhasedBuildExecutor
+
+
+def _executor():
+    db = types.SimpleNamespace(execute=lambda *a, **k: types.SimpleNamespace(rowcount=0), commit=lambda: None)
+    executor = PhasedBuildExecutor(project_id=1, execution_id=7, db=db)
+
+    async def ok(*args, **kwargs):
+        return {"success": True, "branch_name": "build/phase-3", "url": "http://pr", "deployed_components": ["x"]}
+
+    executor.jordan_service = types.SimpleNamespace(
+        create_phase_branch=ok, commit_files=ok, create_phase_pr=ok, deploy_phase=ok,
+    )
+    return executor
+
+
+def _lwc_generator(calls, feedbacks):
+    async def fake_generate(agent, batch_tasks, phase, context, retry_feedback=""):
+        name = batch_tasks[0]["name"]
+        calls[name] += 1
+        feedbacks[name] = retry_feedback
+        js = f"export default class {name} extends LightningElement {{}} // v{calls[name]}"
+        return {"files": {f"force-app/main/default/lwc/{name}/{name}.js": js}}
+    return fake_generate
+
+
+def test_review_fail_regenerates_only_the_rejected_batch():
+    executor = _executor()
+    calls, feedbacks = Counter(), {}
+    executor._generate_single_batch = _lwc_generator(calls, feedbacks)
+    reviews = iter([
+        {"verdict": "FAIL", "validation_type": "llm", "feedback_for_developer": "Corriger le wiring.",
+         "issues": [{"severity": "critical", "file": "lwc/cmp3/cmp3.js", "description": "@wire mal configure"},
+                    {"severity": "info", "description": "nommage cmp1 perfectible"}]},
+        {"verdict": "PASS", "issues": []},
+    ])
+    reviewed = []
+
+    async def fake_review(phase, aggregated):
+        reviewed.append(dict(aggregated["files"]))
+        return next(reviews)
+
+    executor._elena_review = fake_review
+    tasks = [{"name": f"cmp{i}"} for i in range(30)]
+    result = asyncio.run(executor.execute_phase({"phase": 3, "name": "ui_components", "agent": "zara"}, tasks))
+
+    assert result["success"]
+    assert calls["cmp3"] == 2
+    assert sum(calls.values()) == 31
+    assert result["regenerated_batches"] == 1
+    assert "Corriger le wiring." in feedbacks["cmp3"] and "@wire mal configure" in feedbacks["cmp3"]
+    # Le lot regenere remplace l'ancien dans l'agregat, les autres sont inchanges.
+    final = reviewed[-1]
+    assert len(final) == 30
+    assert final["force-app/main/default/lwc/cmp3/cmp3.js"].endswith("v2")
+    assert final["force-app/main/default/lwc/cmp4/cmp4.js"].endswith("v1")
+
+
+def test_issue_matched_by_name_in_description():
+    executor = _executor()
+    batch_results = [
+        {"operations": [{"type": "create_object", "api_name": "Formation__c"}]},
+        {"operations": [{"type": "create_object", "api_name": "Session__c"},
+                        {"type": "create_field", "object": "Session__c", "api_name": "Date__c"}]},
+        None,
+    ]
+    review = {"verdict": "FAIL", "issues": [
+        {"severity": "critical", "file": "plan.json", "description": "Champ Session__c.Date__c sans type"}]}
+    retry, feedback = executor._resolve_retry_batches(1, review, batch_results, "")
+    assert retry == {1, 2}            # lot rejete + lot sans resultat
+    assert "Date__c" in feedback[1]
+
+
+def test_unattributable_issue_falls_back_to_full_retry():
+    executor = _executor()
+    batch_results = [{"files": {"lwc/a/a.js": ""}}, {"files": {"lwc/b/b.js": ""}}]
+    review = {"verdict": "FAIL", "issues": [{"severity": "critical", "description": "Architecture incoherente"}]}
+    assert executor._resolve_retry_batches(3, review, batch_results, "")[0] is None
+    crashed = {"verdict": "FAIL", "validation_type": "error", "issues": [{"severity": "critical", "file": "lwc/a/a.js"}]}
+    assert executor._resolve_retry_batches(3, crashed, batch_results, "")[0] is None
+
+
+def test_partial_retry_rebuilds_phase_context():
+    executor = _executor()
+    first = [{"operations": [{"type": "create_object", "api_name": "Old__c"}]},
+             {"operations": [{"type": "create_object", "api_name": "Keep__c"}]}]
+    for batch in first:
+        executor.context_registry.register_batch_output(1, batch)
+
+    async def fake_generate(agent, batch_tasks, phase, context, retry_feedback=""):
+        return {"operations": [{"type": "create_object", "api_name": "New__c"}]}
+
+    executor._generate_single_batch = fake_generate
+    results = asyncio.run(executor._generate_batches(
+        "raj", [[{"target_object": "A"}], [{"target_object": "B"}]], 1, only={0}, previous=first,
+    ))
+    assert results[1] is first[1]
+    assert executor.context_registry.generated_objects == ["Keep__c", "New__c"]
+
+
+def test_shared_object_name_does_not_pick_the_first_batch():
+    executor = _executor()
+    batch_results = [
+        {"operations": [{"type": "create_object", "api_name": "Formation__c"}],
+         "files": {"classes/FormationService.cls": "public class FormationService {}"}},
+        {"operations": [{"type": "create_field", "object": "Formation__c", "api_name": "Prix__c"}]},
+        {"operations": [{"type": "create_field", "object": "Formation__c", "api_name": "Duree__c"}]},
+    ]
+    review = {"verdict": "FAIL", "issues": [
+        {"severity": "critical", "description": "Formation__c : Prix__c sans valeur par defaut"},
+        {"severity": "critical", "component": "FormationService", "description": "SOQL sur Formation__c sans limite"}]}
+    retry, feedback = executor._resolve_retry_batches(1, review, batch_results, "")
+    assert retry == {0, 1}                       # objet commun aux 3 lots : c'est Prix__c qui tranche
+    assert "Prix__c" in feedback[1] and "SOQL" in feedback[0] and "Prix__c" not in feedback[0]
+
+    tie = {"verdict": "FAIL", "issues": [{"severity": "critical", "description": "Formation__c : sharing incoherent"}]}
+    retry, feedback = executor._resolve_retry_batches(1, tie, batch_results, "")
+    assert retry == {0, 1, 2} and all("sharing" in feedback[i] for i in retry)
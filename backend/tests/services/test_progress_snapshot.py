@@ -0,0 +1,131 @@
+"""Tests PROGRESS-SNAP — snapshots de progression partagés entre viewers SSE/WebSocket."""
+import asyncio
+import threading
+import types
+
+from app.models.execution import ExecutionStatus
+from app.services import progress_snapshot as ps
+
+
+def _execution(**overrides):
+    data = dict(
+        id=42,
+        status=ExecutionStatus.RUNNING,
+        execution_state="sds_generating",
+        selected_agents=["pm", "ba"],
+        agent_execution_status={"pm": {"state": "completed", "progress": 15}, "ba": {"state": "running"}},
+        current_agent="ba",
+        progress=20,
+        sds_document_path=None,
+    )
+    data.update(overrides)
+    return types.SimpleNamespace(**data)
+
+
+# --- build_progress_snapshot -----------------------------------------------
+def test_snapshot_contains_stream_fields():
+    snap = ps.build_progress_snapshot(_execution(), version=7)
+    assert snap["version"] == 7
+    assert snap["status"] == "running"
+    assert snap["overall_progress"] == 50
+    assert snap["current_phase"] == "Running Olivia (BA)"
+    assert [a["status"] for a in snap["agent_progress"]] == ["completed", "in_progress"]
+    assert ps.snapshot_fits_notify(snap)
+
+
+def test_oversized_snapshot_does_not_fit_notify():
+    big = {"pm": {"state": "running", "message": "x" * (ps.MAX_NOTIFY_SNAPSHOT_BYTES + 1)}}
+    snap = ps.build_progress_snapshot(_execution(agent_execution_status=big), version=1)
+    assert not ps.snapshot_fits_notify(snap)
+
+
+def test_versions_are_monotonic():
+    v1 = ps.next_snapshot_version()
+    assert ps.next_snapshot_version(v1) > v1
+    assert ps.next_snapshot_version(10**15) == 10**15 + 1
+
+
+# --- ProgressSnapshotCache -------------------------------------------------
+def test_update_ignores_older_versions():
+    cache = ps.ProgressSnapshotCache()
+    assert cache.update({"execution_id": 1, "version": 5, "status": "running"})
+    assert not cache.update({"execution_id": 1, "version": 4, "status": "pending"})
+    assert cache.get(1)["status"] == "running"
+
+
+def test_cache_is_bounded():
+    cache = ps.ProgressSnapshotCache(max_entries=2)
+    for i in range(3):
+        cache.update({"execution_id": i, "version": 1})
+    assert cache.get(0) is None
+    assert cache.get(2) is not None
+
+
+def test_concurrent_misses_share_one_db_load():
+    cache = ps.ProgressSnapshotCache()
+    calls = []
+    gate = threading.Event()
+
+    def loader():
+        calls.append(1)
+        gate.wait(timeout=5)
+        return {"execution_id": 9, "version": 1, "status": "running"}
+
+    async def scenario():
+        viewers = [asyncio.create_task(cache.get_or_load(9, loader)) for _ in range(50)]
+        await asyncio.sleep(0.05)
+        gate.set()
+        return await asyncio.gather(*viewers)
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(r["status"] == "running" for r in results)
+
+
+def test_cancelled_loader_does_not_strand_waiters():
+    cache = ps.ProgressSnapshotCache()
+    calls = []
+    gate = threading.Event()
+
+    def loader():
+        calls.append(1)
+        if len(calls) == 1:
+            gate.wait(timeout=5)
+        return {"execution_id": 9, "version": 1, "status": "running"}
+
+    async def scenario():
+        first = asyncio.create_task(cache.get_or_load(9, loader))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(cache.get_or_load(9, loader))
+        await asyncio.sleep(0.05)
+        first.cancel()  # the client that started the load disconnects
+        try:
+            return await asyncio.wait_for(second, timeout=2)
+        finally:
+            gate.set()
+
+    result = asyncio.run(scenario())
+    assert result["status"] == "running"
+    assert len(calls) == 2
+    assert cache._loads == {}
+
+
+def test_pushed_snapshot_served_without_db():
+    cache = ps.ProgressSnapshotCache()
+    cache.update({"execution_id": 3, "version": 2, "status": "completed"})
+
+    def loader():
+        raise AssertionError("DB should not be read")
+
+    snap = asyncio.run(cache.get_or_load(3, loader, max_age=60))
+    assert snap["status"] == "completed"
+    assert cache.stats["db_loads"] == 0
+
+
+def test_stale_entry_is_reloaded():
+    cache = ps.ProgressSnapshotCache()
+    cache.update({"execution_id": 3, "version": 2, "status": "running"})
+    snap = asyncio.run(cache.get_or_load(
+        3, lambda: {"execution_id": 3, "version": 3, "status": "failed"}, max_age=0
+    ))
+    assert snap["status"] == "failed"
@@ -0,0 +1,86 @@
+"""Tests INGEST-001 — ingestion RAG par batches (embedder et collection mockés, aucun appel réseau)."""
+import threading
+import types
+
+import pytest
+
+from app.services import rag_service
+
+
+class _FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def create(self, model, input):
+        with self._lock:
+            self.calls.append(list(input))
+        # Réponse volontairement désordonnée : l'ordre doit venir de .index
+        data = [types.SimpleNamespace(index=i, embedding=[float(len(t)), float(i)]) for i, t in enumerate(input)]
+        return types.SimpleNamespace(data=list(reversed(data)))
+
+
+class _FakeCollection:
+    def __init__(self):
+        self.upserts = []
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        assert len(ids) == len(embeddings) == len(documents) == len(metadatas)
+        self.upserts.append(dict(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas))
+
+
+@pytest.fixture
+def fakes(monkeypatch):
+    embeddings = _FakeEmbeddings()
+    collection = _FakeCollection()
+    monkeypatch.setattr(rag_service, "get_openai_client", lambda: types.SimpleNamespace(embeddings=embeddings))
+    monkeypatch.setattr(rag_service, "get_collection", lambda name: collection)
+    return embeddings, collection
+
+
+def test_openai_embeddings_are_batched_and_ordered(fakes):
+    embeddings, _ = fakes
+    texts = ["x" * n for n in range(1, 11)]
+    vectors = rag_service.embed_texts(texts, "openai", batch_size=4, workers=3)
+    assert sorted(len(c) for c in embeddings.calls) == [2, 4, 4]
+    assert [v[0] for v in vectors] == [float(n) for n in range(1, 11)]
+
+
+def test_ingest_streams_slices_with_stable_ids(fakes):
+    embeddings, collection = fakes
+    chunks = (f"chunk {i}" for i in range(25))  # générateur : jamais matérialisé en entier
+    count = rag_service.ingest_document(
+        "technical", chunks, metadata={"source": "a.pdf"}, project_id=7, document_id=3,
+        batch_size=4, slice_size=10,
+    )
+    assert count == 25
+    assert [len(u["ids"]) for u in collection.upserts] == [10, 10, 5]
+    ids = [i for u in collection.upserts for i in u["ids"]]
+    assert ids == [f"proj7_doc3_{i}" for i in range(25)]
+    meta = collection.upserts[0]["metadatas"][0]
+    assert meta == {"source": "a.pdf", "project_id": "7", "document_id": "3"}
+    assert sum(len(c) for c in embeddings.calls) == 25
+    assert max(len(c) for c in embeddings.calls) == 4
+
+
+def test_ingest_empty_document(fakes):
+    _, collection = fakes
+    assert rag_service.ingest_document("technical", [], project_id=1, document_id=1) == 0
+    assert collection.upserts == []
+
+
+def test_nomic_uses_single_batched_encode(fakes, monkeypatch):
+    calls = []
+
+    class _Model:
+        def encode(self, texts, batch_size, convert_to_numpy):
+            calls.append((list(texts), batch_size))
+            import numpy as np
+            return np.zeros((len(texts), 3))
+
+    monkeypatch.setattr(rag_service, "get_nomic_model", lambda: _Model())
+    _, collection = fakes
+    rag_service.ingest_document("apex", ["a", "b", "c"], project_id=1, document_id=2)
+    assert len(calls) == 1
+    assert calls[0][0] == ["search_document: a", "search_document: b", "search_document: c"]
+    assert len(collection.upserts[0]["embeddings"][0]) == 3
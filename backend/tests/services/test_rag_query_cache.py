@@ -0,0 +1,90 @@
+"""Tests QEMB-CACHE — cache des embeddings de requête et requêtes concurrentes (aucun appel réseau)."""
+import threading
+import time
+
+import pytest
+
+from app.services import rag_service
+
+
+class _FakeCollection:
+    def __init__(self, name, delay=0.0):
+        self.name = name
+        self.delay = delay
+        self.embeddings = []
+
+    def query(self, query_embeddings, n_results, where):
+        self.embeddings.append(query_embeddings[0])
+        time.sleep(self.delay)
+        return {"documents": [[f"{self.name} doc"]], "metadatas": [[{"source": f"{self.name}.txt"}]]}
+
+
+@pytest.fixture
+def env(monkeypatch):
+    calls = {"openai": [], "nomic": []}
+    lock = threading.Lock()
+
+    def fake_openai(text):
+        with lock:
+            calls["openai"].append(text)
+        return [1.0, 0.0]
+
+    def fake_nomic(text, is_query=True):
+        with lock:
+            calls["nomic"].append(text)
+        return [0.0, 1.0]
+
+    collections = {k: _FakeCollection(k, delay=0.1) for k in rag_service.COLLECTIONS}
+    monkeypatch.setattr(rag_service, "get_openai_embedding", fake_openai)
+    monkeypatch.setattr(rag_service, "get_nomic_embedding", fake_nomic)
+    monkeypatch.setattr(rag_service, "get_collection", lambda key: collections[key])
+    monkeypatch.setattr(rag_service, "_query_embedding_cache", rag_service.QueryEmbeddingCache())
+    monkeypatch.setattr(
+        rag_service, "_registry_rag_collections",
+        lambda agent_type: ["technical", "operations", "business", "apex"],
+    )
+    return calls, collections
+
+
+def test_one_embedding_per_type_and_concurrent_queries(env):
+    calls, collections = env
+    t0 = time.monotonic()
+    result = rag_service.query_rag("Comment créer un trigger ?", use_reranking=False, n_candidates=40)
+    elapsed = time.monotonic() - t0
+    assert len(calls["openai"]) == 1
+    assert len(calls["nomic"]) == 1
+    assert collections["apex"].embeddings == [[0.0, 1.0]]
+    # Ordre des résultats = ordre des collections, pas ordre de complétion
+    assert result["documents"] == ["technical doc", "operations doc", "business doc", "apex doc"]
+    assert elapsed < 0.35  # 4 requêtes de 100 ms en parallèle
+
+
+def test_repeated_query_hits_cache(env):
+    calls, _ = env
+    rag_service.query_rag("trigger   best practices", use_reranking=False)
+    rag_service.query_rag("  trigger best practices ", use_reranking=False)
+    assert len(calls["openai"]) == 1
+    stats = rag_service.get_query_cache_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2
+    assert stats["hit_rate"] == 0.5
+
+
+def test_embedding_failure_skips_only_that_type(env, monkeypatch):
+    def broken(text):
+        raise RuntimeError("quota")
+
+    monkeypatch.setattr(rag_service, "get_openai_embedding", broken)
+    result = rag_service.query_rag("x", use_reranking=False)
+    assert result["documents"] == ["apex doc"]
+
+
+def test_cache_ttl_and_lru():
+    cache = rag_service.QueryEmbeddingCache(max_entries=2, ttl=0.05)
+    cache.put("m", "a", [1.0])
+    cache.put("m", "b", [2.0])
+    assert cache.get("m", "a") == [1.0]
+    cache.put("m", "c", [3.0])  # évince "b" (moins récemment utilisé)
+    assert cache.get("m", "b") is None
+    assert cache.get("other-model", "a") is None
+    time.sleep(0.06)
+    assert cache.get("m", "a") is None
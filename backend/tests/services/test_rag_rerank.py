@@ -0,0 +1,71 @@
+"""Tests RERANK-001 — reranking par indices, batching et cache de scores (cross-encoder mocké)."""
+import pytest
+
+from app.services import rag_service
+
+
+class _FakeReranker:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size, show_progress_bar):
+        self.calls.append((len(pairs), batch_size))
+        return [float(len(doc)) for _, doc in pairs]
+
+
+@pytest.fixture
+def reranker(monkeypatch):
+    fake = _FakeReranker()
+    monkeypatch.setattr(rag_service, "get_reranker", lambda: fake)
+    monkeypatch.setattr(rag_service, "_rerank_cache", rag_service.RerankScoreCache())
+    return fake
+
+
+def test_indices_sorted_by_score(reranker):
+    docs = ["aa", "aaaa", "a", "aaa"]
+    assert rag_service.rerank_indices("q", docs, top_k=3) == [(1, 4.0), (3, 3.0), (0, 2.0)]
+    assert reranker.calls == [(4, rag_service.RERANK_BATCH_SIZE)]
+    assert rag_service.rerank_results("q", docs, top_k=1) == [("aaaa", 4.0)]
+
+
+def test_duplicate_texts_keep_their_own_metadata(reranker, monkeypatch):
+    def fake_query_collection(coll_key, query, n, project_id=None, query_embedding=None):
+        return ["shared text", "x" * (3 if coll_key == "technical" else 1)], [
+            {"source": f"{coll_key}-shared.txt"}, {"source": f"{coll_key}-other.txt"}
+        ]
+
+    monkeypatch.setattr(rag_service, "query_collection", fake_query_collection)
+    monkeypatch.setattr(rag_service, "get_query_embedding", lambda q, t: [0.0])
+    monkeypatch.setattr(rag_service, "_registry_rag_collections", lambda a: ["technical", "business"])
+    result = rag_service.query_rag("q", n_results=3)
+    assert result["documents"] == ["shared text", "shared text", "xxx"]
+    assert sorted(result["sources"]) == ["business-shared", "technical-other", "technical-shared"]
+    # Texte dupliqué scoré une seule fois
+    assert reranker.calls[0][0] == 3
+
+
+def test_cached_scores_skip_cross_encoder(reranker):
+    docs = ["alpha", "beta", "gamma"]
+    first = rag_service.rerank_indices("q", docs, top_k=3)
+    second = rag_service.rerank_indices(" q ", docs, top_k=3)
+    assert first == second
+    assert len(reranker.calls) == 1
+    rag_service.rerank_indices("q", docs + ["delta!"], top_k=2)
+    assert reranker.calls[-1][0] == 1
+    assert rag_service.get_rerank_cache_stats()["hits"] == 6
+
+
+def test_no_reranker_keeps_original_order(monkeypatch):
+    monkeypatch.setattr(rag_service, "get_reranker", lambda: None)
+    assert rag_service.rerank_indices("q", ["a", "b", "c"], top_k=2) == [(0, 1.0), (1, 1.0)]
+
+
+def test_score_cache_keys_on_normalized_query_and_document_hash():
+    cache = rag_service.RerankScoreCache(max_entries=2, ttl=60)
+    cache.put("Quel  objet ?", "doc A", 0.5)
+    assert cache.get("Quel objet ?", "doc A") == 0.5
+    assert cache.get("Quel objet ?", "doc B") is None
+    cache.put("q", "doc B", 1.0)
+    cache.put("q", "doc C", 2.0)                      # LRU : "doc A" evince
+    assert cache.get("Quel objet ?", "doc A") is None
+    assert cache.stats()["entries"] == 2